@@ -10,27 +10,17 @@ import sys
 from pathlib import Path
 from datetime import datetime
 
-def find_custom_endpoints(obj, path=""):
-    """Recursively find all CustomEndpoint queries"""
-    endpoints = []
-    
-    if isinstance(obj, dict):
-        # Check if this is a CustomEndpoint query
-        if obj.get("version") == "CustomEndpoint/1.0" and "url" in obj:
-            endpoints.append((path, obj))
-        
-        # Recurse into nested dictionaries
-        for key, value in obj.items():
-            new_path = f"{path}.{key}" if path else key
-            endpoints.extend(find_custom_endpoints(value, new_path))
-    
-    elif isinstance(obj, list):
-        # Recurse into list items
-        for i, item in enumerate(obj):
-            new_path = f"{path}[{i}]"
-            endpoints.extend(find_custom_endpoints(item, new_path))
-    
-    return endpoints
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'scripts'))
+from json_walk import to_path, walk  # noqa: E402
+from workbook_index import decode_query, default_decoder, looks_like_json_query  # noqa: E402
+
+def find_custom_endpoints(obj):
+    """Find all CustomEndpoint queries (iterative walk, paths built only for matches)"""
+    return [
+        (to_path(location).lstrip("."), node)
+        for location, node in walk(obj)
+        if isinstance(node, dict) and node.get("version") == "CustomEndpoint/1.0" and "url" in node
+    ]
 
 def add_function_key_param(workbook):
     """Add FunctionKey parameter to global parameters"""
@@ -65,43 +55,35 @@ def add_function_key_param(workbook):
     return False
 
 def update_custom_endpoint_urls(obj):
-    """Recursively update CustomEndpoint URLs to include function key"""
+    """Update CustomEndpoint URLs to include function key (iterative walk, no recursion)"""
     updated_count = 0
     
-    if isinstance(obj, dict):
-        # Check if this is a query field with embedded JSON
-        if "query" in obj and isinstance(obj["query"], str):
-            try:
-                # Try to parse the query JSON
-                query_data = json.loads(obj["query"])
-                
-                if query_data.get("version") == "CustomEndpoint/1.0" and "url" in query_data:
-                    url = query_data["url"]
-                    
-                    # Check if URL already has code parameter
-                    if "code=" not in url and "?code=" not in url:
-                        # Add code parameter
-                        if "?" in url:
-                            query_data["url"] = url + "&code={FunctionKey}"
-                        else:
-                            query_data["url"] = url + "?code={FunctionKey}"
-                        
-                        # Update the query field with modified JSON
-                        obj["query"] = json.dumps(query_data, separators=(',', ': '))
-                        updated_count += 1
-                        print(f"  ✅ Updated: {url[:60]}...")
-            except (json.JSONDecodeError, TypeError):
-                pass
+    for _, node in walk(obj):
+        # Check if this is a query field with embedded JSON (decoded once per run)
+        if not isinstance(node, dict) or not looks_like_json_query(node.get("query")):
+            continue
         
-        # Recurse into nested objects
-        for value in obj.values():
-            if isinstance(value, (dict, list)):
-                updated_count += update_custom_endpoint_urls(value)
-    
-    elif isinstance(obj, list):
-        for item in obj:
-            if isinstance(item, (dict, list)):
-                updated_count += update_custom_endpoint_urls(item)
+        decoded = decode_query(node["query"])
+        query_data = decoded.value if decoded.ok else None
+        
+        if isinstance(query_data, dict) and query_data.get("version") == "CustomEndpoint/1.0" and "url" in query_data:
+            url = query_data["url"]
+            
+            # Check if URL already has code parameter
+            if "code=" not in url and "?code=" not in url:
+                # Decoded queries are shared through the cache, so modify a copy
+                query_data = dict(query_data)
+                
+                # Add code parameter
+                if "?" in url:
+                    query_data["url"] = url + "&code={FunctionKey}"
+                else:
+                    query_data["url"] = url + "?code={FunctionKey}"
+                
+                # Update the query field with modified JSON
+                node["query"] = json.dumps(query_data, separators=(',', ': '))
+                updated_count += 1
+                print(f"  ✅ Updated: {url[:60]}...")
     
     return updated_count
 
@@ -138,6 +120,13 @@ def main():
     print()
     print(f"📊 Summary: {updated_count} URLs updated")
     
+    # Malformed embedded queries are reported, not silently dropped
+    malformed = default_decoder.errors()
+    if malformed:
+        print(f"⚠️  {len(malformed)} embedded queries are not valid JSON and were left unchanged:")
+        for query_text, error in malformed:
+            print(f"  ❌ {error}: {query_text[:60]}...")
+    
     if updated_count > 0 or param_added:
         # Save updated workbook
         print()
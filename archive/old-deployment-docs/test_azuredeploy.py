@@ -8,13 +8,20 @@ and properly formatted on lines 132 and 136.
 import json
 import sys
 import re
+from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'scripts'))
+from verification_cache import VerificationCache  # noqa: E402
 
-def test_json_validity():
+# Bump whenever a test changes so cached results are invalidated
+CHECKER_VERSION = '2'
+
+
+def test_json_validity(template_path='azuredeploy.json'):
     """Test that the JSON file is syntactically valid."""
     print("Testing JSON validity...")
     try:
-        with open('azuredeploy.json', 'r') as f:
+        with open(template_path, 'r') as f:
             template = json.load(f)
         print("  ✅ JSON is syntactically valid")
         return True, template
@@ -37,12 +44,17 @@ def test_required_sections(template):
     return all_present
 
 
+def find_function_app(template):
+    """Return the Microsoft.Web/sites resource (its position in resources has moved over time)."""
+    return next(r for r in template['resources'] if r.get('type') == 'Microsoft.Web/sites')
+
+
 def test_listkeys_function_calls(template):
     """Test that listKeys function calls are complete on lines 132 and 136."""
     print("\nTesting listKeys function calls...")
     
-    # Get the function app resource (3rd resource)
-    function_app = template['resources'][2]
+    # Get the function app resource
+    function_app = find_function_app(template)
     app_settings = function_app['properties']['siteConfig']['appSettings']
     
     # Settings to check
@@ -106,7 +118,7 @@ def test_connection_string_format(template):
     """Test that connection strings have the correct format."""
     print("\nTesting connection string format...")
     
-    function_app = template['resources'][2]
+    function_app = find_function_app(template)
     app_settings = function_app['properties']['siteConfig']['appSettings']
     
     settings_to_check = [
@@ -141,6 +153,20 @@ def test_connection_string_format(template):
     return all_valid
 
 
+def run_all_tests(template_path='azuredeploy.json'):
+    """Run every test and return [(test name, passed), ...]"""
+    json_valid, template = test_json_validity(template_path)
+    if not json_valid:
+        return [("JSON Syntax", False)]
+    
+    return [
+        ("JSON Syntax", json_valid),
+        ("Required Sections", test_required_sections(template)),
+        ("listKeys Function Calls", test_listkeys_function_calls(template)),
+        ("Connection String Format", test_connection_string_format(template))
+    ]
+
+
 def main():
     """Run all tests."""
     print("=" * 70)
@@ -148,28 +174,25 @@ def main():
     print("Testing: deployment/azuredeploy.json")
     print("=" * 70)
     
-    # Run tests
-    json_valid, template = test_json_validity()
+    # Run tests (replayed from the cache when azuredeploy.json is unchanged)
+    if '--no-cache' in sys.argv:
+        all_tests = run_all_tests()
+    else:
+        cache = VerificationCache()
+        all_tests = cache.run('azuredeploy.json', 'test_azuredeploy', CHECKER_VERSION, run_all_tests)
+        if cache.hits:
+            print("\n  ℹ️  azuredeploy.json unchanged since last run (cached results)")
+    
+    json_valid = all_tests[0][1]
     if not json_valid:
         print("\n❌ VALIDATION FAILED: JSON is not valid")
         sys.exit(1)
     
-    sections_valid = test_required_sections(template)
-    listkeys_valid = test_listkeys_function_calls(template)
-    connection_string_valid = test_connection_string_format(template)
-    
     # Summary
     print("\n" + "=" * 70)
     print("VALIDATION SUMMARY")
     print("=" * 70)
     
-    all_tests = [
-        ("JSON Syntax", json_valid),
-        ("Required Sections", sections_valid),
-        ("listKeys Function Calls", listkeys_valid),
-        ("Connection String Format", connection_string_valid)
-    ]
-    
     all_passed = True
     for test_name, result in all_tests:
         status = "✅ PASS" if result else "❌ FAIL"
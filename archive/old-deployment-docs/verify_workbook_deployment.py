@@ -12,9 +12,17 @@ This script verifies that the workbooks are correctly configured with:
 
 import json
 import sys
-import base64
+from pathlib import Path
 from typing import Dict, List, Tuple
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'scripts'))
+from verification_cache import VerificationCache  # noqa: E402
+from workbook_embed import EmbedError, decode_embedded, find_workbook_resource, load_template  # noqa: E402
+from workbook_index import QueryRef, WorkbookIndex  # noqa: E402
+
+# Bump whenever a verify_* check changes so cached results are invalidated
+CHECKER_VERSION = '2'
+
 
 class Colors:
     """ANSI color codes for terminal output"""
@@ -48,68 +56,14 @@ def print_info(text: str):
     print(f"{Colors.YELLOW}ℹ️  {text}{Colors.RESET}")
 
 
-def find_armendpoint_queries(obj, path="") -> List[Dict]:
-    """Recursively find all ARMEndpoint queries in a workbook structure"""
-    results = []
-    
-    if isinstance(obj, dict):
-        # Check if this has a query field with ARMEndpoint
-        if 'query' in obj:
-            query = obj.get('query', '')
-            if isinstance(query, str) and 'ARMEndpoint' in query:
-                try:
-                    query_obj = json.loads(query)
-                    if query_obj.get('version') == 'ARMEndpoint/1.0':
-                        results.append({
-                            'path': path,
-                            'query_obj': query_obj,
-                            'parent': obj
-                        })
-                except:
-                    pass
-        
-        # Recurse into dict values
-        for key, value in obj.items():
-            results.extend(find_armendpoint_queries(value, f"{path}.{key}"))
-    
-    elif isinstance(obj, list):
-        # Recurse into list items
-        for i, item in enumerate(obj):
-            results.extend(find_armendpoint_queries(item, f"{path}[{i}]"))
-    
-    return results
-
-
-def find_customendpoint_queries(obj, path="") -> List[Dict]:
-    """Recursively find all CustomEndpoint queries in a workbook structure"""
-    results = []
-    
-    if isinstance(obj, dict):
-        # Check if this has a query field with CustomEndpoint
-        if 'query' in obj:
-            query = obj.get('query', '')
-            if isinstance(query, str) and 'CustomEndpoint' in query:
-                try:
-                    query_obj = json.loads(query)
-                    if query_obj.get('version') == 'CustomEndpoint/1.0':
-                        results.append({
-                            'path': path,
-                            'query_obj': query_obj,
-                            'parent': obj
-                        })
-                except:
-                    pass
-        
-        # Recurse into dict values
-        for key, value in obj.items():
-            results.extend(find_customendpoint_queries(value, f"{path}.{key}"))
-    
-    elif isinstance(obj, list):
-        # Recurse into list items
-        for i, item in enumerate(obj):
-            results.extend(find_customendpoint_queries(item, f"{path}[{i}]"))
-    
-    return results
+def find_armendpoint_queries(obj) -> List[QueryRef]:
+    """Find all ARMEndpoint queries in a workbook structure"""
+    return WorkbookIndex.of(obj).armendpoint_queries
+
+
+def find_customendpoint_queries(obj) -> List[QueryRef]:
+    """Find all CustomEndpoint queries in a workbook structure"""
+    return WorkbookIndex.of(obj).customendpoint_queries
 
 
 def verify_functionappname_parameter(workbook: Dict, workbook_name: str) -> Tuple[bool, Dict]:
@@ -119,39 +73,36 @@ def verify_functionappname_parameter(workbook: Dict, workbook_name: str) -> Tupl
     issues = []
     
     # Find parameters configuration
-    for item in workbook.get('items', []):
-        if item.get('type') == 9:  # parameters type
-            params = item.get('content', {}).get('parameters', [])
-            for param in params:
-                if 'FunctionAppName' in param.get('name', ''):
-                    print_success(f"Found FunctionAppName parameter")
-                    
-                    # Check if required
-                    is_required = param.get('isRequired', False)
-                    if is_required:
-                        print_success(f"  Parameter is required: {is_required}")
-                    else:
-                        print_error(f"  Parameter should be required but is: {is_required}")
-                        issues.append("FunctionAppName parameter is not required")
-                    
-                    # Check default value
-                    default_value = param.get('value', 'N/A')
-                    print_info(f"  Default value: {default_value}")
-                    
-                    # Check description
-                    description = param.get('description', '')
-                    if description:
-                        print_success(f"  Has description")
-                    else:
-                        issues.append("FunctionAppName parameter missing description")
-                    
-                    return len(issues) == 0, {
-                        'found': True,
-                        'required': is_required,
-                        'default': default_value,
-                        'description': description,
-                        'issues': issues
-                    }
+    for param in WorkbookIndex.of(workbook).parameters(top_level_only=True):
+        if 'FunctionAppName' in param.get('name', ''):
+            print_success(f"Found FunctionAppName parameter")
+            
+            # Check if required
+            is_required = param.get('isRequired', False)
+            if is_required:
+                print_success(f"  Parameter is required: {is_required}")
+            else:
+                print_error(f"  Parameter should be required but is: {is_required}")
+                issues.append("FunctionAppName parameter is not required")
+            
+            # Check default value
+            default_value = param.get('value', 'N/A')
+            print_info(f"  Default value: {default_value}")
+            
+            # Check description
+            description = param.get('description', '')
+            if description:
+                print_success(f"  Has description")
+            else:
+                issues.append("FunctionAppName parameter missing description")
+            
+            return len(issues) == 0, {
+                'found': True,
+                'required': is_required,
+                'default': default_value,
+                'description': description,
+                'issues': issues
+            }
     
     print_error("FunctionAppName parameter not found")
     return False, {'found': False, 'issues': ['FunctionAppName parameter not found']}
@@ -164,35 +115,32 @@ def verify_functionkey_parameter(workbook: Dict, workbook_name: str) -> Tuple[bo
     issues = []
     
     # Find parameters configuration
-    for item in workbook.get('items', []):
-        if item.get('type') == 9:  # parameters type
-            params = item.get('content', {}).get('parameters', [])
-            for param in params:
-                if 'FunctionKey' in param.get('name', ''):
-                    print_success(f"Found FunctionKey parameter")
-                    
-                    # Check if NOT required (should be optional)
-                    is_required = param.get('isRequired', False)
-                    if not is_required:
-                        print_success(f"  Parameter is optional: {not is_required}")
-                    else:
-                        print_error(f"  Parameter should be optional but is required: {is_required}")
-                        issues.append("FunctionKey parameter should be optional")
-                    
-                    # Check description
-                    description = param.get('description', '')
-                    if description and 'optional' in description.lower():
-                        print_success(f"  Has description mentioning optional")
-                    else:
-                        print_info(f"  Description should mention optional usage")
-                        issues.append("FunctionKey parameter description should mention it's optional")
-                    
-                    return len(issues) == 0, {
-                        'found': True,
-                        'required': is_required,
-                        'description': description,
-                        'issues': issues
-                    }
+    for param in WorkbookIndex.of(workbook).parameters(top_level_only=True):
+        if 'FunctionKey' in param.get('name', ''):
+            print_success(f"Found FunctionKey parameter")
+            
+            # Check if NOT required (should be optional)
+            is_required = param.get('isRequired', False)
+            if not is_required:
+                print_success(f"  Parameter is optional: {not is_required}")
+            else:
+                print_error(f"  Parameter should be optional but is required: {is_required}")
+                issues.append("FunctionKey parameter should be optional")
+            
+            # Check description
+            description = param.get('description', '')
+            if description and 'optional' in description.lower():
+                print_success(f"  Has description mentioning optional")
+            else:
+                print_info(f"  Description should mention optional usage")
+                issues.append("FunctionKey parameter description should mention it's optional")
+            
+            return len(issues) == 0, {
+                'found': True,
+                'required': is_required,
+                'description': description,
+                'issues': issues
+            }
     
     print_info("FunctionKey parameter not found (acceptable if using anonymous access)")
     return True, {'found': False, 'issues': []}  # Not finding it is OK
@@ -224,6 +172,11 @@ def verify_custom_endpoints(workbook: Dict, workbook_name: str) -> Tuple[bool, D
     issues = []
     correct_endpoints = 0
     
+    # Report embedded queries that are not valid JSON instead of skipping them
+    for q in WorkbookIndex.of(workbook).malformed_queries:
+        print_error(f"  Malformed query at {q.path}: {q.error}")
+        issues.append(f"Malformed query at {q.path}: {q.error}")
+    
     for i, q in enumerate(queries_to_check, 1):
         query_obj = q['query_obj']
         # CustomEndpoint uses 'url', ARMEndpoint uses 'path'
@@ -440,20 +393,7 @@ def verify_arm_action_contexts(workbook: Dict, workbook_name: str) -> Tuple[bool
     """Verify ARM action contexts have Content-Type headers"""
     print(f"\n{Colors.BOLD}Checking ARM action contexts in {workbook_name}...{Colors.RESET}")
     
-    def find_arm_actions(obj):
-        """Recursively find all ARM action contexts"""
-        results = []
-        if isinstance(obj, dict):
-            if 'armActionContext' in obj:
-                results.append(obj['armActionContext'])
-            for v in obj.values():
-                results.extend(find_arm_actions(v))
-        elif isinstance(obj, list):
-            for item in obj:
-                results.extend(find_arm_actions(item))
-        return results
-    
-    actions = find_arm_actions(workbook)
+    actions = WorkbookIndex.of(workbook).arm_action_contexts
     
     if not actions:
         print_info("No ARM action contexts found")
@@ -510,8 +450,7 @@ def verify_arm_template_deployment(template_path: str) -> Tuple[bool, Dict]:
     print_header("Verifying ARM Template Deployment")
     
     try:
-        with open(template_path, 'r') as f:
-            template = json.load(f)
+        template = load_template(template_path)
     except Exception as e:
         print_error(f"Failed to load ARM template: {e}")
         return False, {'issues': [f"Failed to load ARM template: {e}"]}
@@ -519,11 +458,7 @@ def verify_arm_template_deployment(template_path: str) -> Tuple[bool, Dict]:
     issues = []
     
     # Find workbook resource
-    workbook_resource = None
-    for r in template.get('resources', []):
-        if 'workbook' in r.get('type', '').lower():
-            workbook_resource = r
-            break
+    workbook_resource = find_workbook_resource(template)
     
     if not workbook_resource:
         print_error("No workbook resource found in ARM template")
@@ -539,38 +474,38 @@ def verify_arm_template_deployment(template_path: str) -> Tuple[bool, Dict]:
     else:
         print_success("Found workbookContent variable")
         
-        # Try to decode and verify
+        # Decode straight into the workbook index (no re-serialized copy)
         try:
-            content = variables['workbookContent']
-            decoded = base64.b64decode(content).decode('utf-8')
-            wb_content = json.loads(decoded)
+            workbook, stats = decode_embedded(template)
+            index = WorkbookIndex(workbook)
             
-            print_success(f"Successfully decoded embedded workbook (size: {len(decoded)} bytes)")
+            print_success(f"Successfully decoded embedded workbook (size: {stats['size']} bytes)")
             
             # Check for FunctionAppName
-            content_str = json.dumps(wb_content)
-            
-            if 'FunctionAppName' in content_str:
-                count = content_str.count('FunctionAppName')
-                print_success(f"Embedded workbook contains FunctionAppName ({count} occurrences)")
+            if stats['function_app_name_refs']:
+                print_success(f"Embedded workbook contains FunctionAppName ({stats['function_app_name_refs']} occurrences)")
             else:
                 print_error("Embedded workbook missing FunctionAppName")
                 issues.append("Embedded workbook missing FunctionAppName")
             
             # Check for placeholder
-            if '__FUNCTION_APP_NAME_PLACEHOLDER__' in content_str:
-                count = content_str.count('__FUNCTION_APP_NAME_PLACEHOLDER__')
-                print_success(f"Found placeholder for replacement ({count} occurrences)")
+            if stats['placeholder_refs']:
+                print_success(f"Found placeholder for replacement ({stats['placeholder_refs']} occurrences)")
             
-            # Check ARMEndpoint queries
-            if 'ARMEndpoint' in content_str:
-                count = content_str.count('ARMEndpoint')
-                print_success(f"Embedded workbook has {count} ARMEndpoint references")
+            # Check endpoint queries (CustomEndpoint, or legacy ARMEndpoint)
+            custom_count = len(index.customendpoint_queries)
+            arm_count = len(index.armendpoint_queries)
+            if custom_count or arm_count:
+                print_success(f"Embedded workbook has {custom_count} CustomEndpoint and {arm_count} ARMEndpoint queries")
             else:
-                print_error("Embedded workbook missing ARMEndpoint queries")
-                issues.append("Embedded workbook missing ARMEndpoint queries")
+                print_error("Embedded workbook missing endpoint queries")
+                issues.append("Embedded workbook missing endpoint queries")
+            
+            for q in index.malformed_queries:
+                print_error(f"Malformed query at {q.path}: {q.error}")
+                issues.append(f"Embedded workbook malformed query at {q.path}")
                 
-        except Exception as e:
+        except EmbedError as e:
             print_error(f"Failed to decode/verify workbook content: {e}")
             issues.append(f"Failed to decode workbook: {e}")
     
@@ -587,6 +522,40 @@ def verify_arm_template_deployment(template_path: str) -> Tuple[bool, Dict]:
     return len(issues) == 0, {'issues': issues}
 
 
+def run_cached(cache: VerificationCache, path: str, checker: str, check) -> Tuple[bool, Dict]:
+    """Run check(path) -> (passed, results), or replay the stored result if the file is unchanged"""
+    hits = cache.hits
+    passed, results = cache.run(path, checker, CHECKER_VERSION, lambda p: list(check(p)))
+    if cache.hits > hits:
+        print_info(f"{path} unchanged since last verification (cached result)")
+    return passed, results
+
+
+def verify_workbook_file(path: str, workbook_name: str, checks: List, cache: VerificationCache = None) -> Tuple[bool, Dict]:
+    """Load a workbook, index it once and run each (key, verify_*) check against the index"""
+    print_header(f"Verifying {Path(path).name}")
+    
+    def check(workbook_path):
+        with open(workbook_path, 'r') as f:
+            workbook = WorkbookIndex(json.load(f))
+        
+        passed = True
+        results = {}
+        for key, verify in checks:
+            check_passed, results[key] = verify(workbook, workbook_name)
+            passed = passed and check_passed
+        return passed, results
+    
+    try:
+        if cache:
+            checker = f"verify_workbook_deployment:{workbook_name}:{','.join(key for key, _ in checks)}"
+            return run_cached(cache, path, checker, check)
+        return check(path)
+    except Exception as e:
+        print_error(f"Failed to load {Path(path).name}: {e}")
+        return False, {}
+
+
 def main():
     """Run all verification checks"""
     print(f"{Colors.BOLD}{Colors.BLUE}")
@@ -598,70 +567,41 @@ def main():
     all_passed = True
     results = {}
     
-    # Verify DefenderC2-Workbook.json
-    print_header("Verifying DefenderC2-Workbook.json")
+    cache = None if '--no-cache' in sys.argv else VerificationCache()
     
-    try:
-        with open('../workbook/DefenderC2-Workbook.json', 'r') as f:
-            main_workbook = json.load(f)
-        
-        # Run checks
-        param_passed, param_results = verify_functionappname_parameter(main_workbook, "DefenderC2-Workbook")
-        funckey_passed, funckey_results = verify_functionkey_parameter(main_workbook, "DefenderC2-Workbook")
-        endpoint_passed, endpoint_results = verify_custom_endpoints(main_workbook, "DefenderC2-Workbook")
-        urlparams_passed, urlparams_results = verify_urlparams_format(main_workbook, "DefenderC2-Workbook")
-        refresh_passed, refresh_results = verify_auto_refresh(main_workbook, "DefenderC2-Workbook")
-        action_passed, action_results = verify_arm_action_endpoints(main_workbook, "DefenderC2-Workbook")
-        arm_ctx_passed, arm_ctx_results = verify_arm_action_contexts(main_workbook, "DefenderC2-Workbook")
-        
-        results['main_workbook'] = {
-            'parameter': param_results,
-            'functionkey': funckey_results,
-            'endpoints': endpoint_results,
-            'urlparams': urlparams_results,
-            'auto_refresh': refresh_results,
-            'actions': action_results,
-            'arm_contexts': arm_ctx_results
-        }
-        
-        if not all([param_passed, funckey_passed, endpoint_passed, urlparams_passed, refresh_passed, action_passed, arm_ctx_passed]):
-            all_passed = False
-            
-    except Exception as e:
-        print_error(f"Failed to load DefenderC2-Workbook.json: {e}")
+    # Verify DefenderC2-Workbook.json
+    main_passed, results['main_workbook'] = verify_workbook_file(
+        '../workbook/DefenderC2-Workbook.json', "DefenderC2-Workbook", [
+            ('parameter', verify_functionappname_parameter),
+            ('functionkey', verify_functionkey_parameter),
+            ('endpoints', verify_custom_endpoints),
+            ('urlparams', verify_urlparams_format),
+            ('auto_refresh', verify_auto_refresh),
+            ('actions', verify_arm_action_endpoints),
+            ('arm_contexts', verify_arm_action_contexts)
+        ], cache)
+    if not main_passed:
         all_passed = False
     
-    # Verify FileOperations.workbook
-    print_header("Verifying FileOperations.workbook")
-    
-    try:
-        with open('../workbook/FileOperations.workbook', 'r') as f:
-            file_ops_workbook = json.load(f)
-        
-        # Run checks (skip auto-refresh check for FileOperations)
-        param_passed, param_results = verify_functionappname_parameter(file_ops_workbook, "FileOperations")
-        funckey_passed, funckey_results = verify_functionkey_parameter(file_ops_workbook, "FileOperations")
-        endpoint_passed, endpoint_results = verify_custom_endpoints(file_ops_workbook, "FileOperations")
-        urlparams_passed, urlparams_results = verify_urlparams_format(file_ops_workbook, "FileOperations")
-        arm_ctx_passed, arm_ctx_results = verify_arm_action_contexts(file_ops_workbook, "FileOperations")
-        
-        results['file_operations'] = {
-            'parameter': param_results,
-            'functionkey': funckey_results,
-            'endpoints': endpoint_results,
-            'urlparams': urlparams_results,
-            'arm_contexts': arm_ctx_results
-        }
-        
-        if not all([param_passed, funckey_passed, endpoint_passed, urlparams_passed, arm_ctx_passed]):
-            all_passed = False
-            
-    except Exception as e:
-        print_error(f"Failed to load FileOperations.workbook: {e}")
+    # Verify FileOperations.workbook (skip auto-refresh check for FileOperations)
+    file_ops_passed, results['file_operations'] = verify_workbook_file(
+        '../workbook/FileOperations.workbook', "FileOperations", [
+            ('parameter', verify_functionappname_parameter),
+            ('functionkey', verify_functionkey_parameter),
+            ('endpoints', verify_custom_endpoints),
+            ('urlparams', verify_urlparams_format),
+            ('arm_contexts', verify_arm_action_contexts)
+        ], cache)
+    if not file_ops_passed:
         all_passed = False
     
     # Verify ARM template
-    template_passed, template_results = verify_arm_template_deployment('azuredeploy.json')
+    if cache:
+        template_passed, template_results = run_cached(
+            cache, 'azuredeploy.json', 'verify_workbook_deployment:arm_template',
+            verify_arm_template_deployment)
+    else:
+        template_passed, template_results = verify_arm_template_deployment('azuredeploy.json')
     results['arm_template'] = template_results
     
     if not template_passed:
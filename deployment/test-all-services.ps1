@@ -6,11 +6,13 @@ param(
     [string]$TenantId,
     
     [Parameter(Mandatory = $true)]
-    [string]$FunctionKey
+    [string]$FunctionKey,
+    
+    # e.g. http://localhost:7071/api/Gateway with the function host running against scripts/mock_xdr_api.py
+    [Parameter(Mandatory = $false)]
+    [string]$BaseUrl = "https://sentryxdr.azurewebsites.net/api/Gateway"
 )
 
-$baseUrl = "https://sentryxdr.azurewebsites.net/api/Gateway"
-
 $allTests = @()
 
 Write-Host "`n" + ("=" * 80) -ForegroundColor Cyan
@@ -2,16 +2,17 @@ using namespace System.Net
 
 param($Request, $TriggerMetadata)
 
-# Import required modules
-Import-Module "$PSScriptRoot/../modules/AuthManager.psm1" -Force
-Import-Module "$PSScriptRoot/../modules/ValidationHelper.psm1" -Force
-Import-Module "$PSScriptRoot/../modules/LoggingHelper.psm1" -Force
+# Import required modules (once per runspace, see ModuleLoader.psm1)
+Import-Module "$PSScriptRoot/../modules/ModuleLoader.psm1"
+Import-XDRModule -Name AuthManager, ValidationHelper, LoggingHelper, HttpPipeline
 # NOTE: Business logic is inline - no external module needed
 
 # Extract parameters from request
 $action = $Request.Body.action
 $tenantId = $Request.Body.tenantId
 $body = $Request.Body
+# Correlation ID from the Orchestrator, so this worker's API calls log under the caller's request
+$correlationId = $Request.Body.correlationId ?? $TriggerMetadata.CorrelationId ?? [guid]::NewGuid().ToString()
 
 Write-XDRLog -Level "Info" -Message "AzureWorker received request" -Data @{
     Action = $action
@@ -181,10 +182,10 @@ try {
                 keyName = $keyName
             } | ConvertTo-Json
             
-            $response = Invoke-RestMethod -Method Post -Uri $uri -Headers @{
+            $response = Invoke-XDRRestMethod -Method Post -Uri $uri -Headers @{
                 "Authorization" = "Bearer $token"
                 "Content-Type" = "application/json"
-            } -Body $regenerateBody
+            } -Body $regenerateBody -CorrelationId $correlationId
             
             $result = @{
                 subscriptionId = $body.subscriptionId
@@ -214,10 +215,10 @@ try {
             # Revoke user delegation keys (invalidates all SAS tokens)
             $uri = "https://management.azure.com/subscriptions/$($body.subscriptionId)/resourceGroups/$($body.resourceGroup)/providers/Microsoft.Storage/storageAccounts/$($body.storageAccountName)/revokeUserDelegationKeys?api-version=2023-01-01"
             
-            $response = Invoke-RestMethod -Method Post -Uri $uri -Headers @{
+            $response = Invoke-XDRRestMethod -Method Post -Uri $uri -Headers @{
                 "Authorization" = "Bearer $token"
                 "Content-Type" = "application/json"
-            }
+            } -CorrelationId $correlationId
             
             $result = @{
                 subscriptionId = $body.subscriptionId
@@ -268,10 +269,10 @@ try {
                 }
             } | ConvertTo-Json -Depth 10
             
-            $response = Invoke-RestMethod -Method Patch -Uri $uri -Headers @{
+            $response = Invoke-XDRRestMethod -Method Patch -Uri $uri -Headers @{
                 "Authorization" = "Bearer $token"
                 "Content-Type" = "application/json"
-            } -Body $patchBody
+            } -Body $patchBody -CorrelationId $correlationId
             
             $result = @{
                 subscriptionId = $body.subscriptionId
@@ -316,10 +317,10 @@ try {
                 }
             } | ConvertTo-Json -Depth 10
             
-            $response = Invoke-RestMethod -Method Put -Uri $uri -Headers @{
+            $response = Invoke-XDRRestMethod -Method Put -Uri $uri -Headers @{
                 "Authorization" = "Bearer $token"
                 "Content-Type" = "application/json"
-            } -Body $defenderBody
+            } -Body $defenderBody -CorrelationId $correlationId
             
             $result = @{
                 subscriptionId = $body.subscriptionId
@@ -360,10 +361,10 @@ try {
                 }
             } | ConvertTo-Json
             
-            $response = Invoke-RestMethod -Method Patch -Uri $uri -Headers @{
+            $response = Invoke-XDRRestMethod -Method Patch -Uri $uri -Headers @{
                 "Authorization" = "Bearer $token"
                 "Content-Type" = "application/json"
-            } -Body $patchBody
+            } -Body $patchBody -CorrelationId $correlationId
             
             $result = @{
                 subscriptionId = $body.subscriptionId
@@ -404,10 +405,10 @@ try {
                 }
             } | ConvertTo-Json -Depth 10
             
-            $blobResponse = Invoke-RestMethod -Method Patch -Uri $blobUri -Headers @{
+            $blobResponse = Invoke-XDRRestMethod -Method Patch -Uri $blobUri -Headers @{
                 "Authorization" = "Bearer $token"
                 "Content-Type" = "application/json"
-            } -Body $blobBody
+            } -Body $blobBody -CorrelationId $correlationId
             
             # Disable file share soft delete
             $fileUri = "https://management.azure.com/subscriptions/$($body.subscriptionId)/resourceGroups/$($body.resourceGroup)/providers/Microsoft.Storage/storageAccounts/$($body.storageAccountName)/fileServices/default?api-version=2023-01-01"
@@ -420,10 +421,10 @@ try {
                 }
             } | ConvertTo-Json -Depth 10
             
-            $fileResponse = Invoke-RestMethod -Method Patch -Uri $fileUri -Headers @{
+            $fileResponse = Invoke-XDRRestMethod -Method Patch -Uri $fileUri -Headers @{
                 "Authorization" = "Bearer $token"
                 "Content-Type" = "application/json"
-            } -Body $fileBody
+            } -Body $fileBody -CorrelationId $correlationId
             
             $result = @{
                 subscriptionId = $body.subscriptionId
@@ -494,7 +495,7 @@ try {
             
             # Get existing firewall policy
             $firewallUri = "https://management.azure.com/subscriptions/$($body.subscriptionId)/resourceGroups/$($body.resourceGroup)/providers/Microsoft.Network/azureFirewalls/$($body.firewallName)?api-version=2023-05-01"
-            $firewall = Invoke-RestMethod -Uri $firewallUri -Method Get -Headers $headers
+            $firewall = Invoke-XDRRestMethod -Uri $firewallUri -Method Get -Headers $headers -CorrelationId $correlationId
             
             if (-not $firewall.properties.firewallPolicy.id) {
                 throw "Firewall policy not configured on firewall"
@@ -514,7 +515,7 @@ try {
             }
             
             try {
-                $ruleCollection = Invoke-RestMethod -Uri $policyUri -Method Get -Headers $headers
+                $ruleCollection = Invoke-XDRRestMethod -Uri $policyUri -Method Get -Headers $headers -CorrelationId $correlationId
                 
                 # Add to existing rule collection
                 if (-not $ruleCollection.properties.ruleCollections) {
@@ -535,7 +536,7 @@ try {
                 
                 $blockCollection.rules += $newRule
                 
-                $updateResult = Invoke-RestMethod -Uri $policyUri -Method Put -Headers $headers -Body ($ruleCollection | ConvertTo-Json -Depth 20)
+                $updateResult = Invoke-XDRRestMethod -Uri $policyUri -Method Put -Headers $headers -Body ($ruleCollection | ConvertTo-Json -Depth 20) -CorrelationId $correlationId
                 
                 $result = @{
                     subscriptionId = $body.subscriptionId
@@ -574,7 +575,7 @@ try {
             
             # Get firewall policy
             $firewallUri = "https://management.azure.com/subscriptions/$($body.subscriptionId)/resourceGroups/$($body.resourceGroup)/providers/Microsoft.Network/azureFirewalls/$($body.firewallName)?api-version=2023-05-01"
-            $firewall = Invoke-RestMethod -Uri $firewallUri -Method Get -Headers $headers
+            $firewall = Invoke-XDRRestMethod -Uri $firewallUri -Method Get -Headers $headers -CorrelationId $correlationId
             
             if (-not $firewall.properties.firewallPolicy.id) {
                 throw "Firewall policy not configured"
@@ -596,7 +597,7 @@ try {
             }
             
             try {
-                $ruleCollection = Invoke-RestMethod -Uri $policyUri -Method Get -Headers $headers -ErrorAction SilentlyContinue
+                $ruleCollection = Invoke-XDRRestMethod -Uri $policyUri -Method Get -Headers $headers -CorrelationId $correlationId -ErrorAction SilentlyContinue
                 
                 if (-not $ruleCollection) {
                     # Create new rule collection group
@@ -622,7 +623,7 @@ try {
                 
                 $blockCollection.rules += $newRule
                 
-                $updateResult = Invoke-RestMethod -Uri $policyUri -Method Put -Headers $headers -Body ($ruleCollection | ConvertTo-Json -Depth 20)
+                $updateResult = Invoke-XDRRestMethod -Uri $policyUri -Method Put -Headers $headers -Body ($ruleCollection | ConvertTo-Json -Depth 20) -CorrelationId $correlationId
                 
                 $result = @{
                     subscriptionId = $body.subscriptionId
@@ -659,12 +660,12 @@ try {
             $mode = if ($body.mode) { $body.mode } else { "Alert" }  # Alert or Deny
             
             $firewallUri = "https://management.azure.com/subscriptions/$($body.subscriptionId)/resourceGroups/$($body.resourceGroup)/providers/Microsoft.Network/azureFirewalls/$($body.firewallName)?api-version=2023-05-01"
-            $firewall = Invoke-RestMethod -Uri $firewallUri -Method Get -Headers $headers
+            $firewall = Invoke-XDRRestMethod -Uri $firewallUri -Method Get -Headers $headers -CorrelationId $correlationId
             
             # Update threat intelligence mode
             $firewall.properties.threatIntelMode = $mode
             
-            $updateResult = Invoke-RestMethod -Uri $firewallUri -Method Put -Headers $headers -Body ($firewall | ConvertTo-Json -Depth 20)
+            $updateResult = Invoke-XDRRestMethod -Uri $firewallUri -Method Put -Headers $headers -Body ($firewall | ConvertTo-Json -Depth 20) -CorrelationId $correlationId
             
             $result = @{
                 subscriptionId = $body.subscriptionId
@@ -700,7 +701,7 @@ try {
             
             # Get current secret version
             $vaultUri = "https://$($body.vaultName).vault.azure.net/secrets/$($body.secretName)?api-version=7.4"
-            $secret = Invoke-RestMethod -Uri $vaultUri -Method Get -Headers $headers
+            $secret = Invoke-XDRRestMethod -Uri $vaultUri -Method Get -Headers $headers -CorrelationId $correlationId
             
             # Update secret to disabled
             $updateBody = @{
@@ -710,7 +711,7 @@ try {
             } | ConvertTo-Json
             
             $updateUri = "https://$($body.vaultName).vault.azure.net/secrets/$($body.secretName)?api-version=7.4"
-            $updateResult = Invoke-RestMethod -Uri $updateUri -Method Patch -Headers $headers -Body $updateBody
+            $updateResult = Invoke-XDRRestMethod -Uri $updateUri -Method Patch -Headers $headers -Body $updateBody -CorrelationId $correlationId
             
             $result = @{
                 subscriptionId = $body.subscriptionId
@@ -742,7 +743,7 @@ try {
             
             # Get current key details
             $keyUri = "https://$($body.vaultName).vault.azure.net/keys/$($body.keyName)?api-version=7.4"
-            $currentKey = Invoke-RestMethod -Uri $keyUri -Method Get -Headers $headers
+            $currentKey = Invoke-XDRRestMethod -Uri $keyUri -Method Get -Headers $headers -CorrelationId $correlationId
             
             # Create new version of the key
             $newKeyBody = @{
@@ -754,7 +755,7 @@ try {
             } | ConvertTo-Json
             
             $createUri = "https://$($body.vaultName).vault.azure.net/keys/$($body.keyName)/create?api-version=7.4"
-            $newKey = Invoke-RestMethod -Uri $createUri -Method Post -Headers $headers -Body $newKeyBody
+            $newKey = Invoke-XDRRestMethod -Uri $createUri -Method Post -Headers $headers -Body $newKeyBody -CorrelationId $correlationId
             
             $result = @{
                 subscriptionId = $body.subscriptionId
@@ -786,7 +787,7 @@ try {
             }
             
             $purgeUri = "https://$($body.vaultName).vault.azure.net/deletedsecrets/$($body.secretName)?api-version=7.4"
-            Invoke-RestMethod -Uri $purgeUri -Method Delete -Headers $headers
+            Invoke-XDRRestMethod -Uri $purgeUri -Method Delete -Headers $headers -CorrelationId $correlationId
             
             $result = @{
                 vaultName = $body.vaultName
@@ -826,17 +827,17 @@ try {
             # Azure SQL uses allow-list, so we remove any existing rules allowing this IP
             $uri = "https://management.azure.com/subscriptions/$($body.subscriptionId)/resourceGroups/$($body.resourceGroup)/providers/Microsoft.Sql/servers/$($body.serverName)/firewallRules?api-version=2021-11-01"
             
-            $existingRules = Invoke-RestMethod -Method Get -Uri $uri -Headers @{
+            $existingRules = Invoke-XDRRestMethod -Method Get -Uri $uri -Headers @{
                 "Authorization" = "Bearer $token"
-            }
+            } -CorrelationId $correlationId
             
             $removedRules = @()
             foreach ($rule in $existingRules.value) {
                 if ($rule.properties.startIpAddress -eq $body.ipAddress -or $rule.properties.endIpAddress -eq $body.ipAddress) {
                     $deleteUri = "https://management.azure.com/subscriptions/$($body.subscriptionId)/resourceGroups/$($body.resourceGroup)/providers/Microsoft.Sql/servers/$($body.serverName)/firewallRules/$($rule.name)?api-version=2021-11-01"
-                    Invoke-RestMethod -Method Delete -Uri $deleteUri -Headers @{
+                    Invoke-XDRRestMethod -Method Delete -Uri $deleteUri -Headers @{
                         "Authorization" = "Bearer $token"
-                    }
+                    } -CorrelationId $correlationId
                     $removedRules += $rule.name
                 }
             }
@@ -876,10 +877,10 @@ try {
                 }
             } | ConvertTo-Json
             
-            $response = Invoke-RestMethod -Method Patch -Uri $uri -Headers @{
+            $response = Invoke-XDRRestMethod -Method Patch -Uri $uri -Headers @{
                 "Authorization" = "Bearer $token"
                 "Content-Type" = "application/json"
-            } -Body $patchBody
+            } -Body $patchBody -CorrelationId $correlationId
             
             $result = @{
                 subscriptionId = $body.subscriptionId
@@ -918,10 +919,10 @@ try {
                 }
             } | ConvertTo-Json
             
-            $response = Invoke-RestMethod -Method Patch -Uri $uri -Headers @{
+            $response = Invoke-XDRRestMethod -Method Patch -Uri $uri -Headers @{
                 "Authorization" = "Bearer $token"
                 "Content-Type" = "application/json"
-            } -Body $patchBody
+            } -Body $patchBody -CorrelationId $correlationId
             
             # Store new password in Key Vault if provided
             if ($body.keyVaultName -and $body.secretName) {
@@ -935,10 +936,10 @@ try {
                     }
                 } | ConvertTo-Json
                 
-                Invoke-RestMethod -Method Put -Uri $secretUri -Headers @{
+                Invoke-XDRRestMethod -Method Put -Uri $secretUri -Headers @{
                     "Authorization" = "Bearer $kvToken"
                     "Content-Type" = "application/json"
-                } -Body $secretBody
+                } -Body $secretBody -CorrelationId $correlationId
             }
             
             $result = @{
@@ -996,10 +997,10 @@ try {
                 }
             } | ConvertTo-Json -Depth 10
             
-            $response = Invoke-RestMethod -Method Put -Uri $uri -Headers @{
+            $response = Invoke-XDRRestMethod -Method Put -Uri $uri -Headers @{
                 "Authorization" = "Bearer $token"
                 "Content-Type" = "application/json"
-            } -Body $auditBody
+            } -Body $auditBody -CorrelationId $correlationId
             
             $result = @{
                 subscriptionId = $body.subscriptionId
@@ -1039,10 +1040,10 @@ try {
                 }
             } | ConvertTo-Json
             
-            $response = Invoke-RestMethod -Method Put -Uri $uri -Headers @{
+            $response = Invoke-XDRRestMethod -Method Put -Uri $uri -Headers @{
                 "Authorization" = "Bearer $token"
                 "Content-Type" = "application/json"
-            } -Body $tdeBody
+            } -Body $tdeBody -CorrelationId $correlationId
             
             $result = @{
                 subscriptionId = $body.subscriptionId
@@ -1084,10 +1085,10 @@ try {
                 }
             } | ConvertTo-Json
             
-            $response = Invoke-RestMethod -Method Patch -Uri $uri -Headers @{
+            $response = Invoke-XDRRestMethod -Method Patch -Uri $uri -Headers @{
                 "Authorization" = "Bearer $token"
                 "Content-Type" = "application/json"
-            } -Body $tagBody
+            } -Body $tagBody -CorrelationId $correlationId
             
             # Run isolation command via Arc extension
             $commandUri = "https://management.azure.com/subscriptions/$($body.subscriptionId)/resourceGroups/$($body.resourceGroup)/providers/Microsoft.HybridCompute/machines/$($body.machineName)/runCommand?api-version=2023-10-03-preview"
@@ -1106,10 +1107,10 @@ try {
                 }
             } | ConvertTo-Json -Depth 10
             
-            $commandResponse = Invoke-RestMethod -Method Post -Uri $commandUri -Headers @{
+            $commandResponse = Invoke-XDRRestMethod -Method Post -Uri $commandUri -Headers @{
                 "Authorization" = "Bearer $token"
                 "Content-Type" = "application/json"
-            } -Body $commandBody
+            } -Body $commandBody -CorrelationId $correlationId
             
             $result = @{
                 subscriptionId = $body.subscriptionId
@@ -1153,10 +1154,10 @@ try {
                 }
             } | ConvertTo-Json -Depth 10
             
-            $response = Invoke-RestMethod -Method Post -Uri $uri -Headers @{
+            $response = Invoke-XDRRestMethod -Method Post -Uri $uri -Headers @{
                 "Authorization" = "Bearer $token"
                 "Content-Type" = "application/json"
-            } -Body $commandBody
+            } -Body $commandBody -CorrelationId $correlationId
             
             $result = @{
                 subscriptionId = $body.subscriptionId
@@ -1199,10 +1200,10 @@ try {
                 }
             } | ConvertTo-Json -Depth 10
             
-            $response = Invoke-RestMethod -Method Put -Uri $extensionUri -Headers @{
+            $response = Invoke-XDRRestMethod -Method Put -Uri $extensionUri -Headers @{
                 "Authorization" = "Bearer $token"
                 "Content-Type" = "application/json"
-            } -Body $extensionBody
+            } -Body $extensionBody -CorrelationId $correlationId
             
             $result = @{
                 subscriptionId = $body.subscriptionId
@@ -1231,9 +1232,9 @@ try {
             
             $uri = "https://management.azure.com/subscriptions/$($body.subscriptionId)/resourceGroups/$($body.resourceGroup)/providers/Microsoft.HybridCompute/machines/$($body.machineName)?api-version=2023-10-03-preview"
             
-            $response = Invoke-RestMethod -Method Delete -Uri $uri -Headers @{
+            $response = Invoke-XDRRestMethod -Method Delete -Uri $uri -Headers @{
                 "Authorization" = "Bearer $token"
-            }
+            } -CorrelationId $correlationId
             
             $result = @{
                 subscriptionId = $body.subscriptionId
@@ -1269,9 +1270,9 @@ try {
             $uri = "https://management.azure.com/subscriptions/$($body.subscriptionId)/resourceGroups/$($body.resourceGroup)/providers/Microsoft.Network/ApplicationGatewayWebApplicationFirewallPolicies/$($body.wafPolicyName)?api-version=2023-09-01"
             
             # Get current policy
-            $policy = Invoke-RestMethod -Method Get -Uri $uri -Headers @{
+            $policy = Invoke-XDRRestMethod -Method Get -Uri $uri -Headers @{
                 "Authorization" = "Bearer $token"
-            }
+            } -CorrelationId $correlationId
             
             # Add custom rule to block IP
             $ruleName = "BlockIP_" + ($body.ipAddress -replace '\.','')
@@ -1299,10 +1300,10 @@ try {
             $policy.properties.customRules += $newRule
             
             $policyBody = $policy | ConvertTo-Json -Depth 10
-            $response = Invoke-RestMethod -Method Put -Uri $uri -Headers @{
+            $response = Invoke-XDRRestMethod -Method Put -Uri $uri -Headers @{
                 "Authorization" = "Bearer $token"
                 "Content-Type" = "application/json"
-            } -Body $policyBody
+            } -Body $policyBody -CorrelationId $correlationId
             
             $result = @{
                 subscriptionId = $body.subscriptionId
@@ -1338,9 +1339,9 @@ try {
             
             $uri = "https://management.azure.com/subscriptions/$($body.subscriptionId)/resourceGroups/$($body.resourceGroup)/providers/Microsoft.Network/ApplicationGatewayWebApplicationFirewallPolicies/$($body.wafPolicyName)?api-version=2023-09-01"
             
-            $policy = Invoke-RestMethod -Method Get -Uri $uri -Headers @{
+            $policy = Invoke-XDRRestMethod -Method Get -Uri $uri -Headers @{
                 "Authorization" = "Bearer $token"
-            }
+            } -CorrelationId $correlationId
             
             $newRule = @{
                 name = $body.ruleName
@@ -1356,10 +1357,10 @@ try {
             $policy.properties.customRules += $newRule
             
             $policyBody = $policy | ConvertTo-Json -Depth 10
-            $response = Invoke-RestMethod -Method Put -Uri $uri -Headers @{
+            $response = Invoke-XDRRestMethod -Method Put -Uri $uri -Headers @{
                 "Authorization" = "Bearer $token"
                 "Content-Type" = "application/json"
-            } -Body $policyBody
+            } -Body $policyBody -CorrelationId $correlationId
             
             $result = @{
                 subscriptionId = $body.subscriptionId
@@ -1400,10 +1401,10 @@ try {
                 }
             } | ConvertTo-Json -Depth 10
             
-            $response = Invoke-RestMethod -Method Patch -Uri $uri -Headers @{
+            $response = Invoke-XDRRestMethod -Method Patch -Uri $uri -Headers @{
                 "Authorization" = "Bearer $token"
                 "Content-Type" = "application/json"
-            } -Body $patchBody
+            } -Body $patchBody -CorrelationId $correlationId
             
             $result = @{
                 subscriptionId = $body.subscriptionId
@@ -1436,9 +1437,9 @@ try {
             
             $uri = "https://management.azure.com/subscriptions/$($body.subscriptionId)/resourceGroups/$($body.resourceGroup)/providers/Microsoft.Network/ApplicationGatewayWebApplicationFirewallPolicies/$($body.wafPolicyName)?api-version=2023-09-01"
             
-            $policy = Invoke-RestMethod -Method Get -Uri $uri -Headers @{
+            $policy = Invoke-XDRRestMethod -Method Get -Uri $uri -Headers @{
                 "Authorization" = "Bearer $token"
-            }
+            } -CorrelationId $correlationId
             
             $geoRule = @{
                 name = "BlockGeoLocations"
@@ -1464,10 +1465,10 @@ try {
             $policy.properties.customRules += $geoRule
             
             $policyBody = $policy | ConvertTo-Json -Depth 10
-            $response = Invoke-RestMethod -Method Put -Uri $uri -Headers @{
+            $response = Invoke-XDRRestMethod -Method Put -Uri $uri -Headers @{
                 "Authorization" = "Bearer $token"
                 "Content-Type" = "application/json"
-            } -Body $policyBody
+            } -Body $policyBody -CorrelationId $correlationId
             
             $result = @{
                 subscriptionId = $body.subscriptionId
@@ -1500,7 +1501,7 @@ try {
             } | ConvertTo-Json
             
             $uri = "https://graph.microsoft.com/v1.0/servicePrincipals/$($body.servicePrincipalId)"
-            $updateResult = Invoke-RestMethod -Uri $uri -Method Patch -Headers $headers -Body $updateBody
+            $updateResult = Invoke-XDRRestMethod -Uri $uri -Method Patch -Headers $headers -Body $updateBody -CorrelationId $correlationId
             
             $result = @{
                 servicePrincipalId = $body.servicePrincipalId
@@ -1527,7 +1528,7 @@ try {
             
             # Get current app
             $appUri = "https://graph.microsoft.com/v1.0/applications/$($body.applicationId)"
-            $app = Invoke-RestMethod -Uri $appUri -Method Get -Headers $headers
+            $app = Invoke-XDRRestMethod -Uri $appUri -Method Get -Headers $headers -CorrelationId $correlationId
             
             $removedSecrets = @()
             $removedCerts = @()
@@ -1539,7 +1540,7 @@ try {
                 } | ConvertTo-Json
                 
                 $removeUri = "https://graph.microsoft.com/v1.0/applications/$($body.applicationId)/removePassword"
-                Invoke-RestMethod -Uri $removeUri -Method Post -Headers $headers -Body $removeBody
+                Invoke-XDRRestMethod -Uri $removeUri -Method Post -Headers $headers -Body $removeBody -CorrelationId $correlationId
                 $removedSecrets += $cred.keyId
             }
             
@@ -1550,7 +1551,7 @@ try {
                 } | ConvertTo-Json
                 
                 $removeUri = "https://graph.microsoft.com/v1.0/applications/$($body.applicationId)/removeKey"
-                Invoke-RestMethod -Uri $removeUri -Method Post -Headers $headers -Body $removeBody
+                Invoke-XDRRestMethod -Uri $removeUri -Method Post -Headers $headers -Body $removeBody -CorrelationId $correlationId
                 $removedCerts += $cert.keyId
             }
             
@@ -1581,7 +1582,7 @@ try {
             }
             
             $appUri = "https://graph.microsoft.com/v1.0/applications/$($body.applicationId)"
-            $app = Invoke-RestMethod -Uri $appUri -Method Get -Headers $headers
+            $app = Invoke-XDRRestMethod -Uri $appUri -Method Get -Headers $headers -CorrelationId $correlationId
             
             $revokedCerts = @()
             foreach ($cert in $app.keyCredentials) {
@@ -1590,7 +1591,7 @@ try {
                 } | ConvertTo-Json
                 
                 $removeUri = "https://graph.microsoft.com/v1.0/applications/$($body.applicationId)/removeKey"
-                Invoke-RestMethod -Uri $removeUri -Method Post -Headers $headers -Body $removeBody
+                Invoke-XDRRestMethod -Uri $removeUri -Method Post -Headers $headers -Body $removeBody -CorrelationId $correlationId
                 $revokedCerts += @{
                     keyId = $cert.keyId
                     displayName = $cert.displayName
@@ -1625,9 +1626,9 @@ try {
             
             $uri = "https://management.azure.com/subscriptions/$($body.subscriptionId)/resourceGroups/$($body.resourceGroup)/providers/Microsoft.Web/sites/$($body.appName)/stop?api-version=2023-01-01"
             
-            $response = Invoke-RestMethod -Method Post -Uri $uri -Headers @{
+            $response = Invoke-XDRRestMethod -Method Post -Uri $uri -Headers @{
                 "Authorization" = "Bearer $token"
-            }
+            } -CorrelationId $correlationId
             
             $result = @{
                 subscriptionId = $body.subscriptionId
@@ -1655,9 +1656,9 @@ try {
             
             $uri = "https://management.azure.com/subscriptions/$($body.subscriptionId)/resourceGroups/$($body.resourceGroup)/providers/Microsoft.Web/sites/$($body.appName)/restart?api-version=2023-01-01"
             
-            $response = Invoke-RestMethod -Method Post -Uri $uri -Headers @{
+            $response = Invoke-XDRRestMethod -Method Post -Uri $uri -Headers @{
                 "Authorization" = "Bearer $token"
-            }
+            } -CorrelationId $correlationId
             
             $result = @{
                 subscriptionId = $body.subscriptionId
@@ -1691,10 +1692,10 @@ try {
                 }
             } | ConvertTo-Json
             
-            $response = Invoke-RestMethod -Method Put -Uri $uri -Headers @{
+            $response = Invoke-XDRRestMethod -Method Put -Uri $uri -Headers @{
                 "Authorization" = "Bearer $token"
                 "Content-Type" = "application/json"
-            } -Body $defenderBody
+            } -Body $defenderBody -CorrelationId $correlationId
             
             $result = @{
                 subscriptionId = $body.subscriptionId
@@ -1730,10 +1731,10 @@ try {
                 }
             } | ConvertTo-Json -Depth 10
             
-            $response = Invoke-RestMethod -Method Put -Uri $uri -Headers @{
+            $response = Invoke-XDRRestMethod -Method Put -Uri $uri -Headers @{
                 "Authorization" = "Bearer $token"
                 "Content-Type" = "application/json"
-            } -Body $authBody
+            } -Body $authBody -CorrelationId $correlationId
             
             $result = @{
                 subscriptionId = $body.subscriptionId
@@ -1775,10 +1776,10 @@ try {
                 }
             } | ConvertTo-Json -Depth 10
             
-            $response = Invoke-RestMethod -Method Post -Uri $uri -Headers @{
+            $response = Invoke-XDRRestMethod -Method Post -Uri $uri -Headers @{
                 "Authorization" = "Bearer $token"
                 "Content-Type" = "application/json"
-            } -Body $policyBody
+            } -Body $policyBody -CorrelationId $correlationId
             
             # Tag specific image as quarantined
             $tagUri = "https://$($body.registryName).azurecr.io/acr/v1/$($body.imageName)/_tags/$($body.tag ?? 'latest')"
@@ -1789,10 +1790,10 @@ try {
                 quarantineDetails = $body.reason ?? "Security incident"
             } | ConvertTo-Json
             
-            Invoke-RestMethod -Method Patch -Uri $tagUri -Headers @{
+            Invoke-XDRRestMethod -Method Patch -Uri $tagUri -Headers @{
                 "Authorization" = "Bearer $acrToken"
                 "Content-Type" = "application/json"
-            } -Body $tagBody
+            } -Body $tagBody -CorrelationId $correlationId
             
             $result = @{
                 subscriptionId = $body.subscriptionId
@@ -1831,9 +1832,9 @@ try {
             # Get AKS credentials and run kubectl command
             $credsUri = "https://management.azure.com/subscriptions/$($body.subscriptionId)/resourceGroups/$($body.resourceGroup)/providers/Microsoft.ContainerService/managedClusters/$($body.clusterName)/listClusterAdminCredential?api-version=2023-10-01"
             
-            $creds = Invoke-RestMethod -Method Post -Uri $credsUri -Headers @{
+            $creds = Invoke-XDRRestMethod -Method Post -Uri $credsUri -Headers @{
                 "Authorization" = "Bearer $token"
-            }
+            } -CorrelationId $correlationId
             
             # Use AKS Run Command instead
             $commandUri = "https://management.azure.com/subscriptions/$($body.subscriptionId)/resourceGroups/$($body.resourceGroup)/providers/Microsoft.ContainerService/managedClusters/$($body.clusterName)/runCommand?api-version=2023-10-01"
@@ -1843,10 +1844,10 @@ try {
                 context = ""
             } | ConvertTo-Json
             
-            $response = Invoke-RestMethod -Method Post -Uri $commandUri -Headers @{
+            $response = Invoke-XDRRestMethod -Method Post -Uri $commandUri -Headers @{
                 "Authorization" = "Bearer $token"
                 "Content-Type" = "application/json"
-            } -Body $commandBody
+            } -Body $commandBody -CorrelationId $correlationId
             
             $result = @{
                 subscriptionId = $body.subscriptionId
@@ -1891,10 +1892,10 @@ kubectl drain $($body.nodeName) --ignore-daemonsets --delete-emptydir-data --for
                 context = ""
             } | ConvertTo-Json
             
-            $response = Invoke-RestMethod -Method Post -Uri $commandUri -Headers @{
+            $response = Invoke-XDRRestMethod -Method Post -Uri $commandUri -Headers @{
                 "Authorization" = "Bearer $token"
                 "Content-Type" = "application/json"
-            } -Body $commandBody
+            } -Body $commandBody -CorrelationId $correlationId
             
             $result = @{
                 subscriptionId = $body.subscriptionId
@@ -1930,10 +1931,10 @@ kubectl drain $($body.nodeName) --ignore-daemonsets --delete-emptydir-data --for
                 }
             } | ConvertTo-Json
             
-            $response = Invoke-RestMethod -Method Put -Uri $uri -Headers @{
+            $response = Invoke-XDRRestMethod -Method Put -Uri $uri -Headers @{
                 "Authorization" = "Bearer $token"
                 "Content-Type" = "application/json"
-            } -Body $pricingBody
+            } -Body $pricingBody -CorrelationId $correlationId
             
             $result = @{
                 subscriptionId = $body.subscriptionId
@@ -1974,10 +1975,10 @@ kubectl drain $($body.nodeName) --ignore-daemonsets --delete-emptydir-data --for
                 }
             } | ConvertTo-Json -Depth 10
             
-            $response = Invoke-RestMethod -Method Put -Uri $uri -Headers @{
+            $response = Invoke-XDRRestMethod -Method Put -Uri $uri -Headers @{
                 "Authorization" = "Bearer $token"
                 "Content-Type" = "application/json"
-            } -Body $remediationBody
+            } -Body $remediationBody -CorrelationId $correlationId
             
             $result = @{
                 subscriptionId = $body.subscriptionId
@@ -2014,10 +2015,10 @@ kubectl drain $($body.nodeName) --ignore-daemonsets --delete-emptydir-data --for
                 }
             } | ConvertTo-Json
             
-            $response = Invoke-RestMethod -Method Put -Uri $uri -Headers @{
+            $response = Invoke-XDRRestMethod -Method Put -Uri $uri -Headers @{
                 "Authorization" = "Bearer $token"
                 "Content-Type" = "application/json"
-            } -Body $exemptBody
+            } -Body $exemptBody -CorrelationId $correlationId
             
             $result = @{
                 subscriptionId = $body.subscriptionId
@@ -2070,10 +2071,10 @@ kubectl drain $($body.nodeName) --ignore-daemonsets --delete-emptydir-data --for
                 }
             } | ConvertTo-Json -Depth 10
             
-            $response = Invoke-RestMethod -Method Put -Uri $uri -Headers @{
+            $response = Invoke-XDRRestMethod -Method Put -Uri $uri -Headers @{
                 "Authorization" = "Bearer $token"
                 "Content-Type" = "application/json"
-            } -Body $jitBody
+            } -Body $jitBody -CorrelationId $correlationId
             
             $result = @{
                 subscriptionId = $body.subscriptionId
@@ -2131,10 +2132,10 @@ kubectl drain $($body.nodeName) --ignore-daemonsets --delete-emptydir-data --for
             
             $uri = "https://management.azure.com/subscriptions/$($body.subscriptionId)/resourceGroups/$($body.resourceGroup)/providers/Microsoft.Compute/virtualMachines/$($body.vmName)/providers/Microsoft.Security/adaptiveNetworkHardenings/default/enforce?api-version=2020-01-01"
             
-            $response = Invoke-RestMethod -Method Post -Uri $uri -Headers @{
+            $response = Invoke-XDRRestMethod -Method Post -Uri $uri -Headers @{
                 "Authorization" = "Bearer $token"
                 "Content-Type" = "application/json"
-            }
+            } -CorrelationId $correlationId
             
             $result = @{
                 subscriptionId = $body.subscriptionId
@@ -2181,10 +2182,10 @@ kubectl drain $($body.nodeName) --ignore-daemonsets --delete-emptydir-data --for
                 }
             } | ConvertTo-Json -Depth 10
             
-            $response = Invoke-RestMethod -Method Put -Uri $uri -Headers @{
+            $response = Invoke-XDRRestMethod -Method Put -Uri $uri -Headers @{
                 "Authorization" = "Bearer $token"
                 "Content-Type" = "application/json"
-            } -Body $watchlistBody
+            } -Body $watchlistBody -CorrelationId $correlationId
             
             # Add watchlist items
             foreach ($item in $body.items) {
@@ -2195,10 +2196,10 @@ kubectl drain $($body.nodeName) --ignore-daemonsets --delete-emptydir-data --for
                     }
                 } | ConvertTo-Json -Depth 10
                 
-                Invoke-RestMethod -Method Put -Uri $itemUri -Headers @{
+                Invoke-XDRRestMethod -Method Put -Uri $itemUri -Headers @{
                     "Authorization" = "Bearer $token"
                     "Content-Type" = "application/json"
-                } -Body $itemBody
+                } -Body $itemBody -CorrelationId $correlationId
             }
             
             $result = @{
@@ -2265,10 +2266,10 @@ kubectl drain $($body.nodeName) --ignore-daemonsets --delete-emptydir-data --for
                 }
             } | ConvertTo-Json -Depth 10
             
-            $response = Invoke-RestMethod -Method Put -Uri $uri -Headers @{
+            $response = Invoke-XDRRestMethod -Method Put -Uri $uri -Headers @{
                 "Authorization" = "Bearer $token"
                 "Content-Type" = "application/json"
-            } -Body $automationBody
+            } -Body $automationBody -CorrelationId $correlationId
             
             $result = @{
                 subscriptionId = $body.subscriptionId
@@ -2303,7 +2304,7 @@ kubectl drain $($body.nodeName) --ignore-daemonsets --delete-emptydir-data --for
             }
             
             $uri = "https://management.azure.com/subscriptions/$($body.subscriptionId)/resourceGroups/$($body.resourceGroup)/providers/Microsoft.Compute/virtualMachines/$($body.vmName)/deallocate?api-version=2023-03-01"
-            $deallocateResult = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers
+            $deallocateResult = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -CorrelationId $correlationId
             
             $result = @{
                 subscriptionId = $body.subscriptionId
@@ -2333,7 +2334,7 @@ kubectl drain $($body.nodeName) --ignore-daemonsets --delete-emptydir-data --for
             }
             
             $uri = "https://management.azure.com/subscriptions/$($body.subscriptionId)/resourceGroups/$($body.resourceGroup)/providers/Microsoft.Compute/virtualMachines/$($body.vmName)/restart?api-version=2023-03-01"
-            $restartResult = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers
+            $restartResult = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -CorrelationId $correlationId
             
             $result = @{
                 subscriptionId = $body.subscriptionId
@@ -2365,19 +2366,19 @@ kubectl drain $($body.nodeName) --ignore-daemonsets --delete-emptydir-data --for
             
             # Get VM details
             $vmUri = "https://management.azure.com/subscriptions/$($body.subscriptionId)/resourceGroups/$($body.resourceGroup)/providers/Microsoft.Compute/virtualMachines/$($body.vmName)?api-version=2023-03-01"
-            $vm = Invoke-RestMethod -Uri $vmUri -Method Get -Headers $headers
+            $vm = Invoke-XDRRestMethod -Uri $vmUri -Method Get -Headers $headers -CorrelationId $correlationId
             
             # Get primary NIC
             $nicId = $vm.properties.networkProfile.networkInterfaces[0].id
             $nicUri = "https://management.azure.com$nicId?api-version=2023-05-01"
-            $nic = Invoke-RestMethod -Uri $nicUri -Method Get -Headers $headers
+            $nic = Invoke-XDRRestMethod -Uri $nicUri -Method Get -Headers $headers -CorrelationId $correlationId
             
             # Update NIC with isolation NSG
             $nic.properties.networkSecurityGroup = @{
                 id = $body.isolationNsgId
             }
             
-            $updateResult = Invoke-RestMethod -Uri $nicUri -Method Put -Headers $headers -Body ($nic | ConvertTo-Json -Depth 20)
+            $updateResult = Invoke-XDRRestMethod -Uri $nicUri -Method Put -Headers $headers -Body ($nic | ConvertTo-Json -Depth 20) -CorrelationId $correlationId
             
             $result = @{
                 subscriptionId = $body.subscriptionId
@@ -2408,7 +2409,7 @@ kubectl drain $($body.nodeName) --ignore-daemonsets --delete-emptydir-data --for
             }
             
             $uri = "https://management.azure.com/subscriptions/$($body.subscriptionId)/resourceGroups/$($body.resourceGroup)/providers/Microsoft.Compute/virtualMachines/$($body.vmName)/redeploy?api-version=2023-03-01"
-            $redeployResult = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers
+            $redeployResult = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -CorrelationId $correlationId
             
             $result = @{
                 subscriptionId = $body.subscriptionId
@@ -2439,7 +2440,7 @@ kubectl drain $($body.nodeName) --ignore-daemonsets --delete-emptydir-data --for
             
             # Get VM details
             $vmUri = "https://management.azure.com/subscriptions/$($body.subscriptionId)/resourceGroups/$($body.resourceGroup)/providers/Microsoft.Compute/virtualMachines/$($body.vmName)?api-version=2023-03-01"
-            $vm = Invoke-RestMethod -Uri $vmUri -Method Get -Headers $headers
+            $vm = Invoke-XDRRestMethod -Uri $vmUri -Method Get -Headers $headers -CorrelationId $correlationId
             
             $osDiskId = $vm.properties.storageProfile.osDisk.managedDisk.id
             $snapshotName = if ($body.snapshotName) { $body.snapshotName } else { "$($body.vmName)-snapshot-$(Get-Date -Format 'yyyyMMdd-HHmmss')" }
@@ -2457,7 +2458,7 @@ kubectl drain $($body.nodeName) --ignore-daemonsets --delete-emptydir-data --for
             } | ConvertTo-Json -Depth 10
             
             $snapshotUri = "https://management.azure.com/subscriptions/$($body.subscriptionId)/resourceGroups/$($body.resourceGroup)/providers/Microsoft.Compute/snapshots/$snapshotName?api-version=2023-03-01"
-            $snapshot = Invoke-RestMethod -Uri $snapshotUri -Method Put -Headers $headers -Body $snapshotBody
+            $snapshot = Invoke-XDRRestMethod -Uri $snapshotUri -Method Put -Headers $headers -Body $snapshotBody -CorrelationId $correlationId
             
             $result = @{
                 subscriptionId = $body.subscriptionId
@@ -2,16 +2,17 @@ using namespace System.Net
 
 param($Request, $TriggerMetadata)
 
-# Import required modules
-Import-Module "$PSScriptRoot/../modules/AuthManager.psm1" -Force
-Import-Module "$PSScriptRoot/../modules/ValidationHelper.psm1" -Force
-Import-Module "$PSScriptRoot/../modules/LoggingHelper.psm1" -Force
+# Import required modules (once per runspace, see ModuleLoader.psm1)
+Import-Module "$PSScriptRoot/../modules/ModuleLoader.psm1"
+Import-XDRModule -Name AuthManager, ValidationHelper, LoggingHelper, HttpPipeline
 # NOTE: Business logic is inline - no external modules needed
 
 # Extract parameters from request
 $action = $Request.Body.action
 $tenantId = $Request.Body.tenantId
 $body = $Request.Body
+# Correlation ID from the Orchestrator, so this worker's API calls log under the caller's request
+$correlationId = $Request.Body.correlationId ?? $TriggerMetadata.CorrelationId ?? [guid]::NewGuid().ToString()
 
 Write-XDRLog -Level "Info" -Message "EntraIDWorker received request" -Data @{
     Action = $action
@@ -236,7 +237,7 @@ try {
             }
             
             $uri = "https://graph.microsoft.com/v1.0/users/$($body.userId)/authentication/methods/$($body.authenticationMethodId)"
-            Invoke-RestMethod -Uri $uri -Method Delete -Headers $headers
+            Invoke-XDRRestMethod -Uri $uri -Method Delete -Headers $headers -CorrelationId $correlationId
             
             $result = @{
                 userId = $body.userId
@@ -264,7 +265,7 @@ try {
             
             # Get all authentication methods
             $uri = "https://graph.microsoft.com/v1.0/users/$($body.userId)/authentication/methods"
-            $methods = Invoke-RestMethod -Uri $uri -Method Get -Headers $headers
+            $methods = Invoke-XDRRestMethod -Uri $uri -Method Get -Headers $headers -CorrelationId $correlationId
             
             $deletedMethods = @()
             foreach ($method in $methods.value) {
@@ -272,7 +273,7 @@ try {
                 if ($method.'@odata.type' -ne '#microsoft.graph.passwordAuthenticationMethod') {
                     try {
                         $deleteUri = "https://graph.microsoft.com/v1.0/users/$($body.userId)/authentication/methods/$($method.id)"
-                        Invoke-RestMethod -Uri $deleteUri -Method Delete -Headers $headers
+                        Invoke-XDRRestMethod -Uri $deleteUri -Method Delete -Headers $headers -CorrelationId $correlationId
                         $deletedMethods += @{
                             id = $method.id
                             type = $method.'@odata.type'
@@ -331,7 +332,7 @@ try {
             } | ConvertTo-Json -Depth 10
             
             $uri = "https://graph.microsoft.com/v1.0/identity/conditionalAccess/policies"
-            $policy = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $policyBody
+            $policy = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $policyBody -CorrelationId $correlationId
             
             $result = @{
                 userId = $body.userId
@@ -361,18 +362,18 @@ try {
             
             # Get all role assignments for the user
             $uri = "https://graph.microsoft.com/v1.0/roleManagement/directory/roleAssignments?`$filter=principalId eq '$($body.userId)'"
-            $roleAssignments = Invoke-RestMethod -Uri $uri -Method Get -Headers $headers
+            $roleAssignments = Invoke-XDRRestMethod -Uri $uri -Method Get -Headers $headers -CorrelationId $correlationId
             
             $removedRoles = @()
             foreach ($assignment in $roleAssignments.value) {
                 try {
                     # Get role definition details
                     $roleUri = "https://graph.microsoft.com/v1.0/roleManagement/directory/roleDefinitions/$($assignment.roleDefinitionId)"
-                    $roleDefinition = Invoke-RestMethod -Uri $roleUri -Method Get -Headers $headers
+                    $roleDefinition = Invoke-XDRRestMethod -Uri $roleUri -Method Get -Headers $headers -CorrelationId $correlationId
                     
                     # Delete role assignment
                     $deleteUri = "https://graph.microsoft.com/v1.0/roleManagement/directory/roleAssignments/$($assignment.id)"
-                    Invoke-RestMethod -Uri $deleteUri -Method Delete -Headers $headers
+                    Invoke-XDRRestMethod -Uri $deleteUri -Method Delete -Headers $headers -CorrelationId $correlationId
                     
                     $removedRoles += @{
                         roleAssignmentId = $assignment.id
@@ -413,14 +414,14 @@ try {
             
             # Get active role assignments
             $uri = "https://graph.microsoft.com/v1.0/roleManagement/directory/roleAssignmentScheduleInstances?`$filter=principalId eq '$($body.userId)' and assignmentType eq 'Activated'"
-            $activeAssignments = Invoke-RestMethod -Uri $uri -Method Get -Headers $headers
+            $activeAssignments = Invoke-XDRRestMethod -Uri $uri -Method Get -Headers $headers -CorrelationId $correlationId
             
             $revokedActivations = @()
             foreach ($assignment in $activeAssignments.value) {
                 try {
                     # Get role assignment schedule request to cancel
                     $requestUri = "https://graph.microsoft.com/v1.0/roleManagement/directory/roleAssignmentScheduleRequests?`$filter=principalId eq '$($body.userId)' and roleDefinitionId eq '$($assignment.roleDefinitionId)' and status eq 'Provisioned'"
-                    $requests = Invoke-RestMethod -Uri $requestUri -Method Get -Headers $headers
+                    $requests = Invoke-XDRRestMethod -Uri $requestUri -Method Get -Headers $headers -CorrelationId $correlationId
                     
                     foreach ($request in $requests.value) {
                         # Cancel the activation by creating a deactivation request
@@ -433,7 +434,7 @@ try {
                         } | ConvertTo-Json
                         
                         $cancelUri = "https://graph.microsoft.com/v1.0/roleManagement/directory/roleAssignmentScheduleRequests"
-                        $cancelResult = Invoke-RestMethod -Uri $cancelUri -Method Post -Headers $headers -Body $cancelBody
+                        $cancelResult = Invoke-XDRRestMethod -Uri $cancelUri -Method Post -Headers $headers -Body $cancelBody -CorrelationId $correlationId
                         
                         $revokedActivations += @{
                             roleDefinitionId = $assignment.roleDefinitionId
@@ -474,7 +475,7 @@ try {
             }
             
             $uri = "https://graph.microsoft.com/v1.0/users/$($body.userId)/authentication/methods"
-            $methods = Invoke-RestMethod -Uri $uri -Method Get -Headers $headers
+            $methods = Invoke-XDRRestMethod -Uri $uri -Method Get -Headers $headers -CorrelationId $correlationId
             
             $result = @{
                 userId = $body.userId
@@ -501,13 +502,13 @@ try {
             }
             
             $uri = "https://graph.microsoft.com/v1.0/roleManagement/directory/roleAssignments?`$filter=principalId eq '$($body.userId)'"
-            $assignments = Invoke-RestMethod -Uri $uri -Method Get -Headers $headers
+            $assignments = Invoke-XDRRestMethod -Uri $uri -Method Get -Headers $headers -CorrelationId $correlationId
             
             # Enrich with role names
             $enrichedAssignments = @()
             foreach ($assignment in $assignments.value) {
                 $roleUri = "https://graph.microsoft.com/v1.0/roleManagement/directory/roleDefinitions/$($assignment.roleDefinitionId)"
-                $roleDefinition = Invoke-RestMethod -Uri $roleUri -Method Get -Headers $headers
+                $roleDefinition = Invoke-XDRRestMethod -Uri $roleUri -Method Get -Headers $headers -CorrelationId $correlationId
                 
                 $enrichedAssignments += @{
                     assignmentId = $assignment.id
@@ -549,7 +550,7 @@ try {
             } | ConvertTo-Json
             
             $uri = "https://graph.microsoft.com/v1.0/identityProtection/riskyUsers/confirmCompromised"
-            Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $confirmBody
+            Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $confirmBody -CorrelationId $correlationId
             
             $result = @{
                 userId = $body.userId
@@ -579,7 +580,7 @@ try {
             } | ConvertTo-Json
             
             $uri = "https://graph.microsoft.com/v1.0/identityProtection/riskyUsers/dismiss"
-            Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $dismissBody
+            Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $dismissBody -CorrelationId $correlationId
             
             $result = @{
                 userId = $body.userId
@@ -614,7 +615,7 @@ try {
             } | ConvertTo-Json -Depth 10
             
             $uri = "https://graph.microsoft.com/v1.0/users/$($body.userId)"
-            Invoke-RestMethod -Uri $uri -Method Patch -Headers $headers -Body $resetBody
+            Invoke-XDRRestMethod -Uri $uri -Method Patch -Headers $headers -Body $resetBody -CorrelationId $correlationId
             
             $result = @{
                 userId = $body.userId
@@ -645,7 +646,7 @@ try {
             } | ConvertTo-Json
             
             $uri = "https://graph.microsoft.com/v1.0/users/$($body.userId)"
-            Invoke-RestMethod -Uri $uri -Method Patch -Headers $headers -Body $blockBody
+            Invoke-XDRRestMethod -Uri $uri -Method Patch -Headers $headers -Body $blockBody -CorrelationId $correlationId
             
             $result = @{
                 userId = $body.userId
@@ -672,7 +673,7 @@ try {
             
             # Revoke refresh tokens (signs user out everywhere)
             $uri = "https://graph.microsoft.com/v1.0/users/$($body.userId)/revokeSignInSessions"
-            $revokeResponse = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers
+            $revokeResponse = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -CorrelationId $correlationId
             
             $result = @{
                 userId = $body.userId
@@ -700,7 +701,7 @@ try {
             
             # Get all authentication methods
             $uri = "https://graph.microsoft.com/v1.0/users/$($body.userId)/authentication/methods"
-            $methods = Invoke-RestMethod -Uri $uri -Method Get -Headers $headers
+            $methods = Invoke-XDRRestMethod -Uri $uri -Method Get -Headers $headers -CorrelationId $correlationId
             
             $deletedMethods = @()
             foreach ($method in $methods.value) {
@@ -714,7 +715,7 @@ try {
                 
                 try {
                     $deleteUri = "https://graph.microsoft.com/v1.0/users/$($body.userId)/authentication/$methodType`s/$methodId"
-                    Invoke-RestMethod -Uri $deleteUri -Method Delete -Headers $headers
+                    Invoke-XDRRestMethod -Uri $deleteUri -Method Delete -Headers $headers -CorrelationId $correlationId
                     $deletedMethods += $methodType
                 } catch {
                     Write-XDRLog -Level "Warning" -Message "Could not delete method: $methodType" -Data @{ Error = $_.Exception.Message }
@@ -751,7 +752,7 @@ try {
             } | ConvertTo-Json
             
             $uri = "https://graph.microsoft.com/v1.0/identityProtection/riskyUsers/dismiss"
-            Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $dismissBody
+            Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $dismissBody -CorrelationId $correlationId
             
             $result = @{
                 userId = $body.userId
@@ -793,7 +794,7 @@ try {
             } | ConvertTo-Json -Depth 10
             
             $uri = "https://graph.microsoft.com/v1.0/identity/conditionalAccess/policies"
-            $policy = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $policyBody
+            $policy = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $policyBody -CorrelationId $correlationId
             
             $result = @{
                 userId = $userId ?? "All users"
@@ -827,7 +828,7 @@ try {
             
             # Get active assignments
             $uri = "https://graph.microsoft.com/v1.0/roleManagement/directory/roleAssignmentScheduleInstances?`$filter=principalId eq '$($body.userId)' and roleDefinitionId eq '$($body.roleDefinitionId)'"
-            $activeAssignments = Invoke-RestMethod -Uri $uri -Method Get -Headers $headers
+            $activeAssignments = Invoke-XDRRestMethod -Uri $uri -Method Get -Headers $headers -CorrelationId $correlationId
             
             $revokedCount = 0
             foreach ($assignment in $activeAssignments.value) {
@@ -841,7 +842,7 @@ try {
                     justification = $body.justification ?? "Revoked via DefenderXDR security response"
                 } | ConvertTo-Json
                 
-                Invoke-RestMethod -Uri $cancelUri -Method Post -Headers $headers -Body $cancelBody
+                Invoke-XDRRestMethod -Uri $cancelUri -Method Post -Headers $headers -Body $cancelBody -CorrelationId $correlationId
                 $revokedCount++
             }
             
@@ -873,7 +874,7 @@ try {
             } | ConvertTo-Json
             
             $uri = "https://graph.microsoft.com/v1.0/roleManagement/directory/roleAssignmentScheduleRequests/$($body.requestId)/deny"
-            Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $denyBody
+            Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $denyBody -CorrelationId $correlationId
             
             $result = @{
                 requestId = $body.requestId
@@ -911,7 +912,7 @@ try {
             } | ConvertTo-Json
             
             $uri = "https://graph.microsoft.com/v1.0/roleManagement/directory/roleEligibilityScheduleRequests"
-            Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $removeBody
+            Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $removeBody -CorrelationId $correlationId
             
             $result = @{
                 userId = $body.userId
@@ -938,7 +939,7 @@ try {
             
             # Get audit logs for role activations
             $uri = "https://graph.microsoft.com/v1.0/auditLogs/directoryAudits?`$filter=activityDateTime ge $startDate and activityDateTime le $endDate and category eq 'RoleManagement'"
-            $auditLogs = Invoke-RestMethod -Uri $uri -Method Get -Headers $headers
+            $auditLogs = Invoke-XDRRestMethod -Uri $uri -Method Get -Headers $headers -CorrelationId $correlationId
             
             $activations = @()
             foreach ($log in $auditLogs.value) {
@@ -1033,7 +1034,7 @@ try {
             } | ConvertTo-Json -Depth 10
             
             $uri = "https://graph.microsoft.com/v1.0/roleManagement/directory/roleAssignmentScheduleRequests"
-            Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $expireBody
+            Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $expireBody -CorrelationId $correlationId
             
             $result = @{
                 userId = $body.userId
@@ -1080,7 +1081,7 @@ try {
             } | ConvertTo-Json -Depth 10
             
             $uri = "https://graph.microsoft.com/v1.0/identity/conditionalAccess/policies"
-            $policy = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $policyBody
+            $policy = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $policyBody -CorrelationId $correlationId
             
             $result = @{
                 policyId = $policy.id
@@ -1115,7 +1116,7 @@ try {
             } | ConvertTo-Json -Depth 10
             
             $locationUri = "https://graph.microsoft.com/v1.0/identity/conditionalAccess/namedLocations"
-            $location = Invoke-RestMethod -Uri $locationUri -Method Post -Headers $headers -Body $locationBody
+            $location = Invoke-XDRRestMethod -Uri $locationUri -Method Post -Headers $headers -Body $locationBody -CorrelationId $correlationId
             
             # Create CA policy to block these locations
             $policyBody = @{
@@ -1140,7 +1141,7 @@ try {
             } | ConvertTo-Json -Depth 10
             
             $policyUri = "https://graph.microsoft.com/v1.0/identity/conditionalAccess/policies"
-            $policy = Invoke-RestMethod -Uri $policyUri -Method Post -Headers $headers -Body $policyBody
+            $policy = Invoke-XDRRestMethod -Uri $policyUri -Method Post -Headers $headers -Body $policyBody -CorrelationId $correlationId
             
             $result = @{
                 locationId = $location.id
@@ -1184,7 +1185,7 @@ try {
             } | ConvertTo-Json -Depth 10
             
             $uri = "https://graph.microsoft.com/v1.0/identity/conditionalAccess/policies"
-            $policy = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $policyBody
+            $policy = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $policyBody -CorrelationId $correlationId
             
             $result = @{
                 policyId = $policy.id
@@ -1223,7 +1224,7 @@ try {
             } | ConvertTo-Json -Depth 10
             
             $uri = "https://graph.microsoft.com/v1.0/identity/conditionalAccess/policies"
-            $policy = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $policyBody
+            $policy = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $policyBody -CorrelationId $correlationId
             
             $result = @{
                 policyId = $policy.id
@@ -1266,7 +1267,7 @@ try {
             } | ConvertTo-Json -Depth 10
             
             $uri = "https://graph.microsoft.com/v1.0/identity/conditionalAccess/policies"
-            $policy = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $policyBody
+            $policy = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $policyBody -CorrelationId $correlationId
             
             $result = @{
                 policyId = $policy.id
@@ -1307,7 +1308,7 @@ try {
             } | ConvertTo-Json -Depth 10
             
             $uri = "https://graph.microsoft.com/beta/identity/conditionalAccess/policies/$($body.policyId)/evaluate"
-            $simulation = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $whatIfBody
+            $simulation = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $whatIfBody -CorrelationId $correlationId
             
             $result = @{
                 policyId = $body.policyId
@@ -10,12 +10,29 @@ using namespace System.Net
     
     Architecture: Gateway (validation only) → Orchestrator (authentication + routing) → Workers (business logic)
     
+    The Orchestrator runs in-process (FunctionDispatcher.psm1) unless XDR_DISPATCH_MODE
+    or the dispatchMode parameter is "Http", which restores the internal HTTP call.
+    
+    With async=true the request is queued instead (JobManager.psm1): the Gateway answers
+    202 with a jobId at once, DefenderXDRJobWorker runs it, and DefenderXDRJobStatus
+    serves progress and the result.
+    
 .PARAMETER Request
     HTTP request object from Azure Functions trigger
     
 .EXAMPLE
     GET /api/Gateway?service=MDE&action=GetAllDevices&tenantId=xxx-xxx-xxx
     
+.EXAMPLE
+    POST /api/Gateway
+    {
+        "service": "MDE",
+        "action": "CollectInvestigationPackage",
+        "tenantId": "xxx-xxx-xxx",
+        "machineId": "machineId1",
+        "async": true
+    }
+    
 .EXAMPLE
     POST /api/Gateway
     {
@@ -28,11 +45,15 @@ using namespace System.Net
     
 .NOTES
     Version: 3.0.0 - Modular architecture following Azure Functions best practices
-    Gateway does NOT call modules directly - it's a pure HTTP proxy to Orchestrator
+    Gateway does NOT call modules for business logic - it only validates and dispatches to Orchestrator
 #>
 
 param($Request, $TriggerMetadata)
 
+# Once per runspace (ModuleLoader.psm1); JobManager only for async requests
+Import-Module "$PSScriptRoot/../modules/ModuleLoader.psm1"
+Import-XDRModule -Name HttpPipeline, FunctionDispatcher
+
 # Correlation ID for request tracking (Application Insights will track this automatically)
 $correlationId = [guid]::NewGuid().ToString()
 $actionId = [guid]::NewGuid().ToString()
@@ -62,6 +83,8 @@ if ($requestBody -is [string]) {
 $service = $Request.Query.service ?? $requestBody.service
 $action = $Request.Query.action ?? $requestBody.action
 $tenantId = $Request.Query.tenantId ?? $requestBody.tenantId ?? $Request.Query.tenant ?? $requestBody.tenant
+$dispatchMode = $Request.Query.dispatchMode ?? $requestBody.dispatchMode
+$async = "$($Request.Query.async ?? $requestBody.async)" -in @("true", "1", "True")
 
 # ============================================================================
 # INPUT VALIDATION
@@ -116,7 +139,7 @@ if (-not $action) {
 
 # ============================================================================
 # PROXY TO ORCHESTRATOR
-# Forward request to DefenderXDROrchestrator via internal HTTP call
+# Forward request to DefenderXDROrchestrator (in-process, or internal HTTP call)
 # ============================================================================
 
 try {
@@ -134,7 +157,7 @@ try {
     # Forward ALL other parameters from query string and body
     if ($Request.Query) {
         foreach ($key in $Request.Query.Keys) {
-            if ($key -notin @('service', 'action', 'tenant', 'tenantId', 'code', 'api-version')) {
+            if ($key -notin @('service', 'action', 'tenant', 'tenantId', 'code', 'api-version', 'dispatchMode', 'async')) {
                 $orchestratorPayload[$key] = $Request.Query[$key]
             }
         }
@@ -143,30 +166,61 @@ try {
     # Handle both CustomEndpoint format (hashtable) and ARM Action format (parsed from string)
     if ($requestBody -is [hashtable]) {
         foreach ($key in $requestBody.Keys) {
-            if ($key -notin @('service', 'action', 'tenant', 'tenantId', 'correlationId')) {
+            if ($key -notin @('service', 'action', 'tenant', 'tenantId', 'correlationId', 'dispatchMode', 'async')) {
                 $orchestratorPayload[$key] = $requestBody[$key]
             }
         }
     }
     
-    # Get Orchestrator URL (internal function-to-function call)
-    $functionAppUrl = $env:WEBSITE_HOSTNAME
-    if (-not $functionAppUrl) {
-        throw "WEBSITE_HOSTNAME environment variable not found - function app misconfiguration"
+    # ========================================================================
+    # ASYNC MODE - queue the request and return the job ID at once
+    # ========================================================================
+    
+    if ($async) {
+        Import-XDRModule -Name JobManager
+        $job = New-XDRJob -TenantId $tenantId -Payload $orchestratorPayload -CorrelationId $correlationId
+        Push-OutputBinding -Name JobQueue -Value $job.QueueMessage
+        
+        $statusUrl = "https://$($env:WEBSITE_HOSTNAME)/api/DefenderXDRJobStatus?tenantId=$tenantId&jobId=$($job.JobId)"
+        Write-Host "[$correlationId] Queued job $($job.JobId) - Service: $service, Action: $action"
+        
+        Push-OutputBinding -Name Response -Value ([HttpResponseContext]@{
+            StatusCode = [HttpStatusCode]::Accepted
+            Body = @{
+                success = $true
+                jobId = $job.JobId
+                status = "Queued"
+                statusUrl = $statusUrl
+                service = $service
+                action = $action
+                tenantId = $tenantId
+                correlationId = $correlationId
+                timestamp = (Get-Date).ToString("o")
+            } | ConvertTo-Json
+            Headers = @{
+                "Content-Type" = "application/json"
+                "X-Correlation-ID" = $correlationId
+                "Location" = $statusUrl
+                "Retry-After" = "5"
+            }
+        })
+        return
     }
     
-    $orchestratorUrl = "https://$functionAppUrl/api/DefenderXDROrchestrator"
+    # Resolved once so the Orchestrator makes its worker calls the same way
+    $dispatchMode = Get-XDRDispatchMode -FunctionName "DefenderXDROrchestrator" -Mode $dispatchMode
+    $orchestratorPayload.dispatchMode = $dispatchMode
     
-    Write-Host "[$correlationId] Calling Orchestrator at: $orchestratorUrl"
+    Write-Host "[$correlationId] Calling Orchestrator ($dispatchMode)"
     
-    # Make internal HTTP POST to Orchestrator
-    # Note: Using system key for internal calls (Azure Functions allows internal calls without function key)
-    $orchestratorResponse = Invoke-RestMethod `
-        -Method Post `
-        -Uri $orchestratorUrl `
-        -Body ($orchestratorPayload | ConvertTo-Json -Depth 10) `
-        -ContentType "application/json" `
+    # In-process: the Orchestrator runs in this invocation, no second HTTP hop or cold start
+    # Http: internal POST (Azure Functions allows internal calls without function key)
+    $orchestratorResponse = Invoke-XDRFunction `
+        -FunctionName "DefenderXDROrchestrator" `
+        -Body $orchestratorPayload `
+        -Mode $dispatchMode `
         -TimeoutSec 230 `
+        -CorrelationId $correlationId `
         -ErrorAction Stop
     
     $endTime = Get-Date
@@ -223,6 +277,7 @@ try {
             timestamp = (Get-Date).ToString("o")
             service = $service
             action = $action
+            dispatchMode = $dispatchMode
         }
     }
     
@@ -236,6 +291,7 @@ try {
             "X-Duration-Ms" = [Math]::Round($duration, 2)
             "X-Service" = $service
             "X-Action" = $action
+            "X-Dispatch-Mode" = $dispatchMode
         }
     })
     
@@ -246,6 +302,52 @@ try {
     $errorMessage = $_.Exception.Message
     $errorDetails = $_.ErrorDetails.Message ?? ""
     
+    # Throttled by the Orchestrator's rate limit: pass the 429 and its
+    # Retry-After on so the caller backs off instead of seeing a server error
+    $orchestratorStatus = if ($_.Exception.Response) { [int]$_.Exception.Response.StatusCode } else { 0 }
+    if ($orchestratorStatus -eq 429) {
+        $retryAfter = $_.Exception.Response.Headers.RetryAfter
+        $retryAfterSeconds = if ($retryAfter -and $retryAfter.Delta) {
+            [int][Math]::Ceiling($retryAfter.Delta.Value.TotalSeconds)
+        } elseif ($retryAfter -and $retryAfter.Date) {
+            [int][Math]::Max(0, [Math]::Ceiling(($retryAfter.Date.Value - [DateTimeOffset]::UtcNow).TotalSeconds))
+        } else {
+            60
+        }
+        Write-Warning "[$correlationId] Orchestrator throttled the request, retry after ${retryAfterSeconds}s"
+        
+        Complete-ActionTracking `
+            -ActionId $actionId `
+            -TenantId $tenantId `
+            -Success $false `
+            -ErrorMessage $errorMessage
+        
+        Push-OutputBinding -Name Response -Value ([HttpResponseContext]@{
+            StatusCode = [HttpStatusCode]::TooManyRequests
+            Body = if ($errorDetails) { $errorDetails } else {
+                @{
+                    success = $false
+                    error = @{
+                        code = "RATE_LIMITED"
+                        message = $errorMessage
+                    }
+                    service = $service
+                    action = $action
+                    tenantId = $tenantId
+                    correlationId = $correlationId
+                    retryAfterSeconds = $retryAfterSeconds
+                    timestamp = (Get-Date).ToString("o")
+                } | ConvertTo-Json -Depth 5
+            }
+            Headers = @{
+                "Content-Type" = "application/json"
+                "Retry-After" = "$retryAfterSeconds"
+                "X-Correlation-ID" = $correlationId
+            }
+        })
+        return
+    }
+    
     Write-Error "[$correlationId] Gateway error: $errorMessage"
     if ($errorDetails) {
         Write-Error "[$correlationId] Error details: $errorDetails"
@@ -30,7 +30,7 @@ using namespace System.Net
     Azure AD tenant ID
     
 .NOTES
-    Version: 3.4.0
+    Version: 3.6.0
     API: Microsoft Graph Security API v2
     Endpoints:
     - /security/incidents
@@ -39,11 +39,12 @@ using namespace System.Net
 
 param($Request, $TriggerMetadata)
 
-# Import shared authentication module
+# Import shared modules (once per runspace, see ModuleLoader.psm1)
 $moduleBase = "$PSScriptRoot\..\modules"
-Import-Module "$moduleBase\AuthManager.psm1" -Force
+Import-Module "$moduleBase\ModuleLoader.psm1"
+Import-XDRModule -Name AuthManager, LoggingHelper, HttpPipeline, IncidentMirror
 
-$correlationId = [guid]::NewGuid().ToString()
+$correlationId = $Request.Body.correlationId ?? $TriggerMetadata.CorrelationId ?? [guid]::NewGuid().ToString()
 $startTime = Get-Date
 
 Write-Host "[$correlationId] IncidentWorker started"
@@ -57,6 +58,14 @@ $tenantId = $Request.Query.tenantId ?? $Request.Body.tenantId
 $appId = $env:APPID
 $secretId = $env:SECRETID
 
+# Paging limits for list and statistics actions (0 = all items, -1 = default time budget)
+$maxItems = [int]($Request.Query.maxItems ?? $Request.Body.maxItems ?? 0)
+$timeBudgetSeconds = [int]($Request.Query.timeBudgetSeconds ?? $Request.Body.timeBudgetSeconds ?? -1)
+
+# List and lookup actions read the incident mirror while it is fresh (see
+# IncidentMirror.psm1); source=live always queries Graph
+$source = [string]($Request.Query.source ?? $Request.Body.source ?? "mirror")
+
 # ============================================================================
 # VALIDATION
 # ============================================================================
@@ -97,6 +106,50 @@ $headers = @{
     "Content-Type" = "application/json"
 }
 
+# Name/Count pairs (the Group-Object | Select-Object Name, Count shape) from streamed counters
+function ConvertTo-CountSummary {
+    param([hashtable]$Counts)
+    $Counts.GetEnumerator() | Sort-Object Key | ForEach-Object { [pscustomobject]@{ Name = $_.Key; Count = $_.Value } }
+}
+
+# Structured list filters, applied by the mirror or sent to Graph as $filter:
+# status and severity (comma-separated, any of), since/until (createdDateTime)
+function Get-ListFilter {
+    $listFilter = @{}
+    foreach ($name in @("Status", "Severity")) {
+        $value = $Request.Query[$name.ToLower()] ?? $Request.Body.($name.ToLower())
+        if ($value) { $listFilter[$name] = @(@($value) -join ',' -split ',' | ForEach-Object { $_.Trim() } | Where-Object { $_ }) }
+    }
+    foreach ($name in @("Since", "Until")) {
+        $value = $Request.Query[$name.ToLower()] ?? $Request.Body.($name.ToLower())
+        if ($value) { $listFilter[$name] = ([datetime]$value).ToUniversalTime() }
+    }
+    return $listFilter
+}
+
+function ConvertTo-ODataListFilter {
+    param([hashtable]$ListFilter, [string]$Filter)
+    $clauses = @()
+    if ($Filter) { $clauses += "($Filter)" }
+    if ($ListFilter.Status) { $clauses += "(" + (($ListFilter.Status | ForEach-Object { "status eq '$($_ -replace "'", "''")'" }) -join " or ") + ")" }
+    if ($ListFilter.Severity) { $clauses += "(" + (($ListFilter.Severity | ForEach-Object { "severity eq '$($_ -replace "'", "''")'" }) -join " or ") + ")" }
+    if ($ListFilter.Since) { $clauses += "createdDateTime ge $($ListFilter.Since.ToString('yyyy-MM-ddTHH:mm:ssZ'))" }
+    if ($ListFilter.Until) { $clauses += "createdDateTime le $($ListFilter.Until.ToString('yyyy-MM-ddTHH:mm:ssZ'))" }
+    return $clauses -join " and "
+}
+
+# Data of a list answered by the mirror, in the Graph path's shape
+function ConvertTo-MirroredList {
+    param([string]$Name, [hashtable]$Mirrored)
+    @{
+        count = $Mirrored.Items.Count
+        $Name = $Mirrored.Items
+        paging = @{ pages = 0; items = $Mirrored.Items.Count; complete = $Mirrored.Complete; stopReason = if ($Mirrored.Complete) { $null } else { "MaxItems" } }
+        source = "mirror"
+        mirror = $Mirrored.Mirror
+    }
+}
+
 # ============================================================================
 # ACTION ROUTING
 # ============================================================================
@@ -121,15 +174,30 @@ try {
         
         "GetAllIncidents" {
             $filter = $Request.Query.filter ?? $Request.Body.filter
-            $top = $Request.Query.top ?? $Request.Body.top ?? 100
+            $top = [int]($Request.Query.top ?? $Request.Body.top ?? 100)
+            $listFilter = Get-ListFilter
+            Register-XDRMirrorTenant -TenantId $tenantId
+            
+            # A free-form OData filter can only be answered by Graph
+            $mirrored = if (-not $filter -and $source -ne "live") { Find-XDRMirroredItems -TenantId $tenantId -Kind Incidents @listFilter -Top $top }
+            if ($mirrored) {
+                $result.data = ConvertTo-MirroredList -Name "incidents" -Mirrored $mirrored
+                break
+            }
             
-            $uri = "https://graph.microsoft.com/v1.0/security/incidents?`$top=$top"
+            # top caps the total; pages follow @odata.nextLink until it is reached
+            $pageSize = if ($top -gt 0) { [Math]::Min($top, 1000) } else { 1000 }
+            $uri = "https://graph.microsoft.com/v1.0/security/incidents?`$top=$pageSize"
+            $filter = ConvertTo-ODataListFilter -ListFilter $listFilter -Filter $filter
             if ($filter) { $uri += "&`$filter=$filter" }
             
-            $response = Invoke-RestMethod -Uri $uri -Method Get -Headers $headers
+            $paging = @{}
+            $incidents = @(Get-XDRPagedItems -Uri $uri -Headers $headers -MaxItems $top -TimeBudgetSeconds $timeBudgetSeconds -PagingState $paging -CorrelationId $correlationId)
             $result.data = @{
-                count = $response.value.Count
-                incidents = $response.value
+                count = $incidents.Count
+                incidents = $incidents
+                paging = $paging
+                source = "graph"
             }
         }
         
@@ -137,21 +205,43 @@ try {
             $incidentId = $Request.Query.incidentId ?? $Request.Body.incidentId
             if (-not $incidentId) { throw "incidentId required" }
             
+            $mirrored = if ($source -ne "live") { Get-XDRMirroredItem -TenantId $tenantId -Kind Incidents -Id $incidentId }
+            if ($mirrored) {
+                $result.data = @{ incident = $mirrored.Item; source = "mirror"; mirror = $mirrored.Mirror }
+                break
+            }
+            
             $uri = "https://graph.microsoft.com/v1.0/security/incidents/$incidentId"
-            $incident = Invoke-RestMethod -Uri $uri -Method Get -Headers $headers
-            $result.data = @{ incident = $incident }
+            $incident = Invoke-XDRRestMethod -Uri $uri -Method Get -Headers $headers -CorrelationId $correlationId
+            $result.data = @{ incident = $incident; source = "graph" }
         }
         
         "GetIncidentAlerts" {
             $incidentId = $Request.Query.incidentId ?? $Request.Body.incidentId
             if (-not $incidentId) { throw "incidentId required" }
             
+            # From the mirror when the incident itself is mirrored
+            $mirrored = if ($source -ne "live" -and (Get-XDRMirroredItem -TenantId $tenantId -Kind Incidents -Id $incidentId)) {
+                Find-XDRMirroredItems -TenantId $tenantId -Kind Alerts -IncidentId $incidentId
+            }
+            if ($mirrored) {
+                $result.data = @{
+                    incidentId = $incidentId
+                    alertCount = $mirrored.Items.Count
+                    alerts = $mirrored.Items
+                    source = "mirror"
+                    mirror = $mirrored.Mirror
+                }
+                break
+            }
+            
             $uri = "https://graph.microsoft.com/v1.0/security/incidents/$incidentId/alerts"
-            $response = Invoke-RestMethod -Uri $uri -Method Get -Headers $headers
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Get -Headers $headers -CorrelationId $correlationId
             $result.data = @{
                 incidentId = $incidentId
                 alertCount = $response.value.Count
                 alerts = $response.value
+                source = "graph"
             }
         }
         
@@ -161,7 +251,7 @@ try {
             
             # Note: Comments API may vary - using standard Graph pattern
             $uri = "https://graph.microsoft.com/v1.0/security/incidents/$incidentId"
-            $incident = Invoke-RestMethod -Uri $uri -Method Get -Headers $headers
+            $incident = Invoke-XDRRestMethod -Uri $uri -Method Get -Headers $headers -CorrelationId $correlationId
             $result.data = @{
                 incidentId = $incidentId
                 comments = $incident.comments ?? @()
@@ -181,7 +271,8 @@ try {
             
             $uri = "https://graph.microsoft.com/v1.0/security/incidents/$incidentId"
             $body = $updates | ConvertTo-Json -Depth 5
-            $response = Invoke-RestMethod -Uri $uri -Method PATCH -Headers $headers -Body $body
+            $response = Invoke-XDRRestMethod -Uri $uri -Method PATCH -Headers $headers -Body $body -CorrelationId $correlationId
+            Update-XDRMirroredItem -TenantId $tenantId -Kind Incidents -Id $incidentId -Fields $updates
             
             $result.data = @{
                 message = "Incident updated successfully"
@@ -197,7 +288,8 @@ try {
             
             $uri = "https://graph.microsoft.com/v1.0/security/incidents/$incidentId"
             $body = @{ assignedTo = $assignedTo } | ConvertTo-Json
-            $response = Invoke-RestMethod -Uri $uri -Method PATCH -Headers $headers -Body $body
+            $response = Invoke-XDRRestMethod -Uri $uri -Method PATCH -Headers $headers -Body $body -CorrelationId $correlationId
+            Update-XDRMirroredItem -TenantId $tenantId -Kind Incidents -Id $incidentId -Fields @{ assignedTo = $assignedTo }
             
             $result.data = @{
                 message = "Incident assigned successfully"
@@ -220,7 +312,8 @@ try {
                 determination = $determination
             } | ConvertTo-Json
             
-            $response = Invoke-RestMethod -Uri $uri -Method PATCH -Headers $headers -Body $body
+            $response = Invoke-XDRRestMethod -Uri $uri -Method PATCH -Headers $headers -Body $body -CorrelationId $correlationId
+            Update-XDRMirroredItem -TenantId $tenantId -Kind Incidents -Id $incidentId -Fields @{ status = "resolved"; classification = $classification; determination = $determination }
             
             $result.data = @{
                 message = "Incident closed successfully"
@@ -236,7 +329,8 @@ try {
             
             $uri = "https://graph.microsoft.com/v1.0/security/incidents/$incidentId"
             $body = @{ status = "active" } | ConvertTo-Json
-            $response = Invoke-RestMethod -Uri $uri -Method PATCH -Headers $headers -Body $body
+            $response = Invoke-XDRRestMethod -Uri $uri -Method PATCH -Headers $headers -Body $body -CorrelationId $correlationId
+            Update-XDRMirroredItem -TenantId $tenantId -Kind Incidents -Id $incidentId -Fields @{ status = "active" }
             
             $result.data = @{
                 message = "Incident reopened successfully"
@@ -251,7 +345,7 @@ try {
             
             $uri = "https://graph.microsoft.com/v1.0/security/incidents/$incidentId/comments"
             $body = @{ comment = $comment } | ConvertTo-Json
-            $response = Invoke-RestMethod -Uri $uri -Method POST -Headers $headers -Body $body
+            $response = Invoke-XDRRestMethod -Uri $uri -Method POST -Headers $headers -Body $body -CorrelationId $correlationId
             
             $result.data = @{
                 message = "Comment added successfully"
@@ -269,7 +363,8 @@ try {
             
             $uri = "https://graph.microsoft.com/v1.0/security/incidents/$incidentId"
             $body = @{ tags = $tagArray } | ConvertTo-Json
-            $response = Invoke-RestMethod -Uri $uri -Method PATCH -Headers $headers -Body $body
+            $response = Invoke-XDRRestMethod -Uri $uri -Method PATCH -Headers $headers -Body $body -CorrelationId $correlationId
+            Update-XDRMirroredItem -TenantId $tenantId -Kind Incidents -Id $incidentId -Fields @{ tags = $tagArray }
             
             $result.data = @{
                 message = "Tags added successfully"
@@ -292,7 +387,8 @@ try {
                 try {
                     $uri = "https://graph.microsoft.com/v1.0/security/incidents/$incidentId"
                     $body = $updates | ConvertTo-Json -Depth 5
-                    Invoke-RestMethod -Uri $uri -Method PATCH -Headers $headers -Body $body
+                    Invoke-XDRRestMethod -Uri $uri -Method PATCH -Headers $headers -Body $body -CorrelationId $correlationId
+                    Update-XDRMirroredItem -TenantId $tenantId -Kind Incidents -Id $incidentId -Fields $updates
                     $results.successful += $incidentId
                 }
                 catch {
@@ -323,7 +419,8 @@ try {
                 try {
                     $uri = "https://graph.microsoft.com/v1.0/security/incidents/$incidentId"
                     $body = @{ assignedTo = $assignedTo } | ConvertTo-Json
-                    Invoke-RestMethod -Uri $uri -Method PATCH -Headers $headers -Body $body
+                    Invoke-XDRRestMethod -Uri $uri -Method PATCH -Headers $headers -Body $body -CorrelationId $correlationId
+                    Update-XDRMirroredItem -TenantId $tenantId -Kind Incidents -Id $incidentId -Fields @{ assignedTo = $assignedTo }
                     $results.successful += $incidentId
                 }
                 catch {
@@ -359,7 +456,8 @@ try {
                         classification = $classification
                         determination = $determination
                     } | ConvertTo-Json
-                    Invoke-RestMethod -Uri $uri -Method PATCH -Headers $headers -Body $body
+                    Invoke-XDRRestMethod -Uri $uri -Method PATCH -Headers $headers -Body $body -CorrelationId $correlationId
+                    Update-XDRMirroredItem -TenantId $tenantId -Kind Incidents -Id $incidentId -Fields @{ status = "resolved"; classification = $classification; determination = $determination }
                     $results.successful += $incidentId
                 }
                 catch {
@@ -378,17 +476,14 @@ try {
         }
         
         "GetIncidentStatistics" {
-            $uri = "https://graph.microsoft.com/v1.0/security/incidents?`$top=1000"
-            $response = Invoke-RestMethod -Uri $uri -Method Get -Headers $headers
+            # Running counts kept per tenant; only incidents changed since the
+            # last pass are read (refresh=delta applies them now, refresh=full re-reads all)
+            Import-XDRModule -Name IncidentStatistics
+            $refresh = [string]($Request.Query.refresh ?? $Request.Body.refresh ?? "None")
+            $maxAgeSeconds = [int]($Request.Query.maxAgeSeconds ?? $Request.Body.maxAgeSeconds ?? -1)
             
-            $incidents = $response.value
-            $stats = @{
-                total = $incidents.Count
-                byStatus = $incidents | Group-Object status | Select-Object Name, Count
-                bySeverity = $incidents | Group-Object severity | Select-Object Name, Count
-                byClassification = $incidents | Group-Object classification | Select-Object Name, Count
-                byService = $incidents | ForEach-Object { $_.alerts } | Group-Object serviceSource | Select-Object Name, Count
-            }
+            $stats = Get-XDRIncidentStatistics -TenantId $tenantId -Headers $headers -Refresh $refresh `
+                -MaxAgeSeconds $maxAgeSeconds -TimeBudgetSeconds $timeBudgetSeconds -CorrelationId $correlationId
             
             $result.data = $stats
         }
@@ -397,21 +492,32 @@ try {
             $incidentId = $Request.Query.incidentId ?? $Request.Body.incidentId
             if (-not $incidentId) { throw "incidentId required" }
             
-            # Get incident details
-            $uri = "https://graph.microsoft.com/v1.0/security/incidents/$incidentId"
-            $incident = Invoke-RestMethod -Uri $uri -Method Get -Headers $headers
-            
-            # Get associated alerts
-            $alertsUri = "https://graph.microsoft.com/v1.0/security/incidents/$incidentId/alerts"
-            $alertsResponse = Invoke-RestMethod -Uri $alertsUri -Method Get -Headers $headers
+            # Incident and alerts from the mirror when the incident is mirrored
+            $mirroredIncident = if ($source -ne "live") { Get-XDRMirroredItem -TenantId $tenantId -Kind Incidents -Id $incidentId }
+            $mirroredAlerts = if ($mirroredIncident) { Find-XDRMirroredItems -TenantId $tenantId -Kind Alerts -IncidentId $incidentId }
+            if ($mirroredAlerts) {
+                $incident = $mirroredIncident.Item
+                $alerts = @($mirroredAlerts.Items)
+                $timelineSource = "mirror"
+            } else {
+                # Get incident details
+                $uri = "https://graph.microsoft.com/v1.0/security/incidents/$incidentId"
+                $incident = Invoke-XDRRestMethod -Uri $uri -Method Get -Headers $headers -CorrelationId $correlationId
+                
+                # Get associated alerts
+                $alertsUri = "https://graph.microsoft.com/v1.0/security/incidents/$incidentId/alerts"
+                $alerts = @((Invoke-XDRRestMethod -Uri $alertsUri -Method Get -Headers $headers -CorrelationId $correlationId).value)
+                $timelineSource = "graph"
+            }
             
             $timeline = @{
                 incidentId = $incidentId
                 createdDateTime = $incident.createdDateTime
                 lastUpdateDateTime = $incident.lastUpdateDateTime
                 status = $incident.status
-                alertCount = $alertsResponse.value.Count
-                alerts = $alertsResponse.value | Select-Object alertId, createdDateTime, severity, title, status | Sort-Object createdDateTime
+                alertCount = $alerts.Count
+                alerts = $alerts | Select-Object alertId, createdDateTime, severity, title, status | Sort-Object createdDateTime
+                source = $timelineSource
             }
             
             $result.data = $timeline
@@ -423,15 +529,30 @@ try {
         
         "GetAllAlerts" {
             $filter = $Request.Query.filter ?? $Request.Body.filter
-            $top = $Request.Query.top ?? $Request.Body.top ?? 100
+            $top = [int]($Request.Query.top ?? $Request.Body.top ?? 100)
+            $listFilter = Get-ListFilter
+            Register-XDRMirrorTenant -TenantId $tenantId
+            
+            # A free-form OData filter can only be answered by Graph; mirrored alerts carry no evidence
+            $mirrored = if (-not $filter -and $source -ne "live") { Find-XDRMirroredItems -TenantId $tenantId -Kind Alerts @listFilter -Top $top }
+            if ($mirrored) {
+                $result.data = ConvertTo-MirroredList -Name "alerts" -Mirrored $mirrored
+                break
+            }
             
-            $uri = "https://graph.microsoft.com/v1.0/security/alerts_v2?`$top=$top"
+            # top caps the total; pages follow @odata.nextLink until it is reached
+            $pageSize = if ($top -gt 0) { [Math]::Min($top, 1000) } else { 1000 }
+            $uri = "https://graph.microsoft.com/v1.0/security/alerts_v2?`$top=$pageSize"
+            $filter = ConvertTo-ODataListFilter -ListFilter $listFilter -Filter $filter
             if ($filter) { $uri += "&`$filter=$filter" }
             
-            $response = Invoke-RestMethod -Uri $uri -Method Get -Headers $headers
+            $paging = @{}
+            $alerts = @(Get-XDRPagedItems -Uri $uri -Headers $headers -MaxItems $top -TimeBudgetSeconds $timeBudgetSeconds -PagingState $paging -CorrelationId $correlationId)
             $result.data = @{
-                count = $response.value.Count
-                alerts = $response.value
+                count = $alerts.Count
+                alerts = $alerts
+                paging = $paging
+                source = "graph"
             }
         }
         
@@ -440,7 +561,7 @@ try {
             if (-not $alertId) { throw "alertId required" }
             
             $uri = "https://graph.microsoft.com/v1.0/security/alerts_v2/$alertId"
-            $alert = Invoke-RestMethod -Uri $uri -Method Get -Headers $headers
+            $alert = Invoke-XDRRestMethod -Uri $uri -Method Get -Headers $headers -CorrelationId $correlationId
             $result.data = @{ alert = $alert }
         }
         
@@ -449,7 +570,7 @@ try {
             if (-not $alertId) { throw "alertId required" }
             
             $uri = "https://graph.microsoft.com/v1.0/security/alerts_v2/$alertId"
-            $alert = Invoke-RestMethod -Uri $uri -Method Get -Headers $headers
+            $alert = Invoke-XDRRestMethod -Uri $uri -Method Get -Headers $headers -CorrelationId $correlationId
             $result.data = @{
                 alertId = $alertId
                 evidenceCount = $alert.evidence.Count
@@ -469,7 +590,8 @@ try {
             
             $uri = "https://graph.microsoft.com/v1.0/security/alerts_v2/$alertId"
             $body = $updates | ConvertTo-Json -Depth 5
-            $response = Invoke-RestMethod -Uri $uri -Method PATCH -Headers $headers -Body $body
+            $response = Invoke-XDRRestMethod -Uri $uri -Method PATCH -Headers $headers -Body $body -CorrelationId $correlationId
+            Update-XDRMirroredItem -TenantId $tenantId -Kind Alerts -Id $alertId -Fields $updates
             
             $result.data = @{
                 message = "Alert updated successfully"
@@ -488,7 +610,8 @@ try {
                 status = "resolved"
                 classification = $classification
             } | ConvertTo-Json
-            $response = Invoke-RestMethod -Uri $uri -Method PATCH -Headers $headers -Body $body
+            $response = Invoke-XDRRestMethod -Uri $uri -Method PATCH -Headers $headers -Body $body -CorrelationId $correlationId
+            Update-XDRMirroredItem -TenantId $tenantId -Kind Alerts -Id $alertId -Fields @{ status = "resolved"; classification = $classification }
             
             $result.data = @{
                 message = "Alert resolved successfully"
@@ -503,7 +626,8 @@ try {
             
             $uri = "https://graph.microsoft.com/v1.0/security/alerts_v2/$alertId"
             $body = @{ status = "dismissed" } | ConvertTo-Json
-            $response = Invoke-RestMethod -Uri $uri -Method PATCH -Headers $headers -Body $body
+            $response = Invoke-XDRRestMethod -Uri $uri -Method PATCH -Headers $headers -Body $body -CorrelationId $correlationId
+            Update-XDRMirroredItem -TenantId $tenantId -Kind Alerts -Id $alertId -Fields @{ status = "dismissed" }
             
             $result.data = @{
                 message = "Alert suppressed successfully"
@@ -522,7 +646,8 @@ try {
                 classification = $classification
                 determination = $determination
             } | ConvertTo-Json
-            $response = Invoke-RestMethod -Uri $uri -Method PATCH -Headers $headers -Body $body
+            $response = Invoke-XDRRestMethod -Uri $uri -Method PATCH -Headers $headers -Body $body -CorrelationId $correlationId
+            Update-XDRMirroredItem -TenantId $tenantId -Kind Alerts -Id $alertId -Fields @{ classification = $classification; determination = $determination }
             
             $result.data = @{
                 message = "Alert classified successfully"
@@ -539,7 +664,7 @@ try {
             
             $uri = "https://graph.microsoft.com/v1.0/security/alerts_v2/$alertId/comments"
             $body = @{ comment = $comment } | ConvertTo-Json
-            $response = Invoke-RestMethod -Uri $uri -Method POST -Headers $headers -Body $body
+            $response = Invoke-XDRRestMethod -Uri $uri -Method POST -Headers $headers -Body $body -CorrelationId $correlationId
             
             $result.data = @{
                 message = "Comment added successfully"
@@ -564,7 +689,8 @@ try {
                         status = "resolved"
                         classification = $classification
                     } | ConvertTo-Json
-                    Invoke-RestMethod -Uri $uri -Method PATCH -Headers $headers -Body $body
+                    Invoke-XDRRestMethod -Uri $uri -Method PATCH -Headers $headers -Body $body -CorrelationId $correlationId
+                    Update-XDRMirroredItem -TenantId $tenantId -Kind Alerts -Id $alertId -Fields @{ status = "resolved"; classification = $classification }
                     $results.successful += $alertId
                 }
                 catch {
@@ -594,7 +720,8 @@ try {
                 try {
                     $uri = "https://graph.microsoft.com/v1.0/security/alerts_v2/$alertId"
                     $body = @{ status = "dismissed" } | ConvertTo-Json
-                    Invoke-RestMethod -Uri $uri -Method PATCH -Headers $headers -Body $body
+                    Invoke-XDRRestMethod -Uri $uri -Method PATCH -Headers $headers -Body $body -CorrelationId $correlationId
+                    Update-XDRMirroredItem -TenantId $tenantId -Kind Alerts -Id $alertId -Fields @{ status = "dismissed" }
                     $results.successful += $alertId
                 }
                 catch {
@@ -628,7 +755,8 @@ try {
                         classification = $classification
                         determination = $determination
                     } | ConvertTo-Json
-                    Invoke-RestMethod -Uri $uri -Method PATCH -Headers $headers -Body $body
+                    Invoke-XDRRestMethod -Uri $uri -Method PATCH -Headers $headers -Body $body -CorrelationId $correlationId
+                    Update-XDRMirroredItem -TenantId $tenantId -Kind Alerts -Id $alertId -Fields @{ classification = $classification; determination = $determination }
                     $results.successful += $alertId
                 }
                 catch {
@@ -648,16 +776,26 @@ try {
         
         "GetAlertStatistics" {
             $uri = "https://graph.microsoft.com/v1.0/security/alerts_v2?`$top=1000"
-            $response = Invoke-RestMethod -Uri $uri -Method Get -Headers $headers
             
-            $alerts = $response.value
+            # Counted as pages stream in; the alert list itself is never held
+            $paging = @{}
+            $byStatus = @{}; $bySeverity = @{}; $byClassification = @{}; $byService = @{}; $byCategory = @{}
+            Get-XDRPagedItems -Uri $uri -Headers $headers -MaxItems $maxItems -TimeBudgetSeconds $timeBudgetSeconds -PagingState $paging -CorrelationId $correlationId | ForEach-Object {
+                $byStatus[[string]$_.status]++
+                $bySeverity[[string]$_.severity]++
+                $byClassification[[string]$_.classification]++
+                $byService[[string]$_.serviceSource]++
+                $byCategory[[string]$_.category]++
+            }
+            
             $stats = @{
-                total = $alerts.Count
-                byStatus = $alerts | Group-Object status | Select-Object Name, Count
-                bySeverity = $alerts | Group-Object severity | Select-Object Name, Count
-                byClassification = $alerts | Group-Object classification | Select-Object Name, Count
-                byService = $alerts | Group-Object serviceSource | Select-Object Name, Count
-                byCategory = $alerts | Group-Object category | Select-Object Name, Count
+                total = $paging.items
+                byStatus = @(ConvertTo-CountSummary $byStatus)
+                bySeverity = @(ConvertTo-CountSummary $bySeverity)
+                byClassification = @(ConvertTo-CountSummary $byClassification)
+                byService = @(ConvertTo-CountSummary $byService)
+                byCategory = @(ConvertTo-CountSummary $byCategory)
+                paging = $paging
             }
             
             $result.data = $stats
@@ -5,9 +5,8 @@ param($Request, $TriggerMetadata)
 # Import required modules
 # Add module imports and existence checks
 try {
-    Import-Module "$PSScriptRoot/../modules/AuthManager.psm1" -ErrorAction Stop
-    Import-Module "$PSScriptRoot/../modules/ValidationHelper.psm1" -ErrorAction Stop
-    Import-Module "$PSScriptRoot/../modules/LoggingHelper.psm1" -ErrorAction Stop
+    Import-Module "$PSScriptRoot/../modules/ModuleLoader.psm1" -ErrorAction Stop
+    Import-XDRModule -Name AuthManager, ValidationHelper, LoggingHelper, HttpPipeline
     # NOTE: Business logic is inline - no external module needed
 } catch {
     Push-OutputBinding -Name Response -Value ([HttpResponseContext]@{
@@ -21,6 +20,8 @@ try {
 $action = $Request.Body.action
 $tenantId = $Request.Body.tenantId
 $body = $Request.Body
+# Correlation ID from the Orchestrator, so this worker's API calls log under the caller's request
+$correlationId = $Request.Body.correlationId ?? $TriggerMetadata.CorrelationId ?? [guid]::NewGuid().ToString()
 
 Write-XDRLog -Level "Info" -Message "IntuneWorker received request" -Data @{
     Action = $action
@@ -201,7 +202,7 @@ try {
             }
             
             $uri = "https://graph.microsoft.com/v1.0/deviceManagement/managedDevices/$($body.deviceId)/resetPasscode"
-            $resetResult = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers
+            $resetResult = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -CorrelationId $correlationId
             
             $result = @{
                 deviceId = $body.deviceId
@@ -228,7 +229,7 @@ try {
             }
             
             $uri = "https://graph.microsoft.com/v1.0/deviceManagement/managedDevices/$($body.deviceId)/rebootNow"
-            $rebootResult = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers
+            $rebootResult = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -CorrelationId $correlationId
             
             $result = @{
                 deviceId = $body.deviceId
@@ -255,7 +256,7 @@ try {
             }
             
             $uri = "https://graph.microsoft.com/v1.0/deviceManagement/managedDevices/$($body.deviceId)/shutDown"
-            $shutdownResult = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers
+            $shutdownResult = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -CorrelationId $correlationId
             
             $result = @{
                 deviceId = $body.deviceId
@@ -289,7 +290,7 @@ try {
             } | ConvertTo-Json
             
             $uri = "https://graph.microsoft.com/v1.0/deviceManagement/managedDevices/$($body.deviceId)/enableLostMode"
-            $lostModeResult = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $lostModeBody
+            $lostModeResult = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $lostModeBody -CorrelationId $correlationId
             
             $result = @{
                 deviceId = $body.deviceId
@@ -317,7 +318,7 @@ try {
             }
             
             $uri = "https://graph.microsoft.com/v1.0/deviceManagement/managedDevices/$($body.deviceId)/disableLostMode"
-            $disableResult = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers
+            $disableResult = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -CorrelationId $correlationId
             
             $result = @{
                 deviceId = $body.deviceId
@@ -344,7 +345,7 @@ try {
             }
             
             $uri = "https://graph.microsoft.com/v1.0/deviceManagement/managedDevices/$($body.deviceId)/reevaluateCompliance"
-            $evalResult = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers
+            $evalResult = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -CorrelationId $correlationId
             
             $result = @{
                 deviceId = $body.deviceId
@@ -371,7 +372,7 @@ try {
             }
             
             $uri = "https://graph.microsoft.com/v1.0/deviceManagement/managedDevices/$($body.deviceId)/windowsDefenderUpdateSignatures"
-            $updateResult = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers
+            $updateResult = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -CorrelationId $correlationId
             
             $result = @{
                 deviceId = $body.deviceId
@@ -398,7 +399,7 @@ try {
             }
             
             $uri = "https://graph.microsoft.com/v1.0/deviceManagement/managedDevices/$($body.deviceId)/bypassActivationLock"
-            $bypassResult = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers
+            $bypassResult = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -CorrelationId $correlationId
             
             $result = @{
                 deviceId = $body.deviceId
@@ -429,7 +430,7 @@ try {
             } | ConvertTo-Json
             
             $uri = "https://graph.microsoft.com/v1.0/deviceManagement/managedDevices/$($body.deviceId)/cleanWindowsDevice"
-            $cleanResult = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $cleanBody
+            $cleanResult = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $cleanBody -CorrelationId $correlationId
             
             $result = @{
                 deviceId = $body.deviceId
@@ -457,7 +458,7 @@ try {
             }
             
             $uri = "https://graph.microsoft.com/v1.0/deviceManagement/managedDevices/$($body.deviceId)/logoutSharedAppleDeviceActiveUser"
-            $logoutResult = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers
+            $logoutResult = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -CorrelationId $correlationId
             
             $result = @{
                 deviceId = $body.deviceId
@@ -504,11 +505,11 @@ try {
             
             # Target device via policy assignment
             $uri = "https://graph.microsoft.com/beta/deviceManagement/configurationPolicies"
-            $policy = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $policyBody
+            $policy = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $policyBody -CorrelationId $correlationId
             
             # Force sync to apply immediately
             $syncUri = "https://graph.microsoft.com/v1.0/deviceManagement/managedDevices/$($body.deviceId)/syncDevice"
-            Invoke-RestMethod -Uri $syncUri -Method Post -Headers $headers
+            Invoke-XDRRestMethod -Uri $syncUri -Method Post -Headers $headers -CorrelationId $correlationId
             
             $result = @{
                 deviceId = $body.deviceId
@@ -535,7 +536,7 @@ try {
             }
             
             $uri = "https://graph.microsoft.com/v1.0/deviceManagement/managedDevices/$($body.deviceId)/rotateBitLockerKeys"
-            Invoke-RestMethod -Uri $uri -Method Post -Headers $headers
+            Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -CorrelationId $correlationId
             
             $result = @{
                 deviceId = $body.deviceId
@@ -580,7 +581,7 @@ try {
             } | ConvertTo-Json -Depth 10
             
             $uri = "https://graph.microsoft.com/beta/deviceManagement/configurationPolicies"
-            $policy = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $policyBody
+            $policy = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $policyBody -CorrelationId $correlationId
             
             $result = @{
                 deviceId = $body.deviceId
@@ -608,14 +609,14 @@ try {
             
             # Get device BitLocker recovery keys
             $uri = "https://graph.microsoft.com/v1.0/informationProtection/bitlocker/recoveryKeys?`$filter=deviceId eq '$($body.deviceId)'"
-            $keys = Invoke-RestMethod -Uri $uri -Method Get -Headers $headers
+            $keys = Invoke-XDRRestMethod -Uri $uri -Method Get -Headers $headers -CorrelationId $correlationId
             
             $recoveryKeys = @()
             foreach ($key in $keys.value) {
                 # Get the actual recovery key value (requires additional permission)
                 $keyUri = "https://graph.microsoft.com/v1.0/informationProtection/bitlocker/recoveryKeys/$($key.id)?`$select=key"
                 try {
-                    $keyDetails = Invoke-RestMethod -Uri $keyUri -Method Get -Headers $headers
+                    $keyDetails = Invoke-XDRRestMethod -Uri $keyUri -Method Get -Headers $headers -CorrelationId $correlationId
                     $recoveryKeys += @{
                         keyId = $key.id
                         createdDateTime = $key.createdDateTime
@@ -669,7 +670,7 @@ try {
             } | ConvertTo-Json -Depth 10
             
             $uri = "https://graph.microsoft.com/v1.0/deviceManagement/deviceConfigurations"
-            $policy = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $policyBody
+            $policy = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $policyBody -CorrelationId $correlationId
             
             $result = @{
                 deviceId = $body.deviceId
@@ -695,7 +696,7 @@ try {
             }
             
             $uri = "https://graph.microsoft.com/v1.0/deviceManagement/managedDevices/$($body.deviceId)/rotateFileVaultKey"
-            Invoke-RestMethod -Uri $uri -Method Post -Headers $headers
+            Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -CorrelationId $correlationId
             
             $result = @{
                 deviceId = $body.deviceId
@@ -728,7 +729,7 @@ try {
             
             # Get profile by name
             $profileUri = "https://graph.microsoft.com/v1.0/deviceManagement/deviceConfigurations?`$filter=displayName eq '$($body.profileName)'"
-            $profiles = Invoke-RestMethod -Uri $profileUri -Method Get -Headers $headers
+            $profiles = Invoke-XDRRestMethod -Uri $profileUri -Method Get -Headers $headers -CorrelationId $correlationId
             
             if ($profiles.value.Count -eq 0) {
                 throw "Configuration profile not found: $($body.profileName)"
@@ -746,11 +747,11 @@ try {
             } | ConvertTo-Json -Depth 10
             
             $assignUri = "https://graph.microsoft.com/v1.0/deviceManagement/deviceConfigurations/$profileId/assign"
-            Invoke-RestMethod -Uri $assignUri -Method Post -Headers $headers -Body $assignmentBody
+            Invoke-XDRRestMethod -Uri $assignUri -Method Post -Headers $headers -Body $assignmentBody -CorrelationId $correlationId
             
             # Sync device to apply immediately
             $syncUri = "https://graph.microsoft.com/v1.0/deviceManagement/managedDevices/$($body.deviceId)/syncDevice"
-            Invoke-RestMethod -Uri $syncUri -Method Post -Headers $headers
+            Invoke-XDRRestMethod -Uri $syncUri -Method Post -Headers $headers -CorrelationId $correlationId
             
             $result = @{
                 profileName = $body.profileName
@@ -787,11 +788,11 @@ try {
             } | ConvertTo-Json -Depth 10
             
             $assignUri = "https://graph.microsoft.com/v1.0/deviceManagement/deviceConfigurations/$($body.profileId)/assign"
-            Invoke-RestMethod -Uri $assignUri -Method Post -Headers $headers -Body $assignmentBody
+            Invoke-XDRRestMethod -Uri $assignUri -Method Post -Headers $headers -Body $assignmentBody -CorrelationId $correlationId
             
             # Sync device
             $syncUri = "https://graph.microsoft.com/v1.0/deviceManagement/managedDevices/$($body.deviceId)/syncDevice"
-            Invoke-RestMethod -Uri $syncUri -Method Post -Headers $headers
+            Invoke-XDRRestMethod -Uri $syncUri -Method Post -Headers $headers -CorrelationId $correlationId
             
             $result = @{
                 profileId = $body.profileId
@@ -843,7 +844,7 @@ try {
             } | ConvertTo-Json -Depth 10
             
             $uri = "https://graph.microsoft.com/v1.0/deviceManagement/deviceConfigurations"
-            $policy = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $policyBody
+            $policy = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $policyBody -CorrelationId $correlationId
             
             $result = @{
                 deviceId = $body.deviceId
@@ -879,7 +880,7 @@ try {
             } | ConvertTo-Json -Depth 10
             
             $uri = "https://graph.microsoft.com/v1.0/deviceManagement/deviceConfigurations"
-            $policy = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $policyBody
+            $policy = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $policyBody -CorrelationId $correlationId
             
             $result = @{
                 deviceId = $body.deviceId
@@ -907,7 +908,7 @@ try {
             
             # Get device OS type
             $deviceUri = "https://graph.microsoft.com/v1.0/deviceManagement/managedDevices/$($body.deviceId)"
-            $device = Invoke-RestMethod -Uri $deviceUri -Method Get -Headers $headers
+            $device = Invoke-XDRRestMethod -Uri $deviceUri -Method Get -Headers $headers -CorrelationId $correlationId
             
             $policyBody = $null
             if ($device.operatingSystem -eq "Windows") {
@@ -934,7 +935,7 @@ try {
             
             $policyBodyJson = $policyBody | ConvertTo-Json -Depth 10
             $uri = "https://graph.microsoft.com/v1.0/deviceManagement/deviceConfigurations"
-            $policy = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $policyBodyJson
+            $policy = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $policyBodyJson -CorrelationId $correlationId
             
             $result = @{
                 deviceId = $body.deviceId
@@ -969,7 +970,7 @@ try {
             } | ConvertTo-Json -Depth 10
             
             $uri = "https://graph.microsoft.com/v1.0/deviceManagement/deviceConfigurations"
-            $policy = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $policyBody
+            $policy = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $policyBody -CorrelationId $correlationId
             
             $result = @{
                 deviceId = $body.deviceId
@@ -1014,11 +1015,11 @@ try {
             } | ConvertTo-Json -Depth 10
             
             $uri = "https://graph.microsoft.com/v1.0/deviceManagement/mobileApps/$($body.appId)/assign"
-            Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $assignmentBody
+            Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $assignmentBody -CorrelationId $correlationId
             
             # Sync device to apply immediately
             $syncUri = "https://graph.microsoft.com/v1.0/deviceManagement/managedDevices/$($body.deviceId)/syncDevice"
-            Invoke-RestMethod -Uri $syncUri -Method Post -Headers $headers
+            Invoke-XDRRestMethod -Uri $syncUri -Method Post -Headers $headers -CorrelationId $correlationId
             
             $result = @{
                 deviceId = $body.deviceId
@@ -1057,7 +1058,7 @@ try {
             } | ConvertTo-Json -Depth 10
             
             $uri = "https://graph.microsoft.com/v1.0/deviceManagement/windowsInformationProtectionPolicies"
-            $policy = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $policyBody
+            $policy = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $policyBody -CorrelationId $correlationId
             
             $result = @{
                 appName = $body.appName
@@ -1092,7 +1093,7 @@ try {
                 appId = $body.appId
             } | ConvertTo-Json
             
-            Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $wipeBody
+            Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $wipeBody -CorrelationId $correlationId
             
             $result = @{
                 deviceId = $body.deviceId
@@ -1124,12 +1125,12 @@ try {
             
             # Remove app protection policy assignment
             $uri = "https://graph.microsoft.com/v1.0/deviceAppManagement/managedAppStatuses?userId=$($body.userId)"
-            $appStatuses = Invoke-RestMethod -Uri $uri -Method Get -Headers $headers
+            $appStatuses = Invoke-XDRRestMethod -Uri $uri -Method Get -Headers $headers -CorrelationId $correlationId
             
             foreach ($status in $appStatuses.value) {
                 if ($status.appIdentifier -eq $body.appId) {
                     $deleteUri = "https://graph.microsoft.com/v1.0/deviceAppManagement/managedAppRegistrations/$($status.id)"
-                    Invoke-RestMethod -Uri $deleteUri -Method Delete -Headers $headers
+                    Invoke-XDRRestMethod -Uri $deleteUri -Method Delete -Headers $headers -CorrelationId $correlationId
                 }
             }
             
@@ -1164,7 +1165,7 @@ try {
             
             # Revoke EPM elevation
             $uri = "https://graph.microsoft.com/beta/deviceManagement/privilegeManagementElevations/$($body.elevationId)/revoke"
-            Invoke-RestMethod -Uri $uri -Method Post -Headers $headers
+            Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -CorrelationId $correlationId
             
             $result = @{
                 deviceId = $body.deviceId
@@ -1207,7 +1208,7 @@ try {
             } | ConvertTo-Json -Depth 10
             
             $uri = "https://graph.microsoft.com/beta/deviceManagement/privilegeManagementElevationPolicies"
-            $policy = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $policyBody
+            $policy = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $policyBody -CorrelationId $correlationId
             
             $result = @{
                 deviceId = $body.deviceId
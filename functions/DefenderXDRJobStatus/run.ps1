@@ -0,0 +1,116 @@
+using namespace System.Net
+
+<#
+.SYNOPSIS
+    DefenderXDR Job Status - Progress and results of async Gateway requests
+
+.DESCRIPTION
+    Polled by callers (and the workbook) after the Gateway accepted a request
+    with async=true and returned a job ID.
+
+.EXAMPLE
+    GET /api/DefenderXDRJobStatus?tenantId=xxx-xxx-xxx&jobId=yyy-yyy-yyy
+    One job: status (Queued, Running, Succeeded, Failed), progress and, once
+    finished, the result or error
+
+.EXAMPLE
+    GET /api/DefenderXDRJobStatus?tenantId=xxx-xxx-xxx
+    The tenant's recent jobs, newest first, without results ($.jobs[*])
+#>
+
+param($Request, $TriggerMetadata)
+
+Import-Module "$PSScriptRoot/../modules/ModuleLoader.psm1"
+Import-XDRModule -Name JobManager
+
+$tenantId = $Request.Query.tenantId ?? $Request.Body.tenantId ?? $Request.Query.tenant ?? $Request.Body.tenant
+$jobId = $Request.Query.jobId ?? $Request.Body.jobId
+$topText = [string]($Request.Query.top ?? $Request.Body.top ?? 50)
+
+# Job records are stored by tenant and job GUID; anything else is the caller's mistake
+$validationError = $null
+$guid = [guid]::Empty
+$top = 0
+if (-not $tenantId) {
+    $validationError = "Missing required parameter: tenantId"
+} elseif (-not [guid]::TryParse([string]$tenantId, [ref]$guid)) {
+    $validationError = "Invalid tenantId: must be a GUID"
+} elseif ($jobId -and -not [guid]::TryParse([string]$jobId, [ref]$guid)) {
+    $validationError = "Invalid jobId: must be a GUID"
+} elseif (-not [int]::TryParse($topText, [ref]$top) -or $top -lt 1) {
+    $validationError = "Invalid top: must be a positive integer"
+}
+
+if ($validationError) {
+    Push-OutputBinding -Name Response -Value ([HttpResponseContext]@{
+        StatusCode = [HttpStatusCode]::BadRequest
+        Body = @{
+            success = $false
+            error = $validationError
+            timestamp = (Get-Date).ToString("o")
+        } | ConvertTo-Json
+        Headers = @{ "Content-Type" = "application/json" }
+    })
+    return
+}
+
+try {
+    if ($jobId) {
+        $job = Get-XDRJob -TenantId $tenantId -JobId $jobId
+        if (-not $job) {
+            Push-OutputBinding -Name Response -Value ([HttpResponseContext]@{
+                StatusCode = [HttpStatusCode]::NotFound
+                Body = @{
+                    success = $false
+                    error = "Job not found: $jobId"
+                    jobId = $jobId
+                    timestamp = (Get-Date).ToString("o")
+                } | ConvertTo-Json
+                Headers = @{ "Content-Type" = "application/json" }
+            })
+            return
+        }
+
+        $body = @{
+            success = $true
+            jobId = $jobId
+            status = $job.status
+            done = $job.status -in @("Succeeded", "Failed")
+            job = $job
+            timestamp = (Get-Date).ToString("o")
+        }
+        # Poll again in a few seconds while the job is not finished
+        $headers = @{ "Content-Type" = "application/json" }
+        if (-not $body.done) {
+            $headers["Retry-After"] = "5"
+        }
+    } else {
+        $jobs = Get-XDRJobList -TenantId $tenantId -Top $top
+        $body = @{
+            success = $true
+            tenantId = $tenantId
+            count = $jobs.Count
+            jobs = $jobs
+            timestamp = (Get-Date).ToString("o")
+        }
+        $headers = @{ "Content-Type" = "application/json" }
+    }
+
+    Push-OutputBinding -Name Response -Value ([HttpResponseContext]@{
+        StatusCode = [HttpStatusCode]::OK
+        Body = $body | ConvertTo-Json -Depth 20
+        Headers = $headers
+    })
+} catch {
+    Write-Error "Job status lookup failed: $($_.Exception.Message)"
+    Push-OutputBinding -Name Response -Value ([HttpResponseContext]@{
+        StatusCode = [HttpStatusCode]::InternalServerError
+        Body = @{
+            success = $false
+            error = $_.Exception.Message
+            jobId = $jobId
+            timestamp = (Get-Date).ToString("o")
+        } | ConvertTo-Json
+        Headers = @{ "Content-Type" = "application/json" }
+    })
+}
@@ -0,0 +1,97 @@
+using namespace System.Net
+
+<#
+.SYNOPSIS
+    DefenderXDR Job Worker - Runs queued (async) Gateway requests
+
+.DESCRIPTION
+    Queue-triggered counterpart of the Gateway's synchronous path. The Gateway
+    stores a job record and queues { jobId, tenantId, payload } on xdr-jobs
+    when a request is sent with async=true; this function runs the payload
+    through the Orchestrator (in-process, see FunctionDispatcher.psm1) and
+    records progress and the result for DefenderXDRJobStatus.
+
+    Concurrency per instance is bounded by host.json extensions.queues
+    (batchSize / newBatchThreshold), so bursts wait in the queue instead of
+    timing out at the HTTP front end.
+
+.NOTES
+    Version: 1.0.0
+    A job found Running on redelivery is failed instead of re-run: the previous
+    attempt may already have performed the action (isolation, live response).
+#>
+
+param($JobMessage, $TriggerMetadata)
+
+$modulePath = "$PSScriptRoot\..\modules"
+
+try {
+    Import-Module "$modulePath\ModuleLoader.psm1" -ErrorAction Stop
+    Import-XDRModule -Name JobManager, LoggingHelper, HttpPipeline, FunctionDispatcher
+} catch {
+    Write-Error "❌ CRITICAL: Failed to load job worker modules - $($_.Exception.Message)"
+    throw
+}
+
+# Queue messages are JSON; the worker hands them over as hashtables
+$message = if ($JobMessage -is [string]) { $JobMessage | ConvertFrom-Json -AsHashtable } else { $JobMessage }
+$jobId = $message.jobId
+$tenantId = $message.tenantId
+$payload = $message.payload
+$dequeueCount = [int]($TriggerMetadata.DequeueCount ?? 1)
+
+Write-Host "[$jobId] DefenderXDRJobWorker - $($payload.service)/$($payload.action) (delivery $dequeueCount)"
+
+$job = Get-XDRJob -TenantId $tenantId -JobId $jobId
+if (-not $job) {
+    Write-Warning "[$jobId] Job record not found, dropping message"
+    return
+}
+
+if ($job.status -in @("Succeeded", "Failed")) {
+    Write-Host "[$jobId] Job already $($job.status), nothing to do"
+    return
+}
+
+if ($job.status -eq "Running") {
+    Set-XDRJobStatus -TenantId $tenantId -JobId $jobId -Status "Failed" `
+        -Progress "Interrupted" `
+        -ErrorMessage "The job worker stopped while this job was running (delivery $dequeueCount). Not retried automatically because the action may already have been performed; check its state and resubmit if needed." | Out-Null
+    return
+}
+
+Set-XDRJobStatus -TenantId $tenantId -JobId $jobId -Status "Running" -Progress "Running $($payload.service)/$($payload.action)" | Out-Null
+
+try {
+    $response = Invoke-XDRFunction `
+        -FunctionName "DefenderXDROrchestrator" `
+        -Body $payload `
+        -Mode $payload.dispatchMode `
+        -Background `
+        -CorrelationId $job.correlationId `
+        -ErrorAction Stop
+
+    $status = if ($response.success -eq $false) { "Failed" } else { "Succeeded" }
+    $errorMessage = if ($status -eq "Failed") { $response.error.message ?? "$($response.error)" } else { $null }
+    $job = Set-XDRJobStatus -TenantId $tenantId -JobId $jobId -Status $status -Progress "Completed" -Result $response -ErrorMessage $errorMessage
+} catch {
+    $errorMessage = $_.ErrorDetails.Message ?? $_.Exception.Message
+    Write-Error "[$jobId] Job failed: $errorMessage"
+    # Recording the failure must not throw, or the message would be retried and the action re-run
+    try {
+        $job = Set-XDRJobStatus -TenantId $tenantId -JobId $jobId -Status "Failed" -Progress "Completed" -ErrorMessage $errorMessage
+    } catch {
+        Write-Error "[$jobId] Could not record job failure: $($_.Exception.Message)"
+    }
+}
+
+Write-Host "[$jobId] Job $($job.status) in $($job.durationMs)ms"
+
+try {
+    $removed = Remove-XDRExpiredJobs -TenantId $tenantId
+    if ($removed -gt 0) {
+        Write-Host "[$jobId] Removed $removed expired job records"
+    }
+} catch {
+    Write-Warning "[$jobId] Expired job cleanup failed: $($_.Exception.Message)"
+}
@@ -2,15 +2,16 @@ using namespace System.Net
 
 param($Request, $TriggerMetadata)
 
-# Import required modules
-Import-Module "$PSScriptRoot/../modules/AuthManager.psm1" -Force
-Import-Module "$PSScriptRoot/../modules/ValidationHelper.psm1" -Force
-Import-Module "$PSScriptRoot/../modules/LoggingHelper.psm1" -Force
+# Import required modules (once per runspace, see ModuleLoader.psm1)
+Import-Module "$PSScriptRoot/../modules/ModuleLoader.psm1"
+Import-XDRModule -Name AuthManager, ValidationHelper, LoggingHelper, HttpPipeline
 
 # Extract parameters from request
 $action = $Request.Body.action
 $tenantId = $Request.Body.tenantId
 $body = $Request.Body
+# Correlation ID from the Orchestrator, so this worker's API calls log under the caller's request
+$correlationId = $Request.Body.correlationId ?? $TriggerMetadata.CorrelationId ?? [guid]::NewGuid().ToString()
 
 Write-XDRLog -Level "Info" -Message "MCASWorker received request" -Data @{
     Action = $action
@@ -66,12 +67,12 @@ try {
             
             # Get OAuth2 permission grants
             $uri = "$graphBase/v1.0/oauth2PermissionGrants?`$filter=clientId eq '$($body.clientId)' and principalId eq '$($body.userId)'"
-            $grants = Invoke-RestMethod -Uri $uri -Method Get -Headers $headers
+            $grants = Invoke-XDRRestMethod -Uri $uri -Method Get -Headers $headers -CorrelationId $correlationId
             
             $revokedGrants = @()
             foreach ($grant in $grants.value) {
                 $deleteUri = "$graphBase/v1.0/oauth2PermissionGrants/$($grant.id)"
-                Invoke-RestMethod -Uri $deleteUri -Method Delete -Headers $headers
+                Invoke-XDRRestMethod -Uri $deleteUri -Method Delete -Headers $headers -CorrelationId $correlationId
                 $revokedGrants += @{
                     grantId = $grant.id
                     scope = $grant.scope
@@ -105,17 +106,17 @@ try {
             } | ConvertTo-Json
             
             $uri = "$graphBase/v1.0/servicePrincipals/$($body.servicePrincipalId)"
-            $updateResult = Invoke-RestMethod -Uri $uri -Method Patch -Headers $headers -Body $updateBody
+            $updateResult = Invoke-XDRRestMethod -Uri $uri -Method Patch -Headers $headers -Body $updateBody -CorrelationId $correlationId
             
             # Revoke all user consents
             $grantsUri = "$graphBase/v1.0/oauth2PermissionGrants?`$filter=clientId eq '$($body.servicePrincipalId)'"
-            $grants = Invoke-RestMethod -Uri $grantsUri -Method Get -Headers $headers
+            $grants = Invoke-XDRRestMethod -Uri $grantsUri -Method Get -Headers $headers -CorrelationId $correlationId
             
             $revokedCount = 0
             foreach ($grant in $grants.value) {
                 try {
                     $deleteUri = "$graphBase/v1.0/oauth2PermissionGrants/$($grant.id)"
-                    Invoke-RestMethod -Uri $deleteUri -Method Delete -Headers $headers
+                    Invoke-XDRRestMethod -Uri $deleteUri -Method Delete -Headers $headers -CorrelationId $correlationId
                     $revokedCount++
                 } catch {
                     Write-XDRLog -Level "Warning" -Message "Failed to revoke grant" -Data @{
@@ -145,7 +146,7 @@ try {
             
             # Get all OAuth2 grants for user
             $uri = "$graphBase/v1.0/oauth2PermissionGrants?`$filter=principalId eq '$($body.userId)'"
-            $grants = Invoke-RestMethod -Uri $uri -Method Get -Headers $headers
+            $grants = Invoke-XDRRestMethod -Uri $uri -Method Get -Headers $headers -CorrelationId $correlationId
             
             $revokedApps = @()
             foreach ($grant in $grants.value) {
@@ -156,7 +157,7 @@ try {
                 
                 try {
                     $deleteUri = "$graphBase/v1.0/oauth2PermissionGrants/$($grant.id)"
-                    Invoke-RestMethod -Uri $deleteUri -Method Delete -Headers $headers
+                    Invoke-XDRRestMethod -Uri $deleteUri -Method Delete -Headers $headers -CorrelationId $correlationId
                     $revokedApps += @{
                         grantId = $grant.id
                         clientId = $grant.clientId
@@ -194,7 +195,7 @@ try {
             
             # Revoke all sign-in sessions
             $uri = "$graphBase/v1.0/users/$($body.userId)/revokeSignInSessions"
-            $revokeResult = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers
+            $revokeResult = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -CorrelationId $correlationId
             
             $result = @{
                 userId = $body.userId
@@ -217,13 +218,13 @@ try {
             
             # Remove existing app role assignments
             $assignmentsUri = "$graphBase/v1.0/users/$($body.userId)/appRoleAssignments?`$filter=resourceId eq '$($body.servicePrincipalId)'"
-            $assignments = Invoke-RestMethod -Uri $assignmentsUri -Method Get -Headers $headers
+            $assignments = Invoke-XDRRestMethod -Uri $assignmentsUri -Method Get -Headers $headers -CorrelationId $correlationId
             
             $removedAssignments = @()
             foreach ($assignment in $assignments.value) {
                 try {
                     $deleteUri = "$graphBase/v1.0/users/$($body.userId)/appRoleAssignments/$($assignment.id)"
-                    Invoke-RestMethod -Uri $deleteUri -Method Delete -Headers $headers
+                    Invoke-XDRRestMethod -Uri $deleteUri -Method Delete -Headers $headers -CorrelationId $correlationId
                     $removedAssignments += $assignment.id
                 } catch {
                     Write-XDRLog -Level "Warning" -Message "Failed to remove assignment" -Data @{
@@ -235,11 +236,11 @@ try {
             
             # Revoke OAuth permissions
             $grantsUri = "$graphBase/v1.0/oauth2PermissionGrants?`$filter=clientId eq '$($body.servicePrincipalId)' and principalId eq '$($body.userId)'"
-            $grants = Invoke-RestMethod -Uri $grantsUri -Method Get -Headers $headers
+            $grants = Invoke-XDRRestMethod -Uri $grantsUri -Method Get -Headers $headers -CorrelationId $correlationId
             
             foreach ($grant in $grants.value) {
                 $deleteUri = "$graphBase/v1.0/oauth2PermissionGrants/$($grant.id)"
-                Invoke-RestMethod -Uri $deleteUri -Method Delete -Headers $headers
+                Invoke-XDRRestMethod -Uri $deleteUri -Method Delete -Headers $headers -CorrelationId $correlationId
             }
             
             $result = @{
@@ -263,7 +264,7 @@ try {
             
             # Invalidate all refresh tokens
             $uri = "$graphBase/v1.0/users/$($body.userId)/invalidateAllRefreshTokens"
-            $invalidateResult = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers
+            $invalidateResult = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -CorrelationId $correlationId
             
             $result = @{
                 userId = $body.userId
@@ -294,7 +295,7 @@ try {
             # Check if quarantine folder exists, create if not
             $searchUri = "$graphBase/v1.0/drives/$($body.driveId)/root:/Quarantine"
             try {
-                $quarantineFolder = Invoke-RestMethod -Uri $searchUri -Method Get -Headers $headers
+                $quarantineFolder = Invoke-XDRRestMethod -Uri $searchUri -Method Get -Headers $headers -CorrelationId $correlationId
             } catch {
                 # Create quarantine folder
                 $createFolderBody = @{
@@ -304,7 +305,7 @@ try {
                 } | ConvertTo-Json
                 
                 $createUri = "$graphBase/v1.0/drives/$($body.driveId)/root/children"
-                $quarantineFolder = Invoke-RestMethod -Uri $createUri -Method Post -Headers $headers -Body $createFolderBody
+                $quarantineFolder = Invoke-XDRRestMethod -Uri $createUri -Method Post -Headers $headers -Body $createFolderBody -CorrelationId $correlationId
             }
             
             # Move file to quarantine
@@ -316,7 +317,7 @@ try {
             } | ConvertTo-Json
             
             $uri = "$graphBase/v1.0/drives/$($body.driveId)/items/$($body.fileId)"
-            $moveResult = Invoke-RestMethod -Uri $uri -Method Patch -Headers $headers -Body $moveBody
+            $moveResult = Invoke-XDRRestMethod -Uri $uri -Method Patch -Headers $headers -Body $moveBody -CorrelationId $correlationId
             
             $result = @{
                 driveId = $body.driveId
@@ -341,7 +342,7 @@ try {
             
             # Get all permissions
             $uri = "$graphBase/v1.0/drives/$($body.driveId)/items/$($body.fileId)/permissions"
-            $permissions = Invoke-RestMethod -Uri $uri -Method Get -Headers $headers
+            $permissions = Invoke-XDRRestMethod -Uri $uri -Method Get -Headers $headers -CorrelationId $correlationId
             
             $removedPermissions = @()
             foreach ($permission in $permissions.value) {
@@ -349,7 +350,7 @@ try {
                 if ($permission.link -or ($permission.grantedToIdentitiesV2 -and $permission.grantedToIdentitiesV2[0].user.email -notlike "*@*.$($tenantId)*")) {
                     try {
                         $deleteUri = "$graphBase/v1.0/drives/$($body.driveId)/items/$($body.fileId)/permissions/$($permission.id)"
-                        Invoke-RestMethod -Uri $deleteUri -Method Delete -Headers $headers
+                        Invoke-XDRRestMethod -Uri $deleteUri -Method Delete -Headers $headers -CorrelationId $correlationId
                         $removedPermissions += @{
                             permissionId = $permission.id
                             type = if ($permission.link) { "SharingLink" } else { "ExternalUser" }
@@ -391,7 +392,7 @@ try {
             } | ConvertTo-Json
             
             $uri = "$graphBase/v1.0/drives/$($body.driveId)/items/$($body.fileId)/assignSensitivityLabel"
-            $labelResult = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $labelBody
+            $labelResult = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $labelBody -CorrelationId $correlationId
             
             $result = @{
                 driveId = $body.driveId
@@ -415,7 +416,7 @@ try {
             
             # Get current file name and remove quarantine prefix
             $fileUri = "$graphBase/v1.0/drives/$($body.driveId)/items/$($body.fileId)"
-            $file = Invoke-RestMethod -Uri $fileUri -Method Get -Headers $headers
+            $file = Invoke-XDRRestMethod -Uri $fileUri -Method Get -Headers $headers -CorrelationId $correlationId
             
             $originalName = $file.name -replace '^QUARANTINED-\d{8}-\d{6}-', ''
             
@@ -427,7 +428,7 @@ try {
                 name = $originalName
             } | ConvertTo-Json
             
-            $moveResult = Invoke-RestMethod -Uri $fileUri -Method Patch -Headers $headers -Body $moveBody
+            $moveResult = Invoke-XDRRestMethod -Uri $fileUri -Method Patch -Headers $headers -Body $moveBody -CorrelationId $correlationId
             
             $result = @{
                 driveId = $body.driveId
@@ -474,7 +475,7 @@ try {
             } | ConvertTo-Json -Depth 10
             
             $uri = "$graphBase/v1.0/identity/conditionalAccess/policies"
-            $policy = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $policyBody
+            $policy = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $policyBody -CorrelationId $correlationId
             
             $result = @{
                 applicationId = $body.applicationId
@@ -497,13 +498,13 @@ try {
             
             # Get all app role assignments
             $assignmentsUri = "$graphBase/v1.0/servicePrincipals/$($body.servicePrincipalId)/appRoleAssignedTo"
-            $assignments = Invoke-RestMethod -Uri $assignmentsUri -Method Get -Headers $headers
+            $assignments = Invoke-XDRRestMethod -Uri $assignmentsUri -Method Get -Headers $headers -CorrelationId $correlationId
             
             $removedUsers = @()
             foreach ($assignment in $assignments.value) {
                 try {
                     $deleteUri = "$graphBase/v1.0/servicePrincipals/$($body.servicePrincipalId)/appRoleAssignedTo/$($assignment.id)"
-                    Invoke-RestMethod -Uri $deleteUri -Method Delete -Headers $headers
+                    Invoke-XDRRestMethod -Uri $deleteUri -Method Delete -Headers $headers -CorrelationId $correlationId
                     $removedUsers += @{
                         principalId = $assignment.principalId
                         principalDisplayName = $assignment.principalDisplayName
@@ -519,11 +520,11 @@ try {
             
             # Revoke all OAuth grants
             $grantsUri = "$graphBase/v1.0/oauth2PermissionGrants?`$filter=clientId eq '$($body.servicePrincipalId)'"
-            $grants = Invoke-RestMethod -Uri $grantsUri -Method Get -Headers $headers
+            $grants = Invoke-XDRRestMethod -Uri $grantsUri -Method Get -Headers $headers -CorrelationId $correlationId
             
             foreach ($grant in $grants.value) {
                 $deleteUri = "$graphBase/v1.0/oauth2PermissionGrants/$($grant.id)"
-                Invoke-RestMethod -Uri $deleteUri -Method Delete -Headers $headers
+                Invoke-XDRRestMethod -Uri $deleteUri -Method Delete -Headers $headers -CorrelationId $correlationId
             }
             
             $result = @{
@@ -540,27 +541,31 @@ try {
             Write-XDRLog -Level "Info" -Message "Getting OAuth applications"
             
             $uri = "$graphBase/v1.0/oauth2PermissionGrants?`$top=999"
-            $grants = Invoke-RestMethod -Uri $uri -Method Get -Headers $headers
+            $maxItems = if ($body.maxItems) { [int]$body.maxItems } else { 0 }
+            $timeBudgetSeconds = if ($body.timeBudgetSeconds) { [int]$body.timeBudgetSeconds } else { -1 }
             
-            # Group by clientId and aggregate
+            # Group by clientId as grants stream in from every page
             $apps = @{}
-            foreach ($grant in $grants.value) {
+            $paging = @{}
+            Get-XDRPagedItems -Uri $uri -Headers $headers -MaxItems $maxItems -TimeBudgetSeconds $timeBudgetSeconds -PagingState $paging -CorrelationId $correlationId | ForEach-Object {
+                $grant = $_
                 if (-not $apps.ContainsKey($grant.clientId)) {
                     $apps[$grant.clientId] = @{
                         clientId = $grant.clientId
                         grantCount = 0
-                        users = @()
-                        scopes = @()
+                        users = [System.Collections.Generic.List[object]]::new()
+                        scopes = [System.Collections.Generic.List[object]]::new()
                     }
                 }
                 $apps[$grant.clientId].grantCount++
-                $apps[$grant.clientId].users += $grant.principalId
-                $apps[$grant.clientId].scopes += $grant.scope
+                $apps[$grant.clientId].users.Add($grant.principalId)
+                $apps[$grant.clientId].scopes.Add($grant.scope)
             }
             
             $result = @{
                 appCount = $apps.Count
                 apps = $apps.Values
+                paging = $paging
                 timestamp = (Get-Date).ToUniversalTime().ToString("yyyy-MM-ddTHH:mm:ss.fffZ")
             }
         }
@@ -576,14 +581,14 @@ try {
             }
             
             $uri = "$graphBase/v1.0/oauth2PermissionGrants?`$filter=principalId eq '$($body.userId)'"
-            $grants = Invoke-RestMethod -Uri $uri -Method Get -Headers $headers
+            $grants = Invoke-XDRRestMethod -Uri $uri -Method Get -Headers $headers -CorrelationId $correlationId
             
             # Enrich with app details
             $enrichedGrants = @()
             foreach ($grant in $grants.value) {
                 try {
                     $spUri = "$graphBase/v1.0/servicePrincipals/$($grant.clientId)"
-                    $sp = Invoke-RestMethod -Uri $spUri -Method Get -Headers $headers
+                    $sp = Invoke-XDRRestMethod -Uri $spUri -Method Get -Headers $headers -CorrelationId $correlationId
                     
                     $enrichedGrants += @{
                         grantId = $grant.id
@@ -659,7 +664,7 @@ try {
             } | ConvertTo-Json -Depth 10
             
             $uri = "$graphBase/beta/informationProtection/policy/labels"
-            $policy = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $policyBody
+            $policy = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $policyBody -CorrelationId $correlationId
             
             $result = @{
                 policyName = $body.policyName
@@ -680,18 +685,18 @@ try {
             
             # Get file details
             $fileUri = "$graphBase/v1.0/drives/$($body.driveId)/items/$($body.fileId)"
-            $file = Invoke-RestMethod -Uri $fileUri -Method Get -Headers $headers
+            $file = Invoke-XDRRestMethod -Uri $fileUri -Method Get -Headers $headers -CorrelationId $correlationId
             
             # Remove download permissions
             $permissionsUri = "$graphBase/v1.0/drives/$($body.driveId)/items/$($body.fileId)/permissions"
-            $permissions = Invoke-RestMethod -Uri $permissionsUri -Method Get -Headers $headers
+            $permissions = Invoke-XDRRestMethod -Uri $permissionsUri -Method Get -Headers $headers -CorrelationId $correlationId
             
             $revokedCount = 0
             foreach ($permission in $permissions.value) {
                 if ($permission.roles -contains "read" -or $permission.roles -contains "write") {
                     try {
                         $deleteUri = "$graphBase/v1.0/drives/$($body.driveId)/items/$($body.fileId)/permissions/$($permission.id)"
-                        Invoke-RestMethod -Uri $deleteUri -Method Delete -Headers $headers
+                        Invoke-XDRRestMethod -Uri $deleteUri -Method Delete -Headers $headers -CorrelationId $correlationId
                         $revokedCount++
                     } catch {
                         Write-XDRLog -Level "Warning" -Message "Failed to revoke permission" -Data @{ PermissionId = $permission.id }
@@ -720,7 +725,7 @@ try {
             # Get all sharing links
             $driveId = $body.driveId ?? "root"
             $permissionsUri = "$graphBase/v1.0/drives/$driveId/items/$($body.fileId)/permissions"
-            $permissions = Invoke-RestMethod -Uri $permissionsUri -Method Get -Headers $headers
+            $permissions = Invoke-XDRRestMethod -Uri $permissionsUri -Method Get -Headers $headers -CorrelationId $correlationId
             
             $revokedLinks = @()
             foreach ($permission in $permissions.value) {
@@ -728,7 +733,7 @@ try {
                 if ($permission.link) {
                     try {
                         $deleteUri = "$graphBase/v1.0/drives/$driveId/items/$($body.fileId)/permissions/$($permission.id)"
-                        Invoke-RestMethod -Uri $deleteUri -Method Delete -Headers $headers
+                        Invoke-XDRRestMethod -Uri $deleteUri -Method Delete -Headers $headers -CorrelationId $correlationId
                         $revokedLinks += @{
                             permissionId = $permission.id
                             linkType = $permission.link.type
@@ -764,10 +769,10 @@ try {
             
             # Get file metadata first
             $fileUri = "$graphBase/v1.0/drives/$driveId/items/$($body.fileId)"
-            $file = Invoke-RestMethod -Uri $fileUri -Method Get -Headers $headers
+            $file = Invoke-XDRRestMethod -Uri $fileUri -Method Get -Headers $headers -CorrelationId $correlationId
             
             # Delete the file
-            Invoke-RestMethod -Uri $fileUri -Method Delete -Headers $headers
+            Invoke-XDRRestMethod -Uri $fileUri -Method Delete -Headers $headers -CorrelationId $correlationId
             
             $result = @{
                 fileId = $body.fileId
@@ -796,17 +801,17 @@ try {
             } | ConvertTo-Json
             
             $uri = "$graphBase/v1.0/servicePrincipals/$($body.appId)"
-            $app = Invoke-RestMethod -Uri $uri -Method Patch -Headers $headers -Body $disableBody
+            $app = Invoke-XDRRestMethod -Uri $uri -Method Patch -Headers $headers -Body $disableBody -CorrelationId $correlationId
             
             # Also revoke all user consents
             $grantsUri = "$graphBase/v1.0/oauth2PermissionGrants?`$filter=clientId eq '$($body.appId)'"
-            $grants = Invoke-RestMethod -Uri $grantsUri -Method Get -Headers $headers
+            $grants = Invoke-XDRRestMethod -Uri $grantsUri -Method Get -Headers $headers -CorrelationId $correlationId
             
             $revokedCount = 0
             foreach ($grant in $grants.value) {
                 try {
                     $deleteUri = "$graphBase/v1.0/oauth2PermissionGrants/$($grant.id)"
-                    Invoke-RestMethod -Uri $deleteUri -Method Delete -Headers $headers
+                    Invoke-XDRRestMethod -Uri $deleteUri -Method Delete -Headers $headers -CorrelationId $correlationId
                     $revokedCount++
                 } catch {
                     Write-XDRLog -Level "Warning" -Message "Failed to revoke grant" -Data @{ GrantId = $grant.id }
@@ -839,7 +844,7 @@ try {
             } | ConvertTo-Json
             
             $uri = "$graphBase/v1.0/servicePrincipals/$($body.appId)"
-            $app = Invoke-RestMethod -Uri $uri -Method Patch -Headers $headers -Body $enableBody
+            $app = Invoke-XDRRestMethod -Uri $uri -Method Patch -Headers $headers -Body $enableBody -CorrelationId $correlationId
             
             $result = @{
                 appId = $body.appId
@@ -861,14 +866,14 @@ try {
             
             # Get all service principals with specific tag/category
             $uri = "$graphBase/v1.0/servicePrincipals?`$filter=tags/any(t:t eq '$($body.category)')"
-            $apps = Invoke-RestMethod -Uri $uri -Method Get -Headers $headers
+            $apps = Invoke-XDRRestMethod -Uri $uri -Method Get -Headers $headers -CorrelationId $correlationId
             
             $blockedApps = @()
             foreach ($app in $apps.value) {
                 try {
                     $disableBody = @{ accountEnabled = $false } | ConvertTo-Json
                     $updateUri = "$graphBase/v1.0/servicePrincipals/$($app.id)"
-                    Invoke-RestMethod -Uri $updateUri -Method Patch -Headers $headers -Body $disableBody
+                    Invoke-XDRRestMethod -Uri $updateUri -Method Patch -Headers $headers -Body $disableBody -CorrelationId $correlationId
                     $blockedApps += @{
                         appId = $app.id
                         appName = $app.displayName
@@ -912,7 +917,7 @@ try {
             
             # Use beta endpoint for app governance
             $uri = "$graphBase/beta/security/appGovernancePolicies"
-            $policy = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $policyBody
+            $policy = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $policyBody -CorrelationId $correlationId
             
             $result = @{
                 policyId = $policy.id
@@ -963,7 +968,7 @@ try {
             } | ConvertTo-Json -Depth 10
             
             $uri = "$graphBase/v1.0/identity/conditionalAccess/policies"
-            $policy = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $policyBody
+            $policy = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $policyBody -CorrelationId $correlationId
             
             $result = @{
                 policyId = $policy.id
@@ -1004,7 +1009,7 @@ try {
             } | ConvertTo-Json -Depth 10
             
             $uri = "$graphBase/v1.0/identity/conditionalAccess/policies"
-            $policy = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $policyBody
+            $policy = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $policyBody -CorrelationId $correlationId
             
             $result = @{
                 sessionId = $body.sessionId
@@ -1044,7 +1049,7 @@ try {
             } | ConvertTo-Json -Depth 10
             
             $uri = "$graphBase/v1.0/identity/conditionalAccess/policies"
-            $policy = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $policyBody
+            $policy = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $policyBody -CorrelationId $correlationId
             
             $result = @{
                 policyId = $policy.id
@@ -1065,7 +1070,7 @@ try {
             
             # Revoke refresh tokens to force re-auth
             $uri = "$graphBase/v1.0/users/$($body.userId)/revokeSignInSessions"
-            $revoke = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers
+            $revoke = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -CorrelationId $correlationId
             
             # Create session policy requiring immediate re-auth
             $policyBody = @{
@@ -1089,7 +1094,7 @@ try {
             } | ConvertTo-Json -Depth 10
             
             $policyUri = "$graphBase/v1.0/identity/conditionalAccess/policies"
-            $policy = Invoke-RestMethod -Uri $policyUri -Method Post -Headers $headers -Body $policyBody
+            $policy = Invoke-XDRRestMethod -Uri $policyUri -Method Post -Headers $headers -Body $policyBody -CorrelationId $correlationId
             
             $result = @{
                 userId = $body.userId
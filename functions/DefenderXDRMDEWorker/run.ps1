@@ -7,44 +7,42 @@
     - Device Actions (14): Isolate, Unisolate, Restrict, Scan, Investigation Package, etc.
     - Live Response (15): RunScript, GetFile, PutFile, Session Management
     - Threat Intelligence (12): Indicators (File/IP/URL/Domain)
-    - Advanced Hunting (3): KQL Query Execution
+    - Advanced Hunting (3): KQL Query Execution (result cache), Saved Queries, Query History
     - Incident Management (6): Get, Update, Comment
     - Custom Detection (8): CRUD Operations
     - Alert Management (5): Get, Update, Resolve, Classify
     
 .NOTES
     Version: 3.0.0
-    Requires: AuthManager, BlobManager (for Live Response)
+    Requires: AuthManager, BlobManager (Live Response file actions), BatchExecutor and IndicatorImport (bulk indicators)
 #>
 
 using namespace System.Net
 
+param($Request, $TriggerMetadata)
+
+# Deadlines for batch work count from here (see Get-XDRBatchTimeout)
+$startTime = Get-Date
 
 # Robust module import with existence check and error logging
+# Core modules once per runspace (ModuleLoader.psm1); BlobManager,
+# BatchExecutor and IndicatorImport are imported by the Live Response and
+# bulk indicator actions
 $moduleBase = "$PSScriptRoot\..\modules"
-$modules = @(
-    "AuthManager.psm1",
-    "BlobManager.psm1",
-    "ValidationHelper.psm1",
-    "LoggingHelper.psm1"
-)
-foreach ($mod in $modules) {
-    $modPath = Join-Path $moduleBase $mod
-    if (-not (Test-Path $modPath)) {
-        Write-Error "Required module missing: $modPath"
-        $result = @{ success = $false; error = "Required module missing: $modPath"; timestamp = (Get-Date).ToString("o") }
-        Push-OutputBinding -Name Response -Value ([HttpResponseContext]@{
-            StatusCode = [HttpStatusCode]::InternalServerError
-            Body = ($result | ConvertTo-Json -Depth 10)
-            Headers = @{ "Content-Type" = "application/json" }
-        })
-        return
-    }
-    Import-Module $modPath -Force -ErrorAction Stop
+try {
+    Import-Module (Join-Path $moduleBase "ModuleLoader.psm1") -ErrorAction Stop
+    Import-XDRModule -Name AuthManager, ValidationHelper, LoggingHelper, HttpPipeline
+} catch {
+    Write-Error $_.Exception.Message
+    $result = @{ success = $false; error = $_.Exception.Message; timestamp = (Get-Date).ToString("o") }
+    Push-OutputBinding -Name Response -Value ([HttpResponseContext]@{
+        StatusCode = [HttpStatusCode]::InternalServerError
+        Body = ($result | ConvertTo-Json -Depth 10)
+        Headers = @{ "Content-Type" = "application/json" }
+    })
+    return
 }
 
-param($Request, $TriggerMetadata)
-
 # Initialize result
 $result = @{
     success = $false
@@ -62,7 +60,7 @@ try {
     $tenantId = $requestBody.tenantId
     $action = $requestBody.action
     $parameters = $requestBody.parameters
-    $correlationId = $requestBody.correlationId
+    $correlationId = $requestBody.correlationId ?? $TriggerMetadata.CorrelationId ?? [guid]::NewGuid().ToString()
     # Validation
     if ([string]::IsNullOrEmpty($tenantId)) {
         throw "Missing required parameter: tenantId"
@@ -136,7 +134,7 @@ catch {
             } | ConvertTo-Json
             
             $uri = "$mdeApiBase/machines/$machineId/isolate"
-            $response = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $body
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $body -CorrelationId $correlationId
             
             $result.data = $response
         }
@@ -154,7 +152,7 @@ catch {
             } | ConvertTo-Json
             
             $uri = "$mdeApiBase/machines/$machineId/unisolate"
-            $response = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $body
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $body -CorrelationId $correlationId
             
             $result.data = $response
         }
@@ -172,7 +170,7 @@ catch {
             } | ConvertTo-Json
             
             $uri = "$mdeApiBase/machines/$machineId/restrictCodeExecution"
-            $response = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $body
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $body -CorrelationId $correlationId
             
             $result.data = $response
         }
@@ -190,7 +188,7 @@ catch {
             } | ConvertTo-Json
             
             $uri = "$mdeApiBase/machines/$machineId/unrestrictCodeExecution"
-            $response = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $body
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $body -CorrelationId $correlationId
             
             $result.data = $response
         }
@@ -210,7 +208,7 @@ catch {
             } | ConvertTo-Json
             
             $uri = "$mdeApiBase/machines/$machineId/runAntiVirusScan"
-            $response = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $body
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $body -CorrelationId $correlationId
             
             $result.data = $response
         }
@@ -228,7 +226,7 @@ catch {
             } | ConvertTo-Json
             
             $uri = "$mdeApiBase/machines/$machineId/collectInvestigationPackage"
-            $response = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $body
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $body -CorrelationId $correlationId
             
             $result.data = $response
         }
@@ -246,7 +244,7 @@ catch {
             } | ConvertTo-Json
             
             $uri = "$mdeApiBase/machines/$machineId/offboard"
-            $response = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $body
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $body -CorrelationId $correlationId
             
             $result.data = $response
         }
@@ -266,21 +264,30 @@ catch {
             } | ConvertTo-Json
             
             $uri = "$mdeApiBase/machines/$machineId/StopAndQuarantineFile"
-            $response = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $body
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $body -CorrelationId $correlationId
             
             $result.data = $response
         }
         
         "GETDEVICES" {
             $filter = $parameters.filter
-            $uri = "$mdeApiBase/machines"
             
-            if ($filter) {
-                $uri += "?`$filter=$filter"
+            # Without a filter, from this instance's device inventory (refreshed
+            # incrementally, see DeviceInventory.psm1); source=live reads /machines
+            if (-not $filter -and $parameters.source -ne "live") {
+                Import-XDRModule -Name DeviceInventory
+                $inventory = Get-XDRInventoryDevices -TenantId $tenantId -Headers $headers -Refresh ($parameters.refresh ?? "None") -CorrelationId $correlationId
+                $result.data = @{ value = $inventory.Devices; inventory = $inventory.Inventory }
+            } else {
+                $uri = "$mdeApiBase/machines"
+                
+                if ($filter) {
+                    $uri += "?`$filter=$filter"
+                }
+                
+                $response = Invoke-XDRRestMethod -Uri $uri -Method Get -Headers $headers -CorrelationId $correlationId
+                $result.data = $response
             }
-            
-            $response = Invoke-RestMethod -Uri $uri -Method Get -Headers $headers
-            $result.data = $response
         }
         
         "GETDEVICEINFO" {
@@ -290,8 +297,26 @@ catch {
                 throw "Missing required parameter: machineId"
             }
             
+            # Host names, IP addresses and AAD device ids are resolved through the inventory
+            if ($machineId -notmatch '^[0-9a-fA-F]{40}$') {
+                Import-XDRModule -Name DeviceInventory
+                $lookup = Find-XDRInventoryDevice -TenantId $tenantId -Headers $headers -Identifier $machineId -CorrelationId $correlationId
+                if ($lookup.Matches.Count -eq 0) {
+                    throw "Device not found: $machineId"
+                }
+                $match = $lookup.Matches[0]
+                # Never answer for one device picked out of several; the caller retries with a machine id
+                if ($match.ambiguous) {
+                    $result.data = @{
+                        ambiguous = @(@{ identifier = $match.identifier; candidates = $match.candidates })
+                    }
+                    throw "Device identifier '$machineId' matches $(@($match.candidates).Count) devices. Retry with a machine id."
+                }
+                $machineId = $match.deviceId
+            }
+            
             $uri = "$mdeApiBase/machines/$machineId"
-            $response = Invoke-RestMethod -Uri $uri -Method Get -Headers $headers
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Get -Headers $headers -CorrelationId $correlationId
             
             $result.data = $response
         }
@@ -304,7 +329,7 @@ catch {
             }
             
             $uri = "$mdeApiBase/machineactions/$actionId"
-            $response = Invoke-RestMethod -Uri $uri -Method Get -Headers $headers
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Get -Headers $headers -CorrelationId $correlationId
             
             $result.data = $response
         }
@@ -317,7 +342,7 @@ catch {
                 $uri += "?`$filter=machineId eq '$machineId'"
             }
             
-            $response = Invoke-RestMethod -Uri $uri -Method Get -Headers $headers
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Get -Headers $headers -CorrelationId $correlationId
             $result.data = $response
         }
         
@@ -334,7 +359,7 @@ catch {
             } | ConvertTo-Json
             
             $uri = "$mdeApiBase/machineactions/$actionId/cancel"
-            $response = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $body
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $body -CorrelationId $correlationId
             
             $result.data = $response
         }
@@ -352,7 +377,7 @@ catch {
             } | ConvertTo-Json
             
             $uri = "$mdeApiBase/machines/$machineId/startInvestigation"
-            $response = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $body
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $body -CorrelationId $correlationId
             
             $result.data = $response
         }
@@ -375,7 +400,7 @@ catch {
             } | ConvertTo-Json
             
             $uri = "$mdeApiBase/machineactions/live-response"
-            $response = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $body
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $body -CorrelationId $correlationId
             
             $result.data = $response
         }
@@ -388,7 +413,7 @@ catch {
             }
             
             $uri = "$mdeApiBase/machineactions/$sessionId"
-            $response = Invoke-RestMethod -Uri $uri -Method Get -Headers $headers
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Get -Headers $headers -CorrelationId $correlationId
             
             $result.data = $response
         }
@@ -404,6 +429,7 @@ catch {
             }
             
             # Check if script is in Blob Storage
+            Import-XDRModule -Name BlobManager
             $blobInfo = Get-XDRBlobFileInfo -TenantId $tenantId -FileName $scriptName -Category "scripts"
             
             if (-not $blobInfo.Success) {
@@ -422,7 +448,7 @@ catch {
             $bodyJson = $body | ConvertTo-Json
             
             $uri = "$mdeApiBase/machines/$machineId/runliveresponse"
-            $response = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $bodyJson
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $bodyJson -CorrelationId $correlationId
             
             $result.data = $response
         }
@@ -442,7 +468,7 @@ catch {
             } | ConvertTo-Json
             
             $uri = "$mdeApiBase/machines/$machineId/getfile"
-            $response = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $body
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $body -CorrelationId $correlationId
             
             # File will be downloaded from MDE and stored in Blob Storage
             # The response contains a download link that expires quickly
@@ -454,7 +480,9 @@ catch {
                 Invoke-WebRequest -Uri $response.downloadUrl -OutFile $tempFile
                 
                 # Upload to Blob Storage
-                $fileName = Split-Path -Leaf $filePath
+                Import-XDRModule -Name BlobManager
+                # Device paths are Windows paths whatever the host OS
+                $fileName = ($filePath -split "[\\/]")[-1]
                 $blobResult = Add-XDRBlobFile -TenantId $tenantId `
                     -FilePath $tempFile `
                     -FileName "$correlationId-$fileName" `
@@ -488,6 +516,7 @@ catch {
             }
             
             # Get file from Blob Storage
+            Import-XDRModule -Name BlobManager
             $blobInfo = Get-XDRBlobFileInfo -TenantId $tenantId -FileName $fileName -Category "uploads"
             
             if (-not $blobInfo.Success) {
@@ -511,7 +540,7 @@ catch {
             } | ConvertTo-Json
             
             $uri = "$mdeApiBase/machines/$machineId/putfile"
-            $response = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $body
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $body -CorrelationId $correlationId
             
             $result.data = $response
         }
@@ -533,7 +562,7 @@ catch {
             } | ConvertTo-Json
             
             $uri = "$mdeApiBase/machines/$machineId/runliveresponse"
-            $response = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $body
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $body -CorrelationId $correlationId
             
             $result.data = $response
         }
@@ -546,7 +575,7 @@ catch {
             }
             
             $uri = "$mdeApiBase/machineactions/$commandId"
-            $response = Invoke-RestMethod -Uri $uri -Method Get -Headers $headers
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Get -Headers $headers -CorrelationId $correlationId
             
             $result.data = $response
         }
@@ -564,7 +593,7 @@ catch {
             } | ConvertTo-Json
             
             $uri = "$mdeApiBase/machines/$machineId/runliveresponse"
-            $response = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $body
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $body -CorrelationId $correlationId
             
             $result.data = $response
         }
@@ -585,7 +614,7 @@ catch {
             } | ConvertTo-Json
             
             $uri = "$mdeApiBase/machines/$machineId/runliveresponse"
-            $response = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $body
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $body -CorrelationId $correlationId
             
             $result.data = $response
         }
@@ -607,7 +636,7 @@ catch {
             } | ConvertTo-Json
             
             $uri = "$mdeApiBase/machines/$machineId/runliveresponse"
-            $response = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $body
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $body -CorrelationId $correlationId
             
             $result.data = $response
         }
@@ -633,7 +662,7 @@ catch {
             } | ConvertTo-Json
             
             $uri = "$mdeApiBase/machines/$machineId/runliveresponse"
-            $response = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $body
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $body -CorrelationId $correlationId
             
             $result.data = $response
         }
@@ -655,7 +684,7 @@ catch {
             } | ConvertTo-Json
             
             $uri = "$mdeApiBase/machines/$machineId/runliveresponse"
-            $response = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $body
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $body -CorrelationId $correlationId
             
             $result.data = $response
         }
@@ -675,7 +704,7 @@ catch {
             } | ConvertTo-Json
             
             $uri = "$mdeApiBase/machines/$machineId/runliveresponse"
-            $response = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $body
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $body -CorrelationId $correlationId
             
             $result.data = $response
         }
@@ -695,7 +724,7 @@ catch {
             } | ConvertTo-Json
             
             $uri = "$mdeApiBase/machines/$machineId/runliveresponse"
-            $response = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $body
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $body -CorrelationId $correlationId
             
             $result.data = $response
         }
@@ -733,7 +762,7 @@ catch {
             $bodyJson = $body | ConvertTo-Json
             
             $uri = "$mdeApiBase/indicators"
-            $response = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $bodyJson
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $bodyJson -CorrelationId $correlationId
             
             $result.data = $response
         }
@@ -746,7 +775,7 @@ catch {
             }
             
             $uri = "$mdeApiBase/indicators/$indicatorId"
-            $response = Invoke-RestMethod -Uri $uri -Method Delete -Headers $headers
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Delete -Headers $headers -CorrelationId $correlationId
             
             $result.data = @{ message = "Indicator removed successfully"; indicatorId = $indicatorId }
         }
@@ -759,7 +788,7 @@ catch {
                 $uri += "?`$filter=$filter"
             }
             
-            $response = Invoke-RestMethod -Uri $uri -Method Get -Headers $headers
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Get -Headers $headers -CorrelationId $correlationId
             $result.data = $response
         }
         
@@ -771,7 +800,7 @@ catch {
             }
             
             $uri = "$mdeApiBase/indicators/$indicatorId"
-            $response = Invoke-RestMethod -Uri $uri -Method Get -Headers $headers
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Get -Headers $headers -CorrelationId $correlationId
             
             $result.data = $response
         }
@@ -799,7 +828,7 @@ catch {
             $bodyJson = $body | ConvertTo-Json
             
             $uri = "$mdeApiBase/indicators/$indicatorId"
-            $response = Invoke-RestMethod -Uri $uri -Method Patch -Headers $headers -Body $bodyJson
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Patch -Headers $headers -Body $bodyJson -CorrelationId $correlationId
             
             $result.data = $response
         }
@@ -811,44 +840,36 @@ catch {
                 throw "Missing required parameter: indicators array"
             }
             
-            $results = @()
-            
-            foreach ($indicator in $indicators) {
-                try {
-                    $body = @{
-                        indicatorValue = $indicator.indicatorValue
-                        indicatorType = $indicator.indicatorType
-                        action = $indicator.action
-                        title = $indicator.title
-                        description = $indicator.description
-                        severity = if ($indicator.severity) { $indicator.severity } else { "Informational" }
-                    }
-                    
-                    if ($indicator.expirationTime) {
-                        $body.expirationTime = $indicator.expirationTime
-                    }
-                    
-                    $bodyJson = $body | ConvertTo-Json
-                    
-                    $uri = "$mdeApiBase/indicators"
-                    $response = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $bodyJson
-                    
-                    $results += @{
-                        success = $true
-                        indicator = $indicator.indicatorValue
-                        response = $response
-                    }
-                }
-                catch {
-                    $results += @{
-                        success = $false
-                        indicator = $indicator.indicatorValue
-                        error = $_.Exception.Message
-                    }
+            # Deduplicated, then sent through indicators/import in parallel chunks of up to 500
+            Import-XDRModule -Name BatchExecutor, IndicatorImport
+            $import = Invoke-XDRIndicatorImport `
+                -ApiBase $mdeApiBase `
+                -Headers $headers `
+                -Indicators @($indicators) `
+                -ChunkSize ($parameters.chunkSize ?? 500) `
+                -ThrottleLimit ($parameters.parallelism ?? 0) `
+                -TimeoutSeconds (Get-XDRBatchTimeout -StartTime $startTime -Background:([bool]$TriggerMetadata.Background)) `
+                -CorrelationId $correlationId
+            
+            $result.data = @($import.results | ForEach-Object {
+                if ($_.success) {
+                    @{ success = $true; indicator = $_.indicator; id = $_.id; duplicateOf = $_.duplicateOf }
+                } else {
+                    @{ success = $false; indicator = $_.indicator; error = $_.error; unknown = $_.unknown; duplicateOf = $_.duplicateOf }
                 }
+            })
+            $result.batch = @{
+                status = $import.status
+                total = $import.total
+                submitted = $import.submitted
+                duplicates = $import.duplicates
+                succeeded = $import.succeeded
+                failed = $import.failed
+                unknown = $import.unknown
+                chunks = $import.chunks
+                failedChunks = $import.failedChunks
+                durationMs = $import.durationMs
             }
-            
-            $result.data = $results
         }
         
         "BULKREMOVEINDICATORS" {
@@ -858,28 +879,35 @@ catch {
                 throw "Missing required parameter: indicatorIds array"
             }
             
-            $results = @()
-            
-            foreach ($indicatorId in $indicatorIds) {
-                try {
-                    $uri = "$mdeApiBase/indicators/$indicatorId"
-                    Invoke-RestMethod -Uri $uri -Method Delete -Headers $headers
-                    
-                    $results += @{
-                        success = $true
-                        indicatorId = $indicatorId
-                    }
-                }
-                catch {
-                    $results += @{
-                        success = $false
-                        indicatorId = $indicatorId
-                        error = $_.Exception.Message
-                    }
+            # Deduplicated, then sent through indicators/BatchDelete in parallel chunks of up to 500
+            Import-XDRModule -Name BatchExecutor, IndicatorImport
+            $delete = Invoke-XDRIndicatorBatchDelete `
+                -ApiBase $mdeApiBase `
+                -Headers $headers `
+                -IndicatorIds @($indicatorIds) `
+                -ChunkSize ($parameters.chunkSize ?? 500) `
+                -ThrottleLimit ($parameters.parallelism ?? 0) `
+                -TimeoutSeconds (Get-XDRBatchTimeout -StartTime $startTime -Background:([bool]$TriggerMetadata.Background)) `
+                -CorrelationId $correlationId
+            
+            $result.data = @($delete.results | ForEach-Object {
+                if ($_.success) {
+                    @{ success = $true; indicatorId = $_.indicatorId; duplicateOf = $_.duplicateOf }
+                } else {
+                    @{ success = $false; indicatorId = $_.indicatorId; error = $_.error; duplicateOf = $_.duplicateOf }
                 }
+            })
+            $result.batch = @{
+                status = $delete.status
+                total = $delete.total
+                submitted = $delete.submitted
+                duplicates = $delete.duplicates
+                succeeded = $delete.succeeded
+                failed = $delete.failed
+                chunks = $delete.chunks
+                failedChunks = $delete.failedChunks
+                durationMs = $delete.durationMs
             }
-            
-            $result.data = $results
         }
         
         "ADDFILEINDICATOR" {
@@ -902,7 +930,7 @@ catch {
             } | ConvertTo-Json
             
             $uri = "$mdeApiBase/indicators"
-            $response = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $body
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $body -CorrelationId $correlationId
             
             $result.data = $response
         }
@@ -927,7 +955,7 @@ catch {
             } | ConvertTo-Json
             
             $uri = "$mdeApiBase/indicators"
-            $response = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $body
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $body -CorrelationId $correlationId
             
             $result.data = $response
         }
@@ -952,7 +980,7 @@ catch {
             } | ConvertTo-Json
             
             $uri = "$mdeApiBase/indicators"
-            $response = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $body
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $body -CorrelationId $correlationId
             
             $result.data = $response
         }
@@ -977,7 +1005,7 @@ catch {
             } | ConvertTo-Json
             
             $uri = "$mdeApiBase/indicators"
-            $response = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $body
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $body -CorrelationId $correlationId
             
             $result.data = $response
         }
@@ -991,13 +1019,13 @@ catch {
             
             # First, find the indicator ID
             $uri = "$mdeApiBase/indicators?`$filter=indicatorValue eq '$domain'"
-            $indicators = Invoke-RestMethod -Uri $uri -Method Get -Headers $headers
+            $indicators = Invoke-XDRRestMethod -Uri $uri -Method Get -Headers $headers -CorrelationId $correlationId
             
             if ($indicators.value -and $indicators.value.Count -gt 0) {
                 $indicatorId = $indicators.value[0].id
                 
                 $uri = "$mdeApiBase/indicators/$indicatorId"
-                Invoke-RestMethod -Uri $uri -Method Delete -Headers $headers
+                Invoke-XDRRestMethod -Uri $uri -Method Delete -Headers $headers -CorrelationId $correlationId
                 
                 $result.data = @{ message = "Domain indicator removed"; domain = $domain; indicatorId = $indicatorId }
             } else {
@@ -1016,14 +1044,15 @@ catch {
                 throw "Missing required parameter: query"
             }
             
-            $body = @{
-                Query = $query
-            } | ConvertTo-Json
-            
-            $uri = "$mdeApiBase/advancedqueries/run"
-            $response = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $body
+            # Repeats (workbook AutoRefresh) are answered from the result cache;
+            # parameters.cache = Refresh forces a new run, Bypass skips the cache
+            Import-XDRModule -Name HuntingCache
+            $cacheMode = if ($parameters.cache) { $parameters.cache } else { "Default" }
+            $hunt = Invoke-XDRCachedHuntingQuery -TenantId $tenantId -Query $query `
+                -Uri "$mdeApiBase/advancedqueries/run" -Headers $headers -CacheMode $cacheMode -CorrelationId $correlationId
             
-            $result.data = $response
+            $result.data = $hunt.Data
+            $result.cache = $hunt.Cache
         }
         
         "SAVEQUERY" {
@@ -1035,23 +1064,22 @@ catch {
                 throw "Missing required parameters: queryName, query"
             }
             
-            # Note: This stores query metadata, not an official MDE API endpoint
-            # In production, you might store this in Table Storage or a database
-            $result.data = @{
-                message = "Query saved successfully"
-                queryName = $queryName
-                query = $query
-                description = $description
-                savedAt = (Get-Date).ToString("o")
-            }
+            # Stored with the tenant's hunting records (HuntingCache.psm1), not in MDE
+            Import-XDRModule -Name HuntingCache
+            $saved = Save-XDRHuntingQuery -TenantId $tenantId -Name $queryName -Query $query -Description $description
+            $result.data = $saved + @{ message = "Query saved successfully" }
         }
         
         "GETQUERYHISTORY" {
-            # Note: This would retrieve saved queries from Table Storage
-            # Placeholder for now
+            Import-XDRModule -Name HuntingCache
+            $top = if ($parameters.top) { [int]$parameters.top } else { 50 }
+            $history = Get-XDRHuntingHistory -TenantId $tenantId -Top $top
+            $saved = Get-XDRSavedHuntingQueries -TenantId $tenantId
             $result.data = @{
-                message = "Query history retrieval not yet implemented"
-                queries = @()
+                queries = $history
+                count = $history.Count
+                savedQueries = $saved
+                cacheStats = Get-XDRHuntingCacheStats
             }
         }
         
@@ -1067,7 +1095,7 @@ catch {
                 $uri += "?`$filter=$filter"
             }
             
-            $response = Invoke-RestMethod -Uri $uri -Method Get -Headers $headers
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Get -Headers $headers -CorrelationId $correlationId
             $result.data = $response
         }
         
@@ -1079,7 +1107,7 @@ catch {
             }
             
             $uri = "$mdeApiBase/incidents/$incidentId"
-            $response = Invoke-RestMethod -Uri $uri -Method Get -Headers $headers
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Get -Headers $headers -CorrelationId $correlationId
             
             $result.data = $response
         }
@@ -1105,7 +1133,7 @@ catch {
             $bodyJson = $body | ConvertTo-Json
             
             $uri = "$mdeApiBase/incidents/$incidentId"
-            $response = Invoke-RestMethod -Uri $uri -Method Patch -Headers $headers -Body $bodyJson
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Patch -Headers $headers -Body $bodyJson -CorrelationId $correlationId
             
             $result.data = $response
         }
@@ -1123,7 +1151,7 @@ catch {
             } | ConvertTo-Json
             
             $uri = "$mdeApiBase/incidents/$incidentId/comments"
-            $response = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $body
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $body -CorrelationId $correlationId
             
             $result.data = $response
         }
@@ -1141,7 +1169,7 @@ catch {
             } | ConvertTo-Json
             
             $uri = "$mdeApiBase/incidents/$incidentId"
-            $response = Invoke-RestMethod -Uri $uri -Method Patch -Headers $headers -Body $body
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Patch -Headers $headers -Body $body -CorrelationId $correlationId
             
             $result.data = $response
         }
@@ -1162,7 +1190,7 @@ catch {
             } | ConvertTo-Json
             
             $uri = "$mdeApiBase/incidents/$incidentId"
-            $response = Invoke-RestMethod -Uri $uri -Method Patch -Headers $headers -Body $body
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Patch -Headers $headers -Body $body -CorrelationId $correlationId
             
             $result.data = $response
         }
@@ -1179,7 +1207,7 @@ catch {
                 $uri += "?`$filter=$filter"
             }
             
-            $response = Invoke-RestMethod -Uri $uri -Method Get -Headers $headers
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Get -Headers $headers -CorrelationId $correlationId
             $result.data = $response
         }
         
@@ -1191,7 +1219,7 @@ catch {
             }
             
             $uri = "$mdeApiBase/alerts/$alertId"
-            $response = Invoke-RestMethod -Uri $uri -Method Get -Headers $headers
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Get -Headers $headers -CorrelationId $correlationId
             
             $result.data = $response
         }
@@ -1217,7 +1245,7 @@ catch {
             $bodyJson = $body | ConvertTo-Json
             
             $uri = "$mdeApiBase/alerts/$alertId"
-            $response = Invoke-RestMethod -Uri $uri -Method Patch -Headers $headers -Body $bodyJson
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Patch -Headers $headers -Body $bodyJson -CorrelationId $correlationId
             
             $result.data = $response
         }
@@ -1238,7 +1266,7 @@ catch {
             } | ConvertTo-Json
             
             $uri = "$mdeApiBase/alerts/$alertId"
-            $response = Invoke-RestMethod -Uri $uri -Method Patch -Headers $headers -Body $body
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Patch -Headers $headers -Body $body -CorrelationId $correlationId
             
             $result.data = $response
         }
@@ -1263,7 +1291,7 @@ catch {
             $bodyJson = $body | ConvertTo-Json
             
             $uri = "$mdeApiBase/alerts/$alertId"
-            $response = Invoke-RestMethod -Uri $uri -Method Patch -Headers $headers -Body $bodyJson
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Patch -Headers $headers -Body $bodyJson -CorrelationId $correlationId
             
             $result.data = $response
         }
@@ -1283,7 +1311,7 @@ catch {
             } | ConvertTo-Json
             
             $uri = "$mdeApiBase/machines/$deviceId/runAntiVirusScan"
-            $response = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $body
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $body -CorrelationId $correlationId
             
             $result.data = @{
                 deviceId = $deviceId
@@ -1311,7 +1339,7 @@ catch {
                 } | ConvertTo-Json
                 
                 $uri = "$mdeApiBase/machines/$deviceId/runAntiVirusScan"
-                $response = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $body
+                $response = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $body -CorrelationId $correlationId
                 
                 $actions += @{
                     deviceId = $deviceId
@@ -1349,7 +1377,7 @@ catch {
             } | ConvertTo-Json
             
             $uri = "$mdeApiBase/remediationTasks"
-            $response = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $body
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $body -CorrelationId $correlationId
             
             $result.data = @{
                 deviceId = $deviceId
@@ -1380,7 +1408,7 @@ catch {
             } | ConvertTo-Json
             
             $uri = "$mdeApiBase/vulnerabilities/$vulnerabilityId/machineReferences/$deviceId/exclude"
-            $response = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $body
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $body -CorrelationId $correlationId
             
             $result.data = @{
                 deviceId = $deviceId
@@ -1415,7 +1443,7 @@ catch {
             } | ConvertTo-Json
             
             $uri = "$mdeApiBase/indicators"
-            $response = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $indicator
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $indicator -CorrelationId $correlationId
             
             $result.data = @{
                 softwareName = $softwareName
@@ -1475,7 +1503,7 @@ foreach (`$update in `$searchResult.Updates) {
             } | ConvertTo-Json -Depth 10
             
             $uri = "$mdeApiBase/machines/$deviceId/runliveresponse"
-            $response = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $body
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $body -CorrelationId $correlationId
             
             $result.data = @{
                 deviceId = $deviceId
@@ -1523,7 +1551,7 @@ foreach (`$update in `$searchResult.Updates) {
                 } | ConvertTo-Json -Depth 10
                 
                 $uri = "$mdeApiBase/machines/$deviceId/runliveresponse"
-                $response = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $body
+                $response = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $body -CorrelationId $correlationId
                 
                 $actions += @{
                     deviceId = $deviceId
@@ -1570,7 +1598,7 @@ foreach (`$update in `$searchResult.Updates) {
                 } | ConvertTo-Json -Depth 10
                 
                 $uri = "$mdeApiBase/machines/$deviceId/runliveresponse"
-                $response = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $body
+                $response = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $body -CorrelationId $correlationId
                 
                 $actions += @{
                     deviceId = $deviceId
@@ -1609,7 +1637,7 @@ foreach (`$update in `$searchResult.Updates) {
             } | ConvertTo-Json -Depth 10
             
             $uri = "$mdeApiBase/indicators"
-            $response = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $indicator
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $indicator -CorrelationId $correlationId
             
             $result.data = @{
                 certificateHash = $certificateHash
@@ -1656,7 +1684,7 @@ foreach (`$update in `$searchResult.Updates) {
                     } | ConvertTo-Json -Depth 10
                     
                     $uri = "$mdeApiBase/machines/$deviceId/runliveresponse"
-                    $response = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $body
+                    $response = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $body -CorrelationId $correlationId
                     
                     $actions += @{
                         deviceId = $deviceId
@@ -1734,7 +1762,7 @@ foreach (`$update in `$searchResult.Updates) {
             } | ConvertTo-Json
             
             $uri = "$mdeApiBase/indicators"
-            $indicatorResponse = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $indicator
+            $indicatorResponse = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $indicator -CorrelationId $correlationId
             
             # Then, block via firewall on specific devices if provided
             $actions = @()
@@ -1766,7 +1794,7 @@ foreach (`$update in `$searchResult.Updates) {
                     } | ConvertTo-Json -Depth 10
                     
                     $uri2 = "$mdeApiBase/machines/$deviceId/runliveresponse"
-                    $response = Invoke-RestMethod -Uri $uri2 -Method Post -Headers $headers -Body $body
+                    $response = Invoke-XDRRestMethod -Uri $uri2 -Method Post -Headers $headers -Body $body -CorrelationId $correlationId
                     
                     $actions += @{
                         deviceId = $deviceId
@@ -1815,7 +1843,7 @@ foreach (`$update in `$searchResult.Updates) {
             } | ConvertTo-Json -Depth 10
             
             $uri = "$mdeApiBase/customDetectionRules"
-            $response = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $rule
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $rule -CorrelationId $correlationId
             
             $result.data = @{
                 ruleId = $response.id
@@ -1839,7 +1867,7 @@ foreach (`$update in `$searchResult.Updates) {
             $body = $updates | ConvertTo-Json -Depth 10
             
             $uri = "$mdeApiBase/customDetectionRules/$ruleId"
-            $response = Invoke-RestMethod -Uri $uri -Method Patch -Headers $headers -Body $body
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Patch -Headers $headers -Body $body -CorrelationId $correlationId
             
             $result.data = @{
                 ruleId = $ruleId
@@ -1857,7 +1885,7 @@ foreach (`$update in `$searchResult.Updates) {
             Write-Host "Deleting custom detection rule: $ruleId"
             
             $uri = "$mdeApiBase/customDetectionRules/$ruleId"
-            $response = Invoke-RestMethod -Uri $uri -Method Delete -Headers $headers
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Delete -Headers $headers -CorrelationId $correlationId
             
             $result.data = @{
                 ruleId = $ruleId
@@ -1879,7 +1907,7 @@ foreach (`$update in `$searchResult.Updates) {
             } | ConvertTo-Json
             
             $uri = "$mdeApiBase/customDetectionRules/$ruleId"
-            $response = Invoke-RestMethod -Uri $uri -Method Patch -Headers $headers -Body $body
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Patch -Headers $headers -Body $body -CorrelationId $correlationId
             
             $result.data = @{
                 ruleId = $ruleId
@@ -1901,7 +1929,7 @@ foreach (`$update in `$searchResult.Updates) {
             } | ConvertTo-Json
             
             $uri = "$mdeApiBase/customDetectionRules/$ruleId"
-            $response = Invoke-RestMethod -Uri $uri -Method Patch -Headers $headers -Body $body
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Patch -Headers $headers -Body $body -CorrelationId $correlationId
             
             $result.data = @{
                 ruleId = $ruleId
@@ -26,6 +26,8 @@ $messageId = if ($Request.Query.messageId) { $Request.Query.messageId } else { $
 $url = if ($Request.Query.url) { $Request.Query.url } else { $Request.Body.url }
 $userId = if ($Request.Query.userId) { $Request.Query.userId } else { $Request.Body.userId }
 $remediationType = if ($Request.Query.remediationType) { $Request.Query.remediationType } else { $Request.Body.remediationType }
+# Correlation ID from the Orchestrator, so this worker's API calls log under the caller's request
+$correlationId = $Request.Body.correlationId ?? $TriggerMetadata.CorrelationId ?? [guid]::NewGuid().ToString()
 
 # Get credentials
 $appId = $env:APPID
@@ -46,9 +48,8 @@ if (-not $action) {
         Body = "Missing action parameter"
     })
 try {
-    Import-Module "$PSScriptRoot/../modules/AuthManager.psm1" -ErrorAction Stop
-    Import-Module "$PSScriptRoot/../modules/ValidationHelper.psm1" -ErrorAction Stop
-    Import-Module "$PSScriptRoot/../modules/LoggingHelper.psm1" -ErrorAction Stop
+    Import-Module "$PSScriptRoot/../modules/ModuleLoader.psm1" -ErrorAction Stop
+    Import-XDRModule -Name AuthManager, ValidationHelper, LoggingHelper, HttpPipeline
     # NOTE: Business logic is inline - no external module needed
 } catch {
     Push-OutputBinding -Name Response -Value ([HttpResponseContext]@{
@@ -92,7 +93,7 @@ try {
             
             # Graph Beta endpoint for email remediation
             $uri = "$graphBase/beta/security/collaboration/analyzedEmails/remediate"
-            $response = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $body
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $body -CorrelationId $correlationId
             
             Push-OutputBinding -Name Response -Value ([HttpResponseContext]@{
                 StatusCode = [HttpStatusCode]::OK
@@ -122,7 +123,7 @@ try {
             } | ConvertTo-Json
             
             $uri = "$graphBase/beta/security/collaboration/analyzedEmails/remediate"
-            $response = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $body
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $body -CorrelationId $correlationId
             
             Push-OutputBinding -Name Response -Value ([HttpResponseContext]@{
                 StatusCode = [HttpStatusCode]::OK
@@ -152,7 +153,7 @@ try {
             } | ConvertTo-Json
             
             $uri = "$graphBase/beta/security/collaboration/analyzedEmails/remediate"
-            $response = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $body
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $body -CorrelationId $correlationId
             
             Push-OutputBinding -Name Response -Value ([HttpResponseContext]@{
                 StatusCode = [HttpStatusCode]::OK
@@ -182,7 +183,7 @@ try {
             } | ConvertTo-Json
             
             $uri = "$graphBase/beta/security/collaboration/analyzedEmails/remediate"
-            $response = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $body
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $body -CorrelationId $correlationId
             
             Push-OutputBinding -Name Response -Value ([HttpResponseContext]@{
                 StatusCode = [HttpStatusCode]::OK
@@ -212,7 +213,7 @@ try {
             } | ConvertTo-Json
             
             $uri = "$graphBase/beta/security/collaboration/analyzedEmails/remediate"
-            $response = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $body
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $body -CorrelationId $correlationId
             
             Push-OutputBinding -Name Response -Value ([HttpResponseContext]@{
                 StatusCode = [HttpStatusCode]::OK
@@ -237,31 +238,37 @@ try {
                 throw "Missing required parameter: searchQuery"
             }
             
-            $results = @()
+            $maxItems = if ($Request.Body.maxItems) { [int]$Request.Body.maxItems } else { 0 }
+            $timeBudgetSeconds = if ($Request.Body.timeBudgetSeconds) { [int]$Request.Body.timeBudgetSeconds } else { 180 }
+            $paging = $null
             
-            # If specific users provided, search their mailboxes
+            # Specific users get a deeper search; otherwise every mailbox in the tenant
+            # (requires Mail.ReadWrite permission), with users read across all pages
             if ($userIds.Count -gt 0) {
-                foreach ($uid in $userIds) {
-                    $uri = "$graphBase/v1.0/users/$uid/messages?`$search=`"$searchQuery`"&`$top=50"
-                    $messages = Invoke-RestMethod -Uri $uri -Method Get -Headers $headers
-                    $results += $messages.value
-                }
+                $mailboxIds = @($userIds)
+                $perMailbox = 50
             } else {
-                # Search all mailboxes (requires Mail.ReadWrite permission)
-                $uri = "$graphBase/v1.0/users?`$top=999"
-                $users = Invoke-RestMethod -Uri $uri -Method Get -Headers $headers
-                
-                foreach ($user in $users.value) {
-                    try {
-                        $uri = "$graphBase/v1.0/users/$($user.id)/messages?`$search=`"$searchQuery`"&`$top=10"
-                        $messages = Invoke-RestMethod -Uri $uri -Method Get -Headers $headers -ErrorAction SilentlyContinue
-                        if ($messages.value) {
-                            $results += $messages.value
-                        }
-                    } catch {
-                        # Skip users without mailboxes
-                        continue
-                    }
+                $paging = @{}
+                $mailboxIds = @(Get-XDRPagedItems -Uri "$graphBase/v1.0/users?`$select=id&`$top=999" -Headers $headers -MaxItems $maxItems -TimeBudgetSeconds $timeBudgetSeconds -PagingState $paging -CorrelationId $correlationId | ForEach-Object { $_.id })
+                $perMailbox = 10
+            }
+            
+            # One search per mailbox, sent as $batch requests (20 per batch, several batches in flight)
+            $search = [Uri]::EscapeDataString("`"$searchQuery`"")
+            $requests = foreach ($mailboxId in $mailboxIds) {
+                @{ id = [string]$mailboxId; method = "GET"; url = "/users/$mailboxId/messages?`$search=$search&`$top=$perMailbox" }
+            }
+            $remainingSeconds = if ($paging) { [Math]::Max(1, [int]($timeBudgetSeconds - $paging.durationMs / 1000)) } else { $timeBudgetSeconds }
+            $responses = @(Invoke-XDRGraphBatch -Requests @($requests) -Headers $headers -BatchUri "$graphBase/v1.0/`$batch" -TimeBudgetSeconds $remainingSeconds -CorrelationId $correlationId)
+            
+            $results = [System.Collections.Generic.List[object]]::new()
+            $failedMailboxes = [System.Collections.Generic.List[object]]::new()
+            foreach ($response in $responses) {
+                if ($response.status -eq 200) {
+                    foreach ($message in $response.body.value) { $results.Add($message) }
+                } elseif ($userIds.Count -gt 0) {
+                    # Users without mailboxes are only worth reporting when asked for by name
+                    $failedMailboxes.Add(@{ userId = $response.id; status = $response.status; error = $response.body.error.message })
                 }
             }
             
@@ -274,6 +281,9 @@ try {
                     searchQuery = $searchQuery
                     resultCount = $results.Count
                     results = $results
+                    mailboxesSearched = @($responses | Where-Object { $_.status -eq 200 }).Count
+                    failedMailboxes = $failedMailboxes
+                    paging = $paging
                     timestamp = (Get-Date).ToString("o")
                 } | ConvertTo-Json -Depth 5
             })
@@ -304,7 +314,7 @@ try {
                     
                     if ($uid -and $mid) {
                         $uri = "$graphBase/v1.0/users/$uid/messages/$mid"
-                        Invoke-RestMethod -Uri $uri -Method Delete -Headers $headers
+                        Invoke-XDRRestMethod -Uri $uri -Method Delete -Headers $headers -CorrelationId $correlationId
                         $deletedCount++
                     }
                 } catch {
@@ -344,7 +354,7 @@ try {
             } | ConvertTo-Json
             
             $uri = "$graphBase/beta/security/collaboration/analyzedEmails/zapPhishing"
-            $response = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $body
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $body -CorrelationId $correlationId
             
             Push-OutputBinding -Name Response -Value ([HttpResponseContext]@{
                 StatusCode = [HttpStatusCode]::OK
@@ -373,7 +383,7 @@ try {
             } | ConvertTo-Json
             
             $uri = "$graphBase/beta/security/collaboration/analyzedEmails/zapMalware"
-            $response = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $body
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $body -CorrelationId $correlationId
             
             Push-OutputBinding -Name Response -Value ([HttpResponseContext]@{
                 StatusCode = [HttpStatusCode]::OK
@@ -397,7 +407,7 @@ try {
                 $uri += "?`$filter=$filter"
             }
             
-            $response = Invoke-RestMethod -Uri $uri -Method Get -Headers $headers
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Get -Headers $headers -CorrelationId $correlationId
             
             Push-OutputBinding -Name Response -Value ([HttpResponseContext]@{
                 StatusCode = [HttpStatusCode]::OK
@@ -436,7 +446,7 @@ try {
             if ($messageId) { $body.internetMessageId = $messageId }
             
             $uri = "$graphBase/v1.0/security/threatSubmission/emailThreats"
-            $response = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body ($body | ConvertTo-Json)
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body ($body | ConvertTo-Json) -CorrelationId $correlationId
             
             Push-OutputBinding -Name Response -Value ([HttpResponseContext]@{
                 StatusCode = [HttpStatusCode]::OK
@@ -467,7 +477,7 @@ try {
             } | ConvertTo-Json
             
             $uri = "$graphBase/v1.0/security/threatSubmission/urlThreats"
-            $response = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $body
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $body -CorrelationId $correlationId
             
             Push-OutputBinding -Name Response -Value ([HttpResponseContext]@{
                 StatusCode = [HttpStatusCode]::OK
@@ -503,7 +513,7 @@ try {
             if ($fileHash) { $body.fileHash = $fileHash }
             
             $uri = "$graphBase/v1.0/security/threatSubmission/fileThreats"
-            $response = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body ($body | ConvertTo-Json)
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body ($body | ConvertTo-Json) -CorrelationId $correlationId
             
             Push-OutputBinding -Name Response -Value ([HttpResponseContext]@{
                 StatusCode = [HttpStatusCode]::OK
@@ -530,14 +540,14 @@ try {
             }
             
             $uri = "$graphBase/v1.0/users/$userId/mailFolders/inbox/messageRules"
-            $rules = Invoke-RestMethod -Uri $uri -Method Get -Headers $headers
+            $rules = Invoke-XDRRestMethod -Uri $uri -Method Get -Headers $headers -CorrelationId $correlationId
             
             $removedRules = @()
             foreach ($rule in $rules.value) {
                 # Check if rule has forwarding action
                 if ($rule.actions.forwardTo -or $rule.actions.forwardAsAttachmentTo -or $rule.actions.redirect) {
                     $deleteUri = "$graphBase/v1.0/users/$userId/mailFolders/inbox/messageRules/$($rule.id)"
-                    Invoke-RestMethod -Uri $deleteUri -Method Delete -Headers $headers
+                    Invoke-XDRRestMethod -Uri $deleteUri -Method Delete -Headers $headers -CorrelationId $correlationId
                     $removedRules += $rule
                 }
             }
@@ -559,18 +569,21 @@ try {
         "GETMAILBOXFO RWARDERS" {
             # Get all users with mail forwarding configured (Graph v1.0 - stable)
             $uri = "$graphBase/v1.0/users?`$select=id,displayName,userPrincipalName,mailboxSettings&`$top=999"
-            $users = Invoke-RestMethod -Uri $uri -Method Get -Headers $headers
+            $maxItems = if ($Request.Body.maxItems) { [int]$Request.Body.maxItems } else { 0 }
+            $timeBudgetSeconds = if ($Request.Body.timeBudgetSeconds) { [int]$Request.Body.timeBudgetSeconds } else { -1 }
+            $paging = @{}
             
-            $forwarders = @()
-            foreach ($user in $users.value) {
+            $forwarders = [System.Collections.Generic.List[object]]::new()
+            Get-XDRPagedItems -Uri $uri -Headers $headers -MaxItems $maxItems -TimeBudgetSeconds $timeBudgetSeconds -PagingState $paging -CorrelationId $correlationId | ForEach-Object {
+                $user = $_
                 if ($user.mailboxSettings.automaticRepliesSetting.externalAudience -or 
                     $user.mailboxSettings.forwardingSmtpAddress) {
-                    $forwarders += @{
+                    $forwarders.Add(@{
                         userId = $user.id
                         displayName = $user.displayName
                         userPrincipalName = $user.userPrincipalName
                         forwardingAddress = $user.mailboxSettings.forwardingSmtpAddress
-                    }
+                    })
                 }
             }
             
@@ -582,6 +595,7 @@ try {
                     tenantId = $tenantId
                     forwarderCount = $forwarders.Count
                     forwarders = $forwarders
+                    paging = $paging
                     timestamp = (Get-Date).ToString("o")
                 } | ConvertTo-Json -Depth 5
             })
@@ -600,7 +614,7 @@ try {
             } | ConvertTo-Json -Depth 3
             
             $uri = "$graphBase/v1.0/users/$userId"
-            $response = Invoke-RestMethod -Uri $uri -Method Patch -Headers $headers -Body $body
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Patch -Headers $headers -Body $body -CorrelationId $correlationId
             
             Push-OutputBinding -Name Response -Value ([HttpResponseContext]@{
                 StatusCode = [HttpStatusCode]::OK
@@ -631,7 +645,7 @@ try {
             } | ConvertTo-Json
             
             $uri = "$graphBase/beta/security/collaboration/quarantine/emailMessages/$($Request.Body.quarantineMessageId)/release"
-            $response = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $releaseBody
+            $response = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $releaseBody -CorrelationId $correlationId
             
             Push-OutputBinding -Name Response -Value ([HttpResponseContext]@{
                 StatusCode = [HttpStatusCode]::OK
@@ -657,7 +671,7 @@ try {
             }
             
             $uri = "$graphBase/beta/security/collaboration/quarantine/emailMessages/$($Request.Body.quarantineMessageId)"
-            Invoke-RestMethod -Uri $uri -Method Delete -Headers $headers
+            Invoke-XDRRestMethod -Uri $uri -Method Delete -Headers $headers -CorrelationId $correlationId
             
             Push-OutputBinding -Name Response -Value ([HttpResponseContext]@{
                 StatusCode = [HttpStatusCode]::OK
@@ -688,7 +702,7 @@ try {
                 try {
                     $releaseBody = @{ releaseToAll = $false } | ConvertTo-Json
                     $uri = "$graphBase/beta/security/collaboration/quarantine/emailMessages/$qId/release"
-                    Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $releaseBody
+                    Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $releaseBody -CorrelationId $correlationId
                     $released += $qId
                 } catch {
                     $failed += @{
@@ -723,7 +737,7 @@ try {
             }
             
             $uri = "$graphBase/beta/security/collaboration/quarantine/emailMessages?`$filter=receivedDateTime ge $startDate and receivedDateTime le $endDate"
-            $quarantinedEmails = Invoke-RestMethod -Uri $uri -Method Get -Headers $headers
+            $quarantinedEmails = Invoke-XDRRestMethod -Uri $uri -Method Get -Headers $headers -CorrelationId $correlationId
             
             $report = @{
                 startDate = $startDate
@@ -778,7 +792,7 @@ try {
             
             # Use Security & Compliance PowerShell endpoint
             $uri = "$graphBase/beta/security/collaboration/quarantine/policies"
-            $policy = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $policyBody
+            $policy = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $policyBody -CorrelationId $correlationId
             
             Push-OutputBinding -Name Response -Value ([HttpResponseContext]@{
                 StatusCode = [HttpStatusCode]::OK
@@ -815,7 +829,7 @@ try {
             } | ConvertTo-Json -Depth 10
             
             $uri = "$graphBase/beta/security/collaboration/inboundFlow/tenantAllowBlockList/entries"
-            $blockEntry = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $blockBody
+            $blockEntry = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $blockBody -CorrelationId $correlationId
             
             Push-OutputBinding -Name Response -Value ([HttpResponseContext]@{
                 StatusCode = [HttpStatusCode]::OK
@@ -850,7 +864,7 @@ try {
             } | ConvertTo-Json -Depth 10
             
             $uri = "$graphBase/beta/security/collaboration/inboundFlow/tenantAllowBlockList/entries"
-            $allowEntry = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $allowBody
+            $allowEntry = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $allowBody -CorrelationId $correlationId
             
             Push-OutputBinding -Name Response -Value ([HttpResponseContext]@{
                 StatusCode = [HttpStatusCode]::OK
@@ -876,7 +890,7 @@ try {
             }
             
             $uri = "$graphBase/beta/security/collaboration/inboundFlow/tenantAllowBlockList/entries/$($Request.Body.entryId)"
-            Invoke-RestMethod -Uri $uri -Method Delete -Headers $headers
+            Invoke-XDRRestMethod -Uri $uri -Method Delete -Headers $headers -CorrelationId $correlationId
             
             Push-OutputBinding -Name Response -Value ([HttpResponseContext]@{
                 StatusCode = [HttpStatusCode]::OK
@@ -913,7 +927,7 @@ try {
             } | ConvertTo-Json -Depth 10
             
             $uri = "$graphBase/beta/security/collaboration/inboundFlow/spamFilterPolicies"
-            $policy = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $policyBody
+            $policy = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $policyBody -CorrelationId $correlationId
             
             Push-OutputBinding -Name Response -Value ([HttpResponseContext]@{
                 StatusCode = [HttpStatusCode]::OK
@@ -941,7 +955,7 @@ try {
             } | ConvertTo-Json -Depth 10
             
             $uri = "$graphBase/beta/security/collaboration/attachmentProtection/policies"
-            $policy = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $policyBody
+            $policy = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $policyBody -CorrelationId $correlationId
             
             Push-OutputBinding -Name Response -Value ([HttpResponseContext]@{
                 StatusCode = [HttpStatusCode]::OK
@@ -978,7 +992,7 @@ try {
             } | ConvertTo-Json -Depth 10
             
             $uri = "$graphBase/beta/security/collaboration/campaigns"
-            $campaign = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $campaignBody
+            $campaign = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $campaignBody -CorrelationId $correlationId
             
             Push-OutputBinding -Name Response -Value ([HttpResponseContext]@{
                 StatusCode = [HttpStatusCode]::OK
@@ -1012,7 +1026,7 @@ try {
             } | ConvertTo-Json -Depth 10
             
             $uri = "$graphBase/beta/security/collaboration/inboundFlow/tenantAllowBlockList/entries"
-            $blockEntry = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $blockBody
+            $blockEntry = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $blockBody -CorrelationId $correlationId
             
             Push-OutputBinding -Name Response -Value ([HttpResponseContext]@{
                 StatusCode = [HttpStatusCode]::OK
@@ -1050,7 +1064,7 @@ try {
             
             # Search for matching emails
             $searchUri = "$graphBase/beta/security/collaboration/analyzedEmails?`$filter=$filter"
-            $emails = Invoke-RestMethod -Uri $searchUri -Method Get -Headers $headers
+            $emails = Invoke-XDRRestMethod -Uri $searchUri -Method Get -Headers $headers -CorrelationId $correlationId
             
             # Hard delete matching emails
             $deletedCount = 0
@@ -1062,7 +1076,7 @@ try {
                     } | ConvertTo-Json
                     
                     $remediateUri = "$graphBase/beta/security/collaboration/analyzedEmails/remediate"
-                    Invoke-RestMethod -Uri $remediateUri -Method Post -Headers $headers -Body $deleteBody
+                    Invoke-XDRRestMethod -Uri $remediateUri -Method Post -Headers $headers -Body $deleteBody -CorrelationId $correlationId
                     $deletedCount++
                 } catch {
                     Write-XDRLog -Level "Warning" -Message "Failed to delete email" -Data @{ EmailId = $email.id; Error = $_.Exception.Message }
@@ -1098,7 +1112,7 @@ try {
             $endDate = $Request.Body.endDate ?? (Get-Date).ToString("o")
             
             $uri = "$graphBase/beta/security/collaboration/messageTrace?`$filter=messageId eq '$($Request.Body.messageId)' and receivedDateTime ge $startDate and receivedDateTime le $endDate"
-            $trace = Invoke-RestMethod -Uri $uri -Method Get -Headers $headers
+            $trace = Invoke-XDRRestMethod -Uri $uri -Method Get -Headers $headers -CorrelationId $correlationId
             
             $traceDetails = @()
             foreach ($message in $trace.value) {
@@ -1158,7 +1172,7 @@ try {
             } | ConvertTo-Json -Depth 10
             
             $uri = "$graphBase/beta/security/attackSimulation/simulations"
-            $simulation = Invoke-RestMethod -Uri $uri -Method Post -Headers $headers -Body $simulationBody
+            $simulation = Invoke-XDRRestMethod -Uri $uri -Method Post -Headers $headers -Body $simulationBody -CorrelationId $correlationId
             
             Push-OutputBinding -Name Response -Value ([HttpResponseContext]@{
                 StatusCode = [HttpStatusCode]::OK
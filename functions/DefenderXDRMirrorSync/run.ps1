@@ -0,0 +1,86 @@
+<#
+.SYNOPSIS
+    DefenderXDR Mirror Sync - Keeps the incident and alert mirror up to date
+
+.DESCRIPTION
+    Timer-triggered (every 5 minutes). For each tenant in XDR_MIRROR_TENANTS
+    or read through the Incident worker recently, applies the incidents and
+    alerts changed since the last pass (see IncidentMirror.psm1). The Incident
+    worker answers its list and lookup actions from the mirror while it is fresh.
+
+    Each kind gets XDR_MIRROR_SYNC_BUDGET_SECONDS of paging per tenant
+    (default 60); a pass that does not finish resumes on the next run.
+    The whole run stops starting tenants after XDR_MIRROR_RUN_BUDGET_SECONDS
+    (default 240, inside the 5 minute schedule); the rest resume on the next
+    run. The starting tenant rotates with every run, so a long tenant list
+    does not always leave the same tenants for last.
+
+.NOTES
+    Version: 1.1.0
+    Timer functions run on one instance at a time; other instances reload
+    the stored mirror when it changes.
+#>
+
+param($Timer)
+
+$modulePath = "$PSScriptRoot\..\modules"
+
+try {
+    Import-Module "$modulePath\ModuleLoader.psm1" -ErrorAction Stop
+    Import-XDRModule -Name AuthManager, LoggingHelper, HttpPipeline, IncidentMirror
+} catch {
+    Write-Error "❌ CRITICAL: Failed to load mirror sync modules - $($_.Exception.Message)"
+    throw
+}
+
+$correlationId = [guid]::NewGuid().ToString()
+$budgetSeconds = if ($env:XDR_MIRROR_SYNC_BUDGET_SECONDS) { [int]$env:XDR_MIRROR_SYNC_BUDGET_SECONDS } else { 60 }
+$runBudgetSeconds = if ($env:XDR_MIRROR_RUN_BUDGET_SECONDS) { [int]$env:XDR_MIRROR_RUN_BUDGET_SECONDS } else { 240 }
+# A tenant is only started with enough time left for a useful pass of both kinds
+$minTenantSeconds = 20
+$runClock = [System.Diagnostics.Stopwatch]::StartNew()
+
+if ($Timer.IsPastDue) {
+    Write-Warning "[$correlationId] Mirror sync is running late"
+}
+
+$tenants = @(Get-XDRMirrorTenants | Sort-Object)
+Write-Host "[$correlationId] DefenderXDRMirrorSync - $($tenants.Count) tenant(s)"
+
+# Start one tenant further along on every run (runs are 5 minutes apart)
+$offset = if ($tenants.Count -gt 0) { [int]([DateTimeOffset]::UtcNow.ToUnixTimeSeconds() / 300) % $tenants.Count } else { 0 }
+$ordered = @(for ($i = 0; $i -lt $tenants.Count; $i++) { $tenants[($offset + $i) % $tenants.Count] })
+
+for ($i = 0; $i -lt $ordered.Count; $i++) {
+    $tenantId = $ordered[$i]
+    $remaining = $runBudgetSeconds - $runClock.Elapsed.TotalSeconds
+    if ($remaining -lt $minTenantSeconds) {
+        Write-Warning "[$correlationId] Run budget of ${runBudgetSeconds}s used, $($ordered.Count - $i) tenant(s) left for the next run"
+        break
+    }
+    # Both kinds share what is left of the run
+    $tenantBudget = [Math]::Max(1, [Math]::Min($budgetSeconds, [int]($remaining / 2)))
+
+    # One tenant failing (consent removed, throttling) does not stop the others
+    try {
+        $token = Get-OAuthToken -TenantId $tenantId -AppId $env:APPID -ClientSecret $env:SECRETID -Service "Graph"
+        if (-not $token) {
+            throw "Failed to acquire authentication token"
+        }
+        $headers = @{
+            Authorization = "Bearer $token"
+            "Content-Type" = "application/json"
+        }
+
+        $passes = Sync-XDRIncidentMirror -TenantId $tenantId -Headers $headers -TimeBudgetSeconds $tenantBudget -CorrelationId $correlationId
+        foreach ($kind in $passes.Keys) {
+            $pass = $passes[$kind]
+            Write-Host "[$correlationId] $tenantId $kind $($pass.mode): $($pass.applied) applied, $($pass.removed) removed, $($pass.items) mirrored$(if ($pass.mode -ne 'Skipped' -and -not $pass.complete) { ' (resumes next run)' })"
+        }
+        Write-XDRLog -Level Info -Message "Mirror sync completed" -CorrelationId $correlationId -TenantId $tenantId `
+            -Service "IncidentMirror" -Action "Sync" -Properties @{ passes = $passes }
+    } catch {
+        Write-XDRLog -Level Error -Message "Mirror sync failed: $($_.Exception.Message)" -CorrelationId $correlationId `
+            -TenantId $tenantId -Service "IncidentMirror" -Action "Sync" -Exception $_.Exception
+    }
+}
@@ -50,7 +50,7 @@ using namespace System.Net
     }
     
 .NOTES
-    Version: 2.1.0
+    Version: 2.2.0
     Replaces individual function endpoints with unified orchestration
 #>
 
@@ -115,12 +115,12 @@ function Test-BatchInput {
 $modulePath = "$PSScriptRoot\..\modules"
 
 try {
-    # Core shared utilities (used by multiple functions)
-    Import-Module "$modulePath\AuthManager.psm1" -Force -ErrorAction Stop
-    Import-Module "$modulePath\ValidationHelper.psm1" -Force -ErrorAction Stop
-    Import-Module "$modulePath\LoggingHelper.psm1" -Force -ErrorAction Stop
+    # Core shared utilities (used by multiple functions), once per runspace.
+    # BatchExecutor and FunctionDispatcher are imported by the actions that use them.
+    Import-Module "$modulePath\ModuleLoader.psm1" -ErrorAction Stop
+    Import-XDRModule -Name AuthManager, ValidationHelper, LoggingHelper, HttpPipeline
     
-    Write-Host "✅ v3.4.0 - Core modules loaded (Auth, Validation, Logging) | Batch processing inline"
+    Write-Host "✅ v3.4.0 - Core modules loaded (Auth, Validation, Logging, HttpPipeline) | Batch input parsing inline"
 } catch {
     Write-Error "❌ CRITICAL: Failed to load shared utility module - $($_.Exception.Message)"
     throw
@@ -134,8 +134,8 @@ try {
 #   - AzureInfrastructure.psm1, DefenderForIdentity.psm1
 # These modules have been archived to archive/old-modules/ for reference
 
-# Generate correlation ID for request tracking
-$correlationId = [guid]::NewGuid().ToString()
+# Correlation ID from the Gateway (body over HTTP, trigger metadata in-process); new for direct calls
+$correlationId = $Request.Body.correlationId ?? $TriggerMetadata.CorrelationId ?? [guid]::NewGuid().ToString()
 $startTime = Get-Date
 
 Write-Host "[$correlationId] XDROrchestrator processing request"
@@ -253,6 +253,35 @@ if ($service -notin $validServices) {
     return
 }
 
+# Optional per tenant/service rate limit (token bucket in ValidationHelper)
+if ($env:XDR_RATE_LIMIT_PER_MINUTE) {
+    $rateLimitPerMinute = [int]$env:XDR_RATE_LIMIT_PER_MINUTE
+    if (-not (Test-RateLimit -TenantId $tenantId -Service $service -MaxRequestsPerMinute $rateLimitPerMinute)) {
+        $headroom = Get-RateLimitHeadroom -TenantId $tenantId -Service $service -MaxRequestsPerMinute $rateLimitPerMinute
+        Push-OutputBinding -Name Response -Value ([HttpResponseContext]@{
+            StatusCode = [HttpStatusCode]::TooManyRequests
+            Body = @{
+                success = $false
+                correlationId = $correlationId
+                service = $service
+                action = $action
+                tenantId = $tenantId
+                error = @{
+                    code = "RATE_LIMITED"
+                    message = "Rate limit of $rateLimitPerMinute requests per minute exceeded for $service"
+                }
+                retryAfterSeconds = $headroom.RetryAfterSeconds
+                timestamp = (Get-Date).ToString("o")
+            } | ConvertTo-Json
+            Headers = @{
+                "Content-Type" = "application/json"
+                "Retry-After" = "$($headroom.RetryAfterSeconds)"
+            }
+        })
+        return
+    }
+}
+
 # ============================================================================
 # MAIN ORCHESTRATION
 # ============================================================================
@@ -276,10 +305,10 @@ try {
     # ========================================================================
     # Route requests to specialized Worker functions for processing
     # Workers handle authentication, action execution, and response formatting
+    # Workers are called through Invoke-XDRFunction (FunctionDispatcher.psm1):
+    # in-process by default, over HTTP with XDR_DISPATCH_MODE=Http
     # ========================================================================
     
-    $functionAppUrl = $env:WEBSITE_HOSTNAME
-    
     switch ($service.ToUpper()) {
         
         # ====================================================================
@@ -330,85 +359,123 @@ try {
             $incidentId = $Request.Query.incidentId ?? $Request.Body.incidentId
             $filter = $Request.Query.filter ?? $Request.Body.filter
             
+            $parallelism = $Request.Query.parallelism ?? $Request.Body.parallelism
+            
             # Parse device IDs
-            $deviceIdList = if ($deviceIds) {
+            $deviceIdList = @(if ($deviceIds) {
                 if ($deviceIds -is [string]) {
                     $deviceIds.Split(',') | ForEach-Object { $_.Trim() } | Where-Object { $_ -ne "" }
                 } else { $deviceIds }
-            } else { @() }
+            })
+            
+            # Multi-device MDE machine actions: API path, default comment, response message
+            $mdeDeviceActions = @{
+                "IsolateDevice" = @{ Path = "isolate"; Comment = "Isolated via XDROrchestrator"; Message = "Device isolation initiated" }
+                "UnisolateDevice" = @{ Path = "unisolate"; Comment = "Unisolated via XDROrchestrator"; Message = "Device unisolation initiated" }
+                "RestrictAppExecution" = @{ Path = "restrictCodeExecution"; Comment = "App execution restricted via XDROrchestrator"; Message = "App execution restriction initiated" }
+                "UnrestrictAppExecution" = @{ Path = "unrestrictCodeExecution"; Comment = "App execution unrestricted via XDROrchestrator"; Message = "App execution unrestriction initiated" }
+                "RunAntivirusScan" = @{ Path = "runAntiVirusScan"; Comment = "Scan via XDROrchestrator"; Message = "Antivirus scan initiated" }
+                "CollectInvestigationPackage" = @{ Path = "collectInvestigationPackage"; Comment = "Investigation package via XDROrchestrator"; Message = "Investigation package collection initiated" }
+            }
+            
+            $mdeHeaders = @{ Authorization = "Bearer $tokenString"; "Content-Type" = "application/json" }
             
             # Route to appropriate MDE function
             switch -Wildcard ($action) {
-                "IsolateDevice" {
-                    if ($deviceIdList.Count -eq 0) { throw "Device IDs required" }
-                    $commentText = if ($comment) { $comment } else { "Isolated via XDROrchestrator" }
-                    $isoType = if ($isolationType) { $isolationType } else { "Full" }
-                    $responses = Invoke-DeviceIsolation -Token $token -DeviceIds $deviceIdList -Comment $commentText -IsolationType $isoType
-                    $result.data = @{
-                        message = "Device isolation initiated"
-                        deviceCount = $deviceIdList.Count
-                        actionIds = $responses | ForEach-Object { $_.id }
-                    }
-                }
-                "UnisolateDevice" {
-                    if ($deviceIdList.Count -eq 0) { throw "Device IDs required" }
-                    $commentText = if ($comment) { $comment } else { "Unisolated via XDROrchestrator" }
-                    $responses = Invoke-DeviceUnisolation -Token $token -DeviceIds $deviceIdList -Comment $commentText
-                    $result.data = @{
-                        message = "Device unisolation initiated"
-                        deviceCount = $deviceIdList.Count
-                        actionIds = $responses | ForEach-Object { $_.id }
-                    }
-                }
-                "RestrictAppExecution" {
-                    if ($deviceIdList.Count -eq 0) { throw "Device IDs required" }
-                    $commentText = if ($comment) { $comment } else { "App execution restricted via XDROrchestrator" }
-                    $responses = Invoke-RestrictAppExecution -Token $token -DeviceIds $deviceIdList -Comment $commentText
-                    $result.data = @{
-                        message = "App execution restriction initiated"
-                        deviceCount = $deviceIdList.Count
-                        actionIds = $responses | ForEach-Object { $_.id }
-                    }
-                }
-                "UnrestrictAppExecution" {
+                { $_ -in $mdeDeviceActions.Keys } {
                     if ($deviceIdList.Count -eq 0) { throw "Device IDs required" }
-                    $commentText = if ($comment) { $comment } else { "App execution unrestricted via XDROrchestrator" }
-                    $responses = Invoke-UnrestrictAppExecution -Token $token -DeviceIds $deviceIdList -Comment $commentText
-                    $result.data = @{
-                        message = "App execution unrestriction initiated"
-                        deviceCount = $deviceIdList.Count
-                        actionIds = $responses | ForEach-Object { $_.id }
-                    }
-                }
-                "RunAntivirusScan" {
-                    if ($deviceIdList.Count -eq 0) { throw "Device IDs required" }
-                    $scan = if ($scanType) { $scanType } else { "Quick" }
-                    $commentText = if ($comment) { $comment } else { "$scan scan via XDROrchestrator" }
-                    $responses = Invoke-AntivirusScan -Token $token -DeviceIds $deviceIdList -ScanType $scan -Comment $commentText
-                    $result.data = @{
-                        message = "$scan antivirus scan initiated"
-                        deviceCount = $deviceIdList.Count
-                        actionIds = $responses | ForEach-Object { $_.id }
+                    
+                    # Host names, IP addresses and AAD device ids resolve to machine ids
+                    # through the instance's device inventory, not one lookup per device
+                    $resolution = $null
+                    $refused = $false
+                    if (@($deviceIdList | Where-Object { $_ -notmatch '^[0-9a-fA-F]{40}$' }).Count -gt 0) {
+                        Import-XDRModule -Name DeviceInventory
+                        $resolution = Find-XDRInventoryDevice -TenantId $tenantId -Headers $mdeHeaders -Identifier $deviceIdList -CorrelationId $correlationId
+                        $ambiguous = @($resolution.Matches | Where-Object { $_.ambiguous })
+                        # These actions change devices: never act on a guess or on part of the list
+                        $refused = ($ambiguous.Count -gt 0 -or $resolution.Unresolved.Count -gt 0)
+                        $deviceIdList = @($resolution.Matches | ForEach-Object { $_.deviceId } | Select-Object -Unique)
                     }
-                }
-                "CollectInvestigationPackage" {
-                    if ($deviceIdList.Count -eq 0) { throw "Device IDs required" }
-                    $commentText = if ($comment) { $comment } else { "Investigation package via XDROrchestrator" }
-                    $responses = Invoke-CollectInvestigationPackage -Token $token -DeviceIds $deviceIdList -Comment $commentText
-                    $result.data = @{
-                        message = "Investigation package collection initiated"
-                        deviceCount = $deviceIdList.Count
-                        actionIds = $responses | ForEach-Object { $_.id }
+                    
+                    if ($refused) {
+                        $result.success = $false
+                        $result.data = @{
+                            message = "$action not run: $($ambiguous.Count) identifier(s) match several devices, $($resolution.Unresolved.Count) match none. Retry with machine ids."
+                            deviceCount = 0
+                            ambiguous = @($ambiguous | ForEach-Object { @{ identifier = $_.identifier; candidates = $_.candidates } })
+                            unresolved = $resolution.Unresolved
+                            resolution = @($resolution.Matches | ForEach-Object {
+                                @{ identifier = $_.identifier; deviceId = $_.deviceId; matchedBy = $_.matchedBy; ambiguous = $_.ambiguous; candidates = $_.candidates }
+                            })
+                        }
+                    } else {
+                        $deviceAction = $mdeDeviceActions[$action]
+                        $actionBody = @{ Comment = if ($comment) { $comment } else { $deviceAction.Comment } }
+                        if ($action -eq "IsolateDevice") {
+                            $actionBody.IsolationType = if ($isolationType) { $isolationType } else { "Full" }
+                        }
+                        $message = $deviceAction.Message
+                        if ($action -eq "RunAntivirusScan") {
+                            $scan = if ($scanType) { $scanType } else { "Quick" }
+                            $actionBody.ScanType = $scan
+                            if (-not $comment) { $actionBody.Comment = "$scan scan via XDROrchestrator" }
+                            $message = "$scan antivirus scan initiated"
+                        }
+                        
+                        # One MDE machine action per device, fanned out with bounded parallelism
+                        Import-XDRModule -Name BatchExecutor
+                        $batch = Invoke-XDRBatchOperation `
+                            -Entities $deviceIdList `
+                            -ActionName $action `
+                            -ThrottleLimit ($parallelism ?? 0) `
+                            -TimeoutSeconds (Get-XDRBatchTimeout -StartTime $startTime -Background:([bool]$TriggerMetadata.Background)) `
+                            -Context @{
+                                Uri = "https://api.securitycenter.microsoft.com/api/machines/{0}/$($deviceAction.Path)"
+                                Headers = $mdeHeaders
+                                Body = $actionBody | ConvertTo-Json
+                                CorrelationId = $correlationId
+                            } `
+                            -Operation {
+                                param($Entity, $Context)
+                                $response = Invoke-XDRRestMethod -Method Post -Uri ($Context.Uri -f $Entity) -Headers $Context.Headers -Body $Context.Body -CorrelationId $Context.CorrelationId -ErrorAction Stop
+                                @{ actionId = $response.id; status = $response.status }
+                            }
+                        
+                        $result.success = ($batch.failed -eq 0)
+                        $result.data = @{
+                            message = "$message ($($batch.succeeded)/$($batch.total) devices, $($batch.status))"
+                            deviceCount = $deviceIdList.Count
+                            actionIds = @($batch.results | Where-Object { $_.success } | ForEach-Object { $_.data.actionId })
+                            batch = $batch
+                        }
+                        if ($resolution) {
+                            $result.data.resolution = @($resolution.Matches | ForEach-Object {
+                                @{ identifier = $_.identifier; deviceId = $_.deviceId; matchedBy = $_.matchedBy }
+                            })
+                        }
                     }
                 }
                 "GetDeviceInfo" {
                     if (-not $machineId) { throw "Machine ID required" }
-                    $deviceInfo = Get-DeviceInfo -Token $token -DeviceId $machineId
-                    $result.data = @{ device = $deviceInfo }
+                    Import-XDRModule -Name DeviceInventory
+                    $lookup = Find-XDRInventoryDevice -TenantId $tenantId -Headers $mdeHeaders -Identifier $machineId -CorrelationId $correlationId
+                    if ($lookup.Matches.Count -eq 0) { throw "Device not found: $machineId" }
+                    $match = $lookup.Matches[0]
+                    # A machine id the inventory has not seen yet is read live
+                    $deviceInfo = if ($match.device) { $match.device } else {
+                        Invoke-XDRRestMethod -Uri "https://api.securitycenter.microsoft.com/api/machines/$($match.deviceId)" -Method Get -Headers $mdeHeaders -CorrelationId $correlationId -ErrorAction Stop
+                    }
+                    $result.data = @{ device = $deviceInfo; matchedBy = $match.matchedBy; ambiguous = $match.ambiguous }
                 }
                 "GetAllDevices" {
-                    $filterParam = if ($filter) { @{ Filter = $filter } } else { @{} }
-                    $devices = Get-AllDevices -Token $token @filterParam
+                    if ($filter) {
+                        # OData filters are evaluated by the API
+                        $devices = @(Get-XDRPagedItems -Uri "https://api.securitycenter.microsoft.com/api/machines?`$filter=$filter" -Headers $mdeHeaders -MaxItems 1000 -CorrelationId $correlationId)
+                    } else {
+                        Import-XDRModule -Name DeviceInventory
+                        $devices = (Get-XDRInventoryDevices -TenantId $tenantId -Headers $mdeHeaders -CorrelationId $correlationId).Devices
+                    }
                     $result.data = @{ count = $devices.Count; value = $devices | Select-Object -First 1000 }
                 }
                 "GetAllAlerts" {
@@ -429,7 +496,7 @@ try {
                         $uri = "https://graph.microsoft.com/v1.0/security/alerts_v2"
                         if ($filter) { $uri += "?`$filter=$filter" }
                         
-                        $response = Invoke-RestMethod -Uri $uri -Method Get -Headers $headers -ErrorAction Stop
+                        $response = Invoke-XDRRestMethod -Uri $uri -Method Get -Headers $headers -CorrelationId $correlationId -ErrorAction Stop
                         $result.data = @{ count = $response.value.Count; value = $response.value | Select-Object -First 100 }
                     } catch {
                         Write-Error "Failed to get alerts: $($_.Exception.Message)"
@@ -454,7 +521,7 @@ try {
                         $uri = "https://graph.microsoft.com/v1.0/security/incidents"
                         if ($filter) { $uri += "?`$filter=$filter" }
                         
-                        $response = Invoke-RestMethod -Uri $uri -Method Get -Headers $headers -ErrorAction Stop
+                        $response = Invoke-XDRRestMethod -Uri $uri -Method Get -Headers $headers -CorrelationId $correlationId -ErrorAction Stop
                         $result.data = @{ count = $response.value.Count; value = $response.value | Select-Object -First 100 }
                     } catch {
                         Write-Error "Failed to get incidents: $($_.Exception.Message)"
@@ -462,22 +529,34 @@ try {
                     }
                 }
                 "RunAdvancedQuery" {
-                    # Advanced hunting query
+                    # Advanced hunting query, through the result cache (HuntingCache.psm1)
                     $queryToExecute = if ($huntQuery) { $huntQuery } elseif ($query) { $query } else { throw "Query required" }
-                    $huntResults = Invoke-AdvancedHunting -Token $token -Query $queryToExecute
+                    Import-XDRModule -Name HuntingCache
+                    $hunt = Invoke-XDRCachedHuntingQuery -TenantId $tenantId -Query $queryToExecute `
+                        -Uri "https://api.securitycenter.microsoft.com/api/advancedqueries/run" `
+                        -Headers @{ Authorization = "Bearer $tokenString"; "Content-Type" = "application/json" } `
+                        -CacheMode ($Request.Body.cache ?? "Default") -CorrelationId $correlationId
+                    $huntResults = @($hunt.Data.Results)
                     $result.data = @{
                         resultCount = $huntResults.Count
                         query = $queryToExecute
                         Results = $huntResults | Select-Object -First 1000
+                        cache = $hunt.Cache
                     }
                 }
                 "AdvancedHunt*" {
                     $queryToExecute = if ($huntQuery) { $huntQuery } elseif ($query) { $query } else { throw "Query required" }
-                    $huntResults = Invoke-AdvancedHunting -Token $token -Query $queryToExecute
+                    Import-XDRModule -Name HuntingCache
+                    $hunt = Invoke-XDRCachedHuntingQuery -TenantId $tenantId -Query $queryToExecute `
+                        -Uri "https://api.securitycenter.microsoft.com/api/advancedqueries/run" `
+                        -Headers @{ Authorization = "Bearer $tokenString"; "Content-Type" = "application/json" } `
+                        -CacheMode ($Request.Body.cache ?? "Default") -CorrelationId $correlationId
+                    $huntResults = @($hunt.Data.Results)
                     $result.data = @{
                         resultCount = $huntResults.Count
                         query = $queryToExecute
                         results = $huntResults | Select-Object -First 1000
+                        cache = $hunt.Cache
                     }
                 }
                 "GetIncident*" {
@@ -738,9 +817,11 @@ try {
                             Authorization = "$($token.TokenType) $($token.AccessToken)"
                             "Content-Type" = "application/json"
                         }
-                        $uri = "https://graph.microsoft.com/v1.0/users/$userId"
-                        $user = Invoke-RestMethod -Uri $uri -Method Get -Headers $headers -ErrorAction Stop
-                        $result.data = $user
+                        # Repeated lookups of the same user are served from the instance's user cache
+                        Import-XDRModule -Name DeviceInventory
+                        $lookup = @(Get-XDRInventoryUser -TenantId $tenantId -Headers $headers -UserId $userId -CorrelationId $correlationId)[0]
+                        if (-not $lookup.user) { throw $lookup.error }
+                        $result.data = $lookup.user
                     } catch {
                         Write-Error "Failed to get user: $($_.Exception.Message)"
                         throw
@@ -913,7 +994,7 @@ try {
                             "Content-Type" = "application/json"
                         }
                         $uri = "https://management.azure.com/subscriptions/$subscriptionId/providers/Microsoft.Compute/virtualMachines?api-version=2023-03-01"
-                        $response = Invoke-RestMethod -Uri $uri -Method Get -Headers $headers -ErrorAction Stop
+                        $response = Invoke-XDRRestMethod -Uri $uri -Method Get -Headers $headers -CorrelationId $correlationId -ErrorAction Stop
                         $result.data = @{ count = $response.value.Count; value = $response.value }
                     } catch {
                         Write-Error "Failed to get VMs: $($_.Exception.Message)"
@@ -988,12 +1069,17 @@ try {
                 token = $tokenString
             }
             
-            # Call MCAS Worker
-            $workerUrl = "https://$functionAppUrl/api/DefenderXDRMCASWorker"
-            Write-Host "[$correlationId] Calling MCAS Worker: $workerUrl"
+            # Call MCAS Worker (in-process unless dispatchMode/XDR_DISPATCH_MODE is Http)
+            # Never reloaded: when the Gateway dispatches in-process this module is already running
+            if (-not (Get-Module -Name FunctionDispatcher)) {
+                Import-XDRModule -Name FunctionDispatcher
+            }
+            $dispatchMode = Get-XDRDispatchMode -FunctionName "DefenderXDRMCASWorker" -Mode $Request.Body.dispatchMode
+            Write-Host "[$correlationId] Calling MCAS Worker ($dispatchMode)"
             
             try {
-                $workerResponse = Invoke-RestMethod -Uri $workerUrl -Method Post -Body ($workerRequest | ConvertTo-Json -Depth 10) -ContentType "application/json" -ErrorAction Stop
+                $workerResponse = Invoke-XDRFunction -FunctionName "DefenderXDRMCASWorker" -Body $workerRequest -Mode $dispatchMode `
+                    -Background:([bool]$TriggerMetadata.Background) -CorrelationId $correlationId -ErrorAction Stop
                 
                 $result.data = $workerResponse
                 $result.action = $action
@@ -1020,6 +1106,8 @@ try {
     $result.durationMs = [Math]::Round($duration, 2)
     
     Write-Host "[$correlationId] Request completed successfully in $($result.durationMs)ms"
+    Write-XDRResponseLog -CorrelationId $correlationId -Service $service -Action $action -TenantId $tenantId `
+        -StatusCode 200 -DurationMs $result.durationMs -Success $true
     
     # Return success response
     Push-OutputBinding -Name Response -Value ([HttpResponseContext]@{
@@ -1034,6 +1122,8 @@ try {
     
     Write-Error "[$correlationId] Error processing request: $($_.Exception.Message)"
     Write-Error $_.ScriptStackTrace
+    Write-XDRResponseLog -CorrelationId $correlationId -Service $service -Action $action -TenantId $tenantId `
+        -StatusCode 500 -DurationMs ([Math]::Round($duration, 2)) -Success $false -ErrorMessage $_.Exception.Message
     
     # Return error response with structured format
     Push-OutputBinding -Name Response -Value ([HttpResponseContext]@{
@@ -21,29 +21,45 @@
 
 # You can also define functions or aliases that can be referenced in any of your PowerShell functions.
 
-# Import core modules (v3.3.0 - simplified structure)
+# Shared modules are imported on first use, once per runspace (ModuleLoader.psm1):
+# each function imports its core modules and each action the heavy ones it needs,
+# so a cold start only pays for what the first request uses.
+# XDR_MODULE_LOAD_MODE=Force restores the re-import on every invocation.
 $modulesPath = Join-Path $PSScriptRoot "modules"
+Import-Module (Join-Path $modulesPath "ModuleLoader.psm1") -ErrorAction SilentlyContinue
 
-# Import AuthManager (centralized authentication with caching)
-$AuthManagerPath = Join-Path $modulesPath "AuthManager.psm1"
-if (Test-Path $AuthManagerPath) {
-    Import-Module $AuthManagerPath -Force -ErrorAction SilentlyContinue
-    Write-Host "✅ AuthManager loaded"
+# Offline mode: route Microsoft API calls to a local stand-in (scripts/mock_xdr_api.py)
+# Set XDR_MOCK_API_BASE (e.g. http://127.0.0.1:8765) in local.settings.json to enable.
+# Function-to-function calls against a local host (func start) are sent over plain HTTP.
+if ($env:XDR_MOCK_API_BASE) {
+    $global:XDRMockApiBase = $env:XDR_MOCK_API_BASE.TrimEnd('/')
+    $global:XDRMockApiPattern = '^https://(graph\.microsoft\.com|api\.securitycenter\.microsoft\.com|api\.security\.microsoft\.com|login\.microsoftonline\.com|management\.azure\.com)(?=/|$)'
+    
+    function global:Invoke-RestMethod {
+        # Shadows the cmdlet for every function and module; only -Uri is rewritten
+        [CmdletBinding()]
+        param(
+            [Parameter(Mandatory = $true, Position = 0)]
+            [string]$Uri,
+            [string]$Method,
+            $Headers,
+            $Body,
+            [string]$ContentType,
+            [int]$TimeoutSec,
+            [string]$InFile,
+            [string]$OutFile
+        )
+        
+        if ($Uri -match $global:XDRMockApiPattern) {
+            $PSBoundParameters['Uri'] = $Uri -replace $global:XDRMockApiPattern, $global:XDRMockApiBase
+        } elseif ($Uri -match '^https://(localhost|127\.0\.0\.1)(:\d+)?/') {
+            $PSBoundParameters['Uri'] = $Uri -replace '^https://', 'http://'
+        }
+        Microsoft.PowerShell.Utility\Invoke-RestMethod @PSBoundParameters
+    }
+    
+    Write-Host "🧪 Offline mode - Microsoft API calls routed to $global:XDRMockApiBase"
 }
 
-# Import ValidationHelper (input validation & sanitization)
-$ValidationHelperPath = Join-Path $modulesPath "ValidationHelper.psm1"
-if (Test-Path $ValidationHelperPath) {
-    Import-Module $ValidationHelperPath -Force -ErrorAction SilentlyContinue
-    Write-Host "✅ ValidationHelper loaded"
-}
-
-# Import LoggingHelper (structured logging & telemetry)
-$LoggingHelperPath = Join-Path $modulesPath "LoggingHelper.psm1"
-if (Test-Path $LoggingHelperPath) {
-    Import-Module $LoggingHelperPath -Force -ErrorAction SilentlyContinue
-    Write-Host "✅ LoggingHelper loaded"
-}
-
-Write-Host "🚀 DefenderXDR v3.4.0 - 3 core modules loaded | 219 actions ready"
+Write-Host "🚀 DefenderXDR v3.4.0 - modules load on demand ($(if ($env:XDR_MODULE_LOAD_MODE -eq "Force") { "Force" } else { "Once" })) | 219 actions ready"
 Write-Host "   BatchHelper merged into Orchestrator | ActionTracker → App Insights"
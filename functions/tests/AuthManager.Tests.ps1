@@ -0,0 +1,82 @@
+# Pester 5: Invoke-Pester -Path functions/tests
+
+BeforeAll {
+    Import-Module (Join-Path $PSScriptRoot "../modules/AuthManager.psm1") -Force
+}
+
+Describe "Token cache with the file store" {
+    BeforeEach {
+        $storePath = Join-Path $TestDrive ([guid]::NewGuid().ToString("N"))
+        Set-TokenCacheStore -Provider File -Path $storePath
+        $global:DefenderXDRTokenCache = @{}
+        $tenantId = [guid]::NewGuid().ToString()
+        $appId = [guid]::NewGuid().ToString()
+        $secret = "test-secret-$([guid]::NewGuid())"
+
+        # A token another instance cached, well clear of the refresh-ahead window
+        InModuleScope AuthManager -Parameters @{ TenantId = $tenantId; AppId = $appId; Secret = $secret } {
+            param($TenantId, $AppId, $Secret)
+            $cacheKey = Get-TokenCacheKey -TenantId $TenantId -Service "Graph" -AppId $AppId
+            Save-TokenCacheEntry -CacheKey $cacheKey -CipherKey (Get-TokenCacheCipherKey -ClientSecretPlain $Secret) -TokenInfo @{
+                AccessToken = "stored-token"
+                TokenType = "Bearer"
+                ExpiresAt = (Get-Date).AddMinutes(60)
+                TenantId = $TenantId
+                Service = "Graph"
+            }
+        }
+        $global:DefenderXDRTokenCache = @{}
+    }
+
+    AfterAll {
+        Set-TokenCacheStore -Provider None
+    }
+
+    It "answers from the store without a token request" {
+        $before = (Get-TokenCacheStats).Counters
+        Get-OAuthToken -TenantId $tenantId -AppId $appId -ClientSecret $secret -Service "Graph" | Should -Be "stored-token"
+        $after = (Get-TokenCacheStats).Counters
+        $after.StoreHits | Should -Be ($before.StoreHits + 1)
+        $after.TokenRequests | Should -Be $before.TokenRequests
+    }
+
+    It "writes one encrypted entry that names neither tenant nor app" {
+        $files = @(Get-ChildItem -Path $storePath -Filter "*.token")
+        $files.Count | Should -Be 1
+        $files[0].Name | Should -Not -Match $tenantId
+        $files[0].Name | Should -Not -Match $appId
+        $content = Get-Content -Raw -Path $files[0].FullName
+        $content | Should -BeLike "v1.*"
+        $content | Should -Not -Match "stored-token"
+    }
+
+    It "leaves no temp files behind" {
+        @(Get-ChildItem -Path $storePath -Filter "*.tmp").Count | Should -Be 0
+    }
+
+    It "ignores entries written with another key" {
+        InModuleScope AuthManager -Parameters @{ TenantId = $tenantId; AppId = $appId } {
+            param($TenantId, $AppId)
+            $cacheKey = Get-TokenCacheKey -TenantId $TenantId -Service "Graph" -AppId $AppId
+            Read-SharedTokenCacheEntry -CacheKey $cacheKey -CipherKey (Get-TokenCacheCipherKey -ClientSecretPlain "another-secret") |
+                Should -BeNullOrEmpty
+        }
+    }
+
+    It "holds the store lock exclusively" {
+        InModuleScope AuthManager {
+            $first = & $script:TokenStore.Lock $script:TokenStore "entry"
+            $first | Should -Not -BeNullOrEmpty
+            & $script:TokenStore.Lock $script:TokenStore "entry" | Should -BeNullOrEmpty
+            & $script:TokenStore.Unlock $script:TokenStore $first
+            $again = & $script:TokenStore.Lock $script:TokenStore "entry"
+            $again | Should -Not -BeNullOrEmpty
+            & $script:TokenStore.Unlock $script:TokenStore $again
+        }
+    }
+
+    It "removes store entries on Clear-TokenCache" {
+        Clear-TokenCache
+        @(Get-ChildItem -Path $storePath -Filter "*.token").Count | Should -Be 0
+    }
+}
@@ -0,0 +1,50 @@
+# Pester 5: Invoke-Pester -Path functions/tests
+
+BeforeAll {
+    Import-Module (Join-Path $PSScriptRoot "../modules/BlobManager.psm1") -Force
+    $tenantId = [guid]::NewGuid().ToString()
+}
+
+Describe "Live Response file library" {
+    BeforeEach {
+        $blobs = @{}
+        Mock -ModuleName BlobManager Get-XDRStoreContainer {
+            $container = [pscustomobject]@{}
+            $container | Add-Member -MemberType ScriptMethod -Name GetBlobClient -Value {
+                param($name)
+                $blobs[$name] = $true
+                [pscustomobject]@{ Name = $name; CanGenerateSasUri = $false }
+            }.GetNewClosure()
+            $container
+        }
+        $env:AzureWebJobsStorage = "UseDevelopmentStorage=true"
+    }
+
+    AfterAll {
+        Remove-Item Env:AzureWebJobsStorage -ErrorAction SilentlyContinue
+    }
+
+    It "keeps files under the tenant and category" {
+        New-XDRBlobSasUrl -TenantId $tenantId -FileName "collect.ps1" -Category "scripts" -WarningAction SilentlyContinue | Out-Null
+        $blobs.Keys | Should -Be "$tenantId/scripts/collect.ps1"
+    }
+
+    It "refuses file names that leave the tenant's prefix" {
+        foreach ($name in @("../other/collect.ps1", "..", "a\b.ps1")) {
+            $info = Get-XDRBlobFileInfo -TenantId $tenantId -FileName $name -Category "scripts"
+            $info.Success | Should -BeFalse
+            $info.Error | Should -Match "Invalid file name"
+        }
+        $blobs.Count | Should -Be 0
+    }
+
+    It "refuses a tenant id that is not a GUID" {
+        (Get-XDRBlobFileInfo -TenantId "../$tenantId" -FileName "collect.ps1" -Category "scripts").Error | Should -Be "Invalid tenantId"
+    }
+
+    It "reports a SAS URL it cannot sign instead of throwing" {
+        $sas = New-XDRBlobSasUrl -TenantId $tenantId -FileName "collect.ps1" -Category "scripts" -WarningAction SilentlyContinue
+        $sas.Success | Should -BeFalse
+        $sas.Error | Should -Match "account key"
+    }
+}
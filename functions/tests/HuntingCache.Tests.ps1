@@ -0,0 +1,95 @@
+# Pester 5: Invoke-Pester -Path functions/tests
+
+BeforeAll {
+    Import-Module (Join-Path $PSScriptRoot "../modules/HttpPipeline.psm1") -Force -Global
+    Import-Module (Join-Path $PSScriptRoot "../modules/HuntingCache.psm1") -Force
+
+    $uri = "https://api.securitycenter.microsoft.com/api/advancedqueries/run"
+    $headers = @{ Authorization = "Bearer test" }
+}
+
+Describe "Hunting cache with the file store" {
+    BeforeEach {
+        $env:XDR_HUNTING_CACHE_PATH = Join-Path $TestDrive ([guid]::NewGuid().ToString("N"))
+        $tenantId = [guid]::NewGuid().ToString()
+        Mock -ModuleName HuntingCache Invoke-XDRRestMethod {
+            @{ Schema = @(@{ Name = "DeviceName" }); Results = @(@{ DeviceName = "host-1" }, @{ DeviceName = "host-2" }) }
+        }
+    }
+
+    AfterAll {
+        Remove-Item Env:XDR_HUNTING_CACHE_PATH -ErrorAction SilentlyContinue
+    }
+
+    It "answers a repeated query from the cache" {
+        $query = "DeviceProcessEvents | where Timestamp > ago(1d) | take 10"
+        $first = Invoke-XDRCachedHuntingQuery -TenantId $tenantId -Query $query -Uri $uri -Headers $headers
+        $second = Invoke-XDRCachedHuntingQuery -TenantId $tenantId -Query $query -Uri $uri -Headers $headers
+
+        $first.Cache.status | Should -Be "Miss"
+        $second.Cache.status | Should -Be "Hit"
+        $second.Cache.queryClass | Should -Be "Day"
+        @($second.Data.Results).Count | Should -Be 2
+        Should -Invoke -ModuleName HuntingCache Invoke-XDRRestMethod -Times 1 -Exactly
+    }
+
+    It "shares an entry between queries that differ only in comments and whitespace" {
+        Invoke-XDRCachedHuntingQuery -TenantId $tenantId -Uri $uri -Headers $headers `
+            -Query "DeviceEvents | where Timestamp > ago(1h)" | Out-Null
+        $again = Invoke-XDRCachedHuntingQuery -TenantId $tenantId -Uri $uri -Headers $headers `
+            -Query "DeviceEvents   // recent only`n| where Timestamp > ago(1h)"
+        $again.Cache.status | Should -Be "Hit"
+    }
+
+    It "keeps tenants apart" {
+        $query = "DeviceEvents | take 1"
+        Invoke-XDRCachedHuntingQuery -TenantId $tenantId -Query $query -Uri $uri -Headers $headers | Out-Null
+        $other = Invoke-XDRCachedHuntingQuery -TenantId ([guid]::NewGuid().ToString()) -Query $query -Uri $uri -Headers $headers
+        $other.Cache.status | Should -Be "Miss"
+    }
+
+    It "does not store a bypassed result" {
+        $query = "DeviceEvents | take 2"
+        Invoke-XDRCachedHuntingQuery -TenantId $tenantId -Query $query -Uri $uri -Headers $headers -CacheMode Bypass | Out-Null
+        (Invoke-XDRCachedHuntingQuery -TenantId $tenantId -Query $query -Uri $uri -Headers $headers).Cache.status | Should -Be "Miss"
+    }
+
+    It "deletes a result past its TTL and stale window when read" {
+        $query = "DeviceEvents | where Timestamp > ago(30m)"
+        $first = Invoke-XDRCachedHuntingQuery -TenantId $tenantId -Query $query -Uri $uri -Headers $headers
+        $path = Join-Path $env:XDR_HUNTING_CACHE_PATH "$tenantId/results/$($first.Cache.fingerprint).json"
+        $entry = Get-Content -Raw -Path $path | ConvertFrom-Json -AsHashtable
+        $entry.storedAtUnix = [DateTimeOffset]::UtcNow.AddHours(-3).ToUnixTimeSeconds()
+        Set-Content -Path $path -Value ($entry | ConvertTo-Json -Depth 20 -Compress)
+
+        $before = (Get-XDRHuntingCacheStats).ExpiredRemoved
+        (Invoke-XDRCachedHuntingQuery -TenantId $tenantId -Query $query -Uri $uri -Headers $headers).Cache.status | Should -Be "Miss"
+        (Get-XDRHuntingCacheStats).ExpiredRemoved | Should -Be ($before + 1)
+    }
+
+    It "records every run in the history, newest first" {
+        Invoke-XDRCachedHuntingQuery -TenantId $tenantId -Query "DeviceEvents | take 3" -Uri $uri -Headers $headers | Out-Null
+        Start-Sleep -Milliseconds 20
+        Invoke-XDRCachedHuntingQuery -TenantId $tenantId -Query "DeviceEvents | take 4" -Uri $uri -Headers $headers | Out-Null
+
+        $history = Get-XDRHuntingHistory -TenantId $tenantId
+        $history.Count | Should -Be 2
+        $history[0].query | Should -Be "DeviceEvents | take 4"
+        $history[0].rowCount | Should -Be 2
+    }
+
+    It "saves queries by name, replacing one saved under the same name" {
+        Save-XDRHuntingQuery -TenantId $tenantId -Name "Beta" -Query "DeviceEvents | take 1" | Out-Null
+        Save-XDRHuntingQuery -TenantId $tenantId -Name "Alpha" -Query "DeviceEvents | take 2" | Out-Null
+        Save-XDRHuntingQuery -TenantId $tenantId -Name "beta" -Query "DeviceEvents | take 5" -Description "updated" | Out-Null
+
+        $saved = Get-XDRSavedHuntingQueries -TenantId $tenantId
+        $saved.Count | Should -Be 2
+        $saved[0].queryName | Should -Be "Alpha"
+        $saved[1].query | Should -Be "DeviceEvents | take 5"
+    }
+
+    It "refuses a tenant that is not a GUID" {
+        { Get-XDRHuntingHistory -TenantId "../other" } | Should -Throw "Invalid tenantId"
+    }
+}
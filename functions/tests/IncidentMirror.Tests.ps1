@@ -0,0 +1,129 @@
+# Pester 5: Invoke-Pester -Path functions/tests
+
+BeforeAll {
+    Import-Module (Join-Path $PSScriptRoot "../modules/HttpPipeline.psm1") -Force -Global
+    Import-Module (Join-Path $PSScriptRoot "../modules/IncidentMirror.psm1") -Force
+
+    $headers = @{ Authorization = "Bearer test" }
+
+    function Get-TestTime {
+        param([double]$HoursAgo)
+        [DateTime]::UtcNow.AddHours(-$HoursAgo).ToString("o")
+    }
+}
+
+Describe "Incident mirror with the file store" {
+    BeforeEach {
+        $env:XDR_MIRROR_PATH = Join-Path $TestDrive ([guid]::NewGuid().ToString("N"))
+        $tenantId = [guid]::NewGuid().ToString()
+        $graphIncidents = @(
+            @{ id = "10"; status = "active"; severity = "high"; createdDateTime = (Get-TestTime 1); lastUpdateDateTime = (Get-TestTime 1) }
+            @{ id = "11"; status = "resolved"; severity = "low"; createdDateTime = (Get-TestTime 5); lastUpdateDateTime = (Get-TestTime 2) }
+            @{ id = "12"; status = "active"; severity = "medium"; createdDateTime = (Get-TestTime 3); lastUpdateDateTime = (Get-TestTime 3) }
+        )
+        $graphAlerts = @(
+            @{ id = "a1"; incidentId = "10"; status = "new"; severity = "high"; createdDateTime = (Get-TestTime 1); evidence = @(@{ type = "device" }) }
+            @{ id = "a2"; incidentId = "10"; status = "new"; severity = "low"; createdDateTime = (Get-TestTime 2); evidence = @() }
+            @{ id = "a3"; incidentId = "12"; status = "resolved"; severity = "medium"; createdDateTime = (Get-TestTime 3); evidence = @() }
+        )
+        Mock -ModuleName IncidentMirror Get-XDRPagedItems {
+            $items = if ($Uri -match 'alerts_v2') { $graphAlerts } else { $graphIncidents }
+            $PagingState.complete = $true
+            $PagingState.items = @($items).Count
+            $PagingState.pages = 1
+            $items
+        }
+        InModuleScope IncidentMirror { $script:Mirrors.Clear(); $script:MirrorRegistrations.Clear() }
+    }
+
+    AfterAll {
+        Remove-Item Env:XDR_MIRROR_PATH -ErrorAction SilentlyContinue
+    }
+
+    It "does not answer before a full pass" {
+        Find-XDRMirroredItems -TenantId $tenantId -Kind Incidents | Should -BeNullOrEmpty
+    }
+
+    It "lists mirrored incidents newest first, filtered" {
+        $sync = Sync-XDRIncidentMirror -TenantId $tenantId -Headers $headers
+        $sync.Incidents.mode | Should -Be "Full"
+        $sync.Alerts.items | Should -Be 3
+
+        $all = Find-XDRMirroredItems -TenantId $tenantId -Kind Incidents
+        @($all.Items | ForEach-Object { $_.id }) | Should -Be @("10", "12", "11")
+        $all.Complete | Should -BeTrue
+
+        $active = Find-XDRMirroredItems -TenantId $tenantId -Kind Incidents -Status active -Top 1
+        @($active.Items).Count | Should -Be 1
+        $active.Items[0].id | Should -Be "10"
+        $active.Complete | Should -BeFalse
+    }
+
+    It "lists an incident's alerts without their evidence" {
+        Sync-XDRIncidentMirror -TenantId $tenantId -Headers $headers | Out-Null
+        $alerts = Find-XDRMirroredItems -TenantId $tenantId -Kind Alerts -IncidentId "10"
+        @($alerts.Items | ForEach-Object { $_.id }) | Should -Be @("a1", "a2")
+        $alerts.Items[0].Contains("evidence") | Should -BeFalse
+    }
+
+    It "refuses a window older than the retention period" {
+        Sync-XDRIncidentMirror -TenantId $tenantId -Headers $headers | Out-Null
+        Find-XDRMirroredItems -TenantId $tenantId -Kind Incidents -Since ([DateTime]::UtcNow.AddDays(-90)) | Should -BeNullOrEmpty
+    }
+
+    It "serves another instance from the stored documents" {
+        Sync-XDRIncidentMirror -TenantId $tenantId -Headers $headers | Out-Null
+        Test-Path (Join-Path $env:XDR_MIRROR_PATH "$tenantId/incidents.json") | Should -BeTrue
+        # A fresh instance has no mirror in memory
+        InModuleScope IncidentMirror { $script:Mirrors.Clear() }
+
+        (Get-XDRMirroredItem -TenantId $tenantId -Kind Incidents -Id "11").Item.severity | Should -Be "low"
+    }
+
+    It "keeps serving the held copy while a newer one loads in the background" {
+        Sync-XDRIncidentMirror -TenantId $tenantId -Headers $headers | Out-Null
+        # Another instance's pass adds an incident to the stored document
+        $path = Join-Path $env:XDR_MIRROR_PATH "$tenantId/incidents.json"
+        $document = Get-Content -Raw -Path $path | ConvertFrom-Json -AsHashtable
+        $document.items += @{ id = "13"; status = "active"; severity = "low"; createdDateTime = (Get-TestTime 0.5) }
+        Set-Content -Path $path -Value ($document | ConvertTo-Json -Depth 12 -Compress)
+        [System.IO.File]::SetLastWriteTimeUtc($path, [DateTime]::UtcNow.AddMinutes(1))
+        InModuleScope IncidentMirror -Parameters @{ Key = "$tenantId/Incidents" } {
+            param($Key)
+            $script:Mirrors[$Key].CheckedAt = [datetime]::MinValue
+        }
+
+        Get-XDRMirroredItem -TenantId $tenantId -Kind Incidents -Id "13" | Should -BeNullOrEmpty
+        InModuleScope IncidentMirror -Parameters @{ Key = "$tenantId/Incidents" } {
+            param($Key)
+            $reload = $script:Mirrors[$Key].Reload
+            $reload | Should -Not -BeNullOrEmpty
+            $reload.Handle.AsyncWaitHandle.WaitOne(30000) | Should -BeTrue
+        }
+        (Get-XDRMirroredItem -TenantId $tenantId -Kind Incidents -Id "13").Item.severity | Should -Be "low"
+    }
+
+    It "merges worker writes into the local copy" {
+        Sync-XDRIncidentMirror -TenantId $tenantId -Headers $headers | Out-Null
+        Update-XDRMirroredItem -TenantId $tenantId -Kind Incidents -Id "10" -Fields @{ status = "resolved" }
+        (Get-XDRMirroredItem -TenantId $tenantId -Kind Incidents -Id "10").Item.status | Should -Be "resolved"
+    }
+
+    It "removes items a full pass no longer returns" {
+        Sync-XDRIncidentMirror -TenantId $tenantId -Headers $headers | Out-Null
+        $graphIncidents = @($graphIncidents | Where-Object { $_.id -ne "11" })
+        $sync = Sync-XDRIncidentMirror -TenantId $tenantId -Headers $headers -Kind Incidents -Full
+        $sync.Incidents.removed | Should -Be 1
+        Get-XDRMirroredItem -TenantId $tenantId -Kind Incidents -Id "11" | Should -BeNullOrEmpty
+    }
+
+    It "mirrors tenants that were read recently" {
+        Register-XDRMirrorTenant -TenantId $tenantId
+        Get-XDRMirrorTenants | Should -Contain $tenantId
+    }
+
+    It "ignores tenants given by domain name" {
+        Find-XDRMirroredItems -TenantId "contoso.onmicrosoft.com" -Kind Incidents | Should -BeNullOrEmpty
+        { Register-XDRMirrorTenant -TenantId "contoso.onmicrosoft.com" } | Should -Not -Throw
+    }
+}
@@ -0,0 +1,107 @@
+# Pester 5: Invoke-Pester -Path functions/tests
+
+BeforeAll {
+    Import-Module (Join-Path $PSScriptRoot "../modules/HttpPipeline.psm1") -Force -Global
+    Import-Module (Join-Path $PSScriptRoot "../modules/IncidentStatistics.psm1") -Force
+
+    $headers = @{ Authorization = "Bearer test" }
+
+    function New-TestIncident {
+        param([string]$Id, [string]$Status = "active", [string]$Severity = "high", [string[]]$Sources = @("microsoftDefenderForEndpoint"))
+        @{
+            id = $Id
+            status = $Status
+            severity = $Severity
+            classification = "unknown"
+            alerts = @($Sources | ForEach-Object { @{ serviceSource = $_ } })
+        }
+    }
+}
+
+Describe "Incident statistics with the file store" {
+    BeforeEach {
+        $env:XDR_INCIDENT_STATS_PATH = Join-Path $TestDrive ([guid]::NewGuid().ToString("N"))
+        $tenantId = [guid]::NewGuid().ToString()
+        $graphIncidents = @(
+            (New-TestIncident -Id "1" -Status "active" -Severity "high")
+            (New-TestIncident -Id "2" -Status "resolved" -Severity "low" -Sources "microsoftDefenderForEndpoint", "microsoftDefenderForOffice365")
+        )
+        Mock -ModuleName IncidentStatistics Get-XDRPagedItems {
+            $PagingState.complete = $true
+            $PagingState.items = @($graphIncidents).Count
+            $PagingState.pages = 1
+            $graphIncidents
+        }
+    }
+
+    AfterEach {
+        Clear-XDRIncidentStatistics -TenantId $tenantId
+    }
+
+    AfterAll {
+        Remove-Item Env:XDR_INCIDENT_STATS_PATH -ErrorAction SilentlyContinue
+    }
+
+    It "counts every incident on the first (full) pass and persists the state" {
+        $stats = Get-XDRIncidentStatistics -TenantId $tenantId -Headers $headers
+        $stats.pass.mode | Should -Be "Full"
+        $stats.total | Should -Be 2
+        ($stats.byStatus | Where-Object Name -eq "active").Count | Should -Be 1
+        ($stats.byService | Where-Object Name -eq "microsoftDefenderForEndpoint").Count | Should -Be 2
+        Test-Path (Join-Path $env:XDR_INCIDENT_STATS_PATH "incident-statistics/$tenantId.json") | Should -BeTrue
+    }
+
+    It "returns the summary without calling Graph while it is fresh" {
+        Get-XDRIncidentStatistics -TenantId $tenantId -Headers $headers | Out-Null
+        (Get-XDRIncidentStatistics -TenantId $tenantId -Headers $headers).pass.mode | Should -Be "Cached"
+        Should -Invoke -ModuleName IncidentStatistics Get-XDRPagedItems -Times 1 -Exactly
+    }
+
+    It "applies changed incidents on a delta pass" {
+        Get-XDRIncidentStatistics -TenantId $tenantId -Headers $headers | Out-Null
+        $graphIncidents = @(New-TestIncident -Id "1" -Status "resolved" -Severity "high")
+
+        $stats = Get-XDRIncidentStatistics -TenantId $tenantId -Headers $headers -Refresh Delta
+        $stats.pass.mode | Should -Be "Delta"
+        $stats.total | Should -Be 2
+        ($stats.byStatus | Where-Object Name -eq "resolved").Count | Should -Be 2
+        $stats.byStatus | Where-Object Name -eq "active" | Should -BeNullOrEmpty
+        Should -Invoke -ModuleName IncidentStatistics Get-XDRPagedItems -ParameterFilter { $Uri -match 'filter=' } -Times 1 -Exactly
+    }
+
+    It "does not rewrite the stored state after a delta pass that changed nothing" {
+        Get-XDRIncidentStatistics -TenantId $tenantId -Headers $headers | Out-Null
+        $path = Join-Path $env:XDR_INCIDENT_STATS_PATH "incident-statistics/$tenantId.json"
+        $written = [System.IO.File]::GetLastWriteTimeUtc($path)
+        # Re-read but unchanged
+        $graphIncidents = @($graphIncidents[0])
+
+        $stats = Get-XDRIncidentStatistics -TenantId $tenantId -Headers $headers -Refresh Delta
+        $stats.pass.changed | Should -Be 0
+        $stats.pass.persisted | Should -BeFalse
+        [System.IO.File]::GetLastWriteTimeUtc($path) | Should -Be $written
+
+        $graphIncidents = @(New-TestIncident -Id "3" -Status "active" -Severity "low")
+        (Get-XDRIncidentStatistics -TenantId $tenantId -Headers $headers -Refresh Delta).pass.persisted | Should -BeTrue
+    }
+
+    It "drops incidents a full pass no longer returns" {
+        Get-XDRIncidentStatistics -TenantId $tenantId -Headers $headers | Out-Null
+        $graphIncidents = @(New-TestIncident -Id "2" -Status "resolved" -Severity "low")
+
+        $stats = Get-XDRIncidentStatistics -TenantId $tenantId -Headers $headers -Refresh Full
+        $stats.total | Should -Be 1
+        $stats.bySeverity | Where-Object Name -eq "high" | Should -BeNullOrEmpty
+    }
+
+    It "continues from the stored watermark in a new instance" {
+        Get-XDRIncidentStatistics -TenantId $tenantId -Headers $headers | Out-Null
+        # A fresh instance has no state in memory
+        InModuleScope IncidentStatistics { $script:IncidentStatsStates.Clear() }
+        $graphIncidents = @()
+
+        $stats = Get-XDRIncidentStatistics -TenantId $tenantId -Headers $headers
+        $stats.pass.mode | Should -Be "Delta"
+        $stats.total | Should -Be 2
+    }
+}
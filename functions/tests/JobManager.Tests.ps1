@@ -0,0 +1,72 @@
+# Pester 5: Invoke-Pester -Path functions/tests
+
+BeforeAll {
+    Import-Module (Join-Path $PSScriptRoot "../modules/JobManager.psm1") -Force
+}
+
+Describe "Job records with the file store" {
+    BeforeEach {
+        $env:XDR_JOB_STORE_PATH = Join-Path $TestDrive ([guid]::NewGuid().ToString("N"))
+        $tenantId = [guid]::NewGuid().ToString()
+        $payload = @{ service = "MDE"; action = "RunLiveResponseScript"; parameters = @{ deviceId = "abc" } }
+    }
+
+    AfterAll {
+        Remove-Item Env:XDR_JOB_STORE_PATH -ErrorAction SilentlyContinue
+    }
+
+    It "creates a queued job and its queue message" {
+        $job = New-XDRJob -TenantId $tenantId -Payload $payload -CorrelationId "corr-1"
+        $job.Record.status | Should -Be "Queued"
+        $message = $job.QueueMessage | ConvertFrom-Json
+        $message.jobId | Should -Be $job.JobId
+        $message.payload.action | Should -Be "RunLiveResponseScript"
+        Test-Path (Join-Path $env:XDR_JOB_STORE_PATH "$tenantId/$($job.JobId).json") | Should -BeTrue
+    }
+
+    It "records a job through to completion" {
+        $job = New-XDRJob -TenantId $tenantId -Payload $payload
+        Set-XDRJobStatus -TenantId $tenantId -JobId $job.JobId -Status Running -Progress "Running" | Out-Null
+        Set-XDRJobStatus -TenantId $tenantId -JobId $job.JobId -Status Succeeded -Result @{ rows = 3 } | Out-Null
+
+        $stored = Get-XDRJob -TenantId $tenantId -JobId $job.JobId
+        $stored.status | Should -Be "Succeeded"
+        $stored.attempts | Should -Be 1
+        $stored.result.rows | Should -Be 3
+        $stored.durationMs | Should -Not -BeNullOrEmpty
+    }
+
+    It "does not return another tenant's job" {
+        $job = New-XDRJob -TenantId $tenantId -Payload $payload
+        Get-XDRJob -TenantId ([guid]::NewGuid().ToString()) -JobId $job.JobId | Should -BeNullOrEmpty
+    }
+
+    It "refuses IDs that are not GUIDs" {
+        { Get-XDRJob -TenantId "../other" -JobId ([guid]::NewGuid().ToString()) } | Should -Throw "Invalid tenantId"
+        { Get-XDRJob -TenantId $tenantId -JobId "..\..\x" } | Should -Throw "Invalid jobId"
+    }
+
+    It "lists a tenant's jobs newest first without results" {
+        $first = New-XDRJob -TenantId $tenantId -Payload $payload
+        Start-Sleep -Milliseconds 20
+        $second = New-XDRJob -TenantId $tenantId -Payload $payload
+        Set-XDRJobStatus -TenantId $tenantId -JobId $second.JobId -Status Succeeded -Result @{ rows = 1 } | Out-Null
+
+        $jobs = Get-XDRJobList -TenantId $tenantId
+        $jobs.Count | Should -Be 2
+        $jobs[0].jobId | Should -Be $second.JobId
+        $jobs[1].jobId | Should -Be $first.JobId
+        $jobs[0].Contains("result") | Should -BeFalse
+    }
+
+    It "removes records past the retention period" {
+        $old = New-XDRJob -TenantId $tenantId -Payload $payload
+        $recent = New-XDRJob -TenantId $tenantId -Payload $payload
+        $oldPath = Join-Path $env:XDR_JOB_STORE_PATH "$tenantId/$($old.JobId).json"
+        [System.IO.File]::SetLastWriteTimeUtc($oldPath, [DateTime]::UtcNow.AddDays(-3))
+
+        Remove-XDRExpiredJobs -TenantId $tenantId | Should -Be 1
+        Test-Path $oldPath | Should -BeFalse
+        Get-XDRJob -TenantId $tenantId -JobId $recent.JobId | Should -Not -BeNullOrEmpty
+    }
+}
@@ -0,0 +1,53 @@
+# Pester 5: Invoke-Pester -Path functions/tests
+
+BeforeAll {
+    Import-Module (Join-Path $PSScriptRoot "../modules/ValidationHelper.psm1") -Force
+}
+
+Describe "Rate limiter with the file store" {
+    BeforeEach {
+        $storePath = Join-Path $TestDrive ([guid]::NewGuid().ToString("N"))
+        Set-RateLimitStore -Path $storePath
+        $tenantId = [guid]::NewGuid().ToString()
+    }
+
+    AfterAll {
+        Set-RateLimitStore
+    }
+
+    It "allows up to the capacity, then refuses" {
+        1..3 | ForEach-Object {
+            Test-RateLimit -TenantId $tenantId -Service "MDE" -MaxRequestsPerMinute 3 | Should -BeTrue
+        }
+        Test-RateLimit -TenantId $tenantId -Service "MDE" -MaxRequestsPerMinute 3 -WarningAction SilentlyContinue | Should -BeFalse
+    }
+
+    It "keeps one bucket file per tenant and service" {
+        Test-RateLimit -TenantId $tenantId -Service "MDE" | Should -BeTrue
+        Test-RateLimit -TenantId $tenantId -Service "Graph" | Should -BeTrue
+        @(Get-ChildItem -Path $storePath -Filter "*.json").Count | Should -Be 2
+    }
+
+    It "shares the bucket with another instance using the same directory" {
+        1..2 | ForEach-Object {
+            Test-RateLimit -TenantId $tenantId -Service "MDE" -MaxRequestsPerMinute 2 | Should -BeTrue
+        }
+        # Reconfiguring drops the in-memory state, as a fresh instance would start
+        Set-RateLimitStore -Path $storePath
+        Test-RateLimit -TenantId $tenantId -Service "MDE" -MaxRequestsPerMinute 2 -WarningAction SilentlyContinue | Should -BeFalse
+    }
+
+    It "reports headroom without consuming it" {
+        Test-RateLimit -TenantId $tenantId -Service "MDE" -MaxRequestsPerMinute 10 | Should -BeTrue
+        $headroom = Get-RateLimitHeadroom -TenantId $tenantId -Service "MDE" -MaxRequestsPerMinute 10
+        $headroom.Remaining | Should -Be 9
+        $headroom.Shared | Should -BeTrue
+        (Get-RateLimitHeadroom -TenantId $tenantId -Service "MDE" -MaxRequestsPerMinute 10).Remaining | Should -Be 9
+    }
+
+    It "starts over after Clear-RateLimitTracker" {
+        Test-RateLimit -TenantId $tenantId -Service "MDE" -MaxRequestsPerMinute 1 | Should -BeTrue
+        Clear-RateLimitTracker 6>$null
+        Test-RateLimit -TenantId $tenantId -Service "MDE" -MaxRequestsPerMinute 1 | Should -BeTrue
+    }
+}
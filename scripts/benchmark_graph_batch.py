@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Graph $batch Benchmark
+
+Compares the two ways the MDO worker's BulkEmailSearch can search every
+mailbox for a phishing campaign, against the local mock Graph server
+(mock_xdr_api.py, started in-process):
+- serial:  one GET users/{id}/messages?$search= per mailbox, one after another
+           (the worker before JSON batching)
+- batched: the same searches packed 20 to a POST /v1.0/$batch, with several
+           batches in flight (Invoke-XDRGraphBatch in HttpPipeline.psm1),
+           throttled sub-requests sent again after their Retry-After
+
+Each mode reports wall time, HTTP round trips and messages found; results
+are written as JSON alongside the other benchmarks.
+
+Usage:
+    python3 scripts/benchmark_graph_batch.py
+    python3 scripts/benchmark_graph_batch.py --users 5000 --latency-ms 120 --parallelism 4
+    python3 scripts/benchmark_graph_batch.py --rate-limit 400 --skip-serial
+"""
+
+import argparse
+import asyncio
+import http.client
+import json
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List
+from urllib.parse import quote
+
+from mock_xdr_api import MAX_BATCH_REQUESTS, MockXdrApi, run_server, stable_guid
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+BENCH_DIR = REPO_ROOT / '.defenderc2-cache' / 'benchmarks'
+HEADERS = {'Authorization': 'Bearer mock', 'Content-Type': 'application/json'}
+
+
+def start_mock(api: MockXdrApi) -> int:
+    """Serve the mock on a free local port from a background thread"""
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+    started = threading.Event()
+
+    def serve():
+        async def main():
+            ready = asyncio.Event()
+            server = asyncio.ensure_future(run_server(api, '127.0.0.1', port, ready))
+            await ready.wait()
+            started.set()
+            await server
+        asyncio.run(main())
+
+    threading.Thread(target=serve, daemon=True).start()
+    if not started.wait(10):
+        raise RuntimeError("Mock server did not start")
+    return port
+
+
+def search_url(user_id: str, query: str, top: int) -> str:
+    return f"/users/{user_id}/messages?$search={quote(json.dumps(query))}&$top={top}"
+
+
+def run_serial(port: int, user_ids: List[str], query: str, top: int) -> Dict:
+    """One keep-alive connection, one request per mailbox"""
+    connection = http.client.HTTPConnection('127.0.0.1', port)
+    messages = calls = 0
+    start = time.perf_counter()
+    for user_id in user_ids:
+        while True:
+            connection.request('GET', '/v1.0' + search_url(user_id, query, top), headers=HEADERS)
+            response = connection.getresponse()
+            body = response.read()
+            calls += 1
+            if response.status != 429:
+                break
+            time.sleep(int(response.getheader('Retry-After', '1')))
+        if response.status == 200:
+            messages += len(json.loads(body)['value'])
+    elapsed = time.perf_counter() - start
+    connection.close()
+    return {'wall_s': round(elapsed, 3), 'http_calls': calls, 'messages': messages}
+
+
+def run_batched(port: int, user_ids: List[str], query: str, top: int, parallelism: int,
+                batch_size: int = MAX_BATCH_REQUESTS, max_rounds: int = 5) -> Dict:
+    """$batch requests of batch_size searches, parallelism batches in flight"""
+    local = threading.local()
+    lock = threading.Lock()
+    calls = 0
+
+    def post(chunk: List[Dict]) -> List[Dict]:
+        nonlocal calls
+        if not hasattr(local, 'connection'):
+            local.connection = http.client.HTTPConnection('127.0.0.1', port)
+        while True:
+            local.connection.request('POST', '/v1.0/$batch', body=json.dumps({'requests': chunk}), headers=HEADERS)
+            response = local.connection.getresponse()
+            body = response.read()
+            with lock:
+                calls += 1
+            if response.status != 429:
+                return json.loads(body)['responses']
+            # The batch as a whole was throttled
+            time.sleep(int(response.getheader('Retry-After', '1')))
+
+    pending = [{'id': user_id, 'method': 'GET', 'url': search_url(user_id, query, top)} for user_id in user_ids]
+    results: Dict[str, Dict] = {}
+    rounds = 0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=parallelism) as pool:
+        while pending and rounds < max_rounds:
+            rounds += 1
+            chunks = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+            by_id = {request['id']: request for request in pending}
+            retry, retry_after = [], 0
+            for responses in pool.map(post, chunks):
+                for response in responses:
+                    if response['status'] == 429:
+                        retry.append(by_id[response['id']])
+                        retry_after = max(retry_after, int((response.get('headers') or {}).get('Retry-After', 1)))
+                    else:
+                        results[response['id']] = response
+            if retry:
+                time.sleep(retry_after)
+            pending = retry
+    elapsed = time.perf_counter() - start
+    messages = sum(len(r['body']['value']) for r in results.values() if r['status'] == 200)
+    return {'wall_s': round(elapsed, 3), 'http_calls': calls, 'messages': messages,
+            'rounds': rounds, 'unanswered': len(pending)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark serial vs $batch mailbox search against the mock Graph API")
+    parser.add_argument('--users', type=int, default=500, help="Mailboxes to search")
+    parser.add_argument('--latency-ms', type=float, default=60.0, help="Mock latency per HTTP request")
+    parser.add_argument('--jitter-ms', type=float, default=10.0)
+    parser.add_argument('--rate-limit', type=float, default=0.0,
+                        help="Mock requests per second (sub-requests count individually) before 429")
+    parser.add_argument('--parallelism', type=int, default=4, help="Batches in flight")
+    parser.add_argument('--query', default='invoice', help="Search term (every fifth mailbox has a match)")
+    parser.add_argument('--top', type=int, default=10, help="Messages per mailbox")
+    parser.add_argument('--skip-serial', action='store_true', help="Only run the batched mode")
+    parser.add_argument('--output', default=str(BENCH_DIR / 'graph_batch.json'), help="Results JSON file")
+    args = parser.parse_args(argv)
+
+    api = MockXdrApi(users=args.users, machines=1, incidents=1, latency_ms=args.latency_ms,
+                     jitter_ms=args.jitter_ms, rate_limit=args.rate_limit)
+    port = start_mock(api)
+    user_ids = [stable_guid('user', i) for i in range(args.users)]
+    print(f"🧪 Mock Graph on port {port}: {args.users} mailboxes, "
+          f"{args.latency_ms:.0f}±{args.jitter_ms:.0f} ms per request")
+
+    results = {}
+    if not args.skip_serial:
+        results['serial'] = run_serial(port, user_ids, args.query, args.top)
+        print(f"serial   {results['serial']['wall_s']:>8.2f} s  {results['serial']['http_calls']:>6} calls  "
+              f"{results['serial']['messages']} messages")
+    results['batched'] = run_batched(port, user_ids, args.query, args.top, args.parallelism)
+    print(f"batched  {results['batched']['wall_s']:>8.2f} s  {results['batched']['http_calls']:>6} calls  "
+          f"{results['batched']['messages']} messages ({args.parallelism} in flight)")
+
+    if 'serial' in results:
+        if results['serial']['messages'] != results['batched']['messages']:
+            print("❌ Batched search found a different number of messages")
+            return 1
+        speedup = results['serial']['wall_s'] / max(results['batched']['wall_s'], 1e-9)
+        results['speedup'] = round(speedup, 1)
+        print(f"\n⚡ {speedup:.1f}x faster with $batch")
+
+    payload = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'users': args.users,
+        'latency_ms': args.latency_ms,
+        'jitter_ms': args.jitter_ms,
+        'rate_limit': args.rate_limit,
+        'parallelism': args.parallelism,
+        'results': results,
+    }
+    output_path = Path(args.output)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, indent=2)
+    print(f"💾 Results written to {output_path}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
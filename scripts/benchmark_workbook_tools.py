@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Workbook Tooling Benchmarks
+
+Times the workbook and ARM template tools against the real workbooks in
+workbook/ plus synthetic workbooks scaled 10x and 100x by replicating the
+group items:
+- find_customendpoint_queries / find_armendpoint_queries (verify_workbook_deployment.py)
+- update_custom_endpoint_urls (fix-workbook-authentication.py)
+- rewrite_arm_actions (fix_arm_actions_proper.py)
+- test_listkeys_function_calls (test_azuredeploy.py)
+
+Each case runs in its own child process and records wall time (min/median
+over --repeat runs), peak RSS growth, tracemalloc peak and allocated block
+counts. Results are written as JSON (under .defenderc2-cache/benchmarks) and
+compared against the baseline committed in benchmarks/; the exit code is 1
+if any case regressed past --threshold. Refresh the baseline with
+--save-baseline and commit it with the change that moved the numbers.
+
+Usage:
+    python3 scripts/benchmark_workbook_tools.py
+    python3 scripts/benchmark_workbook_tools.py --save-baseline
+    python3 scripts/benchmark_workbook_tools.py --scales 1 10 --repeat 3 --filter find_
+"""
+
+import argparse
+import contextlib
+import copy
+import importlib.util
+import io
+import json
+import multiprocessing
+import resource
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from fix_arm_actions_proper import rewrite_arm_actions
+from workbook_index import ITEM_TYPE_GROUP, default_decoder
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+BENCH_DIR = REPO_ROOT / '.defenderc2-cache' / 'benchmarks'
+# Tracked, so every checkout compares against the same numbers
+BASELINE_PATH = REPO_ROOT / 'benchmarks' / 'workbook_tools_baseline.json'
+WORKBOOK_GLOBS = ['workbook/*.json', 'workbook/*.workbook']
+TEMPLATE_PATH = REPO_ROOT / 'deployment' / 'azuredeploy.json'
+
+
+def load_script(name: str, path: Path):
+    """Import a script by path (some live in archive/ or have hyphenated names)"""
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def scale_workbook(workbook: Dict, factor: int) -> Dict:
+    """Replicate the top-level group items factor times (names suffixed to stay unique)"""
+    if factor == 1:
+        return workbook
+    scaled = copy.deepcopy(workbook)
+    groups = [item for item in workbook.get('items', []) if item.get('type') == ITEM_TYPE_GROUP]
+    for copy_no in range(1, factor):
+        for group in groups:
+            clone = copy.deepcopy(group)
+            if 'name' in clone:
+                clone['name'] = f"{clone['name']} - copy {copy_no}"
+            scaled['items'].append(clone)
+    return scaled
+
+
+def build_cases(scales: List[int]) -> List[Dict]:
+    """One case per tool, workbook and scale; inputs are loaded in the child process"""
+    cases = []
+    workbooks = sorted({p for pattern in WORKBOOK_GLOBS for p in REPO_ROOT.glob(pattern)})
+    for path in workbooks:
+        for scale in scales:
+            for tool in ('find_customendpoint_queries', 'find_armendpoint_queries',
+                         'update_custom_endpoint_urls', 'rewrite_arm_actions'):
+                cases.append({'tool': tool, 'input': path.name, 'path': str(path), 'scale': scale})
+    cases.append({'tool': 'test_listkeys_function_calls', 'input': TEMPLATE_PATH.name,
+                  'path': str(TEMPLATE_PATH), 'scale': 1})
+    return cases
+
+
+def _prepare(case: Dict) -> Callable[[], Callable[[], object]]:
+    """Return a factory producing a fresh zero-argument callable for each timed run"""
+    tool = case['tool']
+    with open(case['path'], 'r', encoding='utf-8-sig') as f:
+        document = json.load(f)
+
+    if tool == 'test_listkeys_function_calls':
+        module = load_script('test_azuredeploy', REPO_ROOT / 'archive' / 'old-deployment-docs' / 'test_azuredeploy.py')
+        return lambda: (lambda: module.test_listkeys_function_calls(document))
+
+    workbook = scale_workbook(document, case['scale'])
+    if tool in ('find_customendpoint_queries', 'find_armendpoint_queries'):
+        module = load_script('verify_workbook_deployment',
+                             REPO_ROOT / 'archive' / 'old-deployment-docs' / 'verify_workbook_deployment.py')
+        finder = getattr(module, tool)
+        return lambda: (lambda: finder(workbook))
+    if tool == 'update_custom_endpoint_urls':
+        module = load_script('fix_workbook_authentication',
+                             REPO_ROOT / 'archive' / 'old-deployment-docs' / 'fix-workbook-authentication.py')
+        # The fixer mutates its input, so every run gets its own copy
+        return lambda: (lambda wb=copy.deepcopy(workbook): module.update_custom_endpoint_urls(wb))
+    if tool == 'rewrite_arm_actions':
+        return lambda: (lambda wb=copy.deepcopy(workbook): rewrite_arm_actions(wb))
+    raise ValueError(f"Unknown tool: {tool}")
+
+
+def _run_case(case: Dict, repeat: int, queue):
+    """Child process body: time the case and report measurements"""
+    try:
+        factory = _prepare(case)
+        times = []
+        blocks = []
+        traced_peak = 0
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+        for _ in range(repeat):
+            run = factory()
+            # Memoized decoding would make every run after the first a cache hit
+            default_decoder.clear()
+            with contextlib.redirect_stdout(io.StringIO()):
+                blocks_before = sys.getallocatedblocks()
+                start = time.perf_counter()
+                run()
+                times.append(time.perf_counter() - start)
+                blocks.append(sys.getallocatedblocks() - blocks_before)
+
+        # Separate traced run: tracemalloc slows execution, so it is not timed
+        run = factory()
+        default_decoder.clear()
+        tracemalloc.start()
+        with contextlib.redirect_stdout(io.StringIO()):
+            run()
+        _, traced_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        queue.put({
+            'wall_min_s': min(times),
+            'wall_median_s': statistics.median(times),
+            'peak_rss_growth_kb': max(0, rss_after - rss_before),
+            'traced_peak_bytes': traced_peak,
+            'allocated_blocks': max(blocks),
+        })
+    except Exception as e:
+        queue.put({'error': f"{type(e).__name__}: {e}"})
+
+
+def run_case(case: Dict, repeat: int) -> Dict:
+    context = multiprocessing.get_context('fork' if sys.platform != 'win32' else 'spawn')
+    queue = context.Queue()
+    process = context.Process(target=_run_case, args=(case, repeat, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def case_key(case: Dict) -> str:
+    return f"{case['tool']}|{case['input']}|x{case['scale']}"
+
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """Cases whose best-of-N wall time grew past threshold times the baseline (min is least noisy)"""
+    regressions = []
+    for key, result in results.items():
+        base = baseline.get(key)
+        if not base or 'wall_min_s' not in base or 'wall_min_s' not in result:
+            continue
+        ratio = result['wall_min_s'] / base['wall_min_s'] if base['wall_min_s'] else 1.0
+        result['baseline_ratio'] = round(ratio, 3)
+        if ratio > threshold:
+            regressions.append(f"{key}: {ratio:.2f}x baseline "
+                               f"({base['wall_min_s'] * 1000:.2f} ms -> {result['wall_min_s'] * 1000:.2f} ms)")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the workbook and ARM template tooling")
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100], help="Workbook scale factors")
+    parser.add_argument('--repeat', type=int, default=5, help="Timed runs per case")
+    parser.add_argument('--filter', default='', help="Only run cases whose key contains this text")
+    parser.add_argument('--output', default=str(BENCH_DIR / 'results.json'), help="Results JSON file")
+    parser.add_argument('--baseline', default=str(BASELINE_PATH), help="Baseline JSON file")
+    parser.add_argument('--save-baseline', action='store_true', help="Store these results as the new baseline")
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help="Flag a regression when best-of-N time exceeds baseline by this factor")
+    args = parser.parse_args(argv)
+
+    cases = [c for c in build_cases(args.scales) if args.filter in case_key(c)]
+    results = {}
+
+    print(f"{'case':<70} {'median ms':>10} {'rss KB':>8} {'traced KB':>10}")
+    for case in cases:
+        key = case_key(case)
+        result = run_case(case, args.repeat)
+        results[key] = result
+        if 'error' in result:
+            print(f"{key:<70} ❌ {result['error']}")
+        else:
+            print(f"{key:<70} {result['wall_median_s'] * 1000:>10.2f} "
+                  f"{result['peak_rss_growth_kb']:>8} {result['traced_peak_bytes'] // 1024:>10}")
+
+    regressions = []
+    baseline_path = Path(args.baseline)
+    if baseline_path.is_file() and not args.save_baseline:
+        with open(baseline_path, 'r', encoding='utf-8') as f:
+            regressions = compare(results, json.load(f).get('results', {}), args.threshold)
+
+    payload = {
+        'python': sys.version.split()[0],
+        'platform': sys.platform,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'repeat': args.repeat,
+        'results': results,
+        'regressions': regressions,
+    }
+    output_path = Path(args.baseline if args.save_baseline else args.output)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, indent=2)
+    print(f"\n💾 Results written to {output_path}")
+
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s) over {args.threshold}x baseline:")
+        for regression in regressions:
+            print(f"  - {regression}")
+        return 1
+    if any('error' in r for r in results.values()):
+        return 1
+    print("\n✅ No regressions against baseline" if baseline_path.is_file() else "\nℹ️  No baseline to compare against")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
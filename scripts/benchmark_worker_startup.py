@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Worker Startup Benchmark
+
+Measures cold and warm start of each function's run.ps1 under both module
+load modes (XDR_MODULE_LOAD_MODE, see functions/modules/ModuleLoader.psm1):
+- Force: every invocation re-imports its modules with -Force (the old startup)
+- Once:  modules are imported on first use and reused by later invocations
+
+Each function/mode pair runs in a fresh pwsh process, like a new worker:
+profile.ps1 first, then --runs invocations of run.ps1 with a stand-in for the
+Functions host (HttpResponseContext, Push-OutputBinding). The first
+invocation is the cold start (script compile + module imports), the others
+are warm. Requests carry no tenantId, so each handler returns its validation
+error right after startup and no API is called; Live Response and bulk
+actions, whose modules are imported on demand, are not exercised.
+
+Needs PowerShell 7 (pwsh) on PATH. Results are written to
+benchmarks/worker_startup.json, which is tracked: commit it with changes to
+module loading so the numbers they were judged by stay with them.
+
+Usage:
+    python3 scripts/benchmark_worker_startup.py
+    python3 scripts/benchmark_worker_startup.py --functions DefenderXDRAzureWorker DefenderXDRMDEWorker --runs 20
+    python3 scripts/benchmark_worker_startup.py --modes Once
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+FUNCTIONS_DIR = REPO_ROOT / 'functions'
+BENCH_DIR = REPO_ROOT / 'benchmarks'
+
+FUNCTIONS = [
+    'DefenderXDRGateway',
+    'DefenderXDROrchestrator',
+    'DefenderXDRMDEWorker',
+    'DefenderXDRMDOWorker',
+    'DefenderXDREntraIDWorker',
+    'DefenderXDRIntuneWorker',
+    'DefenderXDRAzureWorker',
+    'DefenderXDRMCASWorker',
+    'DefenderXDRIncidentWorker',
+]
+
+# Runs inside pwsh; paths and run count come from the environment
+HARNESS = r'''
+$ErrorActionPreference = "Continue"
+Add-Type -TypeDefinition @"
+public class HttpResponseContext {
+    public object StatusCode;
+    public object Body;
+    public System.Collections.IDictionary Headers;
+}
+"@
+$global:BenchResponses = [System.Collections.Generic.List[object]]::new()
+function global:Push-OutputBinding {
+    param([string]$Name, $Value, [switch]$Clobber)
+    if ($Name -eq "Response") { $global:BenchResponses.Add($Value) }
+}
+
+$stopwatch = [System.Diagnostics.Stopwatch]::StartNew()
+. $env:XDR_BENCH_PROFILE *> $null
+$profileMs = $stopwatch.Elapsed.TotalMilliseconds
+
+$timings = @()
+for ($i = 0; $i -lt [int]$env:XDR_BENCH_RUNS; $i++) {
+    $request = [pscustomobject]@{
+        Method = "POST"
+        Url = "benchmark://$env:XDR_BENCH_FUNCTION"
+        Headers = @{ "content-type" = "application/json" }
+        Query = @{}
+        Params = @{}
+        Body = @{ action = "BenchmarkStartup" }
+    }
+    $stopwatch.Restart()
+    try {
+        & $env:XDR_BENCH_SCRIPT -Request $request -TriggerMetadata @{} *> $null
+    } catch {
+        # Handlers that rethrow validation errors still count
+    }
+    $timings += $stopwatch.Elapsed.TotalMilliseconds
+}
+
+$loads = if (Get-Command Get-XDRModuleLoadStats -ErrorAction SilentlyContinue) { Get-XDRModuleLoadStats } else { $null }
+$status = if ($global:BenchResponses.Count -gt 0) { [int]$global:BenchResponses[0].StatusCode } else { $null }
+"XDR_BENCH_RESULT " + (@{
+    profileMs = $profileMs
+    timingsMs = $timings
+    firstStatus = $status
+    moduleLoads = $loads
+} | ConvertTo-Json -Depth 6 -Compress)
+'''
+
+
+def run_function(pwsh: str, harness: Path, function: str, mode: str, runs: int, timeout: int) -> Dict:
+    """One fresh pwsh process: profile.ps1, then `runs` invocations of run.ps1"""
+    env = dict(os.environ)
+    env.update({
+        'XDR_MODULE_LOAD_MODE': mode,
+        'XDR_BENCH_FUNCTION': function,
+        'XDR_BENCH_SCRIPT': str(FUNCTIONS_DIR / function / 'run.ps1'),
+        'XDR_BENCH_PROFILE': str(FUNCTIONS_DIR / 'profile.ps1'),
+        'XDR_BENCH_RUNS': str(runs),
+    })
+    # Nothing may leave the machine: no credentials, no token store, no job store
+    for name in ('APPID', 'SECRETID', 'XDR_TOKEN_CACHE_STORE', 'WEBSITE_HOSTNAME', 'AzureWebJobsStorage'):
+        env.pop(name, None)
+
+    started = time.perf_counter()
+    proc = subprocess.run([pwsh, '-NoProfile', '-NonInteractive', '-File', str(harness)],
+                          env=env, capture_output=True, text=True, timeout=timeout)
+    process_s = time.perf_counter() - started
+
+    line = next((l for l in reversed(proc.stdout.splitlines()) if l.startswith('XDR_BENCH_RESULT ')), None)
+    if line is None:
+        raise RuntimeError(f"{function} ({mode}) produced no result (exit {proc.returncode}): "
+                           f"{(proc.stderr or proc.stdout).strip()[-500:]}")
+    data = json.loads(line[len('XDR_BENCH_RESULT '):])
+    timings = [float(t) for t in data['timingsMs']]
+    warm = timings[1:]
+    return {
+        'process_s': round(process_s, 3),
+        'profile_ms': round(data['profileMs'], 1),
+        'cold_ms': round(timings[0], 1),
+        'warm_median_ms': round(statistics.median(warm), 1) if warm else None,
+        'warm_max_ms': round(max(warm), 1) if warm else None,
+        'timings_ms': [round(t, 1) for t in timings],
+        'first_status': data.get('firstStatus'),
+        'module_loads': data.get('moduleLoads'),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark cold/warm start of each function under both module load modes")
+    parser.add_argument('--functions', nargs='+', default=FUNCTIONS, choices=FUNCTIONS, metavar='FUNCTION',
+                        help="Functions to measure (default: all HTTP-triggered ones)")
+    parser.add_argument('--modes', nargs='+', default=['Force', 'Once'], choices=['Force', 'Once'],
+                        help="XDR_MODULE_LOAD_MODE values to compare")
+    parser.add_argument('--runs', type=int, default=10, help="Invocations per process (first one is the cold start)")
+    parser.add_argument('--timeout', type=int, default=300, help="Seconds allowed per pwsh process")
+    parser.add_argument('--pwsh', default=shutil.which('pwsh'), help="Path to PowerShell 7")
+    parser.add_argument('--output', default=str(BENCH_DIR / 'worker_startup.json'), help="Results JSON file")
+    args = parser.parse_args(argv)
+
+    if not args.pwsh:
+        print("❌ pwsh not found on PATH (install PowerShell 7 or pass --pwsh)")
+        return 2
+    if args.runs < 2:
+        print("❌ --runs must be at least 2 (one cold, one or more warm)")
+        return 2
+
+    results: Dict[str, Dict[str, Dict]] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        harness = Path(tmp) / 'startup_harness.ps1'
+        harness.write_text(HARNESS, encoding='utf-8')
+
+        print(f"{'function':<28}{'mode':<7}{'profile':>10}{'cold':>10}{'warm p50':>10}{'warm max':>10}")
+        for function in args.functions:
+            results[function] = {}
+            for mode in args.modes:
+                result = run_function(args.pwsh, harness, function, mode, args.runs, args.timeout)
+                results[function][mode] = result
+                print(f"{function:<28}{mode:<7}{result['profile_ms']:>8.0f}ms{result['cold_ms']:>8.0f}ms"
+                      f"{result['warm_median_ms']:>8.0f}ms{result['warm_max_ms']:>8.0f}ms")
+
+    if 'Force' in args.modes and 'Once' in args.modes:
+        print()
+        for function, by_mode in results.items():
+            force, once = by_mode['Force'], by_mode['Once']
+            saved = force['warm_median_ms'] - once['warm_median_ms']
+            by_mode['warm_saved_ms'] = round(saved, 1)
+            by_mode['cold_saved_ms'] = round(force['profile_ms'] + force['cold_ms'] - once['profile_ms'] - once['cold_ms'], 1)
+            print(f"⚡ {function:<28} warm {saved:>7.0f}ms faster, "
+                  f"cold start (profile + first call) {by_mode['cold_saved_ms']:>7.0f}ms faster with Once")
+
+    payload = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'runs': args.runs,
+        'modes': args.modes,
+        'results': results,
+    }
+    output_path = Path(args.output)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, indent=2)
+    print(f"💾 Results written to {output_path}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,23 +2,24 @@
 """
 Fix ALL ARM Actions to use proper ARM Management API paths.
 ARM Actions in Azure Workbooks MUST use ARM resource provider paths, NOT direct HTTPS.
+
+The workbook is parsed once, every armActionContext pointing at a direct
+function URL is rewritten in place (path, headers, params), and the result
+is written once. The rewrite works on the JSON structure, so it does not
+depend on how the file is indented.
 """
 
+import argparse
 import json
 import re
+import sys
+from pathlib import Path
+from typing import Dict, Iterable
 
-workbook_path = r"c:\Users\AlexandrosKefallonit\Desktop\FF\defenderc2xsoar\workbook\DefenderC2-Workbook.json"
-
-print("\n" + "="*70)
-print("  Fixing ARM Actions to use Azure Management API paths")
-print("="*70 + "\n")
-
-# Read the workbook
-with open(workbook_path, 'r', encoding='utf-8') as f:
-    content = f.read()
+from workbook_index import WorkbookIndex
 
 # Function names to fix
-function_names = [
+FUNCTION_NAMES = [
     "DefenderC2Dispatcher",
     "DefenderC2CDManager",
     "DefenderC2HuntManager",
@@ -27,69 +28,112 @@ function_names = [
     "DefenderC2Orchestrator"
 ]
 
-total_fixed = 0
-
-for func_name in function_names:
-    # Old pattern: Direct HTTPS with FunctionKey
-    old_pattern = (
-        f'"path": "https://{{FunctionAppName}}.azurewebsites.net/api/{func_name}?code={{FunctionKey}}",\n'
-        '                    "headers": [\n'
-        '                      {\n'
-        '                        "key": "Content-Type",\n'
-        '                        "value": "application/json"\n'
-        '                      }\n'
-        '                    ],'
-    )
-    
-    # New pattern: ARM resource provider path
-    new_pattern = (
-        f'"path": "/subscriptions/{{Subscription}}/resourceGroups/{{ResourceGroup}}/providers/Microsoft.Web/sites/{{FunctionAppName}}/host/default/admin/functions/{func_name}",\n'
-        '                    "headers": [],\n'
-        '                    "params": [\n'
-        '                      {\n'
-        '                        "key": "api-version",\n'
-        '                        "value": "2022-03-01"\n'
-        '                      }\n'
-        '                    ],'
-    )
-    
-    # Count matches
-    matches = len(re.findall(re.escape(old_pattern), content))
-    
-    if matches > 0:
-        print(f"Fixing {matches} ARM Action(s) for function: {func_name}")
-        content = content.replace(old_pattern, new_pattern)
-        total_fixed += matches
-
-# Write back
-with open(workbook_path, 'w', encoding='utf-8') as f:
-    f.write(content)
-
-# Verify
-with open(workbook_path, 'r', encoding='utf-8') as f:
-    new_content = f.read()
-
-# Count remaining issues
-direct_https_in_arm = len(re.findall(r'"path": "https://{FunctionAppName}\.azurewebsites\.net/api/DefenderC2[^"]*",\s*"headers": \[\s*{\s*"key": "Content-Type"', new_content))
-arm_paths = len(re.findall(r'"/subscriptions/{Subscription}/resourceGroups/{ResourceGroup}/providers/Microsoft\.Web/sites/{FunctionAppName}/host/default/admin/functions/', new_content))
-
-print("\n" + "="*70)
-print("                     FIX COMPLETE!")
-print("="*70 + "\n")
-
-print(f"Results:")
-print(f"  ✅ Fixed {total_fixed} ARM Actions")
-print(f"  {'✅' if direct_https_in_arm == 0 else '❌'} Remaining Direct HTTPS in ARM Actions: {direct_https_in_arm}")
-print(f"  ✅ Total proper ARM paths: {arm_paths}")
-
-if direct_https_in_arm == 0:
-    print("\n✅ SUCCESS! All ARM Actions now use proper ARM Management API paths!")
-    print("\nThe ARM Actions will now:")
-    print("  ✓ Use Azure Management API endpoint")
-    print("  ✓ Authenticate via user's Azure RBAC permissions")  
-    print("  ✓ Invoke functions through /host/default/admin/functions/{name}")
-    print("  ✓ Work in Azure Portal Workbooks!")
-else:
-    print(f"\n⚠️  WARNING: Still have {direct_https_in_arm} direct HTTPS paths in ARM Actions!")
-
-print()
+ARM_API_VERSION = "2022-03-01"
+ARM_FUNCTION_PATH = (
+    "/subscriptions/{{Subscription}}/resourceGroups/{{ResourceGroup}}"
+    "/providers/Microsoft.Web/sites/{{FunctionAppName}}/host/default/admin/functions/{name}"
+)
+ARM_PATH_PREFIX = ARM_FUNCTION_PATH.format(name="").replace("{{", "{").replace("}}", "}")
+
+# Old pattern: Direct HTTPS (optionally with ?code={FunctionKey})
+DIRECT_HTTPS_PATH = re.compile(r"^https://\{FunctionAppName\}\.azurewebsites\.net/api/([^/?]+)")
+
+
+def rewrite_arm_action(context: Dict, function_name: str):
+    """Point one armActionContext at the ARM resource provider path for function_name"""
+    context["path"] = ARM_FUNCTION_PATH.format(name=function_name)
+    # ARM authenticates with the user's token; no Content-Type/function key headers
+    context["headers"] = []
+    params = [p for p in context.get("params") or [] if p.get("key") != "api-version"]
+    context["params"] = [{"key": "api-version", "value": ARM_API_VERSION}] + params
+
+
+def rewrite_arm_actions(workbook, function_names: Iterable[str] = FUNCTION_NAMES) -> Dict:
+    """
+    Rewrite every direct-HTTPS ARM action for the given functions in place.
+
+    Returns fixed counts per function plus the remaining direct HTTPS and
+    total ARM path counts, computed from the rewritten structure.
+    """
+    names = set(function_names)
+    fixed = {name: 0 for name in function_names}
+    remaining_direct = 0
+    arm_paths = 0
+
+    for context in WorkbookIndex(workbook).arm_action_contexts:
+        path = context.get("path") or ""
+        match = DIRECT_HTTPS_PATH.match(path)
+        if match and match.group(1) in names:
+            rewrite_arm_action(context, match.group(1))
+            fixed[match.group(1)] += 1
+            path = context["path"]
+        elif match:
+            remaining_direct += 1
+
+        if path.startswith(ARM_PATH_PREFIX):
+            arm_paths += 1
+
+    return {
+        "fixed": fixed,
+        "total_fixed": sum(fixed.values()),
+        "remaining_direct_https": remaining_direct,
+        "arm_paths": arm_paths,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rewrite workbook ARM actions to ARM Management API paths")
+    parser.add_argument("workbook", nargs="?",
+                        default=str(Path(__file__).parent.parent / "workbook" / "DefenderC2-Workbook.json"),
+                        help="Workbook JSON file to fix")
+    parser.add_argument("--dry-run", action="store_true", help="Report what would change without writing")
+    parser.add_argument("--function", action="append", dest="functions",
+                        help="Function name to rewrite (repeatable, defaults to the DefenderC2 functions)")
+    args = parser.parse_args(argv)
+
+    print("\n" + "="*70)
+    print("  Fixing ARM Actions to use Azure Management API paths")
+    print("="*70 + "\n")
+
+    # Read the workbook
+    with open(args.workbook, 'r', encoding='utf-8') as f:
+        workbook = json.load(f)
+
+    results = rewrite_arm_actions(workbook, args.functions or FUNCTION_NAMES)
+
+    for func_name, count in results["fixed"].items():
+        if count > 0:
+            print(f"{'Would fix' if args.dry_run else 'Fixing'} {count} ARM Action(s) for function: {func_name}")
+
+    # Write back once
+    if results["total_fixed"] > 0 and not args.dry_run:
+        with open(args.workbook, 'w', encoding='utf-8') as f:
+            json.dump(workbook, f, indent=2, ensure_ascii=False)
+
+    direct_https_in_arm = results["remaining_direct_https"]
+
+    print("\n" + "="*70)
+    print("                     DRY RUN COMPLETE" if args.dry_run else "                     FIX COMPLETE!")
+    print("="*70 + "\n")
+
+    print(f"Results:")
+    print(f"  ✅ {'Would fix' if args.dry_run else 'Fixed'} {results['total_fixed']} ARM Actions")
+    print(f"  {'✅' if direct_https_in_arm == 0 else '❌'} Remaining Direct HTTPS in ARM Actions: {direct_https_in_arm}")
+    print(f"  ✅ Total proper ARM paths: {results['arm_paths']}")
+
+    if direct_https_in_arm == 0:
+        print("\n✅ SUCCESS! All ARM Actions now use proper ARM Management API paths!")
+        print("\nThe ARM Actions will now:")
+        print("  ✓ Use Azure Management API endpoint")
+        print("  ✓ Authenticate via user's Azure RBAC permissions")
+        print("  ✓ Invoke functions through /host/default/admin/functions/{name}")
+        print("  ✓ Work in Azure Portal Workbooks!")
+    else:
+        print(f"\n⚠️  WARNING: Still have {direct_https_in_arm} direct HTTPS paths in ARM Actions!")
+
+    print()
+    return 0 if direct_https_in_arm == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,567 @@
+#!/usr/bin/env python3
+"""
+Gateway Load Generator
+
+Replays a mix of service/action payloads against DefenderXDRGateway at a
+fixed open-loop rate and reports latency percentiles, error rates and
+cold-start outliers.
+
+- The action mix is read from Get-ValidActionsForService in
+  functions/modules/ValidationHelper.psm1, and required parameters from
+  Test-RequiredParameters, so new actions are picked up automatically.
+  Only read actions (Get*) are sent unless --include-write is given; use it
+  against the offline stand-in (scripts/mock_xdr_api.py), never a live tenant.
+- Requests are sent on schedule whether or not earlier ones have finished.
+  Latency is measured from the scheduled send time, so a stalled server
+  shows up as queueing delay instead of hiding it (coordinated omission).
+- Latencies go into HDR-style log-linear histograms (~0.1% precision); the
+  percentile distributions are written as .hgrm files next to the JSON report.
+- --dispatch-modes runs the same seeded load once per Gateway dispatch mode
+  (InProcess: Orchestrator and workers run in the Gateway's invocation;
+  Http: the internal HTTP hops) and reports the latency saved.
+
+Usage:
+    python3 scripts/gateway_load_test.py --url http://localhost:7071/api/Gateway --rate 20 --duration 60
+    python3 scripts/gateway_load_test.py --url https://<app>.azurewebsites.net/api/Gateway --function-key KEY --services MDE
+    python3 scripts/gateway_load_test.py --dispatch-modes Http InProcess --rate 5 --duration 60
+    python3 scripts/gateway_load_test.py --list
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import ssl
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlencode, urlsplit
+
+from mock_xdr_api import stable_id
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+VALIDATION_HELPER = REPO_ROOT / 'functions' / 'modules' / 'ValidationHelper.psm1'
+REPORT_DIR = REPO_ROOT / '.defenderc2-cache' / 'loadtest'
+DEFAULT_TENANT = '00000000-0000-0000-0000-000000000001'
+
+# Sample values for parameters named in Test-RequiredParameters; they match
+# the offline stand-in's dataset
+SAMPLE_PARAMETERS = {
+    'deviceIds': ','.join(stable_id('machine', i) for i in range(3)),
+    'deviceId': stable_id('machine', 0),
+    'machineId': stable_id('machine', 0),
+    'fileHash': 'a' * 64,
+    'indicatorValue': 'a' * 64,
+    'query': 'DeviceInfo | take 10',
+    'incidentId': '1000',
+    'alertId': 'da' + stable_id('alert', 0, 30),
+    'status': 'resolved',
+    'emailId': 'AAMkAGI2TG93AAA=',
+    'url': 'https://malicious.example.com/payload',
+    'userId': 'user00001@contoso.com',
+    'subscriptionId': '00000000-0000-0000-0000-00000000aaaa',
+    'resourceGroup': 'rg-loadtest',
+    'nsgName': 'nsg-loadtest',
+    'sourceIP': '203.0.113.10',
+    'vmName': 'vm-loadtest',
+    'storageAccountName': 'stloadtest',
+    'defenderPlan': 'VirtualMachines',
+    'locationName': 'Load test location',
+    'ipRanges': '203.0.113.0/24',
+}
+
+
+# ============================================================================
+# ACTION MIX
+# ============================================================================
+
+def load_action_map(path: Path = VALIDATION_HELPER) -> Dict[str, List[str]]:
+    """Parse the $actionMap in Get-ValidActionsForService into {service: [actions]}"""
+    text = path.read_text(encoding='utf-8-sig')
+    body = re.search(r'function Get-ValidActionsForService\b.*?\$actionMap = @\{(.*?)\n    \}', text, re.S)
+    if not body:
+        raise ValueError(f"Get-ValidActionsForService action map not found in {path}")
+    return {
+        service: re.findall(r'"([^"]+)"', actions)
+        for service, actions in re.findall(r'(\w+) = @\((.*?)\)', body.group(1), re.S)
+    }
+
+
+def load_required_parameters(path: Path = VALIDATION_HELPER) -> Dict[str, List[str]]:
+    """Parse $requiredParamsMap in Test-RequiredParameters into {'Service:Action': [params]}"""
+    text = path.read_text(encoding='utf-8-sig')
+    body = re.search(r'\$requiredParamsMap = @\{(.*?)\n    \}', text, re.S)
+    if not body:
+        return {}
+    return {
+        key: re.findall(r'"([^"]+)"', params)
+        for key, params in re.findall(r'"([^"]+)" = @\(([^)]*)\)', body.group(1))
+    }
+
+
+def build_payloads(tenant_id: str, services: Optional[List[str]] = None, actions: Optional[List[str]] = None,
+                   include_write: bool = False) -> List[Dict]:
+    """One Gateway request body per selected service/action"""
+    required = load_required_parameters()
+    payloads = []
+    for service, service_actions in load_action_map().items():
+        if services and service not in services:
+            continue
+        for action in service_actions:
+            if actions and action not in actions:
+                continue
+            if not include_write and not action.startswith('Get'):
+                continue
+            payload = {'service': service, 'action': action, 'tenantId': tenant_id}
+            for name in required.get(f"{service}:{action}", []):
+                payload[name] = SAMPLE_PARAMETERS.get(name, 'loadtest')
+            payloads.append(payload)
+    return payloads
+
+
+# ============================================================================
+# HISTOGRAM
+# ============================================================================
+
+class LatencyHistogram:
+    """
+    Log-linear histogram in the style of HdrHistogram. Values (microseconds)
+    share a bucket with every value that has the same top SUB_BUCKET_BITS
+    bits, so any recorded value is reported within 2**-(SUB_BUCKET_BITS-1).
+    """
+
+    SUB_BUCKET_BITS = 11
+
+    def __init__(self):
+        self.counts = Counter()
+        self.total = 0
+        self.min = None
+        self.max = 0
+        self._sum = 0
+        self._sum_sq = 0
+
+    def record(self, value_us: int):
+        value_us = max(int(value_us), 0)
+        shift = max(value_us.bit_length() - self.SUB_BUCKET_BITS, 0)
+        self.counts[(shift, value_us >> shift)] += 1
+        self.total += 1
+        self.min = value_us if self.min is None else min(self.min, value_us)
+        self.max = max(self.max, value_us)
+        self._sum += value_us
+        self._sum_sq += value_us * value_us
+
+    def _buckets(self) -> List[Tuple[int, int]]:
+        """(highest equivalent value, count) in value order"""
+        return sorted((((mantissa + 1) << shift) - 1, count) for (shift, mantissa), count in self.counts.items())
+
+    def value_at(self, percentile: float) -> int:
+        if not self.total:
+            return 0
+        target = max(math.ceil(self.total * percentile / 100), 1)
+        seen = 0
+        for value, count in self._buckets():
+            seen += count
+            if seen >= target:
+                return min(value, self.max)
+        return self.max
+
+    @property
+    def mean(self) -> float:
+        return self._sum / self.total if self.total else 0.0
+
+    @property
+    def stddev(self) -> float:
+        if not self.total:
+            return 0.0
+        return math.sqrt(max(self._sum_sq / self.total - self.mean ** 2, 0.0))
+
+    def summary(self) -> Dict:
+        ms = lambda us: round(us / 1000, 3)
+        return {
+            'count': self.total,
+            'min_ms': ms(self.min or 0),
+            'mean_ms': ms(self.mean),
+            'p50_ms': ms(self.value_at(50)),
+            'p90_ms': ms(self.value_at(90)),
+            'p95_ms': ms(self.value_at(95)),
+            'p99_ms': ms(self.value_at(99)),
+            'p999_ms': ms(self.value_at(99.9)),
+            'max_ms': ms(self.max),
+        }
+
+    def percentile_distribution(self, ticks_per_half_distance: int = 5) -> str:
+        """HdrHistogram .hgrm text (values in milliseconds), readable by the HdrHistogram plotter"""
+        lines = [f"{'Value':>12} {'Percentile':>14} {'TotalCount':>10} {'1/(1-Percentile)':>14}", '']
+        buckets = self._buckets()
+        percentile = 0.0
+        half = 0
+        while buckets:
+            target = max(math.ceil(self.total * percentile / 100), 1)
+            seen = 0
+            for value, count in buckets:
+                seen += count
+                if seen >= target:
+                    break
+            inverse = 1 / (1 - percentile / 100) if percentile < 100 else math.inf
+            inverse_text = f"{inverse:14.2f}" if math.isfinite(inverse) else f"{'inf':>14}"
+            lines.append(f"{min(value, self.max) / 1000:12.3f} {percentile / 100:14.12f} {seen:10d} {inverse_text}")
+            if percentile >= 100:
+                break
+            # Steps halve every half distance to 100%, as in HdrHistogram
+            half += 1
+            level = (half - 1) // ticks_per_half_distance
+            percentile += 100 / (2 ** (level + 1)) / ticks_per_half_distance
+            if inverse > self.total:
+                percentile = 100.0
+        lines.append(f"#[Mean    = {self.mean / 1000:12.3f}, StdDeviation   = {self.stddev / 1000:12.3f}]")
+        lines.append(f"#[Max     = {self.max / 1000:12.3f}, Total count    = {self.total:12d}]")
+        lines.append(f"#[Buckets = {len(self.counts):12d}, SubBuckets     = {2 ** self.SUB_BUCKET_BITS:12d}]")
+        return '\n'.join(lines) + '\n'
+
+
+# ============================================================================
+# HTTP CLIENT
+# ============================================================================
+
+class GatewayClient:
+    """Minimal HTTP/1.1 keep-alive client with a bounded connection pool"""
+
+    def __init__(self, url: str, function_key: Optional[str], max_connections: int, timeout: float,
+                 verify_tls: bool = True):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.https = parts.scheme == 'https'
+        self.port = parts.port or (443 if self.https else 80)
+        query = parts.query
+        if function_key:
+            query = f"{query}&{urlencode({'code': function_key})}" if query else urlencode({'code': function_key})
+        self.target = (parts.path or '/') + (f"?{query}" if query else '')
+        self.host_header = parts.netloc
+        self.timeout = timeout
+        self.ssl = None
+        if self.https:
+            self.ssl = ssl.create_default_context()
+            if not verify_tls:
+                self.ssl.check_hostname = False
+                self.ssl.verify_mode = ssl.CERT_NONE
+        self.slots = asyncio.Semaphore(max_connections)
+        self.idle: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+        self.connections_opened = 0
+
+    async def post(self, payload: Dict) -> Tuple[int, Dict[str, str], bytes, bool]:
+        """POST payload; returns (status, headers, body, new_connection)"""
+        async with self.slots:
+            new_connection = not self.idle
+            if new_connection:
+                reader, writer = await asyncio.wait_for(
+                    asyncio.open_connection(self.host, self.port, ssl=self.ssl), self.timeout)
+                self.connections_opened += 1
+            else:
+                reader, writer = self.idle.pop()
+            try:
+                status, headers, body = await asyncio.wait_for(self._exchange(reader, writer, payload), self.timeout)
+            except BaseException:
+                writer.close()
+                raise
+            if headers.get('connection', '').lower() == 'close':
+                writer.close()
+            else:
+                self.idle.append((reader, writer))
+            return status, headers, body, new_connection
+
+    async def _exchange(self, reader, writer, payload: Dict):
+        data = json.dumps(payload).encode('utf-8')
+        writer.write(
+            f"POST {self.target} HTTP/1.1\r\nHost: {self.host_header}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\nConnection: keep-alive\r\n\r\n".encode('latin-1') + data)
+        await writer.drain()
+
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionError("Connection closed by server")
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b';')[0], 16)
+                if size == 0:
+                    await reader.readline()
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readline()
+            body = b''.join(chunks)
+        else:
+            body = await reader.readexactly(int(headers.get('content-length') or 0))
+        return status, headers, body
+
+    def close(self):
+        for _, writer in self.idle:
+            writer.close()
+        self.idle.clear()
+
+
+# ============================================================================
+# LOAD RUN
+# ============================================================================
+
+class LoadRun:
+    def __init__(self, client: GatewayClient, payloads: List[Dict], rate: float, duration: float, seed: int):
+        self.client = client
+        self.payloads = payloads
+        self.rate = rate
+        self.duration = duration
+        self.random = random.Random(seed)
+        self.latency = LatencyHistogram()
+        self.service_time = LatencyHistogram()
+        self.by_action: Dict[str, LatencyHistogram] = {}
+        self.errors: Dict[str, Counter] = {}
+        self.statuses = Counter()
+        self.samples: List[Dict] = []
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        total = int(self.rate * self.duration)
+        start = loop.time()
+        tasks = []
+        for i in range(total):
+            scheduled = start + i / self.rate
+            delay = scheduled - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            payload = self.random.choice(self.payloads)
+            tasks.append(asyncio.ensure_future(self._one(payload, scheduled, scheduled - start)))
+        await asyncio.gather(*tasks)
+        self.wall_seconds = loop.time() - start
+
+    async def _one(self, payload: Dict, scheduled: float, offset: float):
+        loop = asyncio.get_running_loop()
+        key = f"{payload['service']}:{payload['action']}"
+        sent = None
+        status = None
+        error = None
+        gateway_ms = None
+        dispatch_mode = None
+        new_connection = False
+        try:
+            sent = loop.time()
+            status, headers, body, new_connection = await self.client.post(payload)
+            gateway_ms = headers.get('x-duration-ms')
+            dispatch_mode = headers.get('x-dispatch-mode')
+            if status >= 400:
+                error = f"HTTP {status}"
+            elif body[:1] == b'{':
+                try:
+                    if json.loads(body).get('success') is False:
+                        error = 'success=false'
+                except ValueError:
+                    error = 'invalid JSON'
+        except asyncio.TimeoutError:
+            error = 'timeout'
+        except (ConnectionError, OSError, ValueError, asyncio.IncompleteReadError) as e:
+            error = type(e).__name__
+        done = loop.time()
+
+        latency_us = (done - scheduled) * 1e6
+        self.latency.record(latency_us)
+        self.service_time.record((done - (sent or scheduled)) * 1e6)
+        self.by_action.setdefault(key, LatencyHistogram()).record(latency_us)
+        self.statuses[str(status) if status else 'none'] += 1
+        if error:
+            self.errors.setdefault(key, Counter())[error] += 1
+        self.samples.append({
+            'offset_s': round(offset, 3), 'request': key, 'latency_ms': round(latency_us / 1000, 3),
+            'status': status, 'error': error, 'new_connection': new_connection,
+            'gateway_ms': float(gateway_ms) if gateway_ms else None, 'dispatch_mode': dispatch_mode,
+        })
+
+    def cold_start_outliers(self, factor: float, floor_ms: float) -> List[Dict]:
+        """Requests slower than factor x median and floor_ms: cold starts, scale-outs and recycles"""
+        threshold = max(self.latency.value_at(50) / 1000 * factor, floor_ms)
+        return sorted((s for s in self.samples if s['latency_ms'] >= threshold), key=lambda s: s['offset_s'])
+
+    def report(self, factor: float, floor_ms: float) -> Dict:
+        error_count = sum(sum(c.values()) for c in self.errors.values())
+        outliers = self.cold_start_outliers(factor, floor_ms)
+        first = min(self.samples, key=lambda s: s['offset_s']) if self.samples else None
+        return {
+            'target': f"{'https' if self.client.https else 'http'}://{self.client.host_header}",
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'offered_rate_rps': self.rate,
+            'achieved_rate_rps': round(self.latency.total / self.wall_seconds, 2) if self.wall_seconds else 0,
+            'duration_s': round(self.wall_seconds, 3),
+            'requests': self.latency.total,
+            'errors': error_count,
+            'error_rate': round(error_count / self.latency.total, 4) if self.latency.total else 0,
+            'connections_opened': self.client.connections_opened,
+            'latency': self.latency.summary(),
+            'service_time': self.service_time.summary(),
+            'status_codes': dict(self.statuses),
+            'first_request': first,
+            'cold_start': {
+                'threshold_ms': round(max(self.latency.value_at(50) / 1000 * factor, floor_ms), 3),
+                'count': len(outliers),
+                'outliers': outliers[:50],
+            },
+            'by_action': {
+                key: dict(hist.summary(), errors=dict(self.errors.get(key, {})),
+                          error_rate=round(sum(self.errors.get(key, {}).values()) / hist.total, 4))
+                for key, hist in sorted(self.by_action.items())
+            },
+        }
+
+
+def write_report(run: LoadRun, report: Dict, output: Path) -> List[Path]:
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    written = [output]
+    for name, hist in (('latency', run.latency), ('service_time', run.service_time)):
+        path = output.with_name(f"{output.stem}.{name}.hgrm")
+        path.write_text(hist.percentile_distribution(), encoding='utf-8')
+        written.append(path)
+    return written
+
+
+def compare_dispatch(reports: Dict[str, Dict]) -> Dict:
+    """Latency of each dispatch mode and what InProcess saves over Http"""
+    comparison = {
+        mode: {
+            'requests': report['requests'],
+            'error_rate': report['error_rate'],
+            'latency': {k: report['latency'][k] for k in ('p50_ms', 'p95_ms', 'p99_ms', 'mean_ms')},
+            # Modes the Gateway reported using; a fallback to Http shows up here
+            'reported_modes': dict(Counter(s['dispatch_mode'] for s in report['samples'])),
+        }
+        for mode, report in reports.items()
+    }
+    if 'Http' in reports and 'InProcess' in reports:
+        http, inproc = comparison['Http']['latency'], comparison['InProcess']['latency']
+        comparison['saving'] = {
+            key: {'ms': round(http[key] - inproc[key], 3),
+                  'percent': round((http[key] - inproc[key]) / http[key] * 100, 1) if http[key] else 0.0}
+            for key in ('p50_ms', 'p95_ms', 'p99_ms', 'mean_ms')
+        }
+    return comparison
+
+
+def print_comparison(comparison: Dict):
+    print(f"\n{'dispatch mode':<15} {'requests':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'err %':>7}")
+    for mode, stats in comparison.items():
+        if mode == 'saving':
+            continue
+        latency = stats['latency']
+        print(f"{mode:<15} {stats['requests']:>9} {latency['p50_ms']:>9.1f} {latency['p95_ms']:>9.1f} "
+              f"{latency['p99_ms']:>9.1f} {stats['error_rate'] * 100:>6.1f}%")
+    if 'saving' in comparison:
+        saving = comparison['saving']
+        print(f"\n⚡ InProcess saves {saving['p50_ms']['ms']} ms at p50 ({saving['p50_ms']['percent']}%), "
+              f"{saving['p95_ms']['ms']} ms at p95 ({saving['p95_ms']['percent']}%)")
+
+
+def print_report(report: Dict):
+    latency = report['latency']
+    print(f"\n📊 {report['requests']} requests in {report['duration_s']}s "
+          f"({report['achieved_rate_rps']} rps offered {report['offered_rate_rps']})")
+    print(f"   latency  p50 {latency['p50_ms']} ms | p95 {latency['p95_ms']} ms | "
+          f"p99 {latency['p99_ms']} ms | max {latency['max_ms']} ms")
+    print(f"   errors   {report['errors']} ({report['error_rate']:.2%}) | status codes {report['status_codes']}")
+    print(f"   cold-start outliers (>= {report['cold_start']['threshold_ms']} ms): {report['cold_start']['count']}")
+    print(f"\n{'service:action':<45} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'err %':>7}")
+    for key, stats in report['by_action'].items():
+        print(f"{key:<45} {stats['count']:>6} {stats['p50_ms']:>9.1f} {stats['p95_ms']:>9.1f} "
+              f"{stats['p99_ms']:>9.1f} {stats['error_rate'] * 100:>6.1f}%")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Open-loop load generator for DefenderXDRGateway")
+    parser.add_argument('--url', default='http://localhost:7071/api/Gateway', help="Gateway endpoint URL")
+    parser.add_argument('--function-key', help="Function key, sent as ?code=")
+    parser.add_argument('--tenant-id', default=DEFAULT_TENANT)
+    parser.add_argument('--rate', type=float, default=10.0, help="Requests per second (open loop)")
+    parser.add_argument('--duration', type=float, default=30.0, help="Seconds to generate load for")
+    parser.add_argument('--services', nargs='+', help="Only these services")
+    parser.add_argument('--actions', nargs='+', help="Only these actions")
+    parser.add_argument('--include-write', action='store_true',
+                        help="Also send state-changing actions (offline stand-in only!)")
+    parser.add_argument('--max-connections', type=int, default=64)
+    parser.add_argument('--timeout', type=float, default=240.0, help="Per-request timeout in seconds")
+    parser.add_argument('--cold-start-factor', type=float, default=5.0,
+                        help="Outlier when latency exceeds this multiple of the median...")
+    parser.add_argument('--cold-start-ms', type=float, default=2000.0, help="...and at least this many ms")
+    parser.add_argument('--insecure', action='store_true', help="Skip TLS certificate verification")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help="JSON report path (default: .defenderc2-cache/loadtest/<timestamp>.json)")
+    parser.add_argument('--list', action='store_true', help="Print the payload mix and exit")
+    parser.add_argument('--dispatch-modes', nargs='+', choices=['InProcess', 'Http'],
+                        help="Run once per Gateway dispatch mode (sent as dispatchMode) and compare")
+    args = parser.parse_args(argv)
+
+    payloads = build_payloads(args.tenant_id, args.services, args.actions, args.include_write)
+    if args.list:
+        try:
+            for payload in payloads:
+                print(json.dumps(payload))
+            sys.stdout.flush()
+        except BrokenPipeError:
+            # Reader went away (--list | head); point stdout at devnull so the exit flush stays quiet too
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 0
+    if not payloads:
+        print("❌ No actions selected", file=sys.stderr)
+        return 2
+
+    async def execute(run_payloads: List[Dict]):
+        client = GatewayClient(args.url, args.function_key, args.max_connections, args.timeout,
+                               verify_tls=not args.insecure)
+        run = LoadRun(client, run_payloads, args.rate, args.duration, args.seed)
+        try:
+            await run.run()
+        finally:
+            client.close()
+        return run
+
+    output = Path(args.output or REPORT_DIR / f"{time.strftime('%Y%m%dT%H%M%S')}.json")
+    modes = args.dispatch_modes or [None]
+    reports = {}
+    errors = 0
+    for mode in modes:
+        run_payloads = [dict(p, dispatchMode=mode) for p in payloads] if mode else payloads
+        print(f"🚀 {args.rate} rps for {args.duration}s against {args.url} "
+              f"({len(payloads)} service/action payloads{f', dispatch {mode}' if mode else ''})")
+        run = asyncio.run(execute(run_payloads))
+        report = run.report(args.cold_start_factor, args.cold_start_ms)
+        report['dispatch_mode'] = mode
+        mode_output = output.with_name(f"{output.stem}.{mode.lower()}{output.suffix}") if mode else output
+        for path in write_report(run, report, mode_output):
+            print(f"💾 {path}")
+        print_report(report)
+        errors += report['errors']
+        if mode:
+            reports[mode] = dict(report, samples=run.samples)
+
+    if len(reports) > 1:
+        comparison = compare_dispatch(reports)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump({'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+                       'target': args.url, 'rate_rps': args.rate, 'duration_s': args.duration,
+                       'dispatch': comparison}, f, indent=2)
+        print(f"💾 {output}")
+        print_comparison(comparison)
+    return 1 if errors else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
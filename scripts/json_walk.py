@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Iterative JSON Traversal
+
+Generator-based, non-recursive walkers for workbooks and ARM templates:
+- walk() yields (location, node) for every dict/list node in pre-order,
+  using an explicit stack, so deep documents never hit the recursion limit
+- a location is a (parent_location, key) chain; it is only rendered into a
+  JSON pointer (to_pointer) or dotted path (to_path) when a caller asks
+- stream() matches keys while parsing incrementally with ijson, so multi-MB
+  templates are never loaded whole. ijson is optional (listed in
+  scripts/requirements-optional.txt); without it stream() falls back to
+  loading the document with json and walking it.
+
+Usage:
+    python3 scripts/json_walk.py <file.json> <key> [<key> ...] [--stream]
+"""
+
+import json
+import sys
+from typing import Any, Callable, Iterator, Optional, Tuple
+
+try:
+    import ijson
+except ImportError:  # optional dependency, only needed for streaming mode
+    ijson = None
+
+Location = Optional[Tuple]
+
+
+def keys_of(location: Location) -> list:
+    """The keys along a location chain, root first"""
+    keys = []
+    while location is not None:
+        location, key = location
+        keys.append(key)
+    keys.reverse()
+    return keys
+
+
+def to_pointer(location: Location) -> str:
+    """RFC 6901 JSON pointer, e.g. /items/0/content"""
+    return ''.join(
+        '/' + str(key).replace('~', '~0').replace('/', '~1') for key in keys_of(location)
+    )
+
+
+def to_path(location: Location) -> str:
+    """Dotted path used by the verify scripts, e.g. .items[0].content"""
+    return ''.join(f"[{key}]" if isinstance(key, int) else f".{key}" for key in keys_of(location))
+
+
+def walk(obj: Any, location: Location = None) -> Iterator[Tuple[Location, Any]]:
+    """
+    Yield (location, node) for every dict and list in obj, in document (pre-)order.
+
+    Children are expanded when their parent is visited, so callers may modify
+    a node's scalar values while iterating.
+    """
+    stack = [(obj, location)]
+    while stack:
+        node, loc = stack.pop()
+        if isinstance(node, dict):
+            yield loc, node
+            children = [(value, (loc, key)) for key, value in node.items()
+                        if isinstance(value, (dict, list))]
+            stack.extend(reversed(children))
+        elif isinstance(node, list):
+            yield loc, node
+            children = [(value, (loc, i)) for i, value in enumerate(node)
+                        if isinstance(value, (dict, list))]
+            stack.extend(reversed(children))
+
+
+def find(obj: Any, predicate: Callable[[Any], bool]) -> Iterator[Tuple[str, Any]]:
+    """Yield (JSON pointer, node) for every dict/list node matching predicate"""
+    for location, node in walk(obj):
+        if predicate(node):
+            yield to_pointer(location), node
+
+
+def find_keys(obj: Any, keys) -> Iterator[Tuple[str, Any]]:
+    """
+    Yield (JSON pointer, value) for every occurrence of any of keys, in memory.
+    Same results as stream(): matched values are not searched further.
+    """
+    keys = set(keys)
+    # Entries are (node, location, matched); matches are queued alongside
+    # children so they come out in document order
+    stack = [(obj, None, False)]
+    while stack:
+        node, loc, matched = stack.pop()
+        if matched:
+            yield to_pointer(loc), node
+        elif isinstance(node, dict):
+            children = [(value, (loc, key), key in keys) for key, value in node.items()
+                        if key in keys or isinstance(value, (dict, list))]
+            stack.extend(reversed(children))
+        elif isinstance(node, list):
+            children = [(value, (loc, i), False) for i, value in enumerate(node)
+                        if isinstance(value, (dict, list))]
+            stack.extend(reversed(children))
+
+
+def stream(fp, keys) -> Iterator[Tuple[str, Any]]:
+    """
+    Yield (JSON pointer, value) for every occurrence of any of keys while
+    parsing fp incrementally. Only the matched values are materialized; a
+    match nested inside another matched value is returned as part of it.
+
+    fp must be a binary file object. Falls back to json.load + find_keys when
+    ijson is not installed.
+    """
+    keys = set(keys)
+    if ijson is None:
+        yield from find_keys(json.loads(fp.read()), keys)
+        return
+
+    # ijson's C backend rejects a UTF-8 BOM; ARM templates saved on Windows often have one
+    if hasattr(fp, 'peek') and fp.peek(3)[:3] == b'\xef\xbb\xbf':
+        fp.read(3)
+
+    # One [is_array, current key or index] entry per open container;
+    # ijson reports array elements as 'item', so indexes are tracked here
+    containers = []
+    builder = None
+    depth = 0
+    pointer = None
+
+    for _, event, value in ijson.parse(fp, use_float=True):
+        if builder is not None:
+            builder.event(event, value)
+            if event in ('start_map', 'start_array'):
+                depth += 1
+            elif event in ('end_map', 'end_array'):
+                depth -= 1
+            if depth == 0:
+                yield pointer, builder.value
+                builder = None
+                _advance(containers)
+            continue
+
+        if event == 'map_key':
+            containers[-1][1] = value
+            if value in keys:
+                pointer = ''.join(
+                    '/' + str(key).replace('~', '~0').replace('/', '~1') for _, key in containers
+                )
+                builder = ijson.ObjectBuilder()
+        elif event in ('start_map', 'start_array'):
+            is_array = event == 'start_array'
+            containers.append([is_array, 0 if is_array else None])
+        elif event in ('end_map', 'end_array'):
+            containers.pop()
+            _advance(containers)
+        else:
+            _advance(containers)
+
+
+def _advance(containers):
+    # After a complete value inside an array, move on to the next index
+    if containers and containers[-1][0]:
+        containers[-1][1] += 1
+
+
+def main():
+    args = [a for a in sys.argv[1:] if a != '--stream']
+    if len(args) < 2:
+        print(f"Usage: {sys.argv[0]} <file.json> <key> [<key> ...] [--stream]", file=sys.stderr)
+        return 2
+    path, keys = args[0], args[1:]
+    with open(path, 'rb') as f:
+        matches = stream(f, keys) if '--stream' in sys.argv else find_keys(json.load(f), keys)
+        for pointer, value in matches:
+            text = value if isinstance(value, str) else json.dumps(value)
+            print(f"{pointer}: {text[:100]}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
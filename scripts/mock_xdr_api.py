@@ -0,0 +1,591 @@
+#!/usr/bin/env python3
+"""
+Offline Defender / Graph API Stand-in
+
+A single asyncio HTTP server that answers the calls the function app workers
+make, so Gateway -> Orchestrator -> workers can be driven at production-like
+rates without a tenant:
+- AAD token endpoint        POST /{tenant}/oauth2/v2.0/token
+- MDE machines and actions  /api/machines, /api/machines/{id}/{action}, /api/machineactions
+- MDE indicators            /api/indicators, POST /api/indicators/import and /api/indicators/BatchDelete
+- MDE advanced hunting      POST /api/advancedqueries/run
+- Graph users and risk      /v1.0/users, /v1.0/identityProtection/riskyUsers, riskDetections
+- Graph Incident API        /v1.0/security/incidents, /v1.0/security/alerts_v2
+- Graph mail search         /v1.0/users/{id}/messages?$search=
+- Graph JSON batching       POST /v1.0/$batch (up to 20 requests, each throttled on its own)
+
+Collections are paged with @odata.nextLink. Every response can be delayed
+(--latency-ms/--jitter-ms) and throttled with 429 + Retry-After, either at
+random (--throttle-rate) or past a request rate (--rate-limit). Unknown GETs
+return an empty collection and other unknown calls 204, so every worker
+action gets an answer.
+
+Point the function app at the server by setting XDR_MOCK_API_BASE (see
+functions/profile.ps1). GET /_mock/stats returns request counters and
+POST /_mock/reset clears them along with any stored state.
+
+Usage:
+    python3 scripts/mock_xdr_api.py --port 8765
+    python3 scripts/mock_xdr_api.py --latency-ms 80 --jitter-ms 40 --throttle-rate 0.05 --page-size 50
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import re
+import sys
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+MAX_BODY_BYTES = 16 * 1024 * 1024
+
+REASONS = {200: 'OK', 201: 'Created', 204: 'No Content', 400: 'Bad Request', 404: 'Not Found',
+           413: 'Payload Too Large', 429: 'Too Many Requests', 500: 'Internal Server Error'}
+
+MAX_BATCH_REQUESTS = 20
+MAX_INDICATOR_BATCH = 500
+
+MESSAGE_SUBJECTS = ['Weekly status report', 'Lunch on Friday?', 'Quarterly planning',
+                    'Action required: invoice payment overdue', 'Your parcel could not be delivered']
+
+MACHINE_ACTIONS = {
+    'isolate': 'Isolate', 'unisolate': 'Unisolate',
+    'restrictcodeexecution': 'RestrictCodeExecution', 'unrestrictcodeexecution': 'UnrestrictCodeExecution',
+    'runantivirusscan': 'RunAntiVirusScan', 'collectinvestigationpackage': 'CollectInvestigationPackage',
+    'stopandquarantinefile': 'StopAndQuarantineFile', 'offboard': 'Offboard',
+    'startinvestigation': 'StartInvestigation', 'runliveresponse': 'LiveResponse',
+}
+
+
+class Response:
+    __slots__ = ('status', 'body', 'headers')
+
+    def __init__(self, status: int = 200, body=None, headers: Optional[Dict[str, str]] = None):
+        self.status = status
+        self.body = body
+        self.headers = headers or {}
+
+
+class Request:
+    __slots__ = ('method', 'path', 'query', 'headers', 'body')
+
+    def __init__(self, method: str, target: str, headers: Dict[str, str], body: bytes):
+        parts = urlsplit(target)
+        self.method = method
+        self.path = parts.path
+        self.query = dict(parse_qsl(parts.query))
+        self.headers = headers
+        self.body = body
+
+    def json(self):
+        if not self.body:
+            return {}
+        try:
+            return json.loads(self.body)
+        except ValueError:
+            return {}
+
+    def base_url(self) -> str:
+        return f"http://{self.headers.get('host', 'localhost')}"
+
+
+def stable_id(kind: str, i: int, length: int = 40) -> str:
+    """Deterministic hex id; stable_id('machine', i) is the id of the i-th machine"""
+    return hashlib.sha1(f"{kind}-{i}".encode('ascii')).hexdigest()[:length]
+
+
+def stable_guid(kind: str, i: int) -> str:
+    """Deterministic GUID; stable_guid('user', i) is the id of the i-th user"""
+    return str(uuid.UUID(hashlib.md5(f"{kind}-{i}".encode('ascii')).hexdigest()))
+
+
+def _iso(dt: datetime) -> str:
+    return dt.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
+
+class MockXdrApi:
+    """Dataset, routing and fault injection for the stand-in server"""
+
+    def __init__(self, machines: int = 500, users: int = 300, incidents: int = 200, page_size: int = 100,
+                 latency_ms: float = 0.0, jitter_ms: float = 0.0, throttle_rate: float = 0.0,
+                 rate_limit: float = 0.0, retry_after: int = 1, token_ttl: int = 3599, seed: int = 1):
+        self.page_size = page_size
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.throttle_rate = throttle_rate
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.token_ttl = token_ttl
+        self.random = random.Random(seed)
+        self.sizes = {'machines': machines, 'users': users, 'incidents': incidents}
+        self.routes: List[Tuple[str, re.Pattern, Callable]] = []
+        self._register_routes()
+        self.reset()
+
+    # ------------------------------------------------------------------ state
+
+    def reset(self):
+        """Rebuild the dataset and clear counters"""
+        now = datetime.now(timezone.utc).replace(microsecond=0)
+        rnd = random.Random(0)
+        self.machines = [{
+            'id': stable_id('machine', i),
+            'computerDnsName': f"host-{i:05d}.contoso.local",
+            'osPlatform': rnd.choice(['Windows10', 'Windows11', 'WindowsServer2022', 'Linux', 'macOS']),
+            'healthStatus': rnd.choice(['Active', 'Active', 'Active', 'Inactive']),
+            'riskScore': rnd.choice(['None', 'Low', 'Medium', 'High']),
+            'lastIpAddress': f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}",
+            'aadDeviceId': stable_guid('aad-device', i),
+            'lastSeen': _iso(now - timedelta(minutes=rnd.randint(0, 10000))),
+        } for i in range(self.sizes['machines'])]
+        self.users = [{
+            'id': stable_guid('user', i),
+            'displayName': f"User {i:05d}",
+            'userPrincipalName': f"user{i:05d}@contoso.com",
+            'accountEnabled': True,
+        } for i in range(self.sizes['users'])]
+        self.incidents = []
+        self.alerts = []
+        for i in range(self.sizes['incidents']):
+            created = now - timedelta(hours=self.sizes['incidents'] - i)
+            incident_id = str(1000 + i)
+            self.incidents.append({
+                'id': incident_id,
+                'displayName': f"Incident {incident_id}",
+                'severity': rnd.choice(['informational', 'low', 'medium', 'high']),
+                'status': rnd.choice(['active', 'active', 'inProgress', 'resolved']),
+                'classification': 'unknown',
+                'assignedTo': None,
+                'createdDateTime': _iso(created),
+                'lastUpdateDateTime': _iso(created + timedelta(minutes=rnd.randint(0, 600))),
+            })
+            for j in range(rnd.randint(1, 3)):
+                self.alerts.append({
+                    'id': f"da{stable_id('alert', i * 10 + j, 30)}",
+                    'incidentId': incident_id,
+                    'title': f"Alert {j} for incident {incident_id}",
+                    'severity': self.incidents[-1]['severity'],
+                    'status': 'new',
+                    'createdDateTime': _iso(created),
+                    'lastUpdateDateTime': _iso(created),
+                })
+        self.machines_by_id = {m['id']: m for m in self.machines}
+        self.users_by_key = {u['id']: u for u in self.users}
+        self.users_by_key.update({u['userPrincipalName'].lower(): u for u in self.users})
+        self.user_index = {u['id']: i for i, u in enumerate(self.users)}
+        self.incidents_by_id = {inc['id']: inc for inc in self.incidents}
+        self.indicators: Dict[str, Dict] = {}
+        self.machine_actions: Dict[str, Dict] = {}
+        self.next_indicator_id = 1
+        self.counters = Counter()
+        self.started = time.time()
+        self._bucket_tokens = self.rate_limit
+        self._bucket_updated = time.monotonic()
+
+    # ------------------------------------------------------------ fault model
+
+    def _throttled(self) -> bool:
+        if self.rate_limit > 0:
+            now = time.monotonic()
+            self._bucket_tokens = min(self.rate_limit,
+                                      self._bucket_tokens + (now - self._bucket_updated) * self.rate_limit)
+            self._bucket_updated = now
+            if self._bucket_tokens < 1:
+                return True
+            self._bucket_tokens -= 1
+        return self.throttle_rate > 0 and self.random.random() < self.throttle_rate
+
+    async def handle(self, request: Request) -> Response:
+        if request.path.startswith('/_mock/'):
+            return self._control(request)
+
+        self.counters['requests'] += 1
+        delay = self.latency_ms + (self.random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+
+        if self._throttled():
+            return self._throttle_response()
+        return self.dispatch(request)
+
+    def _throttle_response(self) -> Response:
+        self.counters['throttled'] += 1
+        return Response(429, {'error': {'code': 'TooManyRequests',
+                                        'message': 'Rate limit is exceeded. Try again later.'}},
+                        {'Retry-After': str(self.retry_after)})
+
+    def dispatch(self, request: Request) -> Response:
+        """Route a request to its handler (no latency or throttling applied)"""
+        for method, pattern, handler in self.routes:
+            if method != request.method:
+                continue
+            match = pattern.fullmatch(request.path)
+            if match:
+                self.counters[f"{method} {pattern.pattern}"] += 1
+                return handler(request, *match.groups())
+
+        self.counters['unrouted'] += 1
+        if request.method == 'GET':
+            return Response(200, {'value': []})
+        return Response(204)
+
+    def _control(self, request: Request) -> Response:
+        if request.path == '/_mock/stats':
+            elapsed = max(time.time() - self.started, 1e-9)
+            return Response(200, {'uptimeSeconds': round(elapsed, 3),
+                                  'requestsPerSecond': round(self.counters['requests'] / elapsed, 2),
+                                  'counters': dict(self.counters)})
+        if request.path == '/_mock/reset' and request.method == 'POST':
+            self.reset()
+            return Response(204)
+        return Response(404, {'error': {'code': 'NotFound', 'message': request.path}})
+
+    # ---------------------------------------------------------------- routing
+
+    def _route(self, method: str, pattern: str, handler: Callable):
+        self.routes.append((method, re.compile(pattern, re.IGNORECASE), handler))
+
+    def _register_routes(self):
+        # AAD
+        self._route('POST', r'/([^/]+)/oauth2/v2\.0/token', self.token)
+        # MDE
+        self._route('GET', r'/api/machines', lambda r: self.page(r, self.machines))
+        self._route('GET', r'/api/machines/([^/]+)', self.get_machine)
+        self._route('POST', r'/api/machines/([^/]+)/([A-Za-z]+)', self.machine_action)
+        self._route('GET', r'/api/machineactions', lambda r: self.page(r, list(self.machine_actions.values())))
+        self._route('GET', r'/api/machineactions/([^/]+)', self.get_machine_action)
+        self._route('GET', r'/api/indicators', lambda r: self.page(r, list(self.indicators.values())))
+        self._route('POST', r'/api/indicators', self.add_indicator)
+        self._route('POST', r'/api/indicators/import', self.import_indicators)
+        self._route('POST', r'/api/indicators/BatchDelete', self.batch_delete_indicators)
+        self._route('DELETE', r'/api/indicators/([^/]+)', self.delete_indicator)
+        self._route('POST', r'/api/advancedqueries/run', self.advanced_hunting)
+        # Graph
+        self._route('POST', r'/v1\.0/security/runHuntingQuery', self.advanced_hunting)
+        self._route('GET', r'/(?:v1\.0|beta)/users', lambda r: self.page(r, self.users))
+        self._route('GET', r'/(?:v1\.0|beta)/users/([^/]+)', self.get_user)
+        self._route('GET', r'/(?:v1\.0|beta)/users/([^/]+)/messages', self.user_messages)
+        self._route('POST', r'/(v1\.0|beta)/\$batch', self.batch)
+        self._route('GET', r'/(?:v1\.0|beta)/identityProtection/riskyUsers', self.risky_users)
+        self._route('GET', r'/(?:v1\.0|beta)/identityProtection/riskDetections', self.risk_detections)
+        self._route('GET', r'/(?:v1\.0|beta)/security/incidents', lambda r: self.page(r, self.incidents))
+        self._route('GET', r'/(?:v1\.0|beta)/security/incidents/([^/]+)', self.get_incident)
+        self._route('PATCH', r'/(?:v1\.0|beta)/security/incidents/([^/]+)', self.update_incident)
+        self._route('GET', r'/(?:v1\.0|beta)/security/incidents/([^/]+)/alerts',
+                    lambda r, incident_id: self.page(r, [a for a in self.alerts if a['incidentId'] == incident_id]))
+        self._route('GET', r'/(?:v1\.0|beta)/security/alerts_v2', lambda r: self.page(r, self.alerts))
+
+    def page(self, request: Request, items: List[Dict]) -> Response:
+        """
+        OData collection page of at most page_size items. $skip is honoured and
+        $top caps the total across pages; the next page is linked by @odata.nextLink.
+        """
+        try:
+            skip = max(int(request.query.get('$skip', 0)), 0)
+            top = max(int(request.query['$top']), 1) if '$top' in request.query else len(items)
+        except ValueError:
+            return Response(400, {'error': {'code': 'BadRequest', 'message': 'Invalid $top or $skip'}})
+        size = min(top, self.page_size)
+        body = {'value': items[skip:skip + size]}
+        if min(len(items), skip + top) > skip + size:
+            query = dict(request.query, **{'$skip': str(skip + size)})
+            if '$top' in request.query:
+                query['$top'] = str(top - size)
+            body['@odata.nextLink'] = f"{request.base_url()}{request.path}?{urlencode(query)}"
+        return Response(200, body)
+
+    # --------------------------------------------------------------- handlers
+
+    def token(self, request: Request, tenant: str) -> Response:
+        self.counters['tokens_issued'] += 1
+        return Response(200, {
+            'token_type': 'Bearer',
+            'expires_in': self.token_ttl,
+            'ext_expires_in': self.token_ttl,
+            'access_token': f"mock.{tenant}.{uuid.uuid4().hex}",
+        })
+
+    def get_machine(self, request: Request, machine_id: str) -> Response:
+        machine = self.machines_by_id.get(machine_id)
+        if not machine:
+            return Response(404, {'error': {'code': 'ResourceNotFound', 'message': f"Machine {machine_id} not found"}})
+        return Response(200, machine)
+
+    def machine_action(self, request: Request, machine_id: str, action: str) -> Response:
+        if machine_id not in self.machines_by_id:
+            return Response(404, {'error': {'code': 'ResourceNotFound', 'message': f"Machine {machine_id} not found"}})
+        body = request.json()
+        action_id = str(uuid.uuid4())
+        record = {
+            'id': action_id,
+            'type': MACHINE_ACTIONS.get(action.lower(), action),
+            'machineId': machine_id,
+            'requestor': 'mock',
+            'requestorComment': body.get('Comment'),
+            'status': 'Pending',
+            'creationDateTimeUtc': _iso(datetime.now(timezone.utc)),
+        }
+        self.machine_actions[action_id] = record
+        return Response(201, record)
+
+    def get_machine_action(self, request: Request, action_id: str) -> Response:
+        record = self.machine_actions.get(action_id)
+        if not record:
+            return Response(404, {'error': {'code': 'ResourceNotFound', 'message': f"Action {action_id} not found"}})
+        # Actions complete on the second status poll
+        record['status'] = 'Succeeded' if record['status'] != 'Pending' else 'InProgress'
+        return Response(200, record)
+
+    def add_indicator(self, request: Request) -> Response:
+        body = request.json()
+        indicator = dict(body, id=str(self.next_indicator_id))
+        self.next_indicator_id += 1
+        self.indicators[indicator['id']] = indicator
+        return Response(200, indicator)
+
+    def import_indicators(self, request: Request) -> Response:
+        """
+        Adds or updates each indicator (same type and value) and reports
+        { id, indicator, isFailed, failureReason } per submitted item
+        """
+        items = request.json().get('Indicators') or []
+        if len(items) > MAX_INDICATOR_BATCH:
+            return Response(400, {'error': {'code': 'BadRequest',
+                                            'message': f"At most {MAX_INDICATOR_BATCH} indicators per request"}})
+        existing = {(i.get('indicatorType', '').lower(), str(i.get('indicatorValue', '')).lower()): i
+                    for i in self.indicators.values()}
+        outcomes = []
+        for item in items:
+            value = item.get('indicatorValue')
+            if not value or not item.get('indicatorType') or not item.get('action'):
+                outcomes.append({'id': None, 'indicator': value, 'isFailed': True,
+                                 'failureReason': 'indicatorValue, indicatorType and action are required'})
+                continue
+            key = (item['indicatorType'].lower(), str(value).lower())
+            if key in existing:
+                indicator = dict(existing[key], **item)
+            else:
+                indicator = dict(item, id=str(self.next_indicator_id))
+                self.next_indicator_id += 1
+            self.indicators[indicator['id']] = existing[key] = indicator
+            outcomes.append({'id': indicator['id'], 'indicator': value, 'isFailed': False, 'failureReason': None})
+        return Response(200, {'value': outcomes})
+
+    def batch_delete_indicators(self, request: Request) -> Response:
+        """Deletes indicators by id; like the real endpoint, 204 for the whole request (unknown ids are ignored)"""
+        ids = request.json().get('IndicatorIds') or []
+        if len(ids) > MAX_INDICATOR_BATCH:
+            return Response(400, {'error': {'code': 'BadRequest',
+                                            'message': f"At most {MAX_INDICATOR_BATCH} ids per request"}})
+        for indicator_id in ids:
+            self.indicators.pop(str(indicator_id), None)
+        return Response(204)
+
+    def delete_indicator(self, request: Request, indicator_id: str) -> Response:
+        if self.indicators.pop(indicator_id, None) is None:
+            return Response(404, {'error': {'code': 'ResourceNotFound', 'message': f"Indicator {indicator_id} not found"}})
+        return Response(204)
+
+    def advanced_hunting(self, request: Request) -> Response:
+        rows = [{'DeviceId': m['id'], 'DeviceName': m['computerDnsName'], 'Timestamp': m['lastSeen']}
+                for m in self.machines[:self.page_size]]
+        schema = [{'Name': 'DeviceId', 'Type': 'String'}, {'Name': 'DeviceName', 'Type': 'String'},
+                  {'Name': 'Timestamp', 'Type': 'DateTime'}]
+        if request.path.lower().startswith('/v1.0/'):
+            return Response(200, {'schema': [{'name': c['Name'], 'type': c['Type']} for c in schema], 'results': rows})
+        return Response(200, {'Schema': schema, 'Results': rows})
+
+    def get_user(self, request: Request, key: str) -> Response:
+        user = self.users_by_key.get(key.lower()) or self.users_by_key.get(key)
+        if not user:
+            return Response(404, {'error': {'code': 'Request_ResourceNotFound', 'message': f"User {key} not found"}})
+        return Response(200, user)
+
+    def user_messages(self, request: Request, key: str) -> Response:
+        """Five messages per mailbox; every fifth mailbox holds the invoice phish"""
+        user = self.users_by_key.get(key.lower()) or self.users_by_key.get(key)
+        if not user:
+            return Response(404, {'error': {'code': 'ErrorItemNotFound', 'message': f"Mailbox {key} not found"}})
+        i = self.user_index[user['id']]
+        messages = [{
+            'id': f"AAMk{stable_id('message', i * 10 + j, 32)}",
+            'subject': subject,
+            'from': {'emailAddress': {'address': 'billing@contoso-payments.example' if j == 3 else
+                                      f"user{(i + j + 1) % max(len(self.users), 1):05d}@contoso.com"}},
+            'receivedDateTime': _iso(datetime(2024, 1, 1, tzinfo=timezone.utc) + timedelta(hours=i + j)),
+        } for j, subject in enumerate(MESSAGE_SUBJECTS) if j != 3 or i % 5 == 0]
+        term = request.query.get('$search', '').strip('"').lower()
+        if term:
+            messages = [m for m in messages if term in m['subject'].lower()]
+        return self.page(request, messages)
+
+    def batch(self, request: Request, version: str) -> Response:
+        """
+        JSON batching: each sub-request is routed on its own and can be throttled
+        individually (429 + Retry-After inside the batch), as Graph does.
+        """
+        requests = request.json().get('requests') or []
+        if not requests or len(requests) > MAX_BATCH_REQUESTS:
+            return Response(400, {'error': {'code': 'BadRequest',
+                                            'message': f"A batch must hold 1 to {MAX_BATCH_REQUESTS} requests"}})
+        responses = []
+        for sub in requests:
+            if self._throttled():
+                result = self._throttle_response()
+            else:
+                body = sub.get('body')
+                result = self.dispatch(Request(
+                    str(sub.get('method', 'GET')).upper(), f"/{version}/{str(sub.get('url', '')).lstrip('/')}",
+                    dict(request.headers, **{k.lower(): v for k, v in (sub.get('headers') or {}).items()}),
+                    json.dumps(body).encode('utf-8') if body is not None else b''))
+            self.counters['batch_requests'] += 1
+            responses.append({'id': sub.get('id'), 'status': result.status,
+                              'headers': result.headers, 'body': result.body})
+        return Response(200, {'responses': responses})
+
+    def risky_users(self, request: Request) -> Response:
+        risky = [{'id': u['id'], 'userPrincipalName': u['userPrincipalName'], 'riskLevel': 'medium',
+                  'riskState': 'atRisk'} for u in self.users[::10]]
+        return self.page(request, risky)
+
+    def risk_detections(self, request: Request) -> Response:
+        detections = [{'id': stable_guid('detection', i), 'userId': u['id'],
+                       'userPrincipalName': u['userPrincipalName'], 'riskEventType': 'unfamiliarFeatures',
+                       'riskLevel': 'medium'} for i, u in enumerate(self.users[::10])]
+        return self.page(request, detections)
+
+    def get_incident(self, request: Request, incident_id: str) -> Response:
+        incident = self.incidents_by_id.get(incident_id)
+        if not incident:
+            return Response(404, {'error': {'code': 'NotFound', 'message': f"Incident {incident_id} not found"}})
+        return Response(200, incident)
+
+    def update_incident(self, request: Request, incident_id: str) -> Response:
+        incident = self.incidents_by_id.get(incident_id)
+        if not incident:
+            return Response(404, {'error': {'code': 'NotFound', 'message': f"Incident {incident_id} not found"}})
+        incident.update({k: v for k, v in request.json().items() if k in incident and k != 'id'})
+        incident['lastUpdateDateTime'] = _iso(datetime.now(timezone.utc))
+        return Response(200, incident)
+
+
+# ---------------------------------------------------------------------- HTTP
+
+
+async def _read_request(reader: asyncio.StreamReader) -> Optional[Request]:
+    line = await reader.readline()
+    if not line:
+        return None
+    try:
+        method, target, _ = line.decode('latin-1').split(' ', 2)
+    except ValueError:
+        raise ValueError("Malformed request line")
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    length = int(headers.get('content-length') or 0)
+    if length > MAX_BODY_BYTES:
+        raise OverflowError(length)
+    body = await reader.readexactly(length) if length else b''
+    return Request(method.upper(), target, headers, body)
+
+
+def _encode_response(response: Response, keep_alive: bool) -> bytes:
+    payload = b'' if response.body is None else json.dumps(response.body).encode('utf-8')
+    headers = {
+        'Content-Length': str(len(payload)),
+        'Connection': 'keep-alive' if keep_alive else 'close',
+        'request-id': str(uuid.uuid4()),
+    }
+    if payload:
+        headers['Content-Type'] = 'application/json; charset=utf-8'
+    headers.update(response.headers)
+    head = f"HTTP/1.1 {response.status} {REASONS.get(response.status, 'Unknown')}\r\n"
+    head += ''.join(f"{k}: {v}\r\n" for k, v in headers.items())
+    return head.encode('latin-1') + b'\r\n' + payload
+
+
+async def serve_connection(api: MockXdrApi, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    """HTTP/1.1 connection loop with keep-alive"""
+    try:
+        while True:
+            try:
+                request = await _read_request(reader)
+            except OverflowError:
+                writer.write(_encode_response(Response(413), False))
+                break
+            except (ValueError, asyncio.IncompleteReadError):
+                writer.write(_encode_response(Response(400), False))
+                break
+            if request is None:
+                break
+
+            keep_alive = request.headers.get('connection', '').lower() != 'close'
+            try:
+                response = await api.handle(request)
+            except Exception as e:
+                response = Response(500, {'error': {'code': 'InternalServerError', 'message': str(e)}})
+            writer.write(_encode_response(response, keep_alive))
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.CancelledError):
+        pass
+    finally:
+        writer.close()
+
+
+async def run_server(api: MockXdrApi, host: str, port: int, ready: Optional[asyncio.Event] = None):
+    server = await asyncio.start_server(lambda r, w: serve_connection(api, r, w), host, port, backlog=1024)
+    if ready is not None:
+        ready.set()
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline stand-in for the MDE, Graph and AAD token APIs")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=float, default=0.0, help="Added delay per request")
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help="Uniform +/- jitter on the delay")
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help="Fraction of requests answered 429")
+    parser.add_argument('--rate-limit', type=float, default=0.0,
+                        help="Requests per second served before answering 429 (0 = unlimited)")
+    parser.add_argument('--retry-after', type=int, default=1, help="Retry-After seconds on 429 responses")
+    parser.add_argument('--page-size', type=int, default=100, help="Maximum items per collection page")
+    parser.add_argument('--machines', type=int, default=500)
+    parser.add_argument('--users', type=int, default=300)
+    parser.add_argument('--incidents', type=int, default=200)
+    parser.add_argument('--token-ttl', type=int, default=3599, help="expires_in of issued tokens")
+    parser.add_argument('--seed', type=int, default=1, help="Seed for jitter and random throttling")
+    args = parser.parse_args(argv)
+
+    api = MockXdrApi(machines=args.machines, users=args.users, incidents=args.incidents,
+                     page_size=args.page_size, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                     throttle_rate=args.throttle_rate, rate_limit=args.rate_limit,
+                     retry_after=args.retry_after, token_ttl=args.token_ttl, seed=args.seed)
+    print(f"🧪 Mock XDR API listening on http://{args.host}:{args.port} "
+          f"({args.machines} machines, {args.users} users, {args.incidents} incidents)")
+    print(f"   Set XDR_MOCK_API_BASE=http://{args.host}:{args.port} for the function app")
+    try:
+        asyncio.run(run_server(api, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
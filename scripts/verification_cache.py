@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Incremental Verification Cache
+
+Stores verification results on disk keyed by the SHA-256 of the checked
+file's contents plus the checker name and version. Unchanged files return
+their stored result without being parsed again. Entries are evicted least
+recently used first once the cache grows past its size limit; every
+writer enforces the limit, so no caller has to prune.
+
+Default location is .defenderc2-cache/ at the repository root; override
+with the DEFENDERC2_CACHE_DIR environment variable.
+"""
+
+import hashlib
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent.parent / '.defenderc2-cache'
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+
+
+def file_digest(path: str) -> str:
+    """SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class VerificationCache:
+    """On-disk result cache with size-bounded LRU eviction (one JSON file per entry)"""
+
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = Path(cache_dir or os.environ.get('DEFENDERC2_CACHE_DIR') or DEFAULT_CACHE_DIR)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        # Running estimate of the cache size; None until the first put scans the directory
+        self._approx_bytes: Optional[int] = None
+
+    def _entry_path(self, content_hash: str, checker: str, version: str) -> Path:
+        key = hashlib.sha256(f"{checker}\0{version}\0{content_hash}".encode('utf-8')).hexdigest()
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, content_hash: str, checker: str, version: str) -> Optional[Any]:
+        """Stored result for this content/checker/version, or None"""
+        entry = self._entry_path(content_hash, checker, version)
+        try:
+            with open(entry, 'r', encoding='utf-8') as f:
+                result = json.load(f)['result']
+        except (OSError, ValueError, KeyError):
+            self.misses += 1
+            return None
+        # Access time drives LRU eviction; mtime is used because atime is often disabled
+        try:
+            os.utime(entry)
+        except OSError:
+            pass
+        self.hits += 1
+        return result
+
+    def put(self, content_hash: str, checker: str, version: str, result: Any):
+        """Store a JSON-serializable result (atomic write, safe across worker processes)"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        entry = self._entry_path(content_hash, checker, version)
+        payload = {'checker': checker, 'version': version, 'sha256': content_hash, 'result': result}
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(payload, f, ensure_ascii=False)
+            os.replace(tmp_path, entry)
+        except OSError:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            return
+        self._enforce_limit(entry)
+
+    def _enforce_limit(self, written: Path):
+        """Prune once the estimated size passes max_bytes (overwrites count twice, which only prunes early)"""
+        if self._approx_bytes is None:
+            self._approx_bytes = self._scan()[1]
+        else:
+            try:
+                self._approx_bytes += written.stat().st_size
+            except OSError:
+                pass
+        if self._approx_bytes > self.max_bytes:
+            self.prune()
+
+    def _scan(self):
+        """(entries as (mtime, size, path), total bytes)"""
+        entries = []
+        total = 0
+        for entry in self.cache_dir.glob('*.json'):
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry))
+            total += stat.st_size
+        return entries, total
+
+    def run(self, path: str, checker: str, version: str, check: Callable[[str], Any]) -> Any:
+        """
+        Return the cached result for path, or run check(path) and store its result.
+        An unreadable path is not cached: check(path) runs and reports the failure itself.
+        """
+        try:
+            content_hash = file_digest(path)
+        except OSError:
+            self.misses += 1
+            return check(path)
+        result = self.get(content_hash, checker, version)
+        if result is None:
+            result = check(path)
+            self.put(content_hash, checker, version, result)
+        return result
+
+    def prune(self) -> int:
+        """Evict least recently used entries until the cache fits in max_bytes; returns evicted count"""
+        if not self.cache_dir.is_dir():
+            return 0
+        entries, total = self._scan()
+
+        evicted = 0
+        for _, size, entry in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                entry.unlink()
+                total -= size
+                evicted += 1
+            except OSError:
+                pass
+        self._approx_bytes = total
+        return evicted
+
+    def clear(self):
+        if self.cache_dir.is_dir():
+            for entry in self.cache_dir.glob('*.json'):
+                entry.unlink()
+
+
+def main():
+    """Cache maintenance: 'prune' or 'clear'"""
+    command = sys.argv[1] if len(sys.argv) > 1 else 'prune'
+    cache = VerificationCache()
+    if command == 'clear':
+        cache.clear()
+        print(f"🗑️  Cleared {cache.cache_dir}")
+    elif command == 'prune':
+        print(f"🧹 Evicted {cache.prune()} entries from {cache.cache_dir}")
+    else:
+        print(f"Usage: {sys.argv[0]} [prune|clear]", file=sys.stderr)
+        return 2
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
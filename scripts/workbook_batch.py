@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Batch Workbook Fixer / Verifier
+
+Runs the ARM action fix and the structural verification over many workbooks
+at once, one workbook per worker process, and prints a per-file summary.
+Exits non-zero if any workbook fails to load, fix or verify.
+
+Usage:
+    python3 scripts/workbook_batch.py workbook/*.json workbook/*.workbook "archive/old-workbooks/*"
+    python3 scripts/workbook_batch.py --fix --dry-run "workbook/*"
+    python3 scripts/workbook_batch.py --json --workers 8 "archive/**/*.json"
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List
+
+from fix_arm_actions_proper import ARM_PATH_PREFIX, FUNCTION_NAMES, rewrite_arm_actions
+from verification_cache import VerificationCache
+from workbook_index import WorkbookIndex
+
+# Bump whenever verify_workbook() or the index changes so cached results are invalidated
+CHECKER_NAME = 'workbook_batch.verify'
+CHECKER_VERSION = '1'
+
+# Only files with these suffixes are picked up from glob matches (skips README.md etc.)
+WORKBOOK_SUFFIXES = ('.json', '.workbook')
+
+
+def expand_patterns(patterns: List[str]) -> List[str]:
+    """Expand shell-style globs (including **) into a de-duplicated, ordered file list"""
+    paths = []
+    seen = set()
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True))
+        if not matches and os.path.isfile(pattern):
+            matches = [pattern]
+        for match in matches:
+            if not os.path.isfile(match) or not match.endswith(WORKBOOK_SUFFIXES):
+                continue
+            key = os.path.realpath(match)
+            if key not in seen:
+                seen.add(key)
+                paths.append(match)
+    return paths
+
+
+def verify_workbook(index: WorkbookIndex) -> List[str]:
+    """Structural checks shared with verify_workbook_deployment.py / verify_arm_actions.py"""
+    issues = []
+
+    for ref in index.malformed_queries:
+        issues.append(f"Malformed query at {ref.path}: {ref.error}")
+
+    for i, ref in enumerate(index.customendpoint_queries, 1):
+        url = ref.query_obj.get('url', '')
+        if '{FunctionAppName}' not in url:
+            issues.append(f"CustomEndpoint query {i} not using FunctionAppName placeholder")
+
+    for i, context in enumerate(index.arm_action_contexts, 1):
+        path = context.get('path') or ''
+        if path.startswith('https://'):
+            issues.append(f"ARM action {i} uses direct HTTPS path")
+        elif path.startswith('/subscriptions/'):
+            has_api_version = 'api-version' in path or any(
+                p.get('key') == 'api-version' for p in context.get('params') or []
+            )
+            if not has_api_version:
+                issues.append(f"ARM action {i} missing api-version parameter")
+
+    return issues
+
+
+def process_workbook(path: str, fix: bool = False, dry_run: bool = False, use_cache: bool = True) -> Dict:
+    """
+    Fix and/or verify a single workbook. Runs inside a worker process.
+
+    Verify-only runs are served from the verification cache when the file
+    contents are unchanged since the last run.
+    """
+    if fix or not use_cache:
+        return _process_workbook(path, fix, dry_run)
+
+    cache = VerificationCache()
+    try:
+        result = cache.run(path, CHECKER_NAME, CHECKER_VERSION, _process_workbook)
+    except OSError as e:
+        return {'path': path, 'ok': False, 'fixed': 0, 'written': False, 'issues': [f"Failed to load: {e}"]}
+    result['path'] = path
+    result['cached'] = cache.hits > 0
+    return result
+
+
+def _process_workbook(path: str, fix: bool = False, dry_run: bool = False) -> Dict:
+    result = {'path': path, 'ok': False, 'fixed': 0, 'written': False, 'issues': []}
+
+    try:
+        with open(path, 'r', encoding='utf-8-sig') as f:
+            workbook = json.load(f)
+    except (OSError, ValueError) as e:
+        result['issues'].append(f"Failed to load: {e}")
+        return result
+
+    if fix:
+        fix_results = rewrite_arm_actions(workbook, FUNCTION_NAMES)
+        result['fixed'] = fix_results['total_fixed']
+        if result['fixed'] and not dry_run:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(workbook, f, indent=2, ensure_ascii=False)
+            result['written'] = True
+
+    index = WorkbookIndex(workbook)
+    result['summary'] = index.summary()
+    result['arm_paths'] = sum(
+        1 for c in index.arm_action_contexts if (c.get('path') or '').startswith(ARM_PATH_PREFIX)
+    )
+    result['issues'].extend(verify_workbook(index))
+    result['ok'] = not result['issues']
+    return result
+
+
+def run_batch(paths: List[str], fix: bool = False, dry_run: bool = False, workers: int = 0,
+              use_cache: bool = True) -> List[Dict]:
+    """Process every path, one workbook per worker; results keep the input order"""
+    workers = workers or min(len(paths), os.cpu_count() or 1)
+    if workers <= 1 or len(paths) <= 1:
+        return [process_workbook(p, fix, dry_run, use_cache) for p in paths]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(process_workbook, p, fix, dry_run, use_cache) for p in paths]
+        results = []
+        for path, future in zip(paths, futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                results.append({'path': path, 'ok': False, 'fixed': 0, 'written': False,
+                                'issues': [f"Worker failed: {e}"]})
+        return results
+
+
+def print_summary(results: List[Dict], fix: bool, dry_run: bool):
+    print("\n" + "=" * 70)
+    print("  WORKBOOK BATCH SUMMARY")
+    print("=" * 70 + "\n")
+
+    for r in results:
+        status = '✅' if r['ok'] else '❌'
+        line = f"{status} {r['path']}"
+        if r.get('cached'):
+            line += "  (cached)"
+        if fix:
+            verb = 'would fix' if dry_run else 'fixed'
+            line += f"  ({verb} {r['fixed']} ARM actions)"
+        print(line)
+        for issue in r['issues']:
+            print(f"    - {issue}")
+
+    failed = sum(1 for r in results if not r['ok'])
+    print(f"\n📊 {len(results)} workbooks, {len(results) - failed} passed, {failed} failed")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fix and verify many workbooks in parallel")
+    parser.add_argument("patterns", nargs="+", help="Workbook files or glob patterns")
+    parser.add_argument("--fix", action="store_true", help="Rewrite direct HTTPS ARM actions before verifying")
+    parser.add_argument("--dry-run", action="store_true", help="With --fix, report changes without writing")
+    parser.add_argument("--workers", type=int, default=0, help="Worker processes (default: one per CPU)")
+    parser.add_argument("--json", action="store_true", help="Print the per-file summary as JSON")
+    parser.add_argument("--no-cache", action="store_true", help="Re-verify every file even if unchanged")
+    args = parser.parse_args(argv)
+
+    paths = expand_patterns(args.patterns)
+    if not paths:
+        print("❌ No workbook files matched", file=sys.stderr)
+        return 2
+
+    results = run_batch(paths, fix=args.fix, dry_run=args.dry_run, workers=args.workers,
+                        use_cache=not args.no_cache)
+    if not args.no_cache:
+        VerificationCache().prune()
+
+    if args.json:
+        print(json.dumps(results, indent=2, ensure_ascii=False))
+    else:
+        print_summary(results, args.fix, args.dry_run)
+
+    return 0 if all(r['ok'] for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
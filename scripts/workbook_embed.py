@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Workbook Embed / Extract
+
+Handles the workbook payload carried by the deployment templates:
+- deployment/azuredeploy.json embeds the workbook as a base64 string in
+  variables.workbookContent (decoded by base64ToString at deploy time)
+- deployment/workbook-deploy.json takes the workbook object through its
+  workbookContent parameter (see workbook-deploy.parameters.example.json)
+
+The embedded payload is decoded straight from bytes into a WorkbookIndex,
+without an intermediate string or a re-serialized copy of the workbook.
+
+Usage:
+    python3 scripts/workbook_embed.py check    [--template T] [--workbook W]
+    python3 scripts/workbook_embed.py extract  [--template T] --output FILE
+    python3 scripts/workbook_embed.py embed    [--template T] [--workbook W]
+    python3 scripts/workbook_embed.py params   [--workbook W] --output FILE
+"""
+
+import argparse
+import base64
+import binascii
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from workbook_index import WorkbookIndex
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_TEMPLATE = REPO_ROOT / 'deployment' / 'azuredeploy.json'
+DEFAULT_WORKBOOK = REPO_ROOT / 'workbook' / 'DefenderXDR-Complete.json'
+DEFAULT_PARAMS_BASE = REPO_ROOT / 'deployment' / 'workbook-deploy.parameters.example.json'
+
+PLACEHOLDER = '__FUNCTION_APP_NAME_PLACEHOLDER__'
+
+
+class EmbedError(Exception):
+    """Raised when a template does not carry a decodable workbook payload"""
+
+
+def load_template(template_path: str) -> Dict:
+    """Load an ARM template or parameters file (tolerates a UTF-8 BOM)"""
+    with open(template_path, 'r', encoding='utf-8-sig') as f:
+        return json.load(f)
+
+
+def find_workbook_resource(template: Dict) -> Optional[Dict]:
+    for resource in template.get('resources', []):
+        if 'workbook' in resource.get('type', '').lower():
+            return resource
+    return None
+
+
+def decode_embedded(template: Dict) -> Tuple[Any, Dict]:
+    """
+    Return (workbook, stats) from a template's workbook payload.
+
+    Accepts the base64 variables.workbookContent form (azuredeploy.json) and
+    the parameters.workbookContent.value object form (workbook-deploy parameter files).
+    """
+    variables = template.get('variables', {})
+    if 'workbookContent' in variables:
+        try:
+            raw = base64.b64decode(variables['workbookContent'], validate=True)
+        except (binascii.Error, ValueError) as e:
+            raise EmbedError(f"workbookContent is not valid base64: {e}")
+        try:
+            # json.loads detects the encoding of bytes itself; no decoded str copy is kept
+            workbook = json.loads(raw)
+        except ValueError as e:
+            raise EmbedError(f"Embedded workbook is not valid JSON: {e}")
+        stats = {
+            'form': 'base64',
+            'size': len(raw),
+            'function_app_name_refs': raw.count(b'FunctionAppName'),
+            'placeholder_refs': raw.count(PLACEHOLDER.encode('ascii')),
+        }
+        return workbook, stats
+
+    parameter = template.get('parameters', {}).get('workbookContent')
+    if isinstance(parameter, dict) and isinstance(parameter.get('value'), dict):
+        return parameter['value'], {'form': 'parameter'}
+
+    raise EmbedError("No workbookContent variable or parameter value found")
+
+
+def extract_index(template_path: str) -> Tuple[WorkbookIndex, Dict]:
+    """Decode the template's workbook payload straight into a WorkbookIndex"""
+    workbook, stats = decode_embedded(load_template(template_path))
+    return WorkbookIndex(workbook), stats
+
+
+def encode_workbook(workbook_path: str) -> str:
+    """base64 payload for variables.workbookContent, from the workbook file bytes as-is"""
+    with open(workbook_path, 'rb') as f:
+        return base64.b64encode(f.read()).decode('ascii')
+
+
+def first_difference(a: Any, b: Any, path: str = '') -> Optional[str]:
+    """Path of the first node where two JSON structures differ, or None if equal"""
+    stack = [(a, b, path)]
+    while stack:
+        x, y, p = stack.pop()
+        if isinstance(x, dict) and isinstance(y, dict):
+            if x.keys() != y.keys():
+                missing = [k for k in x if k not in y] or [k for k in y if k not in x]
+                return f"{p}.{missing[0]}"
+            stack.extend((x[k], y[k], f"{p}.{k}") for k in reversed(list(x)))
+        elif isinstance(x, list) and isinstance(y, list):
+            if len(x) != len(y):
+                return p or '.'
+            stack.extend((x[i], y[i], f"{p}[{i}]") for i in reversed(range(len(x))))
+        elif x != y:
+            return p or '.'
+    return None
+
+
+def check_drift(template_path: str, workbook_path: str) -> Dict:
+    """Compare the embedded workbook with the source workbook structurally"""
+    index, stats = extract_index(template_path)
+    with open(workbook_path, 'r', encoding='utf-8-sig') as f:
+        source = json.load(f)
+
+    difference = first_difference(index.workbook, source)
+    return {
+        'template': str(template_path),
+        'workbook': str(workbook_path),
+        'drifted': difference is not None,
+        'first_difference': difference,
+        'stats': stats,
+        'embedded_summary': index.summary(),
+    }
+
+
+def embed(template_path: str, workbook_path: str) -> bool:
+    """
+    Regenerate variables.workbookContent from the workbook file.
+
+    The base64 value is swapped in the template text directly, so the rest of
+    the template keeps its formatting (and BOM). Returns True if it changed.
+    """
+    with open(template_path, 'rb') as f:
+        text = f.read()
+
+    template = json.loads(text)
+    current = template.get('variables', {}).get('workbookContent')
+    if not isinstance(current, str):
+        raise EmbedError("Template has no base64 workbookContent variable to replace")
+
+    payload = encode_workbook(workbook_path)
+    if payload == current:
+        return False
+
+    old = current.encode('ascii')
+    if text.count(old) != 1:
+        raise EmbedError("workbookContent value is not unique in the template text")
+    with open(template_path, 'wb') as f:
+        f.write(text.replace(old, payload.encode('ascii')))
+    return True
+
+
+def write_parameters(workbook_path: str, output_path: str, base_path: str = DEFAULT_PARAMS_BASE):
+    """Write a workbook-deploy.json parameters file carrying the workbook object"""
+    parameters = load_template(base_path)
+    with open(workbook_path, 'r', encoding='utf-8-sig') as f:
+        parameters.setdefault('parameters', {})['workbookContent'] = {'value': json.load(f)}
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(parameters, f, indent=2, ensure_ascii=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Embed, extract and drift-check the deployment workbook payload")
+    parser.add_argument('command', choices=['check', 'extract', 'embed', 'params'])
+    parser.add_argument('--template', default=str(DEFAULT_TEMPLATE), help="ARM template or parameters file")
+    parser.add_argument('--workbook', default=str(DEFAULT_WORKBOOK), help="Source workbook JSON")
+    parser.add_argument('--output', help="Output file for extract / params")
+    parser.add_argument('--params-base', default=str(DEFAULT_PARAMS_BASE),
+                        help="Parameters file used as the base for 'params'")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == 'check':
+            result = check_drift(args.template, args.workbook)
+            print(json.dumps(result, indent=2))
+            if result['drifted']:
+                print(f"❌ Embedded workbook has drifted from {args.workbook} "
+                      f"(first difference at {result['first_difference']})")
+                return 1
+            print(f"✅ Embedded workbook matches {args.workbook}")
+            return 0
+
+        if args.command == 'extract':
+            if not args.output:
+                parser.error("extract requires --output")
+            workbook, _ = decode_embedded(load_template(args.template))
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(workbook, f, indent=2, ensure_ascii=False)
+            print(f"✅ Extracted workbook to {args.output}")
+            return 0
+
+        if args.command == 'embed':
+            changed = embed(args.template, args.workbook)
+            print(f"✅ Updated workbookContent in {args.template}" if changed
+                  else f"ℹ️  workbookContent in {args.template} already up to date")
+            return 0
+
+        if not args.output:
+            parser.error("params requires --output")
+        write_parameters(args.workbook, args.output, args.params_base)
+        print(f"✅ Wrote workbook-deploy parameters to {args.output}")
+        return 0
+
+    except (OSError, ValueError, EmbedError) as e:
+        print(f"❌ Error: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
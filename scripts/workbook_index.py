@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Single-pass Workbook Index
+
+Walks an Azure Workbook JSON document once and buckets the nodes that the
+verification and fix scripts care about:
+1. Workbook items by type (1 text, 3 KQL, 9 parameters, 11 links, 12 groups)
+2. Embedded JSON queries by version (ARMEndpoint/1.0, CustomEndpoint/1.0)
+3. Links with linkTarget == "ArmAction" and every armActionContext
+
+The walk is iterative (json_walk.walk), path strings are only built when a
+caller asks for them, and each embedded query string is decoded once per run
+through a shared QueryDecoder. stream_queries() covers files too large to
+load whole.
+"""
+
+import json
+import sys
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from json_walk import stream, to_path, to_pointer, walk
+
+
+ARM_ENDPOINT_VERSION = 'ARMEndpoint/1.0'
+CUSTOM_ENDPOINT_VERSION = 'CustomEndpoint/1.0'
+
+ITEM_TYPE_TEXT = 1
+ITEM_TYPE_QUERY = 3
+ITEM_TYPE_PARAMETERS = 9
+ITEM_TYPE_LINKS = 11
+ITEM_TYPE_GROUP = 12
+
+
+class DecodedQuery:
+    """Result of decoding one embedded query string: the parsed value or the parse error"""
+
+    __slots__ = ('value', 'error')
+
+    def __init__(self, value: Any = None, error: Optional[str] = None):
+        self.value = value
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class QueryDecoder:
+    """
+    Memoized json.loads for query strings embedded in workbooks.
+
+    Entries are keyed by the string itself, so the same query text is parsed
+    once no matter how many workbooks or passes ask for it. Parse errors are
+    cached too, so callers can report them instead of swallowing them.
+    Decoded values are shared: copy before mutating.
+    """
+
+    def __init__(self):
+        self._cache: Dict[str, DecodedQuery] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def decode(self, text: str) -> DecodedQuery:
+        decoded = self._cache.get(text)
+        if decoded is not None:
+            self.hits += 1
+            return decoded
+
+        self.misses += 1
+        try:
+            decoded = DecodedQuery(value=json.loads(text))
+        except ValueError as e:
+            decoded = DecodedQuery(error=str(e))
+        self._cache[text] = decoded
+        return decoded
+
+    def errors(self) -> List[Tuple[str, str]]:
+        """(query text, error) for every string that failed to parse"""
+        return [(text, d.error) for text, d in self._cache.items() if not d.ok]
+
+    def clear(self):
+        self._cache.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+# Shared by every script in the process
+default_decoder = QueryDecoder()
+
+
+def looks_like_json_query(query: Any) -> bool:
+    """Embedded endpoint queries are JSON objects; KQL queries are plain text"""
+    return isinstance(query, str) and query.lstrip().startswith('{')
+
+
+def decode_query(text: str) -> DecodedQuery:
+    """Decode an embedded query string through the shared cache"""
+    return default_decoder.decode(text)
+
+
+class QueryRef:
+    """An embedded query found in the workbook, with its lazily built path"""
+
+    __slots__ = ('query_obj', 'parent', 'error', '_chain')
+
+    def __init__(self, query_obj: Optional[Dict], parent: Dict, chain: Optional[Tuple],
+                 error: Optional[str] = None):
+        self.query_obj = query_obj
+        self.parent = parent
+        self.error = error
+        self._chain = chain
+
+    @property
+    def path(self) -> str:
+        return to_path(self._chain)
+
+    @property
+    def pointer(self) -> str:
+        return to_pointer(self._chain)
+
+    def __getitem__(self, key: str):
+        # Keeps callers written against the old {'path', 'query_obj', 'parent'} dicts working
+        return getattr(self, key)
+
+
+class WorkbookIndex:
+    """One-pass index over a workbook (or ARM template) JSON structure"""
+
+    def __init__(self, workbook: Any, decoder: Optional[QueryDecoder] = None):
+        self.workbook = workbook
+        self.decoder = decoder or default_decoder
+        self.items_by_type: Dict[Any, List[Dict]] = {}
+        self.queries_by_version: Dict[str, List[QueryRef]] = {}
+        self.malformed_queries: List[QueryRef] = []
+        self.arm_action_links: List[Dict] = []
+        self.arm_action_contexts: List[Dict] = []
+        self._build()
+
+    @classmethod
+    def of(cls, workbook: Any) -> 'WorkbookIndex':
+        """Return workbook unchanged if it is already an index, otherwise index it"""
+        return workbook if isinstance(workbook, cls) else cls(workbook)
+
+    def _build(self):
+        """Single pre-order walk; visits nodes in the same order as the old recursive finders"""
+        for chain, node in walk(self.workbook):
+            if not isinstance(node, dict):
+                continue
+
+            if 'type' in node and 'content' in node:
+                self.items_by_type.setdefault(node['type'], []).append(node)
+
+            query = node.get('query')
+            if looks_like_json_query(query):
+                decoded = self.decoder.decode(query)
+                if not decoded.ok:
+                    self.malformed_queries.append(QueryRef(None, node, chain, decoded.error))
+                elif isinstance(decoded.value, dict) and 'version' in decoded.value:
+                    self.queries_by_version.setdefault(decoded.value['version'], []).append(
+                        QueryRef(decoded.value, node, chain)
+                    )
+
+            if node.get('linkTarget') == 'ArmAction':
+                self.arm_action_links.append(node)
+            if 'armActionContext' in node:
+                self.arm_action_contexts.append(node['armActionContext'])
+
+    def items_of_type(self, item_type: int) -> List[Dict]:
+        """All workbook items of the given type, in document order"""
+        return self.items_by_type.get(item_type, [])
+
+    def queries(self, version: str) -> List[QueryRef]:
+        """All embedded queries with the given version, in document order"""
+        return self.queries_by_version.get(version, [])
+
+    @property
+    def armendpoint_queries(self) -> List[QueryRef]:
+        return self.queries(ARM_ENDPOINT_VERSION)
+
+    @property
+    def customendpoint_queries(self) -> List[QueryRef]:
+        return self.queries(CUSTOM_ENDPOINT_VERSION)
+
+    def parameters(self, top_level_only: bool = False) -> List[Dict]:
+        """
+        Every parameter definition from every parameters item, in document order.
+        top_level_only limits it to the workbook's own items list, leaving out
+        parameters items nested in groups (what the deployment verifier checks).
+        """
+        if top_level_only:
+            top_items = self.workbook.get('items', []) if isinstance(self.workbook, dict) else []
+            items = [i for i in top_items if isinstance(i, dict) and i.get('type') == ITEM_TYPE_PARAMETERS]
+        else:
+            items = self.items_of_type(ITEM_TYPE_PARAMETERS)
+        params = []
+        for item in items:
+            params.extend(item.get('content', {}).get('parameters', []))
+        return params
+
+    def summary(self) -> Dict:
+        """Bucket sizes, useful for quick reports"""
+        return {
+            'items_by_type': {str(k): len(v) for k, v in self.items_by_type.items()},
+            'queries_by_version': {k: len(v) for k, v in self.queries_by_version.items()},
+            'arm_action_links': len(self.arm_action_links),
+            'arm_action_contexts': len(self.arm_action_contexts),
+            'malformed_queries': len(self.malformed_queries),
+        }
+
+
+def stream_queries(fp, decoder: Optional[QueryDecoder] = None) -> Iterator[Tuple[str, DecodedQuery]]:
+    """
+    Yield (JSON pointer, decoded query) for every embedded JSON query while
+    parsing a binary file incrementally, for workbooks too large to index whole
+    """
+    decoder = decoder or default_decoder
+    for pointer, query in stream(fp, ['query']):
+        if looks_like_json_query(query):
+            yield pointer, decoder.decode(query)
+
+
+def main():
+    """Print the index summary for each workbook given on the command line"""
+    paths = [a for a in sys.argv[1:] if a != '--stream']
+    if not paths:
+        print(f"Usage: {sys.argv[0]} <workbook.json> [...] [--stream]", file=sys.stderr)
+        return 2
+    for workbook_path in paths:
+        if '--stream' in sys.argv:
+            with open(workbook_path, 'rb') as f:
+                versions: Dict[str, int] = {}
+                for pointer, decoded in stream_queries(f):
+                    if not decoded.ok:
+                        print(f"  Malformed query at {pointer}: {decoded.error}")
+                    elif isinstance(decoded.value, dict):
+                        version = decoded.value.get('version', 'unknown')
+                        versions[version] = versions.get(version, 0) + 1
+            print(workbook_path)
+            print(json.dumps({'queries_by_version': versions}, indent=2))
+            continue
+        with open(workbook_path, 'r', encoding='utf-8') as f:
+            index = WorkbookIndex(json.load(f))
+        print(workbook_path)
+        print(json.dumps(index.summary(), indent=2))
+        for ref in index.malformed_queries:
+            print(f"  Malformed query at {ref.path}: {ref.error}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())